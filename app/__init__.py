@@ -1,3 +1,4 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf.csrf import CSRFProtect
@@ -10,8 +11,9 @@ from flask_migrate import Migrate # Descomentar si usas Flask-Migrate
 from config import config # Importa el diccionario de configuraciones
 # Importar helpers
 from .utils.helpers import format_currency, format_datetime, format_date, format_pedido_folio
+from .utils.db_routing import RoutingSession # Sesión que envía lecturas @solo_lectura a la réplica
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 csrf = CSRFProtect()
 login_manager = LoginManager()
 login_manager.session_protection = 'strong' # Protección de sesión
@@ -21,7 +23,9 @@ login_manager.login_message_category = "info"
 
 migrate = Migrate() # Descomentar si usas Flask-Migrate
 
-def create_app(config_name='default'):
+def create_app(config_name=None):
+    # FLASK_CONFIG permite elegir el perfil (ej. 'production' con PostgreSQL) sin tocar run.py
+    config_name = config_name or os.environ.get('FLASK_CONFIG') or 'default'
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     # REMOVER: config[config_name].init_app(app) # Esta línea es incorrecta
@@ -31,6 +35,26 @@ def create_app(config_name='default'):
     login_manager.init_app(app)
     migrate.init_app(app, db) # Inicializar Flask-Migrate
 
+    # Conteo de consultas, tiempo de BD y consultas lentas por petición (Server-Timing + log)
+    from .utils import db_instrumentation
+    db_instrumentation.init_app(app)
+
+    # Histogramas de latencia por endpoint para /metrics
+    from .utils import metrics
+    metrics.init_app(app)
+
+    # Caché de bytecode de Jinja (las plantillas se compilan una vez, no en cada worker)
+    from .utils import plantillas
+    plantillas.init_app(app)
+
+    # URLs con huella y caché inmutable para app/static/dist (después de `flask build-assets`)
+    from .utils import assets
+    assets.init_app(app)
+
+    # Compresión gzip/brotli de HTML y JSON (registrada al final: corre antes que los hooks de métricas)
+    from .utils import compresion
+    compresion.init_app(app)
+
     # Registrar Blueprints
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint)
@@ -50,6 +74,9 @@ def create_app(config_name='default'):
     from .caja import caja as caja_blueprint
     app.register_blueprint(caja_blueprint, url_prefix='/caja')
 
+    from .trabajos import trabajos as trabajos_blueprint
+    app.register_blueprint(trabajos_blueprint, url_prefix='/trabajos')
+
     # Context processor para hacer 'config' y 'now' disponibles en todas las plantillas
     @app.context_processor
     def inject_variables():
@@ -67,6 +94,9 @@ def create_app(config_name='default'):
     app.jinja_env.globals['format_date'] = format_date
     app.jinja_env.globals['format_pedido_folio'] = format_pedido_folio
 
+    # Compilar las plantillas al arrancar (después de registrar blueprints y filtros)
+    if app.config.get('TEMPLATES_PRECOMPILAR_AL_INICIO'):
+        plantillas.precalentar(app)
 
     # Registrar comandos CLI personalizados
     def register_cli_commands(app):
@@ -107,6 +137,121 @@ def create_app(config_name='default'):
                 # Opcional: db.session.rollback() si hubo un error a mitad del proceso
                 raise e # Re-lanzar la excepción para ver el traceback completo
 
+        @app.cli.command('migrate-sqlite')
+        @click.argument('ruta_sqlite', type=click.Path(exists=True, dir_okay=False))
+        @click.option('--chunk-size', default=5000, show_default=True, help='Filas por lote.')
+        @click.option('--vaciar', is_flag=True, help='Borra los datos del destino antes de copiar.')
+        def migrate_sqlite_command(ruta_sqlite, chunk_size, vaciar):
+            """Copia los datos de un archivo SQLite (ej. app.db) a la BD configurada (ej. PostgreSQL)."""
+            from app.utils.db_migration import migrar_sqlite_a_destino # Importar dentro de la función
+            click.echo(f'Copiando datos de {ruta_sqlite} hacia {db.engine.url.render_as_string(hide_password=True)}...')
+            resumen = migrar_sqlite_a_destino(ruta_sqlite, chunk_size=chunk_size, vaciar_destino=vaciar)
+            for tabla, filas in resumen.items():
+                click.echo(f'  {tabla}: {filas} filas')
+            click.echo('Migración de datos completada.')
+
+        @app.cli.command('seed-scale')
+        @click.option('--pedidos', default=10000, show_default=True, help='Total de pedidos a generar.')
+        @click.option('--clientes', type=int, default=None, help='Clientes a generar (por defecto pedidos/10).')
+        @click.option('--dias', default=365, show_default=True, help='Días de operación simulados.')
+        @click.option('--cajeros', default=2, show_default=True, help='Cajeros (un corte por cajero por día).')
+        @click.option('--repartidores', default=3, show_default=True, help='Repartidores para pedidos a domicilio.')
+        @click.option('--semilla', default=42, show_default=True, help='Semilla del RNG (datos reproducibles).')
+        @click.option('--hasta', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Último día simulado (hoy por defecto).')
+        @click.option('--chunk-size', default=5000, show_default=True, help='Filas por lote de inserción.')
+        def seed_scale_command(pedidos, clientes, dias, cajeros, repartidores, semilla, hasta, chunk_size):
+            """Genera datos sintéticos a gran escala (clientes, pedidos, caja y cortes) para pruebas de volumen."""
+            import time
+            from app.seed_scale import seed_scale_data # Importar dentro de la función
+            click.echo(f'Generando {pedidos} pedidos en {dias} días (semilla {semilla})...')
+            inicio = time.perf_counter()
+            totales = seed_scale_data(
+                pedidos=pedidos, clientes=clientes, dias=dias, cajeros=cajeros, repartidores=repartidores,
+                semilla=semilla, hasta=hasta.date() if hasta else None, chunk_size=chunk_size, progreso=click.echo
+            )
+            for tabla, filas in totales.items():
+                click.echo(f'  {tabla}: {filas} filas')
+            click.echo(f'Generación completada en {time.perf_counter() - inicio:.1f} s.')
+
+        @app.cli.command('archivar-pedidos')
+        @click.option('--dias', type=int, default=None, help='Días sin cambios de los pedidos cerrados (por defecto ARCHIVO_PEDIDOS_DIAS).')
+        @click.option('--chunk-size', default=1000, show_default=True, help='Pedidos por lote (un commit por lote).')
+        @click.option('--limite', type=int, default=None, help='Máximo de pedidos a archivar en esta corrida.')
+        def archivar_pedidos_command(dias, chunk_size, limite):
+            """Mueve los pedidos cerrados antiguos (con ítems, PAs y movimientos) a las tablas de archivo."""
+            from app.utils.archivo import archivar_pedidos_cerrados # Importar dentro de la función
+            dias = dias if dias is not None else app.config.get('ARCHIVO_PEDIDOS_DIAS', 90)
+            click.echo(f'Archivando pedidos cerrados sin cambios en los últimos {dias} días...')
+            totales = archivar_pedidos_cerrados(dias=dias, chunk_size=chunk_size, limite=limite, progreso=click.echo)
+            if totales is None:
+                click.echo('Error durante el archivado; los lotes completados sí quedaron archivados.', err=True)
+                raise SystemExit(1)
+            for tabla, filas in totales.items():
+                click.echo(f'  {tabla}: {filas} filas')
+            click.echo('Archivado completado.')
+
+        @app.cli.command('exportar-columnar')
+        @click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), required=True, help='Primer día a exportar.')
+        @click.option('--hasta', type=click.DateTime(formats=['%Y-%m-%d']), required=True, help='Último día a exportar (inclusive).')
+        @click.option('--formato', type=click.Choice(['parquet', 'arrow']), default='parquet', show_default=True, help='Parquet o Arrow IPC (Feather v2).')
+        @click.option('--salida', default='exportacion', show_default=True, help='Carpeta destino (una subcarpeta por tabla y mes).')
+        @click.option('--tablas', default=None, help='Tablas separadas por coma (por defecto pedidos, ítems, PAs y movimientos de caja).')
+        @click.option('--chunk-size', type=int, default=None, help='Filas por lote (por defecto EXPORTACION_CHUNK_SIZE).')
+        def exportar_columnar_command(desde, hasta, formato, salida, tablas, chunk_size):
+            """Exporta pedidos y movimientos de caja a Parquet/Arrow particionado por mes."""
+            import time
+            from app.utils import exportacion # Importar dentro de la función
+            if exportacion.pa is None:
+                click.echo('Error: el paquete pyarrow no está instalado (pip install pyarrow).', err=True)
+                raise SystemExit(1)
+            tablas = [t.strip() for t in tablas.split(',') if t.strip()] if tablas else None
+            click.echo(f'Exportando {desde:%Y-%m-%d} a {hasta:%Y-%m-%d} en {formato} a {salida}...')
+            inicio = time.perf_counter()
+            totales = exportacion.exportar_columnar(
+                salida, desde.date(), hasta.date(), formato=formato, tablas=tablas,
+                chunk_size=chunk_size or app.config.get('EXPORTACION_CHUNK_SIZE', exportacion.CHUNK_SIZE_DEFAULT),
+                compresion=app.config.get('EXPORTACION_COMPRESION', exportacion.COMPRESION_DEFAULT), progreso=click.echo
+            )
+            if totales is None:
+                click.echo('Error durante la exportación.', err=True)
+                raise SystemExit(1)
+            for tabla, total in totales.items():
+                click.echo(f"  {tabla}: {total['filas']} filas en {total['archivos']} archivos ({total['bytes'] / 1024:.0f} KB)")
+            click.echo(f'Exportación completada en {time.perf_counter() - inicio:.1f} s.')
+
+        @app.cli.command('worker')
+        @click.option('--una-vez', is_flag=True, help='Procesa los trabajos pendientes y termina (cron, tests).')
+        @click.option('--intervalo', type=float, default=None, help='Segundos entre consultas sin pendientes (por defecto TRABAJOS_INTERVALO).')
+        @click.option('--tipos', default=None, help='Solo estas tareas, separadas por coma (ej. reporte_pedidos_detalle).')
+        def worker_command(una_vez, intervalo, tipos):
+            """Ejecuta los trabajos en segundo plano encolados (reportes, archivado, exportaciones)."""
+            from app.trabajos.services import trabajar, identificador_worker # Importar dentro de la función
+            tipos = [t.strip() for t in tipos.split(',') if t.strip()] if tipos else None
+            click.echo(f"Worker {identificador_worker()} esperando trabajos{' de ' + ', '.join(tipos) if tipos else ''}...")
+            ejecutados = trabajar(intervalo=intervalo, una_vez=una_vez, tipos=tipos, salida=click.echo)
+            click.echo(f'Worker detenido: {ejecutados} trabajos ejecutados.')
+
+        @app.cli.command('precompile-templates')
+        def precompile_templates_command():
+            """Compila todas las plantillas y llena la caché de bytecode de Jinja (ej. al desplegar)."""
+            import time
+            from app.utils.plantillas import precompilar_plantillas # Importar dentro de la función
+            if app.jinja_env.bytecode_cache is None:
+                click.echo('Advertencia: TEMPLATE_BYTECODE_CACHE está desactivado; solo se validarán las plantillas.')
+            inicio = time.perf_counter()
+            compiladas, errores = precompilar_plantillas(app)
+            for nombre, error in errores.items():
+                click.echo(f'  Error en {nombre}: {error}', err=True)
+            click.echo(f'{len(compiladas)} plantillas compiladas en {time.perf_counter() - inicio:.2f} s ({len(errores)} con errores).')
+
+        @app.cli.command('build-assets')
+        def build_assets_command():
+            """Genera app/static/dist: archivos con huella, minificados, .gz/.br e imágenes optimizadas."""
+            from app.utils.assets import construir_assets # Importar dentro de la función
+            click.echo(f'Construyendo assets de {app.static_folder}...')
+            manifest = construir_assets(app, progreso=click.echo)
+            click.echo(f'{len(manifest)} archivos con huella. Reinicia los workers para usar el nuevo manifest.')
+
     register_cli_commands(app)
 
     return app
@@ -0,0 +1,122 @@
+# Archivo: PolleriaMontiel\app\caja\registro_cortes.py
+
+"""
+Registro en memoria del corte de caja abierto de cada usuario.
+
+Cada movimiento de caja se asocia al corte abierto de quien lo registra. Antes eso era una consulta
+filtrada y ordenada sobre `cortes_caja` por movimiento (y varias por pago/liquidación). El corte
+abierto solo cambia al abrir o cerrar caja, así que cada proceso lo guarda por usuario:
+
+    - realizar_apertura_caja / realizar_cierre_de_caja actualizan el registro tras el commit.
+    - Invalidación entre procesos: quien abre/cierra reescribe un archivo "marca" (CORTES_REGISTRO_ARCHIVO);
+      los demás procesos comparan su inode/mtime con un os.stat() (sin consultar la BD) y, si cambió,
+      descartan lo que tienen. Con varios servidores el archivo debe estar en un volumen compartido.
+    - Como respaldo, lo guardado se descarta cada CORTES_REGISTRO_TTL segundos (cambios hechos
+      fuera de los servicios, ej. SQL directo).
+    - El primer movimiento de un usuario (o tras una invalidación) sí consulta la BD una vez.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import CorteCaja, EstadoCorteCaja
+
+TTL_DEFAULT = 300
+NOMBRE_ARCHIVO_DEFAULT = 'cortes_abiertos.marca'
+
+
+def _ruta_marca() -> str:
+    ruta = current_app.config.get('CORTES_REGISTRO_ARCHIVO')
+    return ruta or os.path.join(current_app.instance_path, NOMBRE_ARCHIVO_DEFAULT)
+
+
+def _leer_marca(ruta: str) -> Tuple[int, int]:
+    """Identidad actual del archivo marca: (inode, mtime en ns). (0, 0) si todavía no existe."""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return 0, 0
+    return estado.st_ino, estado.st_mtime_ns
+
+
+class RegistroCortesAbiertos:
+    """ID del corte abierto por (base de datos, usuario); None significa "sin corte abierto"."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cortes: Dict[Tuple[str, int], Optional[int]] = {}
+        self._marca: Optional[Tuple[int, int]] = None
+        self._cargado_en = 0.0
+
+    def _sincronizar(self):
+        """Descarta lo guardado si otro proceso publicó cambios o venció el TTL (llamar con el lock)."""
+        marca = _leer_marca(_ruta_marca())
+        ttl = current_app.config.get('CORTES_REGISTRO_TTL', TTL_DEFAULT)
+        if marca != self._marca or time.monotonic() - self._cargado_en > ttl:
+            self._cortes.clear()
+            self._marca = marca
+            self._cargado_en = time.monotonic()
+
+    @staticmethod
+    def _clave(usuario_id: int) -> Tuple[str, int]:
+        return db.engine.url.render_as_string(hide_password=True), usuario_id
+
+    def corte_abierto_id(self, usuario_id: int) -> Optional[int]:
+        """ID del corte ABIERTO del usuario; solo consulta la BD si el proceso no lo conoce aún."""
+        clave = self._clave(usuario_id)
+        with self._lock:
+            self._sincronizar()
+            if clave in self._cortes:
+                return self._cortes[clave]
+
+        # Misma regla que get_current_open_corte_caja: el abierto más reciente del usuario
+        corte_id = db.session.execute(
+            select(CorteCaja.id)
+            .where(CorteCaja.estado_corte == EstadoCorteCaja.ABIERTO, CorteCaja.usuario_id_responsable == usuario_id)
+            .order_by(CorteCaja.fecha_apertura_periodo.desc())
+            .limit(1)
+        ).scalar()
+        with self._lock:
+            self._cortes[clave] = corte_id
+        return corte_id
+
+    def registrar(self, usuario_id: int, corte_id: Optional[int]):
+        """Guarda el corte abierto (None al cerrar) y avisa a los demás procesos. Llamar tras el commit."""
+        clave = self._clave(usuario_id)
+        with self._lock:
+            self._sincronizar() # Aplicar antes lo que otros procesos hayan publicado
+            self._cortes[clave] = corte_id
+            self._publicar()
+
+    def invalidar(self):
+        """Descarta el registro de todos los procesos (ej. tras insertar cortes sin los servicios)."""
+        with self._lock:
+            self._cortes.clear()
+            self._publicar()
+
+    def _publicar(self):
+        """
+        Reescribe el archivo marca (os.replace cambia el inode: los demás procesos lo detectan) y
+        adopta la marca nueva como propia, para que el siguiente _sincronizar de este proceso no
+        descarte lo que acaba de guardar (llamar con el lock).
+        """
+        ruta = _ruta_marca()
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}'
+            with open(temporal, 'w') as archivo:
+                archivo.write(f'{time.time()}\n')
+            os.replace(temporal, ruta)
+            self._marca = _leer_marca(ruta)
+        except OSError as e:
+            # Sin marca los demás procesos se enteran al vencer el TTL
+            print(f"Advertencia: No se pudo publicar el cambio de cortes abiertos en {ruta}: {e}")
+
+
+registro = RegistroCortesAbiertos()
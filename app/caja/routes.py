@@ -9,9 +9,10 @@ from .forms import MovimientoCajaForm, AperturaCajaForm, CierreCajaForm # Import
 from .services import (
     get_current_open_corte_caja, realizar_apertura_caja, realizar_cierre_de_caja,
     registrar_movimiento_caja, get_all_cortes_caja, get_corte_caja_by_id,
-    get_movimientos_for_corte
+    get_movimientos_for_corte, get_detalle_corte
 ) # Importar funciones de servicio
 from app.utils.decorators import role_required # Importar el decorador de roles
+from app.utils.db_routing import solo_lectura # Enrutamiento de lecturas a la réplica
 from app.utils.helpers import format_currency, format_datetime # Importar helpers para formateo
 from decimal import Decimal # Importar Decimal
 
@@ -189,6 +190,7 @@ def registrar_movimiento():
 @caja.route('/cortes')
 @login_required
 @role_required(RolUsuario.ADMINISTRADOR) # Solo Admin puede listar todos los cortes
+@solo_lectura # Reporte/listado: leer desde la réplica si está configurada
 def listar_cortes():
     """
     Muestra una lista paginada de todos los cortes de caja históricos.
@@ -210,38 +212,29 @@ def listar_cortes():
 @caja.route('/cortes/<int:corte_id>')
 @login_required
 @role_required(RolUsuario.ADMINISTRADOR) # Solo Admin puede ver detalles de cualquier corte
+@solo_lectura # Reporte/listado: leer desde la réplica si está configurada
 def ver_corte(corte_id):
     """
     Muestra los detalles de un corte de caja específico.
     """
-    corte = get_corte_caja_by_id(corte_id)
+    page = request.args.get('page', 1, type=int)
+    per_page = 50 # Movimientos por página
+    detalle = get_detalle_corte(corte_id, page=page, per_page=per_page)
 
-    if not corte:
+    if not detalle:
         flash('Corte de caja no encontrado.', 'warning')
         return redirect(url_for('caja.listar_cortes'))
 
-    # Obtener movimientos y detalles de denominaciones para este corte
-    movimientos = get_movimientos_for_corte(corte.id)
-    # Los detalles de denominaciones ya están cargados en corte.detalle_denominaciones_cierre
-
-    # Calcular totales por forma de pago para mostrar en el detalle
-    totales_por_forma_pago = {}
-    for forma_pago in FormaPago:
-        total = sum(m.monto_movimiento for m in movimientos if m.tipo_movimiento == TipoMovimientoCaja.INGRESO and m.forma_pago_efectuado == forma_pago)
-        if total > Decimal('0.00'):
-            totales_por_forma_pago[forma_pago.name.replace('_', ' ').title()] = total
-
-    # Calcular total contado por denominación para mostrar en el detalle
-    conteo_final_denominaciones = {d.denominacion_valor: d.cantidad_contada for d in corte.detalle_denominaciones_cierre}
-
-
+    corte = detalle['corte']
+    # Totales por forma de pago y conteo de denominaciones ya vienen agregados desde el servicio
     return render_template(
         'caja/ver_corte.html',
         title=f'Detalle Corte de Caja #{corte.id}',
         corte=corte,
-        movimientos=movimientos,
-        totales_por_forma_pago=totales_por_forma_pago,
-        conteo_final_denominaciones=conteo_final_denominaciones,
+        movimientos_del_corte=detalle['movimientos'].items,
+        pagination=detalle['movimientos'],
+        totales_por_forma_pago=detalle['totales_por_forma_pago'],
+        conteo_final_denominaciones=detalle['conteo_final_denominaciones'],
         format_currency=format_currency,
         format_datetime=format_datetime
     )
@@ -6,9 +6,16 @@ from app.models import (
     Usuario, Pedido, TipoMovimientoCaja, FormaPago, EstadoCorteCaja
 ) # Importar los modelos y Enums necesarios
 from app.caja.forms import DENOMINACIONES_MXN_ORDENADAS # Importar la lista de denominaciones
+from app.utils.db_routing import solo_lectura # Lecturas de reportes/listados hacia la réplica
+from app.utils import metrics # Contadores de movimientos expuestos en /metrics
+from app.caja.registro_cortes import registro as registro_cortes # Corte abierto por usuario, en memoria
+from app.utils.kpis_dia import kpis as kpis_dia # Indicadores del día en memoria (inicio del administrador)
 from decimal import Decimal # Importar Decimal para cálculos monetarios precisos
 from datetime import datetime
-from typing import Optional, Dict, List, Tuple, Union
+from typing import Optional, Dict, List, Tuple, Union, Any
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
+from flask_sqlalchemy.pagination import Pagination # Base de la paginación de filas del detalle de corte
 
 # --- Funciones de Ayuda Internas ---
 
@@ -69,6 +76,72 @@ def get_movimientos_for_corte(corte_id: int) -> List[MovimientoCaja]:
     """Obtiene todos los MovimientoCaja asociados a un CorteCaja."""
     return MovimientoCaja.query.filter_by(corte_caja_id=corte_id).all()
 
+
+class _PaginacionFilas(Pagination):
+    """Paginación de un SELECT de columnas (filas, no objetos del ORM) cuyo total ya se conoce."""
+
+    def _query_items(self) -> list:
+        consulta = self._query_args['consulta'].limit(self.per_page).offset(self._query_offset)
+        return db.session.execute(consulta).all()
+
+    def _query_count(self) -> int:
+        return self._query_args['total']
+
+
+@solo_lectura
+def get_detalle_corte(corte_id: int, page: int = 1, per_page: int = 50) -> Optional[Dict[str, Any]]:
+    """
+    Datos de la vista de detalle de un corte, en consultas acotadas sin importar cuántos movimientos tenga:
+        - 'corte': el CorteCaja con su usuario responsable ya cargado.
+        - 'resumen': {(TipoMovimientoCaja, FormaPago): (total, num_movimientos)} de un solo GROUP BY.
+        - 'totales_por_forma_pago': ingresos del periodo por forma de pago (etiqueta -> total), tomados del resumen.
+        - 'conteo_final_denominaciones': {denominacion_valor: cantidad_contada} del cierre.
+        - 'movimientos': página de movimientos (filas con las columnas de MovimientoCaja más `usuario_nombre`).
+    Los cortes cerrados incluyen los movimientos archivados con sus pedidos (app/utils/archivo.py).
+    Retorna None si el corte no existe.
+    """
+    corte = CorteCaja.query.options(joinedload(CorteCaja.usuario_responsable_corte)).filter_by(id=corte_id).first()
+    if not corte:
+        return None
+
+    if corte.estado_corte == EstadoCorteCaja.ABIERTO:
+        movimientos = select(MovimientoCaja.__table__).where(MovimientoCaja.corte_caja_id == corte_id).subquery()
+    else:
+        from app.utils.archivo import union_historica # Import local para evitar importación circular
+        movimientos = union_historica(MovimientoCaja, lambda c: c.corte_caja_id == corte_id).subquery()
+
+    resumen = {
+        (tipo, forma_pago): (Decimal(str(total or 0)), cantidad)
+        for tipo, forma_pago, total, cantidad in db.session.execute(
+            select(
+                movimientos.c.tipo_movimiento, movimientos.c.forma_pago_efectuado,
+                func.sum(movimientos.c.monto_movimiento), func.count()
+            ).group_by(movimientos.c.tipo_movimiento, movimientos.c.forma_pago_efectuado)
+        )
+    }
+    totales_por_forma_pago = {}
+    for forma_pago in FormaPago: # Orden del Enum, como antes
+        total, _ = resumen.get((TipoMovimientoCaja.INGRESO, forma_pago), (Decimal('0.00'), 0))
+        if total > Decimal('0.00'):
+            totales_por_forma_pago[forma_pago.name.replace('_', ' ').title()] = total
+
+    pagina = _PaginacionFilas(
+        page=page, per_page=per_page, error_out=False,
+        consulta=select(movimientos, Usuario.nombre_completo.label('usuario_nombre'))
+            .outerjoin(Usuario, Usuario.id == movimientos.c.usuario_id)
+            .order_by(movimientos.c.fecha_movimiento, movimientos.c.id),
+        total=sum(cantidad for _, cantidad in resumen.values())
+    )
+
+    return {
+        'corte': corte,
+        'resumen': resumen,
+        'totales_por_forma_pago': totales_por_forma_pago,
+        'conteo_final_denominaciones': {d.denominacion_valor: d.cantidad_contada for d in corte.detalle_denominaciones_cierre},
+        'movimientos': pagina,
+    }
+
+@solo_lectura
 def get_all_cortes_caja(page: int = 1, per_page: int = 10):
     """Obtiene todos los CortesCaja con paginación."""
     return CorteCaja.query.order_by(CorteCaja.fecha_cierre_corte.desc()).paginate(page=page, per_page=per_page, error_out=False)
@@ -82,7 +155,9 @@ def registrar_movimiento_caja(
     forma_pago_efectuado: str, # Valor del Enum FormaPago
     notas_movimiento: Optional[str] = None,
     pedido_id: Optional[int] = None,
-    denominaciones_contadas: Optional[Dict[Decimal, int]] = None # Solo para efectivo
+    denominaciones_contadas: Optional[Dict[Decimal, int]] = None, # Solo para efectivo
+    commit: bool = True,
+    liquidacion_lote_id: Optional[int] = None # Entrega de efectivo de una liquidación en lote
 ) -> Optional[MovimientoCaja]:
     """
     Registra un nuevo movimiento de caja (ingreso o egreso).
@@ -96,6 +171,10 @@ def registrar_movimiento_caja(
         notas_movimiento: Notas adicionales (opcional).
         pedido_id: ID del pedido asociado (opcional).
         denominaciones_contadas: Diccionario {valor: cantidad} si es efectivo (opcional).
+        commit: Si es False solo hace flush: el movimiento queda en la transacción de quien llama,
+            que debe hacer commit/rollback y llamar a registrar_metricas_movimiento tras el commit.
+        liquidacion_lote_id: LiquidacionLote a la que pertenece (opcional; su conteo de denominaciones
+            está en la liquidación, no en el movimiento).
 
     Returns:
         El objeto MovimientoCaja creado si tiene éxito, None si hay un error.
@@ -107,9 +186,9 @@ def registrar_movimiento_caja(
 
         # Buscar el corte de caja abierto actual para asociar el movimiento en tiempo real
         # Esto es una mejora sobre la lógica de asociar al cierre
-        current_corte = get_current_open_corte_caja(usuario_id=usuario_id)
+        # El registro en memoria evita consultar cortes_caja en cada movimiento
         # Si no hay corte abierto, el movimiento no se asocia a un corte por ahora
-        corte_caja_id = current_corte.id if current_corte else None
+        corte_caja_id = registro_cortes.corte_abierto_id(usuario_id)
 
         movimiento = MovimientoCaja(
             usuario_id=usuario_id,
@@ -120,7 +199,8 @@ def registrar_movimiento_caja(
             monto_movimiento=monto_movimiento,
             forma_pago_efectuado=FormaPago(forma_pago_efectuado),
             notas_movimiento=notas_movimiento,
-            fecha_movimiento=datetime.utcnow()
+            fecha_movimiento=datetime.utcnow(),
+            liquidacion_lote_id=liquidacion_lote_id
         )
 
         db.session.add(movimiento)
@@ -130,18 +210,33 @@ def registrar_movimiento_caja(
         if forma_pago_efectuado == FormaPago.EFECTIVO.value and denominaciones_contadas:
              _create_movimiento_denominaciones(movimiento.id, denominaciones_contadas)
 
+        if not commit:
+            db.session.flush()
+            return movimiento
+
         db.session.commit()
+        registrar_metricas_movimiento(movimiento)
         return movimiento
 
     except ValueError as e:
-        db.session.rollback()
+        if commit:
+            db.session.rollback()
         print(f"Error al registrar movimiento de caja: {e}")
         return None
     except Exception as e:
-        db.session.rollback()
+        if commit:
+            db.session.rollback()
         print(f"Error inesperado al registrar movimiento de caja: {e}")
         return None
 
+def registrar_metricas_movimiento(movimiento: MovimientoCaja):
+    """Actualiza los contadores de /metrics y el efectivo en caja del día con un movimiento ya confirmado."""
+    tipo_movimiento = movimiento.tipo_movimiento.value
+    forma_pago = movimiento.forma_pago_efectuado.value
+    metrics.MOVIMIENTOS_CAJA.inc(tipo_movimiento=tipo_movimiento, forma_pago=forma_pago)
+    metrics.MOVIMIENTOS_CAJA_MONTO.inc(float(movimiento.monto_movimiento), tipo_movimiento=tipo_movimiento, forma_pago=forma_pago)
+    kpis_dia.movimiento_registrado(movimiento)
+
 def realizar_apertura_caja(
     usuario_id_responsable: int,
     saldo_inicial_contado_por_denominaciones: Dict[Decimal, int],
@@ -214,6 +309,10 @@ def realizar_apertura_caja(
 
 
         db.session.commit()
+        registro_cortes.registrar(usuario_id_responsable, corte.id)
+        kpis_dia.corte_abierto(corte.id, corte.usuario_responsable_corte.nombre_completo, saldo_inicial_efectivo_total)
+        metrics.MOVIMIENTOS_CAJA.inc(tipo_movimiento=TipoMovimientoCaja.INGRESO.value, forma_pago=FormaPago.SALDO_INICIAL_CAJA.value)
+        metrics.MOVIMIENTOS_CAJA_MONTO.inc(float(saldo_inicial_efectivo_total), tipo_movimiento=TipoMovimientoCaja.INGRESO.value, forma_pago=FormaPago.SALDO_INICIAL_CAJA.value)
         return corte
 
     except Exception as e:
@@ -313,6 +412,8 @@ def realizar_cierre_de_caja(
         _create_corte_denominaciones(corte.id, efectivo_contado_final_por_denominaciones)
 
         db.session.commit()
+        registro_cortes.registrar(corte.usuario_id_responsable, None) # El responsable ya no tiene corte abierto
+        kpis_dia.corte_cerrado(corte.id)
         return corte
 
     except Exception as e:
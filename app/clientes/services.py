@@ -6,6 +6,7 @@ from typing import Optional, List, Dict, Any # Para type hints
 from datetime import datetime # Para fechas de registro
 from sqlalchemy.exc import IntegrityError # Para manejar errores de unicidad, FK, etc.
 from decimal import Decimal # Importar Decimal para tipos de datos precisos
+from app.utils.db_routing import solo_lectura # Lecturas de listados hacia la réplica
 
 # --- Funciones de Servicio para Cliente ---
 
@@ -77,11 +78,13 @@ def get_client_by_id(client_id: int) -> Optional[Cliente]:
     """Busca un cliente por su ID."""
     return Cliente.query.get(client_id)
 
+@solo_lectura
 def get_all_clients(page: int = 1, per_page: int = 10):
     """Obtiene todos los clientes activos con paginación."""
     # Podrías añadir filtros (ej. solo activos) o ordenación aquí
     return Cliente.query.filter_by(activo=True).order_by(Cliente.nombre.asc(), Cliente.apellidos.asc()).paginate(page=page, per_page=per_page, error_out=False)
 
+@solo_lectura
 def search_clients(query: str, page: int = 1, per_page: int = 10):
     """
     Busca clientes por nombre, apellidos, alias o número de teléfono.
@@ -1,6 +1,13 @@
-from flask import render_template, redirect, url_for
+from flask import render_template, redirect, url_for, Response, abort, current_app, request, flash
 from flask_login import login_required, current_user
 from . import main #. es el directorio actual (main)
+from app.utils import metrics as app_metrics
+from app.utils.kpis_dia import kpis as kpis_dia # Indicadores del día en memoria
+from app.utils import analitica # Analítica de ventas vectorizada (numpy opcional)
+from app.utils.decorators import role_required
+from app.models import RolUsuario
+from datetime import datetime, timedelta
+import hmac
 
 @main.route('/')
 @main.route('/index')
@@ -8,4 +15,50 @@ from . import main #. es el directorio actual (main)
 def index():
     # if not current_user.is_authenticated: # Esta verificación ya la hace @login_required
     #     return redirect(url_for('auth.login'))
-    return render_template('main/index.html', title='Inicio')
+    contexto = {}
+    if current_user.is_admin():
+        contexto = kpis_dia.resumen() # Sin recorrer los pedidos del día en cada visita
+    return render_template('main/index.html', title='Inicio', **contexto)
+
+@main.route('/analitica')
+@login_required
+@role_required(RolUsuario.ADMINISTRADOR)
+def analitica_ventas():
+    """Tablero de analítica de ventas del administrador para un rango de fechas (por defecto los últimos 30 días)."""
+    hoy = datetime.utcnow().date()
+    try:
+        hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if request.args.get('hasta') else hoy
+        desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if request.args.get('desde') else hasta - timedelta(days=29)
+    except ValueError:
+        flash('Fechas inválidas (formato AAAA-MM-DD).', 'danger')
+        return redirect(url_for('main.analitica_ventas'))
+    max_dias = current_app.config.get('ANALITICA_MAX_DIAS', 366)
+    if desde > hasta or (hasta - desde).days >= max_dias:
+        flash(f'El rango debe ir de la fecha inicial a la final y abarcar como máximo {max_dias} días.', 'warning')
+        return redirect(url_for('main.analitica_ventas'))
+
+    datos = analitica.analitica_ventas(desde, hasta)
+    if datos is None:
+        if analitica.np is None:
+            flash('La analítica de ventas requiere el paquete numpy (pip install numpy).', 'warning')
+        else:
+            flash('Error al calcular la analítica de ventas.', 'danger')
+    return render_template('main/analitica.html', title='Analítica de Ventas', desde=desde, hasta=hasta, datos=datos)
+
+@main.route('/metrics')
+def metrics():
+    """
+    Métricas en formato de texto de Prometheus (para el scraper, sin sesión de usuario).
+    Con METRICS_TOKEN se exige 'Authorization: Bearer <token>'; sin él solo responde a METRICS_IPS_SIN_TOKEN,
+    y a nadie si METRICS_EXIGIR_TOKEN (producción).
+    """
+    if not current_app.config.get('METRICS_ENABLED', True):
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            abort(401)
+    elif current_app.config.get('METRICS_EXIGIR_TOKEN') or \
+            request.remote_addr not in current_app.config.get('METRICS_IPS_SIN_TOKEN', ()):
+        abort(403)
+    return Response(app_metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -77,6 +77,12 @@ class EstadoCorteCaja(enum.Enum):
     CERRADO_CONCILIADO = 'CERRADO_CONCILIADO'
     CERRADO_CON_DIFERENCIA = 'CERRADO_CON_DIFERENCIA'
 
+class EstadoTrabajo(enum.Enum):
+    PENDIENTE = 'PENDIENTE'
+    EN_PROCESO = 'EN_PROCESO'
+    COMPLETADO = 'COMPLETADO'
+    ERROR = 'ERROR'
+
 # --- Modelo Usuario ---
 @login_manager.user_loader
 def load_user(user_id):
@@ -344,6 +350,7 @@ class Pedido(db.Model):
     """
     __tablename__ = 'pedidos'
     id = db.Column(db.Integer, primary_key=True)
+    folio = db.Column(db.Integer, nullable=True) # Consecutivo visible, asignado por bloques (app/utils/folios.py)
     cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=True, index=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True) # Cajero/Admin que registra
     repartidor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True) # Repartidor asignado
@@ -373,6 +380,11 @@ class Pedido(db.Model):
     productos_adicionales_pedido = db.relationship('ProductoAdicional', back_populates='pedido', lazy='dynamic', cascade='all, delete-orphan')
     movimientos_caja_asociados = db.relationship('MovimientoCaja', back_populates='pedido_asociado', lazy='dynamic')
 
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('folio', name='uq_pedidos_folio'), # Garantía en BD de folios sin colisiones
+    )
+
     def __repr__(self):
         return f'<Pedido {self.id} - Estado: {self.estado_pedido.value} - Total: ${self.total_pedido:.2f}>' # Usar .value
 
@@ -388,24 +400,14 @@ class Pedido(db.Model):
 
     def puede_ser_modificado(self):
         """Determina si el pedido puede ser modificado según su estado."""
-        # Lógica para determinar si el pedido puede ser modificado
-        # Por ejemplo, no se puede modificar si ya está EN_RUTA, ENTREGADO, CANCELADO, etc.
-        estados_no_modificables = [
-            EstadoPedido.EN_RUTA,
-            EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
-            EstadoPedido.ENTREGADO_Y_PAGADO,
-            EstadoPedido.PAGADO,
-            EstadoPedido.PROBLEMA_EN_ENTREGA,
-            EstadoPedido.CANCELADO_POR_CLIENTE,
-            EstadoPedido.CANCELADO_POR_NEGOCIO
-        ]
-        return self.estado_pedido not in estados_no_modificables
+        # No se puede modificar si ya está EN_RUTA, ENTREGADO, CANCELADO, etc.
+        from app.pedidos.estados import NO_MODIFICABLES # Import local: estados importa este módulo
+        return self.estado_pedido not in NO_MODIFICABLES
 
     def generar_folio_display(self):
         """Genera un folio formateado para mostrar al usuario."""
-        # Implementar lógica para generar folio formateado (ej. PM-000123)
-        # Podría usar el id o un campo de folio separado si se necesita un formato específico no secuencial
-        return f"PM-{self.id:06d}" # Ejemplo simple usando el ID
+        from app.utils.helpers import format_pedido_folio
+        return format_pedido_folio(self) # Usa el folio asignado, o el ID en pedidos anteriores a los folios
 
 
 # --- Modelo PedidoItem (Sección 3.10) ---
@@ -500,11 +502,14 @@ class MovimientoCaja(db.Model):
     forma_pago_efectuado = db.Column(Enum(FormaPago), nullable=False, index=True) # Usar Enum
     fecha_movimiento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     notas_movimiento = db.Column(db.Text, nullable=True)
+    # Entrega de efectivo de una liquidación en lote (el conteo de denominaciones está en la liquidación)
+    liquidacion_lote_id = db.Column(db.Integer, db.ForeignKey('liquidaciones_lote.id'), nullable=True, index=True)
 
     # Relaciones
     usuario_responsable = db.relationship('Usuario', back_populates='movimientos_caja_registrados')
     pedido_asociado = db.relationship('Pedido', back_populates='movimientos_caja_asociados')
     corte_caja_asignado = db.relationship('CorteCaja', back_populates='movimientos_del_corte')
+    liquidacion_lote = db.relationship('LiquidacionLote', back_populates='movimientos')
     detalle_denominaciones = db.relationship('MovimientoDenominacion', back_populates='movimiento_caja_padre', lazy='dynamic', cascade='all, delete-orphan') # Solo si forma_pago_efectuado es 'EFECTIVO'
 
     def __repr__(self):
@@ -534,6 +539,51 @@ class MovimientoDenominacion(db.Model):
         return f'<MovDenom {self.id}: Mov {self.movimiento_caja_id} - ${self.denominacion_valor:.2f} x {self.cantidad}>'
 
 
+# --- Liquidación en lote de un repartidor ---
+class LiquidacionLote(db.Model):
+    """
+    Una entrega de efectivo con la que un repartidor liquida varios pedidos a la vez.
+    Cada pedido tiene su MovimientoCaja de INGRESO por el monto asignado (liquidacion_lote_id);
+    el conteo físico es uno solo y se guarda aquí: sus denominaciones suman monto_recibido,
+    que es la suma de los movimientos del lote.
+    """
+    __tablename__ = 'liquidaciones_lote'
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True) # Quien liquida/recibe
+    repartidor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    monto_recibido = db.Column(Numeric(10, 2), nullable=False) # Usar Numeric
+    fecha_liquidacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # Relaciones
+    usuario = db.relationship('Usuario', foreign_keys=[usuario_id])
+    repartidor = db.relationship('Usuario', foreign_keys=[repartidor_id])
+    movimientos = db.relationship('MovimientoCaja', back_populates='liquidacion_lote', lazy='dynamic')
+    detalle_denominaciones = db.relationship('LiquidacionLoteDenominacion', back_populates='liquidacion_lote', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<LiquidacionLote {self.id}: ${self.monto_recibido:.2f}>'
+
+
+class LiquidacionLoteDenominacion(db.Model):
+    """Billetes y monedas de la entrega de efectivo de una LiquidacionLote."""
+    __tablename__ = 'liquidacion_lote_denominaciones'
+    id = db.Column(db.Integer, primary_key=True)
+    liquidacion_lote_id = db.Column(db.Integer, db.ForeignKey('liquidaciones_lote.id'), nullable=False, index=True)
+    denominacion_valor = db.Column(Numeric(10, 2), nullable=False) # Usar Numeric
+    cantidad = db.Column(db.Integer, nullable=False) # Número de billetes/monedas
+
+    # Relaciones
+    liquidacion_lote = db.relationship('LiquidacionLote', back_populates='detalle_denominaciones')
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('liquidacion_lote_id', 'denominacion_valor', name='uq_liquidacion_lote_denominacion'),
+    )
+
+    def __repr__(self):
+        return f'<LiqLoteDenom {self.id}: Liq {self.liquidacion_lote_id} - ${self.denominacion_valor:.2f} x {self.cantidad}>'
+
+
 # --- Modelo CorteCaja (Sección 3.14) ---
 class CorteCaja(db.Model):
     """
@@ -616,3 +666,60 @@ class ConfiguracionSistema(db.Model):
 
     def __repr__(self):
         return f'<ConfiguracionSistema id={self.id}>'
+
+
+# --- Modelo TrabajoSegundoPlano (cola de trabajos, ver app/trabajos) ---
+class TrabajoSegundoPlano(db.Model):
+    """
+    Trabajo pesado (reportes, archivado, exportaciones) encolado por una petición y ejecutado
+    por `flask worker` fuera del proceso web.
+    """
+    __tablename__ = 'trabajos_segundo_plano'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False) # Nombre de la tarea registrada (app/trabajos/tareas.py)
+    parametros = db.Column(db.JSON, nullable=False, default=dict)
+    estado = db.Column(Enum(EstadoTrabajo), nullable=False, default=EstadoTrabajo.PENDIENTE)
+    progreso = db.Column(db.Integer, nullable=False, default=0) # 0 a 100
+    mensaje = db.Column(db.String(255), nullable=True) # Último avance o error
+    resultado = db.Column(db.JSON, nullable=True) # Resumen que retorna la tarea
+    archivo_resultado = db.Column(db.String(255), nullable=True) # Ruta relativa a TRABAJOS_DIR
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=1)
+    worker = db.Column(db.String(100), nullable=True) # host:pid del worker que lo tomó
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True) # Quien lo solicitó
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime, nullable=True)
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+    latido = db.Column(db.DateTime, nullable=True) # Último avance del worker; sin latido reciente se reintenta
+
+    usuario = db.relationship('Usuario')
+
+    __table_args__ = (
+        db.Index('ix_trabajos_estado_fecha', 'estado', 'fecha_creacion'), # El worker toma el PENDIENTE más antiguo
+        CheckConstraint('progreso >= 0 AND progreso <= 100', name='chk_trabajo_progreso'),
+    )
+
+    def __repr__(self):
+        return f'<TrabajoSegundoPlano {self.id} {self.tipo} {self.estado.value}>'
+
+
+# --- Tablas de archivo de pedidos cerrados (app/utils/archivo.py) ---
+def _tabla_archivo(modelo, indices):
+    """
+    Tabla `<tabla>_archivo` con las mismas columnas (mismo orden y tipos) que el modelo, para que
+    los reportes puedan hacer UNION ALL con la tabla activa. Conserva los IDs originales y no tiene
+    llaves foráneas: el histórico es de solo lectura y sus pedidos ya no existen en la tabla activa.
+    """
+    tabla = modelo.__table__
+    return db.Table(f'{tabla.name}_archivo',
+        *[
+            db.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable, index=c.name in indices)
+            for c in tabla.columns
+        ]
+    )
+
+pedidos_archivo = _tabla_archivo(Pedido, {'folio', 'cliente_id', 'estado_pedido', 'fecha_creacion'})
+pedido_items_archivo = _tabla_archivo(PedidoItem, {'pedido_id'})
+productos_adicionales_archivo = _tabla_archivo(ProductoAdicional, {'pedido_id'})
+movimientos_caja_archivo = _tabla_archivo(MovimientoCaja, {'pedido_id', 'corte_caja_id', 'fecha_movimiento'})
+movimiento_denominaciones_archivo = _tabla_archivo(MovimientoDenominacion, {'movimiento_caja_id'})
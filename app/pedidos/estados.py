@@ -0,0 +1,185 @@
+# Archivo: PolleriaMontiel\app\pedidos\estados.py
+
+"""
+Máquina de estados de los pedidos, precalculada al importar el módulo.
+
+Concentra las reglas que antes estaban repartidas (puede_ser_modificado, estados liquidables,
+visibilidad por rol en ver_pedido/dashboard_pedidos, pedidos activos) para que todas usen las
+mismas definiciones y ninguna reconstruya listas en cada llamada:
+
+    - Conjuntos de estados como frozenset (pertenencia O(1)) y como máscara de bits.
+    - Matriz de transiciones: MATRIZ_TRANSICIONES[estado_actual] & BIT[estado_nuevo].
+    - Visibilidad por rol (None = ve todos los estados) y estados destino por rol para cambios en lote.
+    - Expresiones SQL de filtro (Pedido.estado_pedido IN (...)) construidas una sola vez.
+"""
+
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from app.models import Pedido, EstadoPedido, RolUsuario
+
+# Bit de cada estado, en el orden de definición del Enum
+BIT: Dict[EstadoPedido, int] = {estado: 1 << i for i, estado in enumerate(EstadoPedido)}
+
+
+def _mascara(estados) -> int:
+    mascara = 0
+    for estado in estados:
+        mascara |= BIT[estado]
+    return mascara
+
+
+def _ordenados(estados: FrozenSet[EstadoPedido]) -> Tuple[EstadoPedido, ...]:
+    """Estados en el orden del Enum (SQL y métricas estables)."""
+    return tuple(estado for estado in EstadoPedido if estado in estados)
+
+
+# --- Conjuntos de estados ---
+
+CANCELADOS = frozenset({EstadoPedido.CANCELADO_POR_CLIENTE, EstadoPedido.CANCELADO_POR_NEGOCIO})
+FINALES = frozenset({EstadoPedido.ENTREGADO_Y_PAGADO}) | CANCELADOS
+
+# Cerrados para el archivo histórico (app/utils/archivo.py): finales y pagados
+ARCHIVABLES = FINALES | {EstadoPedido.PAGADO}
+
+# Activos: no finalizados/cancelados (dashboard, métricas)
+ACTIVOS = frozenset({
+    EstadoPedido.PENDIENTE_CONFIRMACION,
+    EstadoPedido.PENDIENTE_PREPARACION,
+    EstadoPedido.EN_PREPARACION,
+    EstadoPedido.LISTO_PARA_ENTREGA,
+    EstadoPedido.ASIGNADO_A_REPARTIDOR,
+    EstadoPedido.EN_RUTA,
+    EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
+    EstadoPedido.PROBLEMA_EN_ENTREGA,
+    EstadoPedido.REPROGRAMADO,
+})
+
+# Ya salió de cocina o está cerrado: no se editan ítems ni datos del pedido
+NO_MODIFICABLES = frozenset({
+    EstadoPedido.EN_RUTA,
+    EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
+    EstadoPedido.ENTREGADO_Y_PAGADO,
+    EstadoPedido.PAGADO,
+    EstadoPedido.PROBLEMA_EN_ENTREGA,
+}) | CANCELADOS
+
+EN_PREPARACION = frozenset({EstadoPedido.PENDIENTE_PREPARACION, EstadoPedido.EN_PREPARACION})
+
+# El administrador puede eliminar pedidos que no entraron a cocina o ya se cancelaron
+ELIMINABLES = frozenset({EstadoPedido.PENDIENTE_CONFIRMACION, EstadoPedido.PENDIENTE_PREPARACION}) | CANCELADOS
+
+# En manos del repartidor: requieren repartidor asignado y se pueden liquidar
+EN_REPARTO = frozenset({
+    EstadoPedido.ASIGNADO_A_REPARTIDOR,
+    EstadoPedido.EN_RUTA,
+    EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
+    EstadoPedido.PROBLEMA_EN_ENTREGA,
+    EstadoPedido.REPROGRAMADO, # Si se liquida después de un problema/reprogramación
+})
+LIQUIDABLES = EN_REPARTO
+CON_REPARTIDOR = EN_REPARTO
+VALORES_CON_REPARTIDOR = frozenset(estado.value for estado in CON_REPARTIDOR) # Para validar formularios
+
+# Volver a uno de estos estados (antes del despacho) desasigna al repartidor. Los estados finales y de
+# pago lo conservan: quién entregó y quién tiene el efectivo (liquidación, analítica de repartidores)
+LIBERAN_REPARTIDOR = frozenset({
+    EstadoPedido.PENDIENTE_CONFIRMACION,
+    EstadoPedido.PENDIENTE_PREPARACION,
+    EstadoPedido.EN_PREPARACION,
+    EstadoPedido.LISTO_PARA_ENTREGA,
+})
+
+# Al liquidar, estos pasan a ENTREGADO_Y_PAGADO; el resto de los liquidables a PAGADO
+ENTREGADOS_AL_LIQUIDAR = EN_REPARTO - {EstadoPedido.ASIGNADO_A_REPARTIDOR}
+
+# --- Transiciones permitidas: estado actual -> estados a los que puede pasar ---
+
+TRANSICIONES: Dict[EstadoPedido, FrozenSet[EstadoPedido]] = {
+    EstadoPedido.PENDIENTE_CONFIRMACION: frozenset({EstadoPedido.PENDIENTE_PREPARACION}) | CANCELADOS,
+    EstadoPedido.PENDIENTE_PREPARACION: frozenset({EstadoPedido.EN_PREPARACION, EstadoPedido.LISTO_PARA_ENTREGA}) | CANCELADOS,
+    EstadoPedido.EN_PREPARACION: frozenset({EstadoPedido.LISTO_PARA_ENTREGA}) | CANCELADOS,
+    EstadoPedido.LISTO_PARA_ENTREGA: frozenset({
+        EstadoPedido.ASIGNADO_A_REPARTIDOR, EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO
+    }) | CANCELADOS,
+    EstadoPedido.ASIGNADO_A_REPARTIDOR: frozenset({
+        EstadoPedido.EN_RUTA, EstadoPedido.LISTO_PARA_ENTREGA, # Desasignar
+        EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO
+    }) | CANCELADOS,
+    EstadoPedido.EN_RUTA: frozenset({
+        EstadoPedido.ENTREGADO_PENDIENTE_PAGO, EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO,
+        EstadoPedido.PROBLEMA_EN_ENTREGA
+    }),
+    EstadoPedido.ENTREGADO_PENDIENTE_PAGO: frozenset({EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO}),
+    # Pagado por adelantado (domicilio): todavía se prepara y se entrega
+    EstadoPedido.PAGADO: frozenset({
+        EstadoPedido.EN_PREPARACION, EstadoPedido.LISTO_PARA_ENTREGA, EstadoPedido.ASIGNADO_A_REPARTIDOR,
+        EstadoPedido.EN_RUTA, EstadoPedido.ENTREGADO_Y_PAGADO
+    }),
+    EstadoPedido.PROBLEMA_EN_ENTREGA: frozenset({
+        EstadoPedido.REPROGRAMADO, EstadoPedido.ASIGNADO_A_REPARTIDOR, EstadoPedido.EN_RUTA,
+        EstadoPedido.ENTREGADO_PENDIENTE_PAGO, EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO
+    }) | CANCELADOS,
+    EstadoPedido.REPROGRAMADO: frozenset({
+        EstadoPedido.LISTO_PARA_ENTREGA, EstadoPedido.ASIGNADO_A_REPARTIDOR, EstadoPedido.EN_RUTA,
+        EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO
+    }) | CANCELADOS,
+}
+TRANSICIONES.update({estado: frozenset() for estado in FINALES}) # Estados finales: sin salida
+
+MATRIZ_TRANSICIONES: Dict[EstadoPedido, int] = {estado: _mascara(destinos) for estado, destinos in TRANSICIONES.items()}
+
+# --- Permisos por rol ---
+
+# Estados de pedido que cada rol puede ver (None = todos)
+VISIBLES_POR_ROL: Dict[RolUsuario, Optional[FrozenSet[EstadoPedido]]] = {
+    RolUsuario.ADMINISTRADOR: None,
+    RolUsuario.CAJERO: None,
+    RolUsuario.TABLAJERO: EN_PREPARACION,
+    RolUsuario.REPARTIDOR: EN_REPARTO, # Además, solo los asignados a él
+}
+MASCARA_VISIBLE_POR_ROL: Dict[RolUsuario, int] = {
+    rol: _mascara(EstadoPedido if estados is None else estados) for rol, estados in VISIBLES_POR_ROL.items()
+}
+
+# Estados a los que cada rol puede mover pedidos (uno por uno o en lote)
+DESTINOS_POR_ROL: Dict[RolUsuario, Tuple[EstadoPedido, ...]] = {
+    RolUsuario.TABLAJERO: (EstadoPedido.EN_PREPARACION, EstadoPedido.LISTO_PARA_ENTREGA),
+    RolUsuario.REPARTIDOR: (EstadoPedido.EN_RUTA, EstadoPedido.ENTREGADO_PENDIENTE_PAGO, EstadoPedido.PROBLEMA_EN_ENTREGA),
+    RolUsuario.CAJERO: (
+        EstadoPedido.EN_PREPARACION, EstadoPedido.LISTO_PARA_ENTREGA, EstadoPedido.ASIGNADO_A_REPARTIDOR,
+        EstadoPedido.CANCELADO_POR_NEGOCIO
+    ),
+    RolUsuario.ADMINISTRADOR: tuple(EstadoPedido),
+}
+
+# --- Expresiones SQL (construidas una sola vez) ---
+
+ACTIVOS_ORDENADOS = _ordenados(ACTIVOS)
+FILTRO_ACTIVOS = Pedido.estado_pedido.in_(ACTIVOS_ORDENADOS)
+FILTRO_LIQUIDABLES = Pedido.estado_pedido.in_(_ordenados(LIQUIDABLES))
+FILTRO_ARCHIVABLES = Pedido.estado_pedido.in_(_ordenados(ARCHIVABLES))
+FILTRO_VISIBLE_POR_ROL = {
+    rol: Pedido.estado_pedido.in_(_ordenados(estados)) for rol, estados in VISIBLES_POR_ROL.items() if estados is not None
+}
+
+
+# --- Consultas ---
+
+def puede_transicionar(estado_actual: EstadoPedido, estado_nuevo: EstadoPedido) -> bool:
+    """True si la matriz permite pasar de estado_actual a estado_nuevo."""
+    return bool(MATRIZ_TRANSICIONES.get(estado_actual, 0) & BIT[estado_nuevo])
+
+
+def es_visible_para_rol(rol: RolUsuario, estado: EstadoPedido) -> bool:
+    """True si un usuario con ese rol puede ver pedidos en ese estado (sin contar la asignación)."""
+    return bool(MASCARA_VISIBLE_POR_ROL.get(rol, 0) & BIT[estado])
+
+
+def rol_puede_cambiar_estado(rol: RolUsuario, estado_actual: EstadoPedido, estado_nuevo: EstadoPedido) -> bool:
+    """True si el rol ve pedidos en estado_actual y puede moverlos a estado_nuevo (sin contar la asignación)."""
+    return estado_nuevo in DESTINOS_POR_ROL.get(rol, ()) and es_visible_para_rol(rol, estado_actual)
+
+
+def estado_tras_liquidacion(estado_actual: EstadoPedido) -> EstadoPedido:
+    """Estado de un pedido liquidado por el repartidor."""
+    return EstadoPedido.ENTREGADO_Y_PAGADO if estado_actual in ENTREGADOS_AL_LIQUIDAR else EstadoPedido.PAGADO
@@ -0,0 +1,59 @@
+# Archivo: PolleriaMontiel\app\pedidos\eventos.py
+
+"""
+Eventos de dominio de pedidos (señales blinker, la misma librería de las señales de Flask).
+
+    pedido_estado_cambiado: se emite una vez por pedido, después del commit, cada vez que cambia
+    su estado (individual o en lote). Argumentos: pedido_id, estado_anterior, estado_nuevo
+    (miembros de EstadoPedido) y usuario_id (puede ser None).
+
+Los receptores se conectan con `pedido_estado_cambiado.connect(fn)` y no deben hacer commit en la
+sesión del llamador; un receptor que falla no revierte el cambio de estado (ya está confirmado).
+"""
+
+from typing import Optional
+
+from blinker import Namespace
+from flask import current_app
+
+from app.models import EstadoPedido
+from app.utils import metrics
+from app.utils.kpis_dia import kpis as kpis_dia
+
+_senales = Namespace()
+
+pedido_estado_cambiado = _senales.signal('pedido-estado-cambiado')
+
+
+def emitir_cambio_estado(
+    pedido_id: int,
+    estado_anterior: Optional[EstadoPedido],
+    estado_nuevo: EstadoPedido,
+    usuario_id: Optional[int] = None
+):
+    """Emite pedido_estado_cambiado para un pedido. Los errores de los receptores solo se registran."""
+    try:
+        pedido_estado_cambiado.send(
+            current_app._get_current_object(),
+            pedido_id=pedido_id,
+            estado_anterior=estado_anterior,
+            estado_nuevo=estado_nuevo,
+            usuario_id=usuario_id
+        )
+    except Exception as e:
+        print(f"Error en un receptor de pedido_estado_cambiado (pedido {pedido_id}): {e}")
+
+
+@pedido_estado_cambiado.connect
+def _contar_transicion(sender, estado_anterior=None, estado_nuevo=None, **kwargs):
+    """Cuenta las transiciones de estado en /metrics."""
+    metrics.PEDIDOS_TRANSICIONES.inc(
+        estado_anterior=estado_anterior.value if estado_anterior else '',
+        estado_nuevo=estado_nuevo.value
+    )
+
+
+@pedido_estado_cambiado.connect
+def _actualizar_kpis_dia(sender, pedido_id=None, estado_nuevo=None, **kwargs):
+    """Mantiene los pedidos por estado y las ventas del día (incluye los cambios en lote)."""
+    kpis_dia.estado_cambiado(pedido_id, estado_nuevo)
@@ -1,10 +1,12 @@
 # Archivo: PolleriaMontiel\app\pedidos\forms.py
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, SubmitField, SelectField, BooleanField, DecimalField, HiddenField, DateTimeLocalField
+from wtforms import StringField, TextAreaField, SubmitField, SelectField, SelectMultipleField, BooleanField, DecimalField, HiddenField, DateTimeLocalField, IntegerField
 from wtforms.validators import DataRequired, Length, Optional, ValidationError, NumberRange
-from wtforms.widgets import NumberInput
+from wtforms.widgets import NumberInput, ListWidget, CheckboxInput
 from app.models import Cliente, Direccion, Usuario, Producto, Subproducto, Modificacion, TipoVenta, FormaPago, EstadoPedido # Importar modelos y Enums
+from app.caja.forms import DENOMINACIONES_MXN_ORDENADAS # Denominaciones para el detalle de efectivo
+from app.pedidos import estados # Estados que requieren repartidor
 from decimal import Decimal
 from datetime import datetime # Para el default de DateTimeLocalField
 
@@ -139,14 +141,7 @@ class PedidoForm(FlaskForm):
 
     def validate_repartidor_id(self, repartidor_id):
         # Validar que si el estado implica asignación, haya un repartidor seleccionado
-        estados_con_repartidor = [
-            EstadoPedido.ASIGNADO_A_REPARTIDOR.value,
-            EstadoPedido.EN_RUTA.value,
-            EstadoPedido.ENTREGADO_PENDIENTE_PAGO.value,
-            EstadoPedido.PROBLEMA_EN_ENTREGA.value,
-            EstadoPedido.REPROGRAMADO.value # Si se reprograma y ya estaba asignado
-        ]
-        if self.estado_pedido.data in estados_con_repartidor and (not repartidor_id.data or int(repartidor_id.data) == 0):
+        if self.estado_pedido.data in estados.VALORES_CON_REPARTIDOR and (not repartidor_id.data or int(repartidor_id.data) == 0):
              raise ValidationError('Debe asignar un repartidor para este estado del pedido.')
 
         if repartidor_id.data and int(repartidor_id.data) != 0: # 0 es el valor por defecto "Seleccionar"
@@ -224,8 +219,8 @@ class PedidoItemForm(FlaskForm):
     submit = SubmitField('Añadir Ítem')
 
     # Validaciones adicionales (ej. producto_id O subproducto_id es requerido)
-    def validate(self):
-        if not FlaskForm.validate(self):
+    def validate(self, extra_validators=None):
+        if not FlaskForm.validate(self, extra_validators=extra_validators):
             return False
 
         # Asegurar que se seleccionó un Producto o un Subproducto
@@ -344,3 +339,127 @@ class ProductoAdicionalForm(FlaskForm):
         # Si la unidad es MONTO, el precio_venta_unitario_pa es el monto total
         if self.unidad_medida_pa.data == 'MONTO' and precio_venta_unitario_pa.data is None:
              raise ValidationError('Debe especificar el monto total para esta unidad.')
+
+
+def _nombre_campo_denominacion(valor) -> str:
+    """Nombre del campo de cantidad para una denominación (mismo esquema que en caja/forms.py)."""
+    return f'cantidad_{str(valor).replace(".", "_")}'
+
+
+def _agregar_campos_denominaciones(form_class, accion: str):
+    """Añade a la clase del formulario un IntegerField por denominación de MXN."""
+    for valor, etiqueta in DENOMINACIONES_MXN_ORDENADAS:
+        setattr(
+            form_class,
+            _nombre_campo_denominacion(valor),
+            IntegerField(
+                f'Cantidad {accion} de {etiqueta}',
+                validators=[Optional(), NumberRange(min=0, message='La cantidad no puede ser negativa.')],
+                default=0,
+                widget=NumberInput(min=0)
+            )
+        )
+
+
+def _recopilar_denominaciones(form):
+    """Retorna {valor_denominacion (Decimal): cantidad} con las cantidades > 0 del formulario."""
+    recibido = {}
+    for valor, etiqueta in DENOMINACIONES_MXN_ORDENADAS:
+        field = getattr(form, _nombre_campo_denominacion(valor))
+        if field.data is not None and field.data > 0:
+            recibido[Decimal(str(valor))] = field.data # $20 billete/moneda comparten campo
+    return recibido
+
+
+class PagoPedidoForm(FlaskForm):
+    """
+    Formulario para procesar el pago de un pedido en caja.
+    Para efectivo se captura el monto recibido y su detalle por denominaciones.
+    """
+    forma_pago = SelectField(
+        'Forma de Pago',
+        choices=[(choice.value, choice.name.replace('_', ' ').title()) for choice in FormaPago],
+        validators=[DataRequired()]
+    )
+
+    monto_recibido = DecimalField(
+        'Monto Recibido (Efectivo)',
+        validators=[Optional(), NumberRange(min=Decimal('0.00'), message='El monto debe ser positivo.')],
+        render_kw={"placeholder": "Monto recibido"},
+        widget=NumberInput(step='0.01')
+    )
+
+    submit = SubmitField('Registrar Pago')
+
+    def get_denominaciones_recibidas(self):
+        """Recopila el detalle del efectivo recibido. Retorna None si no es pago en efectivo."""
+        if self.forma_pago.data != FormaPago.EFECTIVO.value:
+            return None
+        return _recopilar_denominaciones(self)
+
+    def validate_monto_recibido(self, monto_recibido):
+        if self.forma_pago.data == FormaPago.EFECTIVO.value and monto_recibido.data is None:
+            raise ValidationError('Debe indicar el monto recibido para pagos en efectivo.')
+
+
+class LiquidacionForm(FlaskForm):
+    """
+    Formulario para que el repartidor liquide en caja el efectivo cobrado de un pedido a domicilio.
+    """
+    monto_recibido = DecimalField(
+        'Monto Entregado',
+        validators=[DataRequired(), NumberRange(min=Decimal('0.00'), message='El monto no puede ser negativo.')],
+        render_kw={"placeholder": "Efectivo entregado por el repartidor"},
+        widget=NumberInput(step='0.01')
+    )
+
+    submit = SubmitField('Liquidar Pedido')
+
+    def get_denominaciones_recibidas(self):
+        """Recopila el detalle del efectivo entregado por el repartidor."""
+        return _recopilar_denominaciones(self)
+
+    def validate_monto_recibido(self, monto_recibido):
+        if not _recopilar_denominaciones(self):
+            raise ValidationError('Debe detallar el efectivo entregado por denominación.')
+
+
+class LiquidacionLoteForm(FlaskForm):
+    """
+    Formulario para liquidar de una vez varios pedidos a domicilio de un repartidor
+    con una sola entrega de efectivo y un solo conteo por denominaciones.
+    Las opciones de pedido_ids se llenan en la ruta con los pedidos por liquidar.
+    """
+    pedido_ids = SelectMultipleField(
+        'Pedidos a Liquidar',
+        coerce=int,
+        validators=[DataRequired(message='Selecciona al menos un pedido.')],
+        widget=ListWidget(prefix_label=False),
+        option_widget=CheckboxInput()
+    )
+
+    monto_recibido = DecimalField(
+        'Monto Entregado',
+        validators=[DataRequired(), NumberRange(min=Decimal('0.00'), message='El monto no puede ser negativo.')],
+        render_kw={"placeholder": "Efectivo total entregado por el repartidor"},
+        widget=NumberInput(step='0.01')
+    )
+
+    submit = SubmitField('Liquidar Pedidos Seleccionados')
+
+    def get_denominaciones_recibidas(self):
+        """Recopila el detalle del efectivo entregado por el repartidor."""
+        return _recopilar_denominaciones(self)
+
+    def validate_monto_recibido(self, monto_recibido):
+        denominaciones = _recopilar_denominaciones(self)
+        if not denominaciones:
+            raise ValidationError('Debe detallar el efectivo entregado por denominación.')
+        total_contado = sum(valor * cantidad for valor, cantidad in denominaciones.items())
+        if monto_recibido.data is not None and total_contado != monto_recibido.data:
+            raise ValidationError(f'El monto no coincide con el conteo por denominaciones (${total_contado:.2f}).')
+
+
+_agregar_campos_denominaciones(PagoPedidoForm, 'Recibida')
+_agregar_campos_denominaciones(LiquidacionForm, 'Entregada')
+_agregar_campos_denominaciones(LiquidacionLoteForm, 'Entregada')
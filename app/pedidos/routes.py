@@ -1,6 +1,6 @@
 # Archivo: PolleriaMontiel\app\pedidos\routes.py
 
-from flask import render_template, redirect, url_for, flash, request, abort, jsonify, send_file # Importar jsonify y send_file para respuestas AJAX
+from flask import render_template, redirect, url_for, flash, request, abort, jsonify, send_file, current_app # Importar jsonify y send_file para respuestas AJAX
 from flask_login import login_required, current_user
 from app import db
 from app.models import (
@@ -10,19 +10,34 @@ from app.models import (
     TipoVenta, FormaPago, EstadoPedido, TipoMovimientoCaja, RolUsuario, TipoCliente
 ) # Importar todos los modelos y Enums necesarios
 from . import pedidos # Importar el Blueprint
-from .forms import PedidoForm, PedidoItemForm, ProductoAdicionalForm # Importar formularios
+from . import estados # Máquina de estados de pedidos (visibilidad por rol, liquidables, destinos en lote)
+from . import tickets # Tickets y comandas ESC/POS para impresoras térmicas
+from .forms import PedidoForm, PedidoItemForm, ProductoAdicionalForm, PagoPedidoForm, LiquidacionForm, LiquidacionLoteForm # Importar formularios
 from .services import (
     create_pedido, get_pedido_by_id, get_all_pedidos, search_pedidos, get_active_pedidos,
-    update_pedido, delete_pedido, update_pedido_status,
+    update_pedido, delete_pedido, update_pedido_status, update_pedidos_status_bulk,
     add_pedido_item, get_pedido_item_by_id, update_pedido_item, delete_pedido_item,
     add_producto_adicional, get_producto_adicional_by_id, update_producto_adicional, delete_producto_adicional,
-    process_pedido_payment, process_compra_pa_egreso, process_repartidor_liquidacion,
+    process_pedido_payment, process_compra_pa_egreso, process_repartidor_liquidacion, registrar_venta_rapida,
+    process_repartidor_liquidacion_lote, get_pedidos_por_liquidar,
     _get_precio_aplicable # Importar función interna para AJAX de precio
 ) # Importar funciones de servicio
+from app.clientes.services import search_clients, get_client_by_id # Búsqueda de clientes para los endpoints AJAX de toma de pedidos
+from app.productos.services import ( # Búsqueda de productos para los endpoints AJAX de toma de pedidos
+    search_productos, search_subproductos, get_producto_by_id, get_subproducto_by_id
+)
 from app.utils.decorators import role_required # Importar el decorador de roles
+from app.utils.db_routing import solo_lectura # Enrutamiento de lecturas a la réplica
 from app.utils.helpers import format_currency, format_datetime, format_pedido_folio # Importar helpers
-from decimal import Decimal # Importar Decimal
+from app.utils.impresion import cola as cola_impresion # Cola de impresión local (ESC/POS)
+from app.utils.archivo import union_historica # Reportes sobre pedidos activos + archivados
+from app.trabajos.services import encolar_trabajo # Reportes pesados en segundo plano (`flask worker`)
+from app.trabajos.tareas import REPORTE_PEDIDOS_DETALLE, EXPORTACION_COLUMNAR
+from app.utils import exportacion # Exportación Parquet/Arrow (pyarrow opcional)
+from app.trabajos.routes import trabajo_a_dict
+from decimal import Decimal, InvalidOperation # Importar Decimal
 from datetime import datetime, date # Importar datetime y date
+from sqlalchemy import and_, func, select # Consultas de reportes
 from sqlalchemy.orm import joinedload # Para cargar relaciones eager si es necesario
 import json # Para manejar JSON en peticiones AJAX
 
@@ -66,7 +81,7 @@ def dashboard_pedidos():
 
     elif current_user.is_tablajero():
         # Tablajero solo ve pedidos pendientes de preparación o en preparación
-        filters['estado'] = [EstadoPedido.PENDIENTE_PREPARACION.value, EstadoPedido.EN_PREPARACION.value]
+        filters['visible_para_rol'] = RolUsuario.TABLAJERO
         # Podría filtrar por pedidos del día actual si es relevante
         # filters['fecha_desde'] = datetime.combine(date.today(), datetime.min.time())
         pedidos_pagination = get_all_pedidos(page=page, per_page=per_page, filters=filters)
@@ -75,13 +90,7 @@ def dashboard_pedidos():
     elif current_user.is_repartidor():
         # Repartidor solo ve pedidos asignados a él y en estados de entrega
         filters['repartidor_id'] = current_user.id
-        filters['estado'] = [
-            EstadoPedido.ASIGNADO_A_REPARTIDOR.value,
-            EstadoPedido.EN_RUTA.value,
-            EstadoPedido.ENTREGADO_PENDIENTE_PAGO.value,
-            EstadoPedido.PROBLEMA_EN_ENTREGA.value,
-            EstadoPedido.REPROGRAMADO.value
-        ]
+        filters['visible_para_rol'] = RolUsuario.REPARTIDOR
         pedidos_pagination = get_all_pedidos(page=page, per_page=per_page, filters=filters)
         title = f'Mis Pedidos Asignados ({current_user.nombre_completo})'
 
@@ -93,6 +102,10 @@ def dashboard_pedidos():
 
 
     pedidos_list = pedidos_pagination.items if pedidos_pagination else []
+    estados_lote = estados.DESTINOS_POR_ROL.get(current_user.rol, ())
+    repartidores = []
+    if EstadoPedido.ASIGNADO_A_REPARTIDOR in estados_lote:
+        repartidores = Usuario.query.filter_by(rol=RolUsuario.REPARTIDOR, activo=True).order_by(Usuario.nombre_completo).all()
 
     # CORRECCIÓN: Renderizar la plantilla de listado correcta
     return render_template(
@@ -104,7 +117,10 @@ def dashboard_pedidos():
         format_currency=format_currency,
         format_datetime=format_datetime,
         format_pedido_folio=format_pedido_folio,
-        EstadoPedido=EstadoPedido # Pasar el Enum para lógica en plantilla
+        EstadoPedido=EstadoPedido, # Pasar el Enum para lógica en plantilla
+        estados_lote=estados_lote, # Cambio de estado en lote
+        estados_eliminables=estados.ELIMINABLES,
+        repartidores=repartidores
     )
 
 
@@ -123,15 +139,12 @@ def crear_pedido():
     if form.validate_on_submit():
         # Usar servicio para crear pedido
         nuevo_pedido = create_pedido(
-            cliente_id=form.cliente_id.data,
+            cliente_id=form.cliente_id.data or None,
             usuario_id=current_user.id, # El usuario logueado es el creador
-            repartidor_id=form.repartidor_id.data,
-            direccion_entrega_id=form.direccion_entrega_id.data,
-            tipo_venta=form.tipo_venta.data,
-            forma_pago=form.forma_pago.data,
-            paga_con=form.paga_con.data,
-            cambio_entregado=form.cambio_entregado.data,
-            costo_envio=form.costo_envio.data,
+            repartidor_id=form.repartidor_id.data or None, # 0 es la opción "Seleccionar Repartidor"
+            direccion_entrega_id=form.direccion_entrega_id.data or None,
+            tipo_venta_value=form.tipo_venta.data,
+            forma_pago_value=form.forma_pago.data or None,
             notas_pedido=form.notas_pedido.data,
             fecha_entrega_programada=form.fecha_entrega_programada.data,
             requiere_factura=form.requiere_factura.data
@@ -139,7 +152,7 @@ def crear_pedido():
         )
 
         if nuevo_pedido:
-            flash(f'Pedido #{format_pedido_folio(nuevo_pedido.id)} creado exitosamente.', 'success')
+            flash(f'Pedido #{format_pedido_folio(nuevo_pedido)} creado exitosamente.', 'success')
             # Redirigir a la vista de edición del pedido para añadir ítems
             return redirect(url_for('pedidos.editar_pedido', pedido_id=nuevo_pedido.id))
         else:
@@ -152,6 +165,74 @@ def crear_pedido():
     return render_template('pedidos/crear_pedido.html', title='Crear Nuevo Pedido', form=form)
 
 
+@pedidos.route('/venta-rapida', methods=['POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_RW) # Cajero y Admin cobran en mostrador
+def venta_rapida():
+    """
+    Endpoint AJAX de venta de mostrador en una sola petición: recibe las líneas y el pago (JSON)
+    y crea el pedido ya cobrado en una sola transacción.
+
+    Cuerpo esperado:
+        {"lineas": [{"producto_id": "PECH", "cantidad": "1.5", "unidad_medida": "kg"}, ...],
+         "productos_adicionales": [{"nombre_pa": "Tortillas", "cantidad_pa": "1", "costo_compra_unitario_pa": "24"}],
+         "pago": {"forma_pago": "EFECTIVO", "monto_recibido": "500", "denominaciones": {"500.0": 1}},
+         "cliente_id": null, "notas_pedido": null}
+    """
+    data = request.get_json(silent=True) or {}
+    pago = data.get('pago') or {}
+
+    try:
+        lineas = [{
+            'producto_id': linea.get('producto_id') or None,
+            'subproducto_id': int(linea['subproducto_id']) if linea.get('subproducto_id') else None,
+            'modificacion_id': int(linea['modificacion_id']) if linea.get('modificacion_id') else None,
+            'cantidad': Decimal(str(linea.get('cantidad'))),
+            'unidad_medida': linea.get('unidad_medida') or 'kg',
+        } for linea in data.get('lineas') or []] # El precio siempre lo calcula el servidor
+        productos_adicionales = [{
+            'nombre_pa': pa.get('nombre_pa'),
+            'cantidad_pa': Decimal(str(pa.get('cantidad_pa', '1'))),
+            'unidad_medida_pa': pa.get('unidad_medida_pa') or 'pieza',
+            'costo_compra_unitario_pa': Decimal(str(pa['costo_compra_unitario_pa'])) if pa.get('costo_compra_unitario_pa') is not None else None,
+            'precio_venta_unitario_pa': Decimal(str(pa['precio_venta_unitario_pa'])) if pa.get('precio_venta_unitario_pa') is not None else None,
+            'notas_pa': pa.get('notas_pa'),
+        } for pa in data.get('productos_adicionales') or []]
+        monto_recibido = Decimal(str(pago['monto_recibido'])) if pago.get('monto_recibido') is not None else None
+        denominaciones = {
+            Decimal(str(valor)): int(cantidad) for valor, cantidad in (pago.get('denominaciones') or {}).items() if int(cantidad) > 0
+        } or None
+        cliente_id = int(data['cliente_id']) if data.get('cliente_id') else None
+    except (InvalidOperation, TypeError, ValueError, KeyError, AttributeError):
+        return jsonify({'success': False, 'message': 'Datos de la venta no válidos.'}), 400
+
+    if not pago.get('forma_pago') or (not lineas and not productos_adicionales):
+        return jsonify({'success': False, 'message': 'La venta requiere al menos un producto y la forma de pago.'}), 400
+
+    pedido = registrar_venta_rapida(
+        usuario_id=current_user.id,
+        lineas=lineas,
+        forma_pago_value=pago.get('forma_pago'),
+        monto_recibido=monto_recibido,
+        denominaciones_recibidas=denominaciones,
+        productos_adicionales=productos_adicionales,
+        cliente_id=cliente_id,
+        notas_pedido=data.get('notas_pedido')
+    )
+    if not pedido:
+        # El servicio ya imprime un error detallado
+        return jsonify({'success': False, 'message': 'No se pudo registrar la venta. Verifica productos, precios y pago.'}), 400
+
+    return jsonify({
+        'success': True,
+        'pedido_id': pedido.id,
+        'folio': format_pedido_folio(pedido),
+        'total': str(pedido.total_pedido), # Decimal a string para JSON
+        'cambio': str(pedido.cambio_entregado or Decimal('0.00')),
+        'ticket_url': url_for('pedidos.imprimir_ticket', pedido_id=pedido.id),
+    }), 201
+
+
 @pedidos.route('/<int:pedido_id>')
 @login_required
 @role_required(ROLES_PEDIDOS_READ) # Todos los roles pueden ver detalles de pedidos relevantes
@@ -170,14 +251,9 @@ def ver_pedido(pedido_id):
     # Tablajero solo ve pedidos en estado PENDIENTE_PREPARACION o EN_PREPARACION.
     # Repartidor solo ve pedidos asignados a él y en estados de entrega.
     if not (current_user.is_admin() or current_user.is_cajero()):
-        is_relevant = False
-        if current_user.is_tablajero() and pedido.estado_pedido in [EstadoPedido.PENDIENTE_PREPARACION, EstadoPedido.EN_PREPARACION]:
-            is_relevant = True
-        if current_user.is_repartidor() and pedido.repartidor_id == current_user.id and pedido.estado_pedido in [
-            EstadoPedido.ASIGNADO_A_REPARTIDOR, EstadoPedido.EN_RUTA, EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
-            EstadoPedido.PROBLEMA_EN_ENTREGA, EstadoPedido.REPROGRAMADO
-        ]:
-            is_relevant = True
+        is_relevant = estados.es_visible_para_rol(current_user.rol, pedido.estado_pedido)
+        if current_user.is_repartidor() and pedido.repartidor_id != current_user.id:
+            is_relevant = False
 
         if not is_relevant:
             flash('No tienes permiso para ver los detalles de este pedido.', 'danger')
@@ -187,7 +263,7 @@ def ver_pedido(pedido_id):
     # Necesitarás una plantilla 'pedidos/ver_pedido.html'
     return render_template(
         'pedidos/ver_pedido.html',
-        title=f'Pedido #{format_pedido_folio(pedido.id)}',
+        title=f'Pedido #{format_pedido_folio(pedido)}',
         pedido=pedido,
         format_currency=format_currency,
         format_datetime=format_datetime,
@@ -216,7 +292,7 @@ def editar_pedido(pedido_id):
 
     # Opcional: Validar si el pedido puede ser modificado por el usuario actual
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
     form = PedidoForm(obj=pedido) # Pre-llenar formulario con datos del pedido
@@ -229,13 +305,10 @@ def editar_pedido(pedido_id):
         updated_pedido = update_pedido(
             pedido_id=pedido.id,
             cliente_id=form.cliente_id.data,
-            repartidor_id=form.repartidor_id.data,
-            direccion_entrega_id=form.direccion_entrega_id.data,
-            tipo_venta=form.tipo_venta.data,
-            forma_pago=form.forma_pago.data,
-            paga_con=form.paga_con.data,
-            cambio_entregado=form.cambio_entregado.data,
-            costo_envio=form.costo_envio.data,
+            repartidor_id=form.repartidor_id.data or None, # 0 es la opción "Seleccionar Repartidor"
+            direccion_entrega_id=form.direccion_entrega_id.data or None,
+            tipo_venta_value=form.tipo_venta.data,
+            forma_pago_value=form.forma_pago.data or None,
             notas_pedido=form.notas_pedido.data,
             fecha_entrega_programada=form.fecha_entrega_programada.data,
             requiere_factura=form.requiere_factura.data
@@ -243,7 +316,7 @@ def editar_pedido(pedido_id):
         )
 
         if updated_pedido:
-            flash(f'Pedido #{format_pedido_folio(updated_pedido.id)} actualizado exitosamente.', 'success')
+            flash(f'Pedido #{format_pedido_folio(updated_pedido)} actualizado exitosamente.', 'success')
             return redirect(url_for('pedidos.ver_pedido', pedido_id=updated_pedido.id))
         else:
             # El servicio ya imprime un error detallado
@@ -254,7 +327,7 @@ def editar_pedido(pedido_id):
     # Necesitarás una plantilla 'pedidos/editar_pedido.html'
     return render_template(
         'pedidos/editar_pedido.html',
-        title=f'Editar Pedido #{format_pedido_folio(pedido.id)}',
+        title=f'Editar Pedido #{format_pedido_folio(pedido)}',
         form=form,
         pedido=pedido, # Pasar el objeto pedido para acceder a sus relaciones (ítems, PAs)
         format_currency=format_currency,
@@ -262,10 +335,10 @@ def editar_pedido(pedido_id):
         format_pedido_folio=format_pedido_folio,
         EstadoPedido=EstadoPedido, # Pasar Enum
         TipoVenta=TipoVenta, # Pasar Enum
-        FormaPago=FormaPago # Pasar Enum
-        # Puedes pasar formularios vacíos para añadir ítems/PAs si se usan modales en la vista
-        # item_form=PedidoItemForm(),
-        # pa_form=ProductoAdicionalForm()
+        FormaPago=FormaPago, # Pasar Enum
+        # Formularios vacíos para las secciones de añadir ítems/PAs (formulario_pedido.js los envía por POST)
+        item_form=PedidoItemForm(),
+        pa_form=ProductoAdicionalForm()
     )
 
 
@@ -284,17 +357,17 @@ def eliminar_pedido(pedido_id):
 
     # Opcional: Validar si el pedido puede ser eliminado según su estado
     # if pedido.estado_pedido not in [EstadoPedido.PENDIENTE_CONFIRMACION, EstadoPedido.CANCELADO_POR_CLIENTE, EstadoPedido.CANCELADO_POR_NEGOCIO]:
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser eliminado en estado {pedido.estado_pedido.value}. Considere cancelarlo.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser eliminado en estado {pedido.estado_pedido.value}. Considere cancelarlo.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
     success = delete_pedido(pedido_id)
 
     if success:
-        flash(f'Pedido #{format_pedido_folio(pedido.id)} eliminado exitosamente.', 'success')
+        flash(f'Pedido #{format_pedido_folio(pedido)} eliminado exitosamente.', 'success')
     else:
         # El servicio ya imprime un error detallado
-        flash(f'Error al eliminar pedido #{format_pedido_folio(pedido.id)}.', 'danger')
+        flash(f'Error al eliminar pedido #{format_pedido_folio(pedido)}.', 'danger')
 
     # Redirigir a la lista de pedidos
     return redirect(url_for('pedidos.dashboard_pedidos'))
@@ -306,8 +379,8 @@ def eliminar_pedido(pedido_id):
 def cambiar_estado_pedido(pedido_id):
     """
     Cambia el estado de un pedido. Requiere método POST.
-    La lógica de qué estados son permitidos para cada rol/estado actual
-    se maneja en el servicio o aquí antes de llamar al servicio.
+    Los estados permitidos para cada rol están en estados.DESTINOS_POR_ROL / VISIBLES_POR_ROL;
+    la transición desde el estado actual la valida el servicio.
     """
     pedido = get_pedido_by_id(pedido_id)
     if not pedido:
@@ -324,39 +397,23 @@ def cambiar_estado_pedido(pedido_id):
         new_estado = EstadoPedido[new_estado_value]
         current_estado = pedido.estado_pedido
 
-        # Lógica de autorización y transición de estado:
-        # Solo Admin puede cambiar a cualquier estado.
-        # Cajero: PENDIENTE_PREPARACION -> EN_PREPARACION, LISTO_PARA_ENTREGA, ASIGNADO_A_REPARTIDOR, CANCELADO_POR_NEGOCIO (si no ha salido)
-        # Tablajero: PENDIENTE_PREPARACION -> EN_PREPARACION, EN_PREPARACION -> LISTO_PARA_ENTREGA
-        # Repartidor: ASIGNADO_A_REPARTIDOR -> EN_RUTA, EN_RUTA -> ENTREGADO_PENDIENTE_PAGO/PROBLEMA_EN_ENTREGA, ENTREGADO_PENDIENTE_PAGO -> PAGADO
-        # Esta lógica detallada se implementaría aquí o en el servicio update_pedido_status
-        # Para MVP, asumimos que el servicio valida las transiciones permitidas por rol y estado actual.
-
-        # if not current_user.is_admin():
-        #     # Validar transiciones permitidas para roles no-Admin
-        #     is_transition_allowed = False
-        #     if current_user.is_cajero():
-        #         # Lógica de transiciones para Cajero
-        #         pass # Implementar aquí
-        #     elif current_user.is_tablajero():
-        #          # Lógica de transiciones para Tablajero
-        #          pass # Implementar aquí
-        #     elif current_user.is_repartidor():
-        #          # Lógica de transiciones para Repartidor
-        #          pass # Implementar aquí
-        #
-        #     if not is_transition_allowed:
-        #         flash(f'No tienes permiso para cambiar el estado del pedido #{format_pedido_folio(pedido.id)} de "{current_estado.value}" a "{new_estado_value}".', 'danger')
-        #         return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
+        # Mismas reglas por rol que cambiar_estado_lote: estados destino del rol, estado actual visible
+        # para el rol y, para el repartidor, solo sus pedidos. La matriz de transiciones la valida el servicio
+        permitido = estados.rol_puede_cambiar_estado(current_user.rol, current_estado, new_estado)
+        if current_user.is_repartidor() and pedido.repartidor_id != current_user.id:
+            permitido = False
+        if not permitido:
+            flash(f'No tienes permiso para cambiar el estado del pedido #{format_pedido_folio(pedido)} de "{current_estado.value}" a "{new_estado_value}".', 'danger')
+            return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
         # Si la transición es permitida por rol, llamar al servicio
         updated_pedido = update_pedido_status(pedido.id, new_estado)
 
         if updated_pedido:
-            flash(f'Estado del pedido #{format_pedido_folio(updated_pedido.id)} actualizado a "{updated_pedido.estado_pedido.name.replace("_", " ").title()}".', 'success')
+            flash(f'Estado del pedido #{format_pedido_folio(updated_pedido)} actualizado a "{updated_pedido.estado_pedido.name.replace("_", " ").title()}".', 'success')
         else:
             # El servicio ya imprime un error detallado
-            flash(f'Error al actualizar el estado del pedido #{format_pedido_folio(pedido.id)}.', 'danger')
+            flash(f'Error al actualizar el estado del pedido #{format_pedido_folio(pedido)}.', 'danger')
 
     except ValueError:
         # Si new_estado_value no es un miembro válido del Enum EstadoPedido
@@ -369,6 +426,49 @@ def cambiar_estado_pedido(pedido_id):
     return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
+@pedidos.route('/cambiar_estado_lote', methods=['POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_READ) # Cada rol solo puede mover a los estados de estados.DESTINOS_POR_ROL
+def cambiar_estado_lote():
+    """
+    Cambia el estado de varios pedidos seleccionados en el dashboard con una sola operación.
+    Los pedidos con transición no permitida o modificados por otro usuario se reportan y no se tocan.
+    """
+    pedido_ids = request.form.getlist('pedido_ids', type=int)
+    new_estado_value = request.form.get('new_estado')
+    destino = url_for('pedidos.dashboard_pedidos')
+
+    if not pedido_ids or not new_estado_value:
+        flash('Selecciona al menos un pedido y el nuevo estado.', 'warning')
+        return redirect(destino)
+
+    estados_permitidos = estados.DESTINOS_POR_ROL.get(current_user.rol, ())
+    if new_estado_value not in [estado.value for estado in estados_permitidos]:
+        flash(f'No tienes permiso para cambiar pedidos al estado "{new_estado_value}".', 'danger')
+        return redirect(destino)
+
+    resultado = update_pedidos_status_bulk(
+        pedido_ids,
+        new_estado_value,
+        usuario_id=current_user.id,
+        repartidor_id=request.form.get('repartidor_id', type=int),
+        solo_del_repartidor=current_user.id if current_user.is_repartidor() else None, # Solo sus propios pedidos
+        rol=current_user.rol # Solo pedidos que el rol puede ver (administrador y cajero: todos)
+    )
+    if resultado is None:
+        # El servicio ya imprime un error detallado
+        flash('Error al cambiar el estado de los pedidos. Por favor, verifica los datos.', 'danger')
+        return redirect(destino)
+
+    if resultado['actualizados']:
+        flash(f'{len(resultado["actualizados"])} pedido(s) actualizados a "{new_estado_value.replace("_", " ").title()}".', 'success')
+    if resultado['rechazados']:
+        flash(f'{len(resultado["rechazados"])} pedido(s) no admiten ese cambio de estado.', 'warning')
+    if resultado['conflictos']:
+        flash(f'{len(resultado["conflictos"])} pedido(s) fueron modificados por otro usuario; revisa y vuelve a intentar.', 'warning')
+    return redirect(destino)
+
+
 @pedidos.route('/<int:pedido_id>/pagar', methods=['GET', 'POST'])
 @login_required
 @role_required(ROLES_PEDIDOS_RW) # Cajero y Admin pueden procesar pagos
@@ -384,27 +484,27 @@ def process_payment_route(pedido_id):
 
     # Validar que el pedido esté en un estado que permita el pago
     # if pedido.estado_pedido not in [EstadoPedido.LISTO_PARA_ENTREGA, EstadoPedido.ENTREGADO_PENDIENTE_PAGO]:
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no está en un estado que permita el pago ({pedido.estado_pedido.value}).', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no está en un estado que permita el pago ({pedido.estado_pedido.value}).', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
-    form = PaymentForm() # Necesitarás crear este formulario (monto, forma_pago, paga_con, denominaciones)
+    form = PagoPedidoForm()
 
     if form.validate_on_submit():
         # Usar servicio para procesar el pago
         # El servicio debe manejar la creación del MovimientoCaja y la actualización del estado del pedido
         success = process_pedido_payment(
             pedido_id=pedido.id,
-            monto_recibido=form.monto_recibido.data, # O total_pedido si se paga exacto
-            forma_pago=form.forma_pago.data,
-            paga_con=form.paga_con.data, # Solo si forma_pago es EFECTIVO
-            denominaciones_recibidas=form.denominaciones_recibidas.data # Solo si forma_pago es EFECTIVO
+            usuario_id_cajero=current_user.id,
+            forma_pago_value=form.forma_pago.data,
+            monto_recibido=form.monto_recibido.data, # Solo si forma_pago es EFECTIVO
+            denominaciones_recibidas=form.get_denominaciones_recibidas() # Solo si forma_pago es EFECTIVO
         )
 
         if success:
-            flash(f'Pago del pedido #{format_pedido_folio(pedido.id)} procesado exitosamente.', 'success')
+            flash(f'Pago del pedido #{format_pedido_folio(pedido)} procesado exitosamente.', 'success')
         else:
             # El servicio ya imprime un error detallado
-            flash(f'Error al procesar el pago del pedido #{format_pedido_folio(pedido.id)}. Por favor, verifica los datos.', 'danger')
+            flash(f'Error al procesar el pago del pedido #{format_pedido_folio(pedido)}. Por favor, verifica los datos.', 'danger')
 
         return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
@@ -428,34 +528,27 @@ def process_liquidacion_route(pedido_id):
         return redirect(url_for('pedidos.dashboard_pedidos'))
 
     # Validar que el pedido sea a domicilio y esté en un estado liquidable
-    liquidable_states = [
-        EstadoPedido.ASIGNADO_A_REPARTIDOR,
-        EstadoPedido.EN_RUTA,
-        EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
-        EstadoPedido.PROBLEMA_EN_ENTREGA,
-        EstadoPedido.REPROGRAMADO
-    ]
-    if pedido.tipo_venta != TipoVenta.DOMICILIO or pedido.estado_pedido not in liquidable_states:
-         flash(f'El pedido #{format_pedido_folio(pedido.id)} no es a domicilio o no está en un estado liquidable ({pedido.estado_pedido.value}).', 'warning')
+    if pedido.tipo_venta != TipoVenta.DOMICILIO or pedido.estado_pedido not in estados.LIQUIDABLES:
+         flash(f'El pedido #{format_pedido_folio(pedido)} no es a domicilio o no está en un estado liquidable ({pedido.estado_pedido.value}).', 'warning')
          return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
-    form = LiquidacionForm() # Necesitarás crear este formulario (monto_recibido, denominaciones)
+    form = LiquidacionForm()
 
     if form.validate_on_submit():
         # Usar servicio para procesar la liquidación
         # El servicio debe manejar la creación del MovimientoCaja y la actualización del estado del pedido
         updated_pedido = process_repartidor_liquidacion(
             pedido_id=pedido.id,
-            usuario_liquida_id=current_user.id, # El usuario logueado es quien liquida
-            monto_recibido_efectivo=form.monto_recibido_efectivo.data,
-            denominaciones_recibidas=form.denominaciones_recibidas.data
+            usuario_id_repartidor_o_cajero=current_user.id, # El usuario logueado es quien liquida
+            monto_recibido=form.monto_recibido.data,
+            denominaciones_recibidas=form.get_denominaciones_recibidas()
         )
 
         if updated_pedido:
-            flash(f'Liquidación del pedido #{format_pedido_folio(updated_pedido.id)} procesada exitosamente.', 'success')
+            flash(f'Liquidación del pedido #{format_pedido_folio(updated_pedido)} procesada exitosamente.', 'success')
         else:
             # El servicio ya imprime un error detallado
-            flash(f'Error al procesar la liquidación del pedido #{format_pedido_folio(pedido.id)}. Por favor, verifica los datos.', 'danger')
+            flash(f'Error al procesar la liquidación del pedido #{format_pedido_folio(pedido)}. Por favor, verifica los datos.', 'danger')
 
         return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
@@ -465,6 +558,51 @@ def process_liquidacion_route(pedido_id):
     return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
+@pedidos.route('/liquidar-lote', methods=['GET', 'POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_ENTREGA) # Repartidor, Cajero, Admin pueden liquidar
+def liquidar_lote():
+    """
+    Liquida varios pedidos a domicilio de un repartidor con una sola entrega de efectivo.
+    El repartidor ve sus propios pedidos; Cajero/Admin eligen el repartidor (?repartidor_id=).
+    """
+    repartidores = []
+    if current_user.is_repartidor():
+        repartidor_id = current_user.id
+    else:
+        repartidores = Usuario.query.filter_by(rol=RolUsuario.REPARTIDOR, activo=True).order_by(Usuario.nombre_completo).all()
+        repartidor_id = request.args.get('repartidor_id', type=int)
+
+    pedidos_pendientes = get_pedidos_por_liquidar(repartidor_id) if repartidor_id else []
+    form = LiquidacionLoteForm()
+    form.pedido_ids.choices = [
+        (pedido.id, f"#{format_pedido_folio(pedido)} - {format_currency(pedido.total_pedido)}") for pedido in pedidos_pendientes
+    ]
+
+    if form.validate_on_submit():
+        liquidados = process_repartidor_liquidacion_lote(
+            pedido_ids=form.pedido_ids.data,
+            usuario_id_repartidor_o_cajero=current_user.id, # El usuario logueado es quien liquida
+            monto_recibido=form.monto_recibido.data,
+            denominaciones_recibidas=form.get_denominaciones_recibidas()
+        )
+
+        if liquidados:
+            flash(f'Liquidación de {len(liquidados)} pedidos procesada exitosamente.', 'success')
+            return redirect(url_for('pedidos.liquidar_lote', repartidor_id=repartidor_id))
+        # El servicio ya imprime un error detallado
+        flash('Error al procesar la liquidación en lote. Por favor, verifica los pedidos y el efectivo.', 'danger')
+
+    return render_template(
+        'pedidos/liquidar_lote.html',
+        title='Liquidación de Repartidor',
+        form=form,
+        repartidores=repartidores,
+        repartidor_id=repartidor_id,
+        pedidos_pendientes=pedidos_pendientes
+    )
+
+
 # --- Rutas para Ítems de Pedido (usadas típicamente con AJAX o POST desde formulario de edición) ---
 
 @pedidos.route('/<int:pedido_id>/items/nuevo', methods=['POST'])
@@ -482,7 +620,7 @@ def add_item_to_pedido(pedido_id):
 
     # Opcional: Validar si el pedido puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
@@ -495,7 +633,8 @@ def add_item_to_pedido(pedido_id):
         # Usar servicio para añadir ítem
         nuevo_item = add_pedido_item(
             pedido_id=pedido.id,
-            producto_id=form.producto_id.data,
+            usuario_id=current_user.id,
+            producto_id=form.producto_id.data or None,
             subproducto_id=form.subproducto_id.data,
             modificacion_id=form.modificacion_id.data,
             cantidad=form.cantidad.data,
@@ -505,7 +644,7 @@ def add_item_to_pedido(pedido_id):
         )
 
         if nuevo_item:
-            flash(f'Ítem "{nuevo_item.descripcion_item_venta}" añadido al pedido #{format_pedido_folio(pedido.id)}.', 'success')
+            flash(f'Ítem "{nuevo_item.descripcion_item_venta}" añadido al pedido #{format_pedido_folio(pedido)}.', 'success')
         else:
             # El servicio ya imprime un error detallado
             flash('Error al añadir ítem al pedido. Por favor, verifica los datos.', 'danger')
@@ -534,7 +673,7 @@ def edit_pedido_item(item_id):
 
     # Opcional: Validar si el pedido asociado puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
     form = PedidoItemForm(obj=item) # Pre-llenar formulario con datos del ítem
@@ -551,7 +690,7 @@ def edit_pedido_item(item_id):
         )
 
         if updated_item:
-            flash(f'Ítem "{updated_item.descripcion_item_venta}" del pedido #{format_pedido_folio(pedido.id)} actualizado.', 'success')
+            flash(f'Ítem "{updated_item.descripcion_item_venta}" del pedido #{format_pedido_folio(pedido)} actualizado.', 'success')
         else:
             # El servicio ya imprime un error detallado
             flash('Error al actualizar ítem del pedido. Por favor, verifica los datos.', 'danger')
@@ -579,14 +718,14 @@ def delete_pedido_item_route(item_id):
 
     # Opcional: Validar si el pedido asociado puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
     success = delete_pedido_item(item_id)
 
     if success:
-        flash(f'Ítem eliminado del pedido #{format_pedido_folio(pedido.id)}.', 'success')
+        flash(f'Ítem eliminado del pedido #{format_pedido_folio(pedido)}.', 'success')
     else:
         # El servicio ya imprime un error detallado
         flash('Error al eliminar ítem del pedido.', 'danger')
@@ -612,7 +751,7 @@ def add_producto_adicional_to_pedido(pedido_id):
 
     # Opcional: Validar si el pedido puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
     form = ProductoAdicionalForm()
@@ -630,7 +769,7 @@ def add_producto_adicional_to_pedido(pedido_id):
         )
 
         if nuevo_pa:
-            flash(f'Producto Adicional "{nuevo_pa.nombre_pa}" añadido al pedido #{format_pedido_folio(pedido.id)}.', 'success')
+            flash(f'Producto Adicional "{nuevo_pa.nombre_pa}" añadido al pedido #{format_pedido_folio(pedido)}.', 'success')
         else:
             # El servicio ya imprime un error detallado
             flash('Error al añadir Producto Adicional al pedido. Por favor, verifica los datos.', 'danger')
@@ -659,7 +798,7 @@ def edit_producto_adicional(pa_id):
 
     # Opcional: Validar si el pedido asociado puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
     form = ProductoAdicionalForm(obj=pa) # Pre-llenar formulario con datos del PA
@@ -677,7 +816,7 @@ def edit_producto_adicional(pa_id):
         )
 
         if updated_pa:
-            flash(f'Producto Adicional "{updated_pa.nombre_pa}" del pedido #{format_pedido_folio(pedido.id)} actualizado.', 'success')
+            flash(f'Producto Adicional "{updated_pa.nombre_pa}" del pedido #{format_pedido_folio(pedido)} actualizado.', 'success')
         else:
             # El servicio ya imprime un error detallado
             flash('Error al actualizar Producto Adicional del pedido. Por favor, verifica los datos.', 'danger')
@@ -705,14 +844,14 @@ def delete_producto_adicional_route(pa_id):
 
     # Opcional: Validar si el pedido asociado puede ser modificado
     # if not current_user.is_admin() and not pedido.puede_ser_modificado():
-    #      flash(f'El pedido #{format_pedido_folio(pedido.id)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
+    #      flash(f'El pedido #{format_pedido_folio(pedido)} no puede ser modificado en estado {pedido.estado_pedido.value}.', 'warning')
     #      return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
 
 
     success = delete_producto_adicional(pa_id)
 
     if success:
-        flash(f'Producto Adicional eliminado del pedido #{format_pedido_folio(pedido.id)}.', 'success')
+        flash(f'Producto Adicional eliminado del pedido #{format_pedido_folio(pedido)}.', 'success')
     else:
         # El servicio ya imprime un error detallado
         flash('Error al eliminar Producto Adicional del pedido.', 'danger')
@@ -907,6 +1046,7 @@ def ajax_get_precio_aplicable():
 @pedidos.route('/ajax/reportes/pedidos_estadisticas', methods=['POST'])
 @login_required
 @role_required(ROLES_PEDIDOS_ADMIN) # Solo Admin puede acceder a estadísticas masivas
+@solo_lectura # Reporte/listado: leer desde la réplica si está configurada
 def ajax_reportes_pedidos_estadisticas():
     """
     Endpoint AJAX para generar estadísticas de pedidos en un rango de fechas.
@@ -924,16 +1064,14 @@ def ajax_reportes_pedidos_estadisticas():
 
         rango_fechas = {'desde': fecha_desde, 'hasta': fecha_hasta}
 
-        # Lógica para obtener estadísticas (ej. conteo por estado, total ventas por tipo venta)
-        # Esto requeriría funciones en services.py
-        estadisticas = {} # Diccionario con los resultados
-        # Ejemplo simple: conteo por estado
-        pedidos_filtrados = Pedido.query.filter(Pedido.fecha_creacion >= rango_fechas['desde'], Pedido.fecha_creacion <= rango_fechas['hasta']).all()
-        for pedido in pedidos_filtrados:
-            estado = pedido.estado_pedido
-            if estado not in estadisticas:
-                estadisticas[estado] = 0
-            estadisticas[estado] += 1
+        # Conteo por estado, incluyendo los pedidos archivados (UNION ALL activa + archivo)
+        pedidos_rango = union_historica(
+            Pedido, lambda c: and_(c.fecha_creacion >= rango_fechas['desde'], c.fecha_creacion <= rango_fechas['hasta'])
+        ).subquery()
+        filas = db.session.execute(
+            select(pedidos_rango.c.estado_pedido, func.count()).group_by(pedidos_rango.c.estado_pedido)
+        ).all()
+        estadisticas = {estado.value: total for estado, total in filas} # Llaves string para poder serializar a JSON
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -945,119 +1083,68 @@ def ajax_reportes_pedidos_estadisticas():
 @role_required(ROLES_PEDIDOS_ADMIN) # Solo Admin puede acceder a detalles masivos
 def ajax_reportes_pedidos_detalle():
     """
-    Endpoint AJAX para generar un reporte detallado de pedidos en un rango de fechas.
-    Podría retornar un archivo (CSV, Excel) o datos JSON.
+    Endpoint AJAX para generar un reporte detallado (Excel) de pedidos en un rango de fechas.
+    El reporte lo genera `flask worker`: se responde 202 con el trabajo, cuyo estado se consulta en
+    url_estado y el archivo se descarga en url_descarga al completarse.
     """
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     fecha_desde_str = data.get('fecha_desde')
     fecha_hasta_str = data.get('fecha_hasta')
 
-    # Validar y parsear fechas
+    # Validar fechas aquí para responder el error de inmediato, no al terminar el trabajo
     try:
         fecha_desde = datetime.strptime(fecha_desde_str, '%Y-%m-%d') if fecha_desde_str else None
         fecha_hasta = datetime.strptime(fecha_hasta_str, '%Y-%m-%d') if fecha_hasta_str else None
-        if fecha_hasta: # Incluir todo el día hasta las 23:59:59
-             fecha_hasta = fecha_hasta.replace(hour=23, minute=59, second=59)
-
-        rango_fechas = {'desde': fecha_desde, 'hasta': fecha_hasta}
-
-        # Obtener IDs de pedidos que cumplen el rango de fechas
-        pedidos_validos = [p.id for p in Pedido.query.filter(Pedido.fecha_creacion >= rango_fechas['desde'], Pedido.fecha_creacion <= rango_fechas['hasta']).all()]
-
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Fechas inválidas (formato AAAA-MM-DD): {e}'}), 400
+    if fecha_desde is None or fecha_hasta is None:
+        return jsonify({'success': False, 'message': 'Se requieren fecha_desde y fecha_hasta.'}), 400
+    if fecha_desde > fecha_hasta:
+        return jsonify({'success': False, 'message': 'fecha_desde no puede ser posterior a fecha_hasta.'}), 400
+
+    trabajo = encolar_trabajo(
+        REPORTE_PEDIDOS_DETALLE,
+        {'fecha_desde': fecha_desde_str, 'fecha_hasta': fecha_hasta_str},
+        usuario_id=current_user.id
+    )
+    if trabajo is None:
+        return jsonify({'success': False, 'message': 'No se pudo encolar el reporte.'}), 500
+    return jsonify({'success': True, 'message': 'Reporte en proceso.', 'trabajo': trabajo_a_dict(trabajo)}), 202
 
-    if not pedidos_validos:
-        return jsonify({'success': False, 'message': 'No se encontraron pedidos válidos para generar reporte.'}), 404
+@pedidos.route('/ajax/reportes/exportacion_columnar', methods=['POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_ADMIN) # Exporta todo el historial de ventas y caja: solo Admin
+def ajax_reportes_exportacion_columnar():
+    """
+    Endpoint AJAX para exportar pedidos, ítems, PAs y movimientos de caja a Parquet o Arrow,
+    particionados por mes. Lo genera `flask worker`: se responde 202 con el trabajo (ver /trabajos/<id>).
+    """
+    data = request.get_json(silent=True) or {}
+    formato = data.get('formato') or exportacion.PARQUET
+    tablas = data.get('tablas') or None
 
-    # Lógica para generar reporte detallado
-    # Ejemplo: crear un CSV en memoria con los detalles de los pedidos
+    if exportacion.pa is None:
+        return jsonify({'success': False, 'message': 'Librería de exportación (pyarrow) no instalada.'}), 500
     try:
-        # Requiere la librería pandas y openpyxl (pip install pandas openpyxl)
-        import pandas as pd
-        from io import BytesIO
-
-        # Obtener datos de los pedidos válidos
-        pedidos_data = Pedido.query.filter(Pedido.id.in_(pedidos_validos)).options(
-            joinedload(Pedido.items),
-            joinedload(Pedido.productos_adicionales)
-        ).all()
-
-        # Crear un DataFrame por cada pedido con sus ítems y PAs
-        dfs = []
-        for pedido in pedidos_data:
-            items_list = []
-            for item in pedido.items:
-                items_list.append({
-                    'Pedido ID': pedido.id,
-                    'Folio Pedido': format_pedido_folio(pedido.id),
-                    'Fecha Creacion': format_datetime(pedido.fecha_creacion),
-                    'Estado': pedido.estado_pedido.value,
-                    'Tipo Venta': pedido.tipo_venta.value,
-                    'Cliente': pedido.cliente.get_nombre_completo() if pedido.cliente else 'Mostrador',
-                    'Tipo Item': 'Pollo',
-                    'Descripcion Item': item.descripcion_item_venta,
-                    'Cantidad': item.cantidad,
-                    'Unidad Medida': item.unidad_medida,
-                    'Precio Unitario Venta': item.precio_unitario_venta,
-                    'Subtotal Item': item.subtotal_item,
-                    'Notas Item': item.notas_item,
-                    'Costo Compra Unitario': item.costo_unitario_item, # Puede ser None
-                    'Comision Calculada': None # No aplica a items de pollo
-                })
-            for pa in pedido.productos_adicionales_pedido:
-                 items_list.append({
-                    'Pedido ID': pedido.id,
-                    'Folio Pedido': format_pedido_folio(pedido.id),
-                    'Fecha Creacion': format_datetime(pedido.fecha_creacion),
-                    'Estado': pedido.estado_pedido.value,
-                    'Tipo Venta': pedido.tipo_venta.value,
-                    'Cliente': pedido.cliente.get_nombre_completo() if pedido.cliente else 'Mostrador',
-                    'Tipo Item': 'Adicional',
-                    'Descripcion Item': pa.nombre_pa,
-                    'Cantidad': pa.cantidad_pa,
-                    'Unidad Medida': pa.unidad_medida_pa,
-                    'Precio Unitario Venta': pa.precio_venta_unitario_pa,
-                    'Subtotal Item': pa.subtotal_pa,
-                    'Notas Item': pa.notas_pa,
-                    'Costo Compra Unitario': pa.costo_compra_unitario_pa, # Puede ser None
-                    'Comision Calculada': pa.comision_calculada_pa # Puede ser None
-                })
-            if items_list:
-                dfs.append(pd.DataFrame(items_list))
-
-        if not dfs:
-            return jsonify({'success': False, 'message': 'No hay datos de ítems para el rango de fechas.'}), 404
-
-        # Concatenar todos los DataFrames
-        reporte_df = pd.concat(dfs, ignore_index=True)
-
-        # Generar archivo Excel en memoria
-        output = BytesIO()
-        writer = pd.ExcelWriter(output, engine='openpyxl')
-        reporte_df.to_excel(writer, index=False, sheet_name='Detalle Pedidos')
-        writer.close() # Usar close() en lugar de save() en versiones recientes de pandas/openpyxl
-
-        # Configurar respuesta para descargar archivo
-        # from flask import send_file # Asegurarse de importar send_file
-
-        # return send_file(output, download_name='reporte_pedidos.xlsx', as_attachment=True, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        # Nota: send_file requiere que el contexto de la aplicación esté activo.
-        # Para AJAX, a veces es más simple retornar un enlace a otra ruta que sirva el archivo.
-        # Para MVP, podemos simplificar y solo retornar éxito o error.
-        # Si se quiere servir el archivo directamente desde AJAX POST, puede requerir ajustes.
-
-        # Para MVP, solo retornamos éxito si el DataFrame se creó
-        return jsonify({'success': True, 'message': f'Reporte generado con {len(reporte_df)} filas.'}), 200
-
-    except ImportError:
-        return jsonify({'success': False, 'message': 'Librerías de reporte (pandas, openpyxl) no instaladas.'}), 500
-    except Exception as e:
-        # Loggear el error en el servidor
-        print(f"Error al generar reporte detallado: {e}")
-        return jsonify({'success': False, 'message': f'Error interno al generar reporte: {e}'}), 500
-
-    # return jsonify({'success': True, 'data': 'Reporte generado exitosamente.'}), 200 # Línea original, reemplazar por la lógica de archivo/datos
+        desde = datetime.strptime(data.get('fecha_desde'), '%Y-%m-%d').date()
+        hasta = datetime.strptime(data.get('fecha_hasta'), '%Y-%m-%d').date()
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Fechas inválidas (formato AAAA-MM-DD): {e}'}), 400
+    if desde > hasta:
+        return jsonify({'success': False, 'message': 'fecha_desde no puede ser posterior a fecha_hasta.'}), 400
+    if formato not in exportacion.FORMATOS:
+        return jsonify({'success': False, 'message': f"Formato no soportado (use {', '.join(exportacion.FORMATOS)})."}), 400
+    if tablas is not None and (not isinstance(tablas, list) or any(t not in exportacion.TABLAS_EXPORTACION for t in tablas)):
+        return jsonify({'success': False, 'message': f"Tablas válidas: {', '.join(exportacion.TABLAS_EXPORTACION)}."}), 400
+
+    trabajo = encolar_trabajo(
+        EXPORTACION_COLUMNAR,
+        {'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'formato': formato, 'tablas': tablas},
+        usuario_id=current_user.id
+    )
+    if trabajo is None:
+        return jsonify({'success': False, 'message': 'No se pudo encolar la exportación.'}), 500
+    return jsonify({'success': True, 'message': 'Exportación en proceso.', 'trabajo': trabajo_a_dict(trabajo)}), 202
 
 # --- Rutas para impresión (Tickets y Comandas) ---
 
@@ -1082,7 +1169,10 @@ def imprimir_ticket(pedido_id):
     return render_template(
         'pedidos/imprimir_ticket.html',
         pedido=pedido,
-        config=current_app.config, # Pasar la configuración para nombre del negocio, etc.
+        config=current_app.config, # Pasar la configuración
+        negocio=db.session.get(ConfiguracionSistema, 1), # Nombre, dirección y teléfono del negocio
+        TipoVenta=TipoVenta,
+        FormaPago=FormaPago,
         format_currency=format_currency,
         format_datetime=format_datetime,
         format_pedido_folio=format_pedido_folio
@@ -1114,3 +1204,61 @@ def imprimir_comanda(pedido_id):
         format_datetime=format_datetime,
         format_pedido_folio=format_pedido_folio
     )
+
+
+def _encolar_impresion(pedido_id: int, tipo: str):
+    """Encola el ticket/comanda ESC/POS y responde JSON (AJAX) o con flash y redirección al pedido."""
+    responder_json = request.is_json or request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+    pedido = get_pedido_by_id(pedido_id)
+    if not pedido:
+        if responder_json:
+            return jsonify({'success': False, 'message': 'Pedido no encontrado.'}), 404
+        flash('Pedido no encontrado.', 'warning')
+        return redirect(url_for('pedidos.dashboard_pedidos'))
+
+    trabajo = tickets.imprimir_pedido(pedido, tipo, usuario_id=current_user.id)
+    nombre = 'Comanda' if tipo == tickets.COMANDA else 'Ticket'
+    if responder_json:
+        if trabajo is None:
+            return jsonify({'success': False, 'message': 'No hay impresora configurada o no se pudo generar el ticket.'}), 503
+        return jsonify({
+            'success': True, 'trabajo': trabajo.como_dict(),
+            'url_estado': url_for('pedidos.estado_impresion', trabajo_id=trabajo.id)
+        }), 202
+
+    if trabajo is None:
+        flash(f'{nombre} no enviado: no hay impresora configurada o no se pudo generar.', 'danger')
+    else:
+        flash(f'{nombre} del pedido #{format_pedido_folio(pedido)} enviado a la impresora.', 'success')
+    return redirect(url_for('pedidos.ver_pedido', pedido_id=pedido.id))
+
+
+@pedidos.route('/<int:pedido_id>/imprimir/ticket/termica', methods=['POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_READ) # Mismos roles que imprimir_ticket
+def imprimir_ticket_termica(pedido_id):
+    """Envía el ticket de venta a la impresora térmica (ESC/POS, vía la cola de impresión)."""
+    return _encolar_impresion(pedido_id, tickets.TICKET)
+
+
+@pedidos.route('/<int:pedido_id>/imprimir/comanda/termica', methods=['POST'])
+@login_required
+@role_required(ROLES_PEDIDOS_PREPARACION) # Mismos roles que imprimir_comanda
+def imprimir_comanda_termica(pedido_id):
+    """Envía la comanda de preparación a la impresora de cocina (IMPRESORA_COMANDAS)."""
+    return _encolar_impresion(pedido_id, tickets.COMANDA)
+
+
+@pedidos.route('/impresion/<trabajo_id>', methods=['GET'])
+@login_required
+@role_required(ROLES_PEDIDOS_READ)
+def estado_impresion(trabajo_id):
+    """
+    Estado de un trabajo de la cola de impresión (EN_COLA, IMPRESO, ERROR).
+    La cola está en memoria: solo el proceso que encoló el trabajo lo conoce; si la consulta llega a
+    otro worker responde 404. Solo quien lo encoló o un administrador puede consultarlo.
+    """
+    trabajo = cola_impresion.estado(trabajo_id)
+    if trabajo is None or (trabajo.usuario_id != current_user.id and not current_user.is_admin()):
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado (o ya descartado).'}), 404
+    return jsonify({'success': True, 'trabajo': trabajo.como_dict()})
@@ -5,15 +5,23 @@ from app.models import (
     Pedido, PedidoItem, ProductoAdicional, Cliente, Direccion, Usuario,
     Producto, Subproducto, Modificacion, Precio, Telefono, ConfiguracionSistema,
     MovimientoCaja, # Añadir MovimientoCaja aquí
+    LiquidacionLote, LiquidacionLoteDenominacion,
     TipoVenta, FormaPago, EstadoPedido, TipoMovimientoCaja, RolUsuario, TipoCliente
 ) # Importar los modelos y Enums necesarios
-from app.caja.services import registrar_movimiento_caja, calcular_y_sugerir_cambio_con_denominaciones, registrar_egreso_compra_pa, registrar_ingreso_liquidacion_repartidor # Importar servicios de caja
+from app.caja.services import registrar_movimiento_caja, registrar_metricas_movimiento, calcular_y_sugerir_cambio_con_denominaciones, registrar_egreso_compra_pa, registrar_ingreso_liquidacion_repartidor # Importar servicios de caja
 from app.utils.helpers import format_pedido_folio # Importar helpers
+from app.utils.db_routing import solo_lectura # Lecturas de reportes/listados hacia la réplica
+from app.utils.folios import siguiente_folio # Folios de pedido reservados por bloques
+from app.productos import cache_precios # Tramos de precio en memoria para la venta rápida
 from decimal import Decimal # Importar Decimal para cálculos monetarios precisos
 from datetime import datetime, date # Importar datetime y date
 from typing import Optional, List, Dict, Any, Tuple, Union
 from sqlalchemy.exc import IntegrityError # Para manejar errores de BD
-from sqlalchemy import or_, and_ # Para consultas complejas
+from sqlalchemy import or_, and_, select, update, tuple_ # Para consultas complejas
+from app.utils import metrics # Contadores de negocio expuestos en /metrics
+from app.pedidos.eventos import emitir_cambio_estado # Evento por cada cambio de estado
+from app.pedidos import estados # Máquina de estados precalculada (conjuntos, transiciones, filtros SQL)
+from app.utils.kpis_dia import kpis as kpis_dia # Indicadores del día en memoria (inicio del administrador)
 
 # --- Funciones de Ayuda Internas ---
 
@@ -117,18 +125,13 @@ def _get_item_description(
     return ", ".join(parts)
 
 
-def _recalculate_pedido_totals(pedido: Pedido):
+def _calcular_totales(pedido: Pedido, items: List[PedidoItem], productos_adicionales: List[ProductoAdicional]):
     """
-    Recalcula los subtotales y el total general de un pedido. (Lógica de Sección 4.1)
+    Calcula los subtotales y el total general del pedido a partir de sus líneas. (Lógica de Sección 4.1)
     Actualiza el objeto Pedido en memoria.
     """
-    # Asegurarse de que las relaciones estén cargadas si se usa lazy='dynamic' y no se han accedido antes
-    # O usar .all() si se necesita la lista completa para sumar
-    items = pedido.items.all()
-    productos_adicionales = pedido.productos_adicionales_pedido.all()
-
-    pedido.subtotal_productos_pollo = sum(item.subtotal_item for item in items)
-    pedido.subtotal_productos_adicionales = sum(pa.subtotal_pa for pa in productos_adicionales)
+    pedido.subtotal_productos_pollo = sum((item.subtotal_item for item in items), Decimal('0.0'))
+    pedido.subtotal_productos_adicionales = sum((pa.subtotal_pa for pa in productos_adicionales), Decimal('0.0'))
 
     # Asegurar que costo_envio y descuento_aplicado no sean None
     costo_envio = pedido.costo_envio if pedido.costo_envio is not None else Decimal('0.0')
@@ -139,8 +142,206 @@ def _recalculate_pedido_totals(pedido: Pedido):
     pedido.total_pedido = round(pedido.total_pedido, 2)
 
 
+def _recalculate_pedido_totals(pedido: Pedido):
+    """
+    Recalcula los subtotales y el total general de un pedido leyendo sus líneas de la BD.
+    Actualiza el objeto Pedido en memoria.
+    """
+    # Las relaciones son lazy='dynamic': .all() consulta las líneas actuales (incluye las pendientes de flush)
+    _calcular_totales(pedido, pedido.items.all(), pedido.productos_adicionales_pedido.all())
+    # Las líneas cambiaron: marcar el pedido como modificado aunque el total sea el mismo
+    # (ej. solo cambian las notas); es la versión con la que se cachean los tickets (tickets.py)
+    pedido.fecha_actualizacion = datetime.utcnow()
+
+
+def _construir_pedido_item(
+    pedido: Pedido,
+    producto_id: Optional[str] = None,
+    subproducto_id: Optional[int] = None,
+    modificacion_id: Optional[int] = None,
+    cantidad: Decimal = Decimal('0.0'),
+    unidad_medida: str = 'kg',
+    precio_unitario_venta: Optional[Decimal] = None,
+    notas_item: Optional[str] = None
+) -> Optional[PedidoItem]:
+    """
+    Valida los datos y construye un PedidoItem del pedido (sin añadirlo a la sesión).
+    Calcula el precio unitario si no se provee y el subtotal. Retorna None si los datos no son válidos.
+    """
+    cantidad = Decimal(str(cantidad))
+    if cantidad <= Decimal('0.0'):
+        print("Error al añadir ítem: La cantidad debe ser positiva.")
+        return None
+
+    if not producto_id and not subproducto_id:
+         print("Error al añadir ítem: Debe especificar un producto o subproducto.")
+         return None
+
+    # 1. Determinar precio unitario si no se provee
+    final_precio_unitario = Decimal(str(precio_unitario_venta)) if precio_unitario_venta is not None else None
+    if final_precio_unitario is None:
+        # Usar la lógica de obtención de precio aplicable (Sección 4.2)
+        final_precio_unitario = _get_precio_aplicable(
+            producto_id=producto_id,
+            subproducto_id=subproducto_id,
+            cliente_id=pedido.cliente_id, # Usar el cliente del pedido
+            cantidad_solicitada=cantidad
+        )
+        if final_precio_unitario is None:
+             print("Error al añadir ítem: No se pudo determinar el precio aplicable.")
+             return None # No se puede añadir el ítem sin precio
+
+    # 2. Generar descripción del ítem (Sección 4.1)
+    descripcion_item = _get_item_description(producto_id, subproducto_id, modificacion_id)
+
+    # 3. Calcular subtotal
+    subtotal = cantidad * final_precio_unitario
+    subtotal = round(subtotal, 2) # Asegurar precisión
+
+    # 4. Crear el PedidoItem
+    return PedidoItem(
+        pedido_id=pedido.id,
+        producto_id=producto_id,
+        subproducto_id=subproducto_id,
+        modificacion_id=modificacion_id,
+        descripcion_item_venta=descripcion_item,
+        cantidad=cantidad,
+        unidad_medida=unidad_medida,
+        precio_unitario_venta=final_precio_unitario,
+        subtotal_item=subtotal,
+        # notas_item: PedidoItem no tiene columna de notas; se acepta el parámetro pero no se persiste
+        # costo_unitario_item (opcional, para futuro)
+    )
+
+
+def _construir_producto_adicional(
+    pedido: Pedido,
+    pas_existentes: int, # PAs que ya tiene el pedido (para la comisión por exceso)
+    config: Optional[ConfiguracionSistema],
+    nombre_pa: str,
+    cantidad_pa: Decimal = Decimal('1.0'),
+    unidad_medida_pa: str = 'pieza',
+    costo_compra_unitario_pa: Optional[Decimal] = None,
+    precio_venta_unitario_pa: Optional[Decimal] = None,
+    notas_pa: Optional[str] = None
+) -> Optional[ProductoAdicional]:
+    """
+    Valida los datos y construye un ProductoAdicional del pedido (sin añadirlo a la sesión).
+    Calcula el precio de venta y subtotal, incluyendo comisión si aplica. Retorna None si los datos no son válidos.
+    """
+    cantidad_pa = Decimal(str(cantidad_pa))
+    if cantidad_pa <= Decimal('0.0'):
+        print("Error al añadir PA: La cantidad debe ser positiva.")
+        return None
+
+    costo_compra_unitario_pa = Decimal(str(costo_compra_unitario_pa)) if costo_compra_unitario_pa is not None else None
+
+    # 1. Determinar precio de venta unitario y calcular comisión (Sección 4.3)
+    final_precio_venta = Decimal(str(precio_venta_unitario_pa)) if precio_venta_unitario_pa is not None else None
+    comision_calculada = Decimal('0.0')
+
+    # Si no se provee precio de venta, pero sí costo de compra, calcular precio con comisión
+    if final_precio_venta is None and costo_compra_unitario_pa is not None:
+        limite_sin_comision = config.limite_items_pa_sin_comision if config else 3
+        monto_comision_fija = config.monto_comision_fija_pa_extra if config else Decimal('4.0')
+
+        # Si los PAs existentes ya alcanzan el límite, este nuevo paga comisión
+        if pas_existentes >= limite_sin_comision:
+            comision_calculada = monto_comision_fija
+
+        final_precio_venta = costo_compra_unitario_pa + comision_calculada
+        final_precio_venta = round(final_precio_venta, 2) # Asegurar precisión
+
+    elif final_precio_venta is None and costo_compra_unitario_pa is None:
+         print("Error al añadir PA: Debe proporcionar precio de venta o costo de compra.")
+         return None # No se puede añadir el PA sin precio
+
+    # Si se provee precio de venta directamente, no calculamos comisión automática para MVP
+    # Lógica futura podría recalcular comisión incluso si se da el precio de venta
+
+    # 2. Calcular subtotal
+    subtotal = cantidad_pa * final_precio_venta
+    subtotal = round(subtotal, 2) # Asegurar precisión
+
+    # 3. Crear el ProductoAdicional
+    return ProductoAdicional(
+        pedido_id=pedido.id,
+        nombre_pa=nombre_pa,
+        cantidad_pa=cantidad_pa,
+        unidad_medida_pa=unidad_medida_pa,
+        costo_compra_unitario_pa=costo_compra_unitario_pa,
+        precio_venta_unitario_pa=final_precio_venta,
+        subtotal_pa=subtotal,
+        comision_calculada_pa=comision_calculada,
+        notas_pa=notas_pa
+    )
+
+
 # --- Funciones de Servicio Principales para Pedidos ---
 
+def _construir_pedido(
+    usuario_id: int,
+    tipo_venta_value: str,
+    cliente_id: Optional[int] = None,
+    direccion_entrega_id: Optional[int] = None,
+    repartidor_id: Optional[int] = None,
+    forma_pago_value: Optional[str] = None,
+    notas_pedido: Optional[str] = None,
+    fecha_entrega_programada: Optional[datetime] = None,
+    requiere_factura: bool = False
+) -> Optional[Pedido]:
+    """
+    Valida los datos y construye el Pedido (sin añadirlo a la sesión).
+    Retorna None si los datos no son válidos; lanza ValueError si un Enum no es válido.
+    """
+    # Validar Enums
+    tipo_venta_enum = TipoVenta(tipo_venta_value)
+    forma_pago_enum = FormaPago(forma_pago_value) if forma_pago_value else None
+
+    # Validar cliente y dirección para domicilio
+    if tipo_venta_enum == TipoVenta.DOMICILIO:
+        if not cliente_id:
+            print("Error al crear pedido: Cliente es requerido para pedidos a domicilio.")
+            return None
+        if not direccion_entrega_id:
+             print("Error al crear pedido: Dirección de entrega es requerida para pedidos a domicilio.")
+             return None
+        # Opcional: Validar que cliente y direccion_entrega_id existan y estén asociados
+        cliente = Cliente.query.get(cliente_id)
+        direccion = Direccion.query.get(direccion_entrega_id)
+        if not cliente or not direccion or direccion.cliente_id != cliente.id:
+             print("Error al crear pedido: Cliente o dirección de entrega no válidos o no asociados.")
+             return None
+
+    # Validar repartidor si se asigna inicialmente
+    if repartidor_id:
+        repartidor = Usuario.query.get(repartidor_id)
+        if not repartidor or not repartidor.is_repartidor():
+             print("Error al crear pedido: Repartidor asignado no válido.")
+             return None
+
+    # Determinar estado inicial basado en tipo de venta y si requiere confirmación
+    # Para MVP, asumimos PENDIENTE_PREPARACION si es mostrador o domicilio con cliente/dirección
+    # PENDIENTE_CONFIRMACION podría usarse si el flujo lo requiere (ej. pedido por WhatsApp sin confirmar)
+    initial_estado = EstadoPedido.PENDIENTE_PREPARACION
+
+    return Pedido(
+        folio=siguiente_folio(), # Reservado por bloques, sin bloquear la fila de configuración en cada pedido
+        cliente_id=cliente_id,
+        usuario_id=usuario_id,
+        repartidor_id=repartidor_id,
+        direccion_entrega_id=direccion_entrega_id,
+        tipo_venta=tipo_venta_enum,
+        forma_pago=forma_pago_enum,
+        notas_pedido=notas_pedido,
+        fecha_entrega_programada=fecha_entrega_programada,
+        requiere_factura=requiere_factura,
+        estado_pedido=initial_estado,
+        # Los totales se inicializan en 0 por defecto en el modelo
+        # paga_con y cambio_entregado son NULL inicialmente
+    )
+
+
 def create_pedido(
     usuario_id: int, # Cajero o Admin que crea el pedido
     tipo_venta_value: str, # Valor del Enum TipoVenta
@@ -154,67 +355,21 @@ def create_pedido(
 ) -> Optional[Pedido]:
     """
     Crea un nuevo registro de pedido inicial.
+    Para registrar el pedido completo (ítems, PAs y pago) en una sola transacción usar
+    create_pedido_with_lines.
     """
     try:
-        # Validar Enums
-        tipo_venta_enum = TipoVenta(tipo_venta_value)
-        forma_pago_enum = FormaPago(forma_pago_value) if forma_pago_value else None
-
-        # Validar cliente y dirección para domicilio
-        if tipo_venta_enum == TipoVenta.DOMICILIO:
-            if not cliente_id:
-                print("Error al crear pedido: Cliente es requerido para pedidos a domicilio.")
-                return None
-            if not direccion_entrega_id:
-                 print("Error al crear pedido: Dirección de entrega es requerida para pedidos a domicilio.")
-                 return None
-            # Opcional: Validar que cliente y direccion_entrega_id existan y estén asociados
-            cliente = Cliente.query.get(cliente_id)
-            direccion = Direccion.query.get(direccion_entrega_id)
-            if not cliente or not direccion or direccion.cliente_id != cliente.id:
-                 print("Error al crear pedido: Cliente o dirección de entrega no válidos o no asociados.")
-                 return None
-
-        # Validar repartidor si se asigna inicialmente
-        if repartidor_id:
-            repartidor = Usuario.query.get(repartidor_id)
-            if not repartidor or not repartidor.is_repartidor():
-                 print("Error al crear pedido: Repartidor asignado no válido.")
-                 return None
-
-        # Determinar estado inicial basado en tipo de venta y si requiere confirmación
-        # Para MVP, asumimos PENDIENTE_PREPARACION si es mostrador o domicilio con cliente/dirección
-        # PENDIENTE_CONFIRMACION podría usarse si el flujo lo requiere (ej. pedido por WhatsApp sin confirmar)
-        initial_estado = EstadoPedido.PENDIENTE_PREPARACION
-
-        # Generar folio (usando el helper, aunque el modelo también tiene un método)
-        # El helper usa el ID, que solo está disponible después de db.session.add + db.session.flush()
-        # O se podría generar un folio secuencial antes de guardar si se usa un campo dedicado en el modelo
-
-        pedido = Pedido(
-            cliente_id=cliente_id,
-            usuario_id=usuario_id,
-            repartidor_id=repartidor_id,
-            direccion_entrega_id=direccion_entrega_id,
-            tipo_venta=tipo_venta_enum,
-            forma_pago=forma_pago_enum,
-            notas_pedido=notas_pedido,
-            fecha_entrega_programada=fecha_entrega_programada,
-            requiere_factura=requiere_factura,
-            estado_pedido=initial_estado,
-            # Los totales se inicializan en 0 por defecto en el modelo
-            # paga_con y cambio_entregado son NULL inicialmente
+        pedido = _construir_pedido(
+            usuario_id, tipo_venta_value, cliente_id, direccion_entrega_id, repartidor_id,
+            forma_pago_value, notas_pedido, fecha_entrega_programada, requiere_factura
         )
+        if pedido is None:
+            return None
 
         db.session.add(pedido)
         db.session.commit() # Commit para obtener el ID y poder añadir items/PAs
-
-        # Opcional: Actualizar el campo de folio consecutivo en ConfiguracionSistema si se usa
-        # config = ConfiguracionSistema.query.get(1)
-        # if config:
-        #     config.ultimo_folio_pedido = pedido.id # O un campo de folio separado
-        #     db.session.commit()
-
+        metrics.PEDIDOS_CREADOS.inc(tipo_venta=pedido.tipo_venta.value)
+        kpis_dia.pedido_guardado(pedido)
 
         return pedido
 
@@ -231,11 +386,180 @@ def create_pedido(
         print(f"Error inesperado al crear pedido: {e}")
         return None
 
+
+def create_pedido_with_lines(
+    usuario_id: int, # Cajero o Admin que crea el pedido
+    tipo_venta_value: str, # Valor del Enum TipoVenta
+    items: Optional[List[Dict[str, Any]]] = None,
+    productos_adicionales: Optional[List[Dict[str, Any]]] = None,
+    pago: Optional[Dict[str, Any]] = None,
+    cliente_id: Optional[int] = None,
+    direccion_entrega_id: Optional[int] = None,
+    repartidor_id: Optional[int] = None,
+    forma_pago_value: Optional[str] = None,
+    costo_envio: Optional[Decimal] = None,
+    descuento_aplicado: Optional[Decimal] = None,
+    notas_pedido: Optional[str] = None,
+    fecha_entrega_programada: Optional[datetime] = None,
+    requiere_factura: bool = False
+) -> Optional[Pedido]:
+    """
+    Crea el pedido con sus ítems, productos adicionales y totales en una sola transacción
+    (un solo commit). Los IDs se obtienen con flush(), así la cocina nunca ve un pedido a medias.
+
+    Args:
+        items: Lista de dicts con las llaves de add_pedido_item (producto_id o subproducto_id,
+            modificacion_id, cantidad, unidad_medida, precio_unitario_venta opcional).
+        productos_adicionales: Lista de dicts con las llaves de add_producto_adicional
+            (nombre_pa, cantidad_pa, unidad_medida_pa, costo_compra_unitario_pa,
+            precio_venta_unitario_pa, notas_pa).
+        pago: Opcional, para ventas de mostrador cobradas al momento: dict con forma_pago_value,
+            monto_recibido y denominaciones_recibidas (como process_pedido_payment). El movimiento
+            de caja y el cambio de estado quedan en el mismo commit.
+
+    Returns:
+        El Pedido creado, o None si algún dato no es válido (no se guarda nada).
+    """
+    items = items or []
+    productos_adicionales = productos_adicionales or []
+    if not items and not productos_adicionales:
+        print("Error al crear pedido con líneas: El pedido debe tener al menos un ítem o producto adicional.")
+        return None
+
+    try:
+        pedido = _construir_pedido(
+            usuario_id, tipo_venta_value, cliente_id, direccion_entrega_id, repartidor_id,
+            forma_pago_value, notas_pedido, fecha_entrega_programada, requiere_factura
+        )
+        if pedido is None:
+            return None
+        # Asignar explícitamente como Decimal: tras el flush el default de la columna quedaría como float
+        pedido.costo_envio = Decimal(str(costo_envio)) if costo_envio is not None else Decimal('0.0')
+        pedido.descuento_aplicado = Decimal(str(descuento_aplicado)) if descuento_aplicado is not None else Decimal('0.0')
+
+        db.session.add(pedido)
+        db.session.flush() # ID del pedido para las líneas, sin commit
+
+        lineas_items = []
+        for datos in items:
+            item = _construir_pedido_item(pedido, **datos)
+            if item is None:
+                db.session.rollback()
+                return None
+            lineas_items.append(item)
+
+        config = ConfiguracionSistema.query.get(1) if productos_adicionales else None
+        lineas_pas = []
+        for datos in productos_adicionales:
+            pa = _construir_producto_adicional(pedido, len(lineas_pas), config, **datos)
+            if pa is None:
+                db.session.rollback()
+                return None
+            lineas_pas.append(pa)
+
+        db.session.add_all(lineas_items + lineas_pas)
+        _calcular_totales(pedido, lineas_items, lineas_pas) # En memoria, sin volver a consultar las líneas
+
+        movimiento = None
+        if pago:
+            movimiento = _aplicar_pago(pedido, usuario_id, **pago)
+            if movimiento is False:
+                db.session.rollback()
+                return None
+
+        db.session.commit()
+        metrics.PEDIDOS_CREADOS.inc(tipo_venta=pedido.tipo_venta.value)
+        metrics.PEDIDO_ITEMS_AGREGADOS.inc(len(lineas_items))
+        if pago:
+            _metricas_pago(pedido, movimiento)
+        kpis_dia.pedido_guardado(pedido)
+        return pedido
+
+    except ValueError as e:
+        db.session.rollback()
+        print(f"Error al crear pedido con líneas: Valor no válido - {e}")
+        return None
+    except IntegrityError as e:
+        db.session.rollback()
+        print(f"Error de integridad al crear pedido con líneas: {e}")
+        return None
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error inesperado al crear pedido con líneas: {e}")
+        return None
+
+def registrar_venta_rapida(
+    usuario_id: int, # Cajero o Admin que cobra
+    lineas: List[Dict[str, Any]],
+    forma_pago_value: str,
+    monto_recibido: Optional[Decimal] = None, # Solo para efectivo
+    denominaciones_recibidas: Optional[Dict[Decimal, int]] = None, # Solo para efectivo
+    productos_adicionales: Optional[List[Dict[str, Any]]] = None,
+    cliente_id: Optional[int] = None,
+    notas_pedido: Optional[str] = None
+) -> Optional[Pedido]:
+    """
+    Venta de mostrador en un solo paso: precia las líneas con la caché de tramos de precio y guarda
+    pedido, ítems, PAs, MovimientoCaja y denominaciones en una sola transacción (create_pedido_with_lines).
+
+    Args:
+        lineas: Lista de dicts como en create_pedido_with_lines. Si una línea no trae
+            precio_unitario_venta, se toma de la caché según el tipo de cliente y la cantidad.
+
+    Returns:
+        El Pedido ya cobrado (ENTREGADO_Y_PAGADO), o None si algún dato o el pago no es válido.
+    """
+    tipo_cliente_value = TipoCliente.PUBLICO.value # Venta al público si no se indica cliente
+    if cliente_id:
+        cliente = db.session.get(Cliente, cliente_id)
+        if not cliente:
+            print(f"Error en venta rápida: Cliente con ID {cliente_id} no encontrado.")
+            return None
+        tipo_cliente_value = cliente.tipo_cliente.value
+
+    items = []
+    for linea in lineas or []:
+        datos = dict(linea)
+        if datos.get('precio_unitario_venta') is None:
+            try:
+                cantidad = Decimal(str(datos.get('cantidad', '0')))
+            except ArithmeticError:
+                print(f"Error en venta rápida: Cantidad no válida ({datos.get('cantidad')}).")
+                return None
+            precio = cache_precios.precio_aplicable(
+                tipo_cliente_value, cantidad,
+                producto_id=datos.get('producto_id'), subproducto_id=datos.get('subproducto_id')
+            )
+            if precio is None:
+                print(f"Error en venta rápida: No se encontró precio para Producto {datos.get('producto_id')} / Subproducto {datos.get('subproducto_id')} para cliente {tipo_cliente_value}.")
+                return None
+            datos['precio_unitario_venta'] = precio
+        items.append(datos)
+
+    if monto_recibido is None and denominaciones_recibidas:
+        monto_recibido = sum((Decimal(str(valor)) * cantidad for valor, cantidad in denominaciones_recibidas.items()), Decimal('0.0'))
+
+    return create_pedido_with_lines(
+        usuario_id=usuario_id,
+        tipo_venta_value=TipoVenta.MOSTRADOR.value,
+        items=items,
+        productos_adicionales=productos_adicionales,
+        pago={
+            'forma_pago_value': forma_pago_value,
+            'monto_recibido': monto_recibido,
+            'denominaciones_recibidas': denominaciones_recibidas,
+        },
+        cliente_id=cliente_id,
+        forma_pago_value=forma_pago_value,
+        notas_pedido=notas_pedido
+    )
+
 def get_pedido_by_id(pedido_id: int) -> Optional[Pedido]:
     """Obtiene un pedido por su ID."""
     # Usar .options(db.joinedload(...)) si necesitas cargar relaciones eager
     return Pedido.query.get(pedido_id)
 
+@solo_lectura
 def get_all_pedidos(page: int = 1, per_page: int = 10, filters: Optional[Dict[str, Any]] = None):
     """
     Obtiene todos los pedidos con paginación y filtros opcionales.
@@ -250,6 +574,9 @@ def get_all_pedidos(page: int = 1, per_page: int = 10, filters: Optional[Dict[st
                 query = query.filter(Pedido.estado_pedido.in_([EstadoPedido(s) for s in filters['estado']]))
             else:
                 query = query.filter(Pedido.estado_pedido == EstadoPedido(filters['estado']))
+        if 'visible_para_rol' in filters and filters['visible_para_rol'] in estados.FILTRO_VISIBLE_POR_ROL:
+            # Estados que ve el rol (filtro SQL precalculado en app/pedidos/estados.py)
+            query = query.filter(estados.FILTRO_VISIBLE_POR_ROL[filters['visible_para_rol']])
         if 'tipo_venta' in filters and filters['tipo_venta']:
              query = query.filter(Pedido.tipo_venta == TipoVenta(filters['tipo_venta']))
         if 'cliente_id' in filters and filters['cliente_id']:
@@ -272,39 +599,32 @@ def get_all_pedidos(page: int = 1, per_page: int = 10, filters: Optional[Dict[st
 
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
+@solo_lectura
 def get_active_pedidos(page: int = 1, per_page: int = 10):
     """
     Obtiene pedidos en estados activos (no finalizados/cancelados) para el dashboard.
     """
-    # Definir estados considerados "activos"
-    active_states = [
-        EstadoPedido.PENDIENTE_CONFIRMACION,
-        EstadoPedido.PENDIENTE_PREPARACION,
-        EstadoPedido.EN_PREPARACION,
-        EstadoPedido.LISTO_PARA_ENTREGA,
-        EstadoPedido.ASIGNADO_A_REPARTIDOR,
-        EstadoPedido.EN_RUTA,
-        EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
-        EstadoPedido.PROBLEMA_EN_ENTREGA,
-        EstadoPedido.REPROGRAMADO,
-    ]
-    query = Pedido.query.filter(Pedido.estado_pedido.in_(active_states)).order_by(Pedido.fecha_creacion.asc())
+    query = Pedido.query.filter(estados.FILTRO_ACTIVOS).order_by(Pedido.fecha_creacion.asc())
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
 
+@solo_lectura
 def search_pedidos(query: str, page: int = 1, per_page: int = 10):
     """
     Busca pedidos por folio, nombre/alias de cliente, o número de teléfono.
     """
     search_term = f"%{query}%"
 
-    # Buscar por folio (si el folio es el ID, convertir query a int si es posible)
+    # Buscar por folio (acepta '123' o 'PM-000123'); los pedidos anteriores a los folios usan su ID
     pedido_by_id = None
     try:
-        pedido_id = int(query)
-        pedido_by_id = Pedido.query.filter_by(id=pedido_id)
+        termino = query.strip().upper()
+        numero = int(termino[3:] if termino.startswith('PM-') else termino) # Sin str.removeprefix (Python 3.8)
+        pedido_by_id = Pedido.query.filter(
+            or_(Pedido.folio == numero, and_(Pedido.folio.is_(None), Pedido.id == numero))
+        )
     except ValueError:
-        pass # No es un ID numérico
+        pass # No es un folio numérico
 
     # Buscar por nombre/alias de cliente (requiere join con Cliente)
     pedidos_by_client_name_alias = Pedido.query.join(Pedido.cliente).filter(
@@ -406,6 +726,7 @@ def update_pedido(
         # fecha_actualizacion se actualiza automáticamente por onupdate=datetime.utcnow
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pedido)
         return pedido
 
     except ValueError as e:
@@ -442,6 +763,7 @@ def delete_pedido(pedido_id: int) -> bool:
         # Para MVP, asumimos que la cascada es suficiente o que los movimientos se manejan por separado si es necesario.
         db.session.delete(pedido)
         db.session.commit()
+        kpis_dia.pedido_eliminado(pedido_id)
         return True
     except IntegrityError as e:
         db.session.rollback()
@@ -454,8 +776,8 @@ def delete_pedido(pedido_id: int) -> bool:
 
 def update_pedido_status(pedido_id: int, new_estado_value: str) -> Optional[Pedido]:
     """
-    Actualiza el estado de un pedido, aplicando lógica de transición si es necesario.
-    Para MVP, es una actualización directa, pero aquí iría la lógica compleja.
+    Actualiza el estado de un pedido si la matriz de estados.TRANSICIONES lo permite
+    (las mismas reglas que update_pedidos_status_bulk). Retorna None si la transición no es válida.
     """
     pedido = get_pedido_by_id(pedido_id)
     if not pedido:
@@ -464,14 +786,19 @@ def update_pedido_status(pedido_id: int, new_estado_value: str) -> Optional[Pedi
 
     try:
         new_estado_enum = EstadoPedido(new_estado_value)
-        # Aquí iría la lógica para validar si la transición de pedido.estado_pedido a new_estado_enum es válida
-        # Por ejemplo:
-        # if pedido.estado_pedido == EstadoPedido.EN_RUTA and new_estado_enum == EstadoPedido.PENDIENTE_PREPARACION:
-        #     print("Error: No se puede retroceder de EN_RUTA a PENDIENTE_PREPARACION.")
-        #     return None
+        estado_anterior = pedido.estado_pedido
+        if estado_anterior == new_estado_enum:
+            return pedido # Sin cambio
+        if not estados.puede_transicionar(estado_anterior, new_estado_enum):
+            print(f"Error al actualizar estado del pedido {pedido_id}: Transición de {estado_anterior.value} a {new_estado_enum.value} no permitida.")
+            return None
 
         pedido.estado_pedido = new_estado_enum
+        if new_estado_enum in estados.LIBERAN_REPARTIDOR:
+            pedido.repartidor_id = None # De vuelta antes del despacho: ya no está asignado
         db.session.commit()
+        if estado_anterior != new_estado_enum:
+            emitir_cambio_estado(pedido.id, estado_anterior, new_estado_enum)
         return pedido
 
     except ValueError as e:
@@ -484,6 +811,105 @@ def update_pedido_status(pedido_id: int, new_estado_value: str) -> Optional[Pedi
         return None
 
 
+def update_pedidos_status_bulk(
+    pedido_ids: List[int],
+    new_estado_value: str,
+    usuario_id: Optional[int] = None, # Usuario que hace el cambio (para el evento)
+    repartidor_id: Optional[int] = None, # Requerido al pasar a ASIGNADO_A_REPARTIDOR
+    solo_del_repartidor: Optional[int] = None, # Si se indica, solo pedidos asignados a ese repartidor
+    rol: Optional[RolUsuario] = None # Si se indica, solo pedidos en estados visibles para ese rol
+) -> Optional[Dict[str, List[int]]]:
+    """
+    Cambia el estado de varios pedidos a la vez (ej. cocina marca un lote LISTO_PARA_ENTREGA,
+    despacho asigna varios pedidos a un repartidor).
+
+    Lee solo (id, estado, fecha_actualizacion) de los pedidos, valida cada transición en memoria
+    contra la matriz de estados.TRANSICIONES y aplica un solo UPDATE ... WHERE (id, fecha_actualizacion) IN (...):
+    un pedido que otro usuario modificó entre la lectura y el UPDATE no se toca (concurrencia optimista).
+    Al volver antes del despacho (estados.LIBERAN_REPARTIDOR, ej. desasignar a LISTO_PARA_ENTREGA) se limpia
+    repartidor_id; los estados de pago, entrega y cancelación lo conservan.
+    Después del commit emite un evento pedido_estado_cambiado por pedido actualizado.
+
+    Returns:
+        {'actualizados': [...], 'rechazados': [...], 'conflictos': [...]} con IDs de pedido
+        (rechazados: no existen, no son del repartidor, no son visibles para el rol o la transición no está permitida;
+        conflictos: cambiaron mientras tanto),
+        o None si el estado o el repartidor no son válidos.
+    """
+    try:
+        new_estado_enum = EstadoPedido(new_estado_value)
+    except ValueError as e:
+        print(f"Error al actualizar estado en lote: Valor de estado '{new_estado_value}' no válido - {e}")
+        return None
+
+    if new_estado_enum == EstadoPedido.ASIGNADO_A_REPARTIDOR:
+        repartidor = db.session.get(Usuario, repartidor_id) if repartidor_id else None
+        if not repartidor or not repartidor.is_repartidor():
+            print("Error al actualizar estado en lote: Se requiere un repartidor válido para asignar pedidos.")
+            return None
+
+    pedido_ids = list(dict.fromkeys(pedido_ids or [])) # Sin repetidos, conservando el orden
+    resultado = {'actualizados': [], 'rechazados': [], 'conflictos': []}
+    if not pedido_ids:
+        return resultado
+
+    try:
+        # 1. Leer solo lo necesario para validar (sin cargar los pedidos completos)
+        consulta = select(Pedido.id, Pedido.estado_pedido, Pedido.fecha_actualizacion).where(Pedido.id.in_(pedido_ids))
+        if solo_del_repartidor is not None:
+            consulta = consulta.where(Pedido.repartidor_id == solo_del_repartidor)
+        if rol is not None and rol in estados.FILTRO_VISIBLE_POR_ROL:
+            consulta = consulta.where(estados.FILTRO_VISIBLE_POR_ROL[rol]) # Ej. tablajero: solo pedidos en preparación
+        actuales = {fila.id: fila for fila in db.session.execute(consulta)}
+
+        # 2. Validar transiciones en memoria
+        validos = []
+        for pedido_id in pedido_ids:
+            fila = actuales.get(pedido_id)
+            if fila is None or not estados.puede_transicionar(fila.estado_pedido, new_estado_enum):
+                resultado['rechazados'].append(pedido_id)
+            else:
+                validos.append(fila)
+        if not validos:
+            return resultado
+
+        # 3. Un solo UPDATE, condicionado a que nadie haya modificado el pedido desde la lectura
+        ahora = datetime.utcnow()
+        valores = {'estado_pedido': new_estado_enum, 'fecha_actualizacion': ahora}
+        if new_estado_enum == EstadoPedido.ASIGNADO_A_REPARTIDOR:
+            valores['repartidor_id'] = repartidor_id
+        elif new_estado_enum in estados.LIBERAN_REPARTIDOR:
+            valores['repartidor_id'] = None # Desasignado: no dejar la asignación anterior
+        sentencia = (
+            update(Pedido)
+            .where(tuple_(Pedido.id, Pedido.fecha_actualizacion).in_([(fila.id, fila.fecha_actualizacion) for fila in validos]))
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.get_bind(Pedido).dialect.update_returning:
+            actualizados = {pedido_id for (pedido_id,) in db.session.execute(sentencia.returning(Pedido.id))}
+        else:
+            db.session.execute(sentencia)
+            actualizados = {pedido_id for (pedido_id,) in db.session.execute(
+                select(Pedido.id).where(Pedido.id.in_([fila.id for fila in validos]), Pedido.fecha_actualizacion == ahora)
+            )}
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error inesperado al actualizar estado en lote de los pedidos {pedido_ids}: {e}")
+        return None
+
+    # 4. Un evento por pedido actualizado (ya confirmado)
+    for fila in validos:
+        if fila.id in actualizados:
+            resultado['actualizados'].append(fila.id)
+            emitir_cambio_estado(fila.id, fila.estado_pedido, new_estado_enum, usuario_id)
+        else:
+            resultado['conflictos'].append(fila.id)
+    return resultado
+
+
 # --- Funciones de Servicio para PedidoItem ---
 
 def add_pedido_item(
@@ -511,58 +937,22 @@ def add_pedido_item(
     #      print(f"Error al añadir ítem al pedido {pedido_id}: El pedido no puede ser modificado en estado {pedido.estado_pedido.value}.")
     #      return None
 
-    if cantidad <= Decimal('0.0'):
-        print("Error al añadir ítem: La cantidad debe ser positiva.")
-        return None
-
-    if not producto_id and not subproducto_id:
-         print("Error al añadir ítem: Debe especificar un producto o subproducto.")
-         return None
-
     try:
-        # 1. Determinar precio unitario si no se provee
-        final_precio_unitario = precio_unitario_venta
-        if final_precio_unitario is None:
-            # Usar la lógica de obtención de precio aplicable (Sección 4.2)
-            final_precio_unitario = _get_precio_aplicable(
-                producto_id=producto_id,
-                subproducto_id=subproducto_id,
-                cliente_id=pedido.cliente_id, # Usar el cliente del pedido
-                cantidad_solicitada=cantidad
-            )
-            if final_precio_unitario is None:
-                 print("Error al añadir ítem: No se pudo determinar el precio aplicable.")
-                 return None # No se puede añadir el ítem sin precio
-
-        # 2. Generar descripción del ítem (Sección 4.1)
-        descripcion_item = _get_item_description(producto_id, subproducto_id, modificacion_id)
-
-        # 3. Calcular subtotal
-        subtotal = cantidad * final_precio_unitario
-        subtotal = round(subtotal, 2) # Asegurar precisión
-
-        # 4. Crear el PedidoItem
-        item = PedidoItem(
-            pedido_id=pedido.id,
-            producto_id=producto_id,
-            subproducto_id=subproducto_id,
-            modificacion_id=modificacion_id,
-            descripcion_item_venta=descripcion_item,
-            cantidad=cantidad,
-            unidad_medida=unidad_medida,
-            precio_unitario_venta=final_precio_unitario,
-            subtotal_item=subtotal,
-            notas_item=notas_item
-            # costo_unitario_item (opcional, para futuro)
+        item = _construir_pedido_item(
+            pedido, producto_id, subproducto_id, modificacion_id, cantidad, unidad_medida, precio_unitario_venta, notas_item
         )
+        if item is None:
+            return None
 
         db.session.add(item)
         db.session.flush() # Para que el ítem tenga ID si es necesario
 
-        # 5. Recalcular totales del pedido
+        # Recalcular totales del pedido
         _recalculate_pedido_totals(pedido)
 
         db.session.commit()
+        metrics.PEDIDO_ITEMS_AGREGADOS.inc()
+        kpis_dia.pedido_guardado(pedido)
         return item
 
     except ValueError as e:
@@ -636,6 +1026,7 @@ def update_pedido_item(
         _recalculate_pedido_totals(item.pedido)
 
         db.session.commit()
+        kpis_dia.pedido_guardado(item.pedido)
         return item
 
     except Exception as e:
@@ -667,6 +1058,7 @@ def delete_pedido_item(item_id: int) -> bool:
         _recalculate_pedido_totals(pedido)
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pedido)
         return True
     except Exception as e:
         db.session.rollback()
@@ -700,62 +1092,27 @@ def add_producto_adicional(
     #      print(f"Error al añadir PA al pedido {pedido_id}: El pedido no puede ser modificado en estado {pedido.estado_pedido.value}.")
     #      return None
 
-    if cantidad_pa <= Decimal('0.0'):
-        print("Error al añadir PA: La cantidad debe ser positiva.")
-        return None
-
     try:
-        # 1. Determinar precio de venta unitario y calcular comisión (Sección 4.3)
-        final_precio_venta = precio_venta_unitario_pa
-        comision_calculada = Decimal('0.0')
-
-        # Si no se provee precio de venta, pero sí costo de compra, calcular precio con comisión
-        if final_precio_venta is None and costo_compra_unitario_pa is not None:
-            # Obtener configuración de comisión (asumimos una única fila de config)
-            config = ConfiguracionSistema.query.get(1)
-            limite_sin_comision = config.limite_items_pa_sin_comision if config else 3
-            monto_comision_fija = config.monto_comision_fija_pa_extra if config else Decimal('4.0')
-
-            # Contar PAs existentes en el pedido para saber si este nuevo excede el límite
-            current_pas_count = pedido.productos_adicionales_pedido.count()
-
-            if current_pas_count >= limite_sin_comision:
-                comision_calculada = monto_comision_fija
-
-            final_precio_venta = costo_compra_unitario_pa + comision_calculada
-            final_precio_venta = round(final_precio_venta, 2) # Asegurar precisión
-
-        elif final_precio_venta is None and costo_compra_unitario_pa is None:
-             print("Error al añadir PA: Debe proporcionar precio de venta o costo de compra.")
-             return None # No se puede añadir el PA sin precio
-
-        # Si se provee precio de venta directamente, no calculamos comisión automática para MVP
-        # Lógica futura podría recalcular comisión incluso si se da el precio de venta
-
-        # 2. Calcular subtotal
-        subtotal = cantidad_pa * final_precio_venta
-        subtotal = round(subtotal, 2) # Asegurar precisión
-
-        # 3. Crear el ProductoAdicional
-        pa = ProductoAdicional(
-            pedido_id=pedido.id,
-            nombre_pa=nombre_pa,
-            cantidad_pa=cantidad_pa,
-            unidad_medida_pa=unidad_medida_pa,
-            costo_compra_unitario_pa=costo_compra_unitario_pa,
-            precio_venta_unitario_pa=final_precio_venta,
-            subtotal_pa=subtotal,
-            comision_calculada_pa=comision_calculada,
-            notas_pa=notas_pa
+        # Configuración de comisión (única fila) y PAs existentes, solo si se calculará la comisión
+        calcula_comision = precio_venta_unitario_pa is None and costo_compra_unitario_pa is not None
+        config = ConfiguracionSistema.query.get(1) if calcula_comision else None
+        pas_existentes = pedido.productos_adicionales_pedido.count() if calcula_comision else 0
+
+        pa = _construir_producto_adicional(
+            pedido, pas_existentes, config, nombre_pa, cantidad_pa, unidad_medida_pa,
+            costo_compra_unitario_pa, precio_venta_unitario_pa, notas_pa
         )
+        if pa is None:
+            return None
 
         db.session.add(pa)
         db.session.flush() # Para que el PA tenga ID si es necesario
 
-        # 4. Recalcular totales del pedido
+        # Recalcular totales del pedido
         _recalculate_pedido_totals(pedido)
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pedido)
         return pa
 
     except ValueError as e:
@@ -866,6 +1223,7 @@ def update_producto_adicional(
         _recalculate_pedido_totals(pa.pedido)
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pa.pedido)
         return pa
 
     except ValueError as e:
@@ -901,6 +1259,7 @@ def delete_producto_adicional(pa_id: int) -> bool:
         _recalculate_pedido_totals(pedido)
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pedido)
         return True
     except Exception as e:
         db.session.rollback()
@@ -910,6 +1269,129 @@ def delete_producto_adicional(pa_id: int) -> bool:
 
 # --- Funciones de Servicio para Procesar Pagos y Movimientos de Caja (Sección 5) ---
 
+def _aplicar_pago(
+    pedido: Pedido,
+    usuario_id_cajero: int,
+    forma_pago_value: str,
+    monto_recibido: Optional[Decimal] = None,
+    denominaciones_recibidas: Optional[Dict[Decimal, int]] = None
+) -> Union[MovimientoCaja, None, bool]:
+    """
+    Aplica el pago al pedido en la sesión actual, sin commit: registra el MovimientoCaja (si aplica),
+    el cambio y el nuevo estado. Retorna el movimiento (None si la forma de pago no genera movimiento)
+    o False si el pago no es válido; en ese caso quien llama debe hacer rollback.
+    Lanza ValueError si la forma de pago no es válida.
+    """
+    forma_pago_enum = FormaPago(forma_pago_value)
+    if monto_recibido is not None:
+        monto_recibido = Decimal(str(monto_recibido))
+
+    # Validar monto recibido para efectivo
+    if forma_pago_enum == FormaPago.EFECTIVO:
+        if monto_recibido is None or monto_recibido < pedido.total_pedido:
+            print(f"Error al procesar pago en efectivo: Monto recibido ({monto_recibido}) es insuficiente para el total del pedido ({pedido.total_pedido}).")
+            return False
+        if denominaciones_recibidas is None:
+             print("Error al procesar pago en efectivo: Se requieren detalles de denominaciones recibidas.")
+             return False
+
+        # Calcular cambio y sugerir denominaciones (Lógica de Sección 4.4)
+        cambio_total = monto_recibido - pedido.total_pedido
+        # Para MVP, no necesitamos las existencias de caja aquí, solo calcular el cambio
+        # La sugerencia de denominaciones se haría en la UI antes de llamar a este servicio
+        # Si se necesitara la sugerencia aquí, se llamaría a calcular_y_sugerir_cambio_con_denominaciones
+        # y se validaría si el cambio es posible.
+
+        pedido.paga_con = monto_recibido
+        pedido.cambio_entregado = cambio_total
+        # El egreso del cambio se registra como parte del movimiento de ingreso o como un egreso separado
+        # Para MVP, registramos el ingreso total recibido y el egreso del cambio como parte del mismo movimiento de ingreso de venta.
+
+    elif forma_pago_enum in [FormaPago.TARJETA_DEBITO, FormaPago.TARJETA_CREDITO, FormaPago.TRANSFERENCIA_BANCARIA, FormaPago.QR_PAGO]:
+        # Para pagos no efectivo, el monto recibido es el total del pedido
+        monto_recibido = pedido.total_pedido
+        pedido.paga_con = pedido.total_pedido # Opcional, registrar que se pagó el total
+        pedido.cambio_entregado = Decimal('0.0') # No hay cambio
+
+    elif forma_pago_enum == FormaPago.CREDITO_INTERNO:
+         # No hay movimiento de caja inmediato, solo se registra la forma de pago
+         monto_recibido = Decimal('0.0') # O el total del pedido, dependiendo de cómo se quiera registrar
+         pedido.paga_con = Decimal('0.0')
+         pedido.cambio_entregado = Decimal('0.0')
+         # El movimiento de caja (INGRESO) se registrará cuando se pague el crédito
+
+    elif forma_pago_enum == FormaPago.CORTESIA:
+         monto_recibido = Decimal('0.0')
+         pedido.paga_con = Decimal('0.0')
+         pedido.cambio_entregado = Decimal('0.0')
+         # No hay movimiento de caja
+
+    elif forma_pago_enum == FormaPago.EFECTIVO_CONTRA_ENTREGA:
+         # Este caso se maneja en la liquidación del repartidor (registrar_ingreso_liquidacion_repartidor)
+         # No se procesa el pago aquí, solo se registra la forma de pago en create_pedido/update_pedido
+         print(f"Advertencia: Intentando procesar pago EFECTIVO_CONTRA_ENTREGA para pedido {pedido.id} en la función process_pedido_payment.")
+         # Podríamos permitir registrar el monto esperado aquí si es útil
+         # pedido.paga_con = monto_recibido # Monto esperado
+         # No registrar movimiento de caja aquí
+         pass # No hacer nada más para este caso en esta función
+
+    else:
+        print(f"Error al procesar pago: Forma de pago '{forma_pago_value}' no soportada para procesamiento inmediato.")
+        return False
+
+
+    # Registrar Movimiento de Caja (si aplica)
+    movimiento = None
+    if forma_pago_enum in [FormaPago.EFECTIVO, FormaPago.TARJETA_DEBITO, FormaPago.TARJETA_CREDITO, FormaPago.TRANSFERENCIA_BANCARIA, FormaPago.QR_PAGO]:
+        motivo = f"Venta Pedido {pedido.tipo_venta.name.replace('_', ' ').title()} #{format_pedido_folio(pedido)}"
+        # Para efectivo, el monto del movimiento es el total del pedido, no el monto recibido
+        # El cambio se maneja en el detalle de denominaciones del movimiento
+        monto_movimiento = pedido.total_pedido
+
+        movimiento = registrar_movimiento_caja(
+            usuario_id=usuario_id_cajero,
+            tipo_movimiento=TipoMovimientoCaja.INGRESO.value,
+            motivo_movimiento=motivo,
+            monto_movimiento=monto_movimiento,
+            forma_pago_efectuado=forma_pago_enum.value,
+            notas_movimiento=f"Pago de pedido {format_pedido_folio(pedido)}",
+            pedido_id=pedido.id,
+            # Para efectivo, pasar las denominaciones recibidas.
+            # El servicio registrar_movimiento_caja manejará el egreso del cambio en el detalle de denominaciones.
+            denominaciones_contadas=denominaciones_recibidas if forma_pago_enum == FormaPago.EFECTIVO else None,
+            commit=False # El commit lo hace quien llama, junto con el pedido
+        )
+
+        if not movimiento:
+            print(f"Error al registrar movimiento de caja para pedido {pedido.id}.")
+            return False
+
+    # Actualizar estado del pedido a PAGADO o ENTREGADO_Y_PAGADO
+    # Si es mostrador, pasa a ENTREGADO_Y_PAGADO inmediatamente
+    # Si es domicilio y el repartidor liquida, pasa a PAGADO o ENTREGADO_Y_PAGADO
+    # Para MVP, simplificamos: si se procesa el pago aquí, el estado final es PAGADO o ENTREGADO_Y_PAGADO
+    if pedido.tipo_venta == TipoVenta.MOSTRADOR:
+         pedido.estado_pedido = EstadoPedido.ENTREGADO_Y_PAGADO
+    elif pedido.tipo_venta == TipoVenta.DOMICILIO and forma_pago_enum != FormaPago.EFECTIVO_CONTRA_ENTREGA:
+         # Si se paga antes de la entrega (ej. transferencia previa), puede pasar a PAGADO
+         pedido.estado_pedido = EstadoPedido.PAGADO
+    elif pedido.tipo_venta == TipoVenta.DOMICILIO and forma_pago_enum == FormaPago.EFECTIVO_CONTRA_ENTREGA:
+         # Este caso se maneja en la liquidación del repartidor
+         pass # No cambiar estado aquí
+
+    pedido.forma_pago = forma_pago_enum # Asegurar que la forma de pago quede registrada en el pedido
+    return movimiento
+
+
+def _metricas_pago(pedido: Pedido, movimiento: Optional[MovimientoCaja]):
+    """Actualiza los contadores de /metrics de un pago ya confirmado (después del commit)."""
+    forma_pago = pedido.forma_pago.value
+    metrics.PAGOS.inc(forma_pago=forma_pago)
+    metrics.PAGOS_MONTO.inc(float(pedido.total_pedido or 0), forma_pago=forma_pago)
+    if movimiento is not None:
+        registrar_metricas_movimiento(movimiento)
+
+
 def process_pedido_payment(
     pedido_id: int,
     usuario_id_cajero: int, # Cajero que procesa el pago
@@ -932,103 +1414,14 @@ def process_pedido_payment(
     #      return None
 
     try:
-        forma_pago_enum = FormaPago(forma_pago_value)
-
-        # Validar monto recibido para efectivo
-        if forma_pago_enum == FormaPago.EFECTIVO:
-            if monto_recibido is None or monto_recibido < pedido.total_pedido:
-                print(f"Error al procesar pago en efectivo: Monto recibido ({monto_recibido}) es insuficiente para el total del pedido ({pedido.total_pedido}).")
-                return None
-            if denominaciones_recibidas is None:
-                 print("Error al procesar pago en efectivo: Se requieren detalles de denominaciones recibidas.")
-                 return None
-
-            # Calcular cambio y sugerir denominaciones (Lógica de Sección 4.4)
-            cambio_total = monto_recibido - pedido.total_pedido
-            # Para MVP, no necesitamos las existencias de caja aquí, solo calcular el cambio
-            # La sugerencia de denominaciones se haría en la UI antes de llamar a este servicio
-            # Si se necesitara la sugerencia aquí, se llamaría a calcular_y_sugerir_cambio_con_denominaciones
-            # y se validaría si el cambio es posible.
-
-            pedido.paga_con = monto_recibido
-            pedido.cambio_entregado = cambio_total
-            # El egreso del cambio se registra como parte del movimiento de ingreso o como un egreso separado
-            # Para MVP, registramos el ingreso total recibido y el egreso del cambio como parte del mismo movimiento de ingreso de venta.
-
-        elif forma_pago_enum in [FormaPago.TARJETA_DEBITO, FormaPago.TARJETA_CREDITO, FormaPago.TRANSFERENCIA_BANCARIA, FormaPago.QR_PAGO]:
-            # Para pagos no efectivo, el monto recibido es el total del pedido
-            monto_recibido = pedido.total_pedido
-            pedido.paga_con = pedido.total_pedido # Opcional, registrar que se pagó el total
-            pedido.cambio_entregado = Decimal('0.0') # No hay cambio
-
-        elif forma_pago_enum == FormaPago.CREDITO_INTERNO:
-             # No hay movimiento de caja inmediato, solo se registra la forma de pago
-             monto_recibido = Decimal('0.0') # O el total del pedido, dependiendo de cómo se quiera registrar
-             pedido.paga_con = Decimal('0.0')
-             pedido.cambio_entregado = Decimal('0.0')
-             # El movimiento de caja (INGRESO) se registrará cuando se pague el crédito
-
-        elif forma_pago_enum == FormaPago.CORTESIA:
-             monto_recibido = Decimal('0.0')
-             pedido.paga_con = Decimal('0.0')
-             pedido.cambio_entregado = Decimal('0.0')
-             # No hay movimiento de caja
-
-        elif forma_pago_enum == FormaPago.EFECTIVO_CONTRA_ENTREGA:
-             # Este caso se maneja en la liquidación del repartidor (registrar_ingreso_liquidacion_repartidor)
-             # No se procesa el pago aquí, solo se registra la forma de pago en create_pedido/update_pedido
-             print(f"Advertencia: Intentando procesar pago EFECTIVO_CONTRA_ENTREGA para pedido {pedido_id} en la función process_pedido_payment.")
-             # Podríamos permitir registrar el monto esperado aquí si es útil
-             # pedido.paga_con = monto_recibido # Monto esperado
-             # No registrar movimiento de caja aquí
-             pass # No hacer nada más para este caso en esta función
-
-        else:
-            print(f"Error al procesar pago: Forma de pago '{forma_pago_value}' no soportada para procesamiento inmediato.")
+        movimiento = _aplicar_pago(pedido, usuario_id_cajero, forma_pago_value, monto_recibido, denominaciones_recibidas)
+        if movimiento is False:
+            db.session.rollback()
             return None
 
-
-        # Registrar Movimiento de Caja (si aplica)
-        if forma_pago_enum in [FormaPago.EFECTIVO, FormaPago.TARJETA_DEBITO, FormaPago.TARJETA_CREDITO, FormaPago.TRANSFERENCIA_BANCARIA, FormaPago.QR_PAGO]:
-            motivo = f"Venta Pedido {pedido.tipo_venta.name.replace('_', ' ').title()} #{format_pedido_folio(pedido.id)}"
-            # Para efectivo, el monto del movimiento es el total del pedido, no el monto recibido
-            # El cambio se maneja en el detalle de denominaciones del movimiento
-            monto_movimiento = pedido.total_pedido
-
-            movimiento = registrar_movimiento_caja(
-                usuario_id=usuario_id_cajero,
-                tipo_movimiento=TipoMovimientoCaja.INGRESO.value,
-                motivo_movimiento=motivo,
-                monto_movimiento=monto_movimiento,
-                forma_pago_efectuado=forma_pago_enum.value,
-                notas_movimiento=f"Pago de pedido {format_pedido_folio(pedido.id)}",
-                pedido_id=pedido.id,
-                # Para efectivo, pasar las denominaciones recibidas.
-                # El servicio registrar_movimiento_caja manejará el egreso del cambio en el detalle de denominaciones.
-                denominaciones_contadas=denominaciones_recibidas if forma_pago_enum == FormaPago.EFECTIVO else None
-            )
-
-            if not movimiento:
-                print(f"Error al registrar movimiento de caja para pedido {pedido_id}.")
-                db.session.rollback() # Rollback si el movimiento de caja falla
-                return None
-
-        # Actualizar estado del pedido a PAGADO o ENTREGADO_Y_PAGADO
-        # Si es mostrador, pasa a ENTREGADO_Y_PAGADO inmediatamente
-        # Si es domicilio y el repartidor liquida, pasa a PAGADO o ENTREGADO_Y_PAGADO
-        # Para MVP, simplificamos: si se procesa el pago aquí, el estado final es PAGADO o ENTREGADO_Y_PAGADO
-        if pedido.tipo_venta == TipoVenta.MOSTRADOR:
-             pedido.estado_pedido = EstadoPedido.ENTREGADO_Y_PAGADO
-        elif pedido.tipo_venta == TipoVenta.DOMICILIO and forma_pago_enum != FormaPago.EFECTIVO_CONTRA_ENTREGA:
-             # Si se paga antes de la entrega (ej. transferencia previa), puede pasar a PAGADO
-             pedido.estado_pedido = EstadoPedido.PAGADO
-        elif pedido.tipo_venta == TipoVenta.DOMICILIO and forma_pago_enum == FormaPago.EFECTIVO_CONTRA_ENTREGA:
-             # Este caso se maneja en la liquidación del repartidor
-             pass # No cambiar estado aquí
-
-        pedido.forma_pago = forma_pago_enum # Asegurar que la forma de pago quede registrada en el pedido
-
-        db.session.commit()
+        db.session.commit() # Movimiento de caja y estado del pedido en la misma transacción
+        _metricas_pago(pedido, movimiento)
+        kpis_dia.pedido_guardado(pedido)
         return pedido
 
     except ValueError as e:
@@ -1089,14 +1482,7 @@ def process_repartidor_liquidacion(
 
     # Validar que el pedido sea a domicilio y esté en un estado que permita liquidación
     # (ej. EN_RUTA, ENTREGADO_PENDIENTE_PAGO, PROBLEMA_EN_ENTREGA, ASIGNADO_A_REPARTIDOR)
-    liquidable_states = [
-        EstadoPedido.ASIGNADO_A_REPARTIDOR,
-        EstadoPedido.EN_RUTA,
-        EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
-        EstadoPedido.PROBLEMA_EN_ENTREGA,
-        EstadoPedido.REPROGRAMADO # Si se liquida después de un problema/reprogramación
-    ]
-    if pedido.tipo_venta != TipoVenta.DOMICILIO or pedido.estado_pedido not in liquidable_states:
+    if pedido.tipo_venta != TipoVenta.DOMICILIO or pedido.estado_pedido not in estados.LIQUIDABLES:
          print(f"Error al procesar liquidación del pedido {pedido_id}: El pedido no es a domicilio o no está en un estado liquidable ({pedido.estado_pedido.value}).")
          return None
 
@@ -1124,19 +1510,14 @@ def process_repartidor_liquidacion(
             return None
 
         # Actualizar estado del pedido a PAGADO o ENTREGADO_Y_PAGADO
-        # Si ya estaba ENTREGADO_PENDIENTE_PAGO, pasa a ENTREGADO_Y_PAGADO
-        # Si estaba en otro estado (EN_RUTA, PROBLEMA), pasa a PAGADO (o ENTREGADO_Y_PAGADO si se considera entregado al liquidar)
-        # Para MVP, simplificamos: pasa a ENTREGADO_Y_PAGADO si estaba en un estado de entrega/problema, o a PAGADO si no.
-        if pedido.estado_pedido in [EstadoPedido.EN_RUTA, EstadoPedido.ENTREGADO_PENDIENTE_PAGO, EstadoPedido.PROBLEMA_EN_ENTREGA, EstadoPedido.REPROGRAMADO]:
-             pedido.estado_pedido = EstadoPedido.ENTREGADO_Y_PAGADO
-        else:
-             pedido.estado_pedido = EstadoPedido.PAGADO # Ej. si se liquida un pedido que nunca salió por algún motivo
+        _marcar_pedido_liquidado(pedido)
 
         # Opcional: Registrar el monto liquidado en el pedido si es diferente al total_pedido
         # Esto podría ser útil si hay diferencias en la liquidación
         # pedido.monto_liquidado_repartidor = monto_recibido # Necesitaría un campo en el modelo Pedido
 
         db.session.commit()
+        kpis_dia.pedido_guardado(pedido)
         return pedido
 
     except Exception as e:
@@ -1144,5 +1525,154 @@ def process_repartidor_liquidacion(
         print(f"Error inesperado al procesar liquidación del pedido {pedido_id}: {e}")
         return None
 
+def get_pedidos_por_liquidar(repartidor_id: int) -> List[Pedido]:
+    """Pedidos a domicilio del repartidor que todavía se pueden liquidar, del más antiguo al más reciente."""
+    return Pedido.query.filter(
+        Pedido.tipo_venta == TipoVenta.DOMICILIO,
+        Pedido.repartidor_id == repartidor_id,
+        estados.FILTRO_LIQUIDABLES
+    ).order_by(Pedido.fecha_creacion.asc(), Pedido.id.asc()).all()
+
+
+def _monto_esperado_liquidacion(pedido: Pedido) -> Decimal:
+    """Efectivo que el repartidor debe entregar por el pedido (0 si se pagó por otro medio)."""
+    if pedido.forma_pago in (None, FormaPago.EFECTIVO, FormaPago.EFECTIVO_CONTRA_ENTREGA):
+        return pedido.total_pedido or Decimal('0.00')
+    return Decimal('0.00')
+
+
+def _asignar_montos_liquidacion(pedidos: List[Pedido], monto_recibido: Decimal) -> List[Decimal]:
+    """
+    Reparte el efectivo entregado entre los pedidos: cada uno recibe lo esperado y la diferencia
+    (sobrante o faltante) se aplica desde el último pedido hacia atrás, sin dejar montos negativos.
+    La suma de los montos asignados siempre es igual a monto_recibido.
+    """
+    montos = [_monto_esperado_liquidacion(pedido) for pedido in pedidos]
+    diferencia = monto_recibido - sum(montos, Decimal('0.00'))
+    if diferencia > Decimal('0.00'):
+        montos[-1] += diferencia
+    else:
+        faltante = -diferencia
+        for i in range(len(montos) - 1, -1, -1):
+            if faltante <= Decimal('0.00'):
+                break
+            descuento = min(montos[i], faltante)
+            montos[i] -= descuento
+            faltante -= descuento
+    return montos
+
+
+def _marcar_pedido_liquidado(pedido: Pedido):
+    """
+    Actualiza el estado de un pedido liquidado por el repartidor.
+    Si estaba en un estado de entrega/problema pasa a ENTREGADO_Y_PAGADO; si no, a PAGADO
+    (ej. si se liquida un pedido que nunca salió por algún motivo).
+    """
+    pedido.estado_pedido = estados.estado_tras_liquidacion(pedido.estado_pedido)
+
+
+def process_repartidor_liquidacion_lote(
+    pedido_ids: List[int],
+    usuario_id_repartidor_o_cajero: int, # Usuario que liquida (repartidor) o que recibe (cajero)
+    monto_recibido: Decimal, # Efectivo total entregado por el repartidor por todos los pedidos
+    denominaciones_recibidas: Dict[Decimal, int] # Un solo conteo del efectivo entregado
+) -> Optional[List[Pedido]]:
+    """
+    Liquida en una sola transacción varios pedidos a domicilio del mismo repartidor contra una sola
+    entrega de efectivo. Registra una LiquidacionLote con el conteo de denominaciones completo (suma
+    monto_recibido) y un MovimientoCaja de INGRESO por pedido con el monto asignado
+    (ver _asignar_montos_liquidacion), ligado al pedido y a la liquidación: los movimientos del lote
+    suman monto_recibido. Todos los estados se actualizan en el mismo commit.
+
+    Returns:
+        Los pedidos liquidados, o None si algún pedido no es liquidable o hay un error (no se guarda nada).
+    """
+    pedido_ids = list(dict.fromkeys(pedido_ids or [])) # Sin repetidos, conservando el orden
+    if not pedido_ids:
+        print("Error al procesar liquidación en lote: No se seleccionaron pedidos.")
+        return None
+
+    if monto_recibido is None or monto_recibido < Decimal('0.0'):
+         print("Error al procesar liquidación en lote: El monto recibido no puede ser negativo.")
+         return None
+
+    if not denominaciones_recibidas:
+         print("Error al procesar liquidación en lote: Se requieren detalles de denominaciones recibidas.")
+         return None
+
+    total_contado = sum((Decimal(str(valor)) * cantidad for valor, cantidad in denominaciones_recibidas.items()), Decimal('0.00'))
+    if total_contado != monto_recibido:
+        print(f"Error al procesar liquidación en lote: El monto entregado ({monto_recibido}) no coincide con el conteo de denominaciones ({total_contado}).")
+        return None
+
+    # Una sola consulta para todos los pedidos, del más antiguo al más reciente
+    pedidos = Pedido.query.filter(Pedido.id.in_(pedido_ids)).order_by(Pedido.fecha_creacion.asc(), Pedido.id.asc()).all()
+    if len(pedidos) != len(pedido_ids):
+        faltantes = set(pedido_ids) - {pedido.id for pedido in pedidos}
+        print(f"Error al procesar liquidación en lote: Pedidos no encontrados: {sorted(faltantes)}.")
+        return None
+
+    for pedido in pedidos:
+        if pedido.tipo_venta != TipoVenta.DOMICILIO or pedido.estado_pedido not in estados.LIQUIDABLES:
+            print(f"Error al procesar liquidación en lote: El pedido {pedido.id} no es a domicilio o no está en un estado liquidable ({pedido.estado_pedido.value}).")
+            return None
+    if len({pedido.repartidor_id for pedido in pedidos}) != 1:
+        print("Error al procesar liquidación en lote: Todos los pedidos deben ser del mismo repartidor.")
+        return None
+
+    usuario = db.session.get(Usuario, usuario_id_repartidor_o_cajero) # Nombre para el motivo, una sola vez
+    nombre_usuario = usuario.nombre_completo if usuario else "Usuario Desconocido"
+    montos = _asignar_montos_liquidacion(pedidos, monto_recibido)
+    folios = ', '.join(f"#{format_pedido_folio(pedido)}" for pedido in pedidos)
+
+    try:
+        # El conteo físico es uno solo: va en la liquidación, no en cada movimiento
+        liquidacion = LiquidacionLote(
+            usuario_id=usuario_id_repartidor_o_cajero,
+            repartidor_id=pedidos[0].repartidor_id,
+            monto_recibido=monto_recibido
+        )
+        db.session.add(liquidacion)
+        db.session.flush() # Obtener el ID para los movimientos
+        db.session.add_all([
+            LiquidacionLoteDenominacion(liquidacion_lote_id=liquidacion.id, denominacion_valor=valor, cantidad=cantidad)
+            for valor, cantidad in denominaciones_recibidas.items() if cantidad > 0
+        ])
+
+        movimientos = []
+        for pedido, monto in zip(pedidos, montos):
+            if monto > Decimal('0.00'):
+                movimiento = registrar_movimiento_caja(
+                    usuario_id=usuario_id_repartidor_o_cajero,
+                    tipo_movimiento=TipoMovimientoCaja.INGRESO.value,
+                    motivo_movimiento=f"Liquidación Pedido Domicilio #{format_pedido_folio(pedido)} por {nombre_usuario}",
+                    monto_movimiento=monto,
+                    forma_pago_efectuado=FormaPago.EFECTIVO.value,
+                    notas_movimiento=f"Liquidación en lote #{liquidacion.id} de {len(pedidos)} pedidos ({folios}); efectivo entregado ${monto_recibido:.2f}",
+                    pedido_id=pedido.id,
+                    commit=False, # Todo el lote en un solo commit
+                    liquidacion_lote_id=liquidacion.id
+                )
+                if not movimiento:
+                    print(f"Error al registrar movimiento de liquidación para pedido {pedido.id}.")
+                    db.session.rollback()
+                    return None
+                movimientos.append(movimiento)
+
+        for pedido in pedidos:
+            _marcar_pedido_liquidado(pedido)
+
+        db.session.commit()
+        for movimiento in movimientos:
+            registrar_metricas_movimiento(movimiento)
+        for pedido in pedidos:
+            kpis_dia.pedido_guardado(pedido)
+        return pedidos
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error inesperado al procesar liquidación en lote de los pedidos {pedido_ids}: {e}")
+        return None
+
 # Puedes añadir más funciones de servicio aquí según se necesiten
 # Por ejemplo: funciones para obtener pedidos por repartidor, por cliente, por rango de fechas, etc.
\ No newline at end of file
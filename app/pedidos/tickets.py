@@ -0,0 +1,255 @@
+# Archivo: PolleriaMontiel\app\pedidos\tickets.py
+
+"""
+Tickets de venta y comandas de preparación en bytes ESC/POS para impresoras térmicas.
+
+imprimir_ticket/imprimir_comanda renderizan una página HTML que el navegador imprime (una pestaña
+por ticket y lento en térmicas). Aquí el pedido se convierte directo a comandos ESC/POS:
+
+    - Las líneas de productos usan format_pedido_item_description / format_producto_adicional_description
+      (app/utils/helpers.py), las mismas descripciones de los mensajes al cliente.
+    - Cada ticket se guarda en memoria por versión del pedido (fecha_actualizacion, estado y total,
+      más los datos del negocio): reimprimir un pedido sin cambios no vuelve a leer sus líneas.
+    - `imprimir_pedido` solo encola los bytes en la cola de impresión (app/utils/impresion.py).
+
+Texto en la página de códigos PC858 (acentos y ñ), ancho en columnas TICKETS_ANCHO
+(32 para papel de 58 mm, 42-48 para 80 mm).
+"""
+
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from flask import current_app
+
+from app import db
+from app.models import Pedido, ConfiguracionSistema, TipoVenta, FormaPago
+from app.utils.helpers import (
+    format_currency, format_datetime, format_pedido_folio,
+    format_pedido_item_description, format_producto_adicional_description
+)
+from app.utils.impresion import cola, TrabajoImpresion
+
+TICKET, COMANDA = 'ticket', 'comanda'
+ANCHO_DEFAULT = 32
+CACHE_MAX_DEFAULT = 256
+
+# Comandos ESC/POS
+ESC, GS = b'\x1b', b'\x1d'
+INICIALIZAR = ESC + b'@'
+PAGINA_PC858 = ESC + b't\x13' # Tabla 19: PC858 (Europa occidental con €)
+CODIFICACION = 'cp858'
+IZQUIERDA, CENTRO = ESC + b'a\x00', ESC + b'a\x01'
+NEGRITA_SI, NEGRITA_NO = ESC + b'E\x01', ESC + b'E\x00'
+TAMANO_NORMAL, TAMANO_DOBLE = GS + b'!\x00', GS + b'!\x11' # Doble alto y ancho
+CORTE_PARCIAL = GS + b'V\x42\x03' # Avanza 3 líneas y corta
+
+
+class _Ticket:
+    """Acumula texto y comandos ESC/POS de un ticket de `ancho` columnas."""
+
+    def __init__(self, ancho: int):
+        self.ancho = ancho
+        self._partes: List[bytes] = [INICIALIZAR, PAGINA_PC858]
+
+    def comando(self, *comandos: bytes):
+        self._partes.extend(comandos)
+
+    def texto(self, texto: str, ancho: Optional[int] = None):
+        """Una o más líneas, partidas en palabras al ancho de la impresora."""
+        for linea in textwrap.wrap(texto or '', ancho or self.ancho) or ['']:
+            self._partes.append(linea.encode(CODIFICACION, errors='replace') + b'\n')
+
+    def centrado(self, texto: str, negrita: bool = False, doble: bool = False):
+        self.comando(CENTRO, NEGRITA_SI if negrita else NEGRITA_NO, TAMANO_DOBLE if doble else TAMANO_NORMAL)
+        self.texto(texto, self.ancho // 2 if doble else None)
+        self.comando(TAMANO_NORMAL, NEGRITA_NO, IZQUIERDA)
+
+    def columnas(self, izquierda: str, derecha: str, negrita: bool = False):
+        """Texto a la izquierda e importe alineado a la derecha (el texto largo continúa abajo)."""
+        if negrita:
+            self.comando(NEGRITA_SI)
+        lineas = textwrap.wrap(izquierda, max(1, self.ancho - len(derecha) - 1)) or ['']
+        for linea in lineas[:-1]:
+            self.texto(linea)
+        self.texto(lineas[-1].ljust(self.ancho - len(derecha)) + derecha)
+        if negrita:
+            self.comando(NEGRITA_NO)
+
+    def separador(self):
+        self.texto('-' * self.ancho)
+
+    def bytes(self) -> bytes:
+        return b''.join(self._partes + [CORTE_PARCIAL])
+
+
+def _linea_descripcion(ticket: _Ticket, descripcion: str):
+    """'- 1.5 kg Pechuga Entera: $180.00' -> descripción a la izquierda, importe a la derecha."""
+    texto, _, importe = descripcion.rpartition(': ')
+    if not texto:
+        ticket.texto(descripcion)
+    else:
+        ticket.columnas(texto, importe)
+
+
+def _datos_negocio() -> Tuple[str, str, str]:
+    negocio = db.session.get(ConfiguracionSistema, 1)
+    if negocio is None:
+        return 'Pollería Montiel', '', ''
+    return negocio.nombre_negocio, negocio.direccion_negocio or '', negocio.telefono_negocio or ''
+
+
+def _cliente(ticket: _Ticket, pedido: Pedido):
+    if not pedido.cliente:
+        return
+    ticket.texto(f'Cliente: {pedido.cliente.get_nombre_completo()}')
+    if pedido.cliente.alias:
+        ticket.texto(f'Alias: {pedido.cliente.alias}')
+    direccion = pedido.direccion_entrega
+    if pedido.tipo_venta == TipoVenta.DOMICILIO and direccion:
+        ticket.texto(f'Entrega: {direccion.calle_numero}, {direccion.colonia or ""}, {direccion.ciudad}')
+        if direccion.referencias:
+            ticket.texto(f'Ref: {direccion.referencias}')
+        if pedido.fecha_entrega_programada:
+            ticket.texto(f'Prog: {format_datetime(pedido.fecha_entrega_programada)}')
+    ticket.separador()
+
+
+def render_ticket(pedido: Pedido, negocio: Tuple[str, str, str], ancho: int = ANCHO_DEFAULT) -> bytes:
+    """Ticket de venta del pedido (mismo contenido que pedidos/imprimir_ticket.html)."""
+    nombre, direccion, telefono = negocio
+    ticket = _Ticket(ancho)
+    ticket.centrado(nombre, negrita=True, doble=True)
+    if direccion:
+        ticket.centrado(direccion)
+    if telefono:
+        ticket.centrado(f'Tel: {telefono}')
+    ticket.separador()
+    ticket.centrado(f'PEDIDO #{format_pedido_folio(pedido)}', negrita=True)
+    ticket.centrado(format_datetime(pedido.fecha_creacion))
+    if pedido.usuario_creador:
+        ticket.centrado(f'Atendido por: {pedido.usuario_creador.nombre_completo}')
+    ticket.separador()
+    _cliente(ticket, pedido)
+
+    for item in pedido.items:
+        _linea_descripcion(ticket, format_pedido_item_description(item))
+    for pa in pedido.productos_adicionales_pedido:
+        _linea_descripcion(ticket, format_producto_adicional_description(pa))
+        if pa.notas_pa:
+            ticket.texto(f'  Notas: {pa.notas_pa}')
+    ticket.separador()
+
+    ticket.columnas('Subtotal Pollo:', format_currency(pedido.subtotal_productos_pollo))
+    ticket.columnas('Subtotal PAs:', format_currency(pedido.subtotal_productos_adicionales))
+    if pedido.descuento_aplicado and pedido.descuento_aplicado > 0:
+        ticket.columnas('Descuento:', f'-{format_currency(pedido.descuento_aplicado)}')
+    if pedido.costo_envio and pedido.costo_envio > 0:
+        ticket.columnas('Envío:', format_currency(pedido.costo_envio))
+    ticket.columnas('TOTAL:', format_currency(pedido.total_pedido), negrita=True)
+    ticket.separador()
+
+    if pedido.forma_pago:
+        ticket.texto(f"Forma de Pago: {pedido.forma_pago.name.replace('_', ' ').title()}")
+        if pedido.forma_pago == FormaPago.EFECTIVO and pedido.paga_con is not None:
+            cambio = pedido.cambio_entregado if pedido.cambio_entregado is not None else pedido.paga_con - pedido.total_pedido
+            ticket.columnas('Paga Con:', format_currency(pedido.paga_con))
+            ticket.columnas('Cambio:', format_currency(cambio))
+        ticket.separador()
+    if pedido.notas_pedido:
+        ticket.texto('Notas del Pedido:')
+        ticket.texto(pedido.notas_pedido)
+        ticket.separador()
+    ticket.centrado('¡Gracias por tu preferencia!')
+    return ticket.bytes()
+
+
+def render_comanda(pedido: Pedido, ancho: int = ANCHO_DEFAULT) -> bytes:
+    """Comanda para preparación: folio grande, tipo de venta, cantidades y notas, sin importes."""
+    ticket = _Ticket(ancho)
+    ticket.centrado(f'#{format_pedido_folio(pedido)}', negrita=True, doble=True)
+    ticket.centrado(f'{pedido.tipo_venta.value} - {format_datetime(pedido.fecha_creacion)}')
+    if pedido.fecha_entrega_programada:
+        ticket.centrado(f'Entregar: {format_datetime(pedido.fecha_entrega_programada)}', negrita=True)
+    ticket.separador()
+    for item in pedido.items:
+        # La descripción del helper sin el importe
+        ticket.comando(NEGRITA_SI)
+        ticket.texto(format_pedido_item_description(item).rpartition(': ')[0])
+        ticket.comando(NEGRITA_NO)
+    for pa in pedido.productos_adicionales_pedido:
+        ticket.texto(format_producto_adicional_description(pa).rpartition(': ')[0])
+        if pa.notas_pa:
+            ticket.texto(f'  >> {pa.notas_pa}')
+    if pedido.notas_pedido:
+        ticket.separador()
+        ticket.texto(f'Notas: {pedido.notas_pedido}')
+    return ticket.bytes()
+
+
+# --- Caché por versión del pedido ---
+
+def version_pedido(pedido: Pedido) -> Tuple:
+    """Cambia con cualquier modificación guardada del pedido (los servicios recalculan y actualizan la fila)."""
+    return (pedido.fecha_actualizacion, pedido.estado_pedido, str(pedido.total_pedido))
+
+
+class _CacheTickets:
+    """LRU en memoria del proceso: (BD, tipo, pedido, versión, ancho, negocio) -> bytes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tickets: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+
+    def obtener(self, clave: Tuple) -> Optional[bytes]:
+        with self._lock:
+            datos = self._tickets.get(clave)
+            if datos is not None:
+                self._tickets.move_to_end(clave)
+            return datos
+
+    def guardar(self, clave: Tuple, datos: bytes, maximo: int):
+        with self._lock:
+            self._tickets[clave] = datos
+            self._tickets.move_to_end(clave)
+            while len(self._tickets) > maximo:
+                self._tickets.popitem(last=False)
+
+    def invalidar(self):
+        with self._lock:
+            self._tickets.clear()
+
+
+cache = _CacheTickets()
+
+
+def ticket_pedido(pedido: Pedido, tipo: str = TICKET) -> bytes:
+    """Bytes ESC/POS del ticket o comanda del pedido, desde la caché si el pedido no cambió."""
+    config = current_app.config
+    ancho = config.get('TICKETS_ANCHO', ANCHO_DEFAULT)
+    negocio = _datos_negocio() if tipo == TICKET else None
+    clave = (db.engine.url.render_as_string(hide_password=True), tipo, pedido.id, version_pedido(pedido), ancho, negocio)
+    datos = cache.obtener(clave)
+    if datos is None:
+        datos = render_ticket(pedido, negocio, ancho) if tipo == TICKET else render_comanda(pedido, ancho)
+        cache.guardar(clave, datos, config.get('TICKETS_CACHE_MAX', CACHE_MAX_DEFAULT))
+    return datos
+
+
+def imprimir_pedido(pedido: Pedido, tipo: str = TICKET, usuario_id: Optional[int] = None) -> Optional[TrabajoImpresion]:
+    """
+    Encola el ticket (IMPRESORA_TICKETS) o la comanda (IMPRESORA_COMANDAS) del pedido a nombre de usuario_id.
+
+    Returns:
+        El trabajo de impresión, o None si no hay impresora configurada o falló el renderizado.
+    """
+    try:
+        datos = ticket_pedido(pedido, tipo)
+    except Exception as e:
+        print(f"Error al generar {tipo} ESC/POS del pedido {pedido.id}: {e}")
+        return None
+    clave_destino = 'IMPRESORA_COMANDAS' if tipo == COMANDA else 'IMPRESORA_TICKETS'
+    return cola.encolar(
+        datos, descripcion=f'{tipo} {format_pedido_folio(pedido)}', clave_destino=clave_destino, usuario_id=usuario_id
+    )
@@ -0,0 +1,104 @@
+# Archivo: PolleriaMontiel\app\productos\cache_precios.py
+
+"""
+Caché en memoria de los tramos de precio (tabla `precios`) para la venta rápida de mostrador.
+
+`_get_precio_aplicable` hace 1-3 consultas por línea (cliente, tramos y precio base). La tabla de
+precios es pequeña y cambia poco, así que se carga completa en una sola consulta y se resuelve en
+Python con la misma regla: el tramo vigente con mayor `cantidad_minima_kg` que cubra la cantidad y,
+si no hay, el precio base (cantidad mínima 0).
+
+    - Se invalida al crear/actualizar/eliminar precios en este proceso (app/productos/services.py).
+    - Los demás procesos ven el cambio al vencer PRECIOS_CACHE_TTL segundos.
+    - Solo guarda tuplas de valores, nunca objetos del ORM (no quedan ligados a una sesión).
+"""
+
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Precio
+
+TTL_DEFAULT = 60
+
+# (tipo_cliente, producto_id, subproducto_id) -> [(cantidad_minima_kg, precio_kg, inicio, fin)], mayor cantidad primero
+Tramos = Dict[Tuple[str, Optional[str], Optional[int]], List[Tuple[Decimal, Decimal, Optional[date], Optional[date]]]]
+
+
+class CachePrecios:
+    """Tramos de precio activos por base de datos, recargados cada `ttl` segundos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tramos: Dict[str, Tuple[float, Tramos]] = {} # url del motor -> (cargado_en, tramos)
+
+    def _cargar(self) -> Tramos:
+        filas = db.session.execute(
+            select(
+                Precio.tipo_cliente, Precio.producto_id, Precio.subproducto_id,
+                Precio.cantidad_minima_kg, Precio.precio_kg,
+                Precio.fecha_inicio_vigencia, Precio.fecha_fin_vigencia
+            ).where(Precio.activo == True).order_by(Precio.cantidad_minima_kg.desc())
+        ).all()
+        tramos: Tramos = {}
+        for tipo_cliente, producto_id, subproducto_id, minima, precio_kg, inicio, fin in filas:
+            clave = (tipo_cliente.value, producto_id, subproducto_id)
+            tramos.setdefault(clave, []).append((Decimal(str(minima)), Decimal(str(precio_kg)), inicio, fin))
+        return tramos
+
+    def tramos(self, ttl: int) -> Tramos:
+        clave = db.engine.url.render_as_string(hide_password=True)
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._tramos.get(clave)
+            if entrada is None or ahora - entrada[0] > ttl:
+                entrada = self._tramos[clave] = (ahora, self._cargar())
+            return entrada[1]
+
+    def invalidar(self):
+        """Descarta los tramos en memoria; la siguiente consulta recarga la tabla."""
+        with self._lock:
+            self._tramos.clear()
+
+
+cache = CachePrecios()
+
+
+def precio_aplicable(
+    tipo_cliente_value: str,
+    cantidad: Decimal,
+    producto_id: Optional[str] = None,
+    subproducto_id: Optional[int] = None
+) -> Optional[Decimal]:
+    """
+    Precio por kg para el producto O subproducto, tipo de cliente y cantidad, desde la caché.
+    Misma regla que `_get_precio_aplicable` de pedidos. Retorna None si no hay precio.
+    """
+    ttl = current_app.config.get('PRECIOS_CACHE_TTL', TTL_DEFAULT)
+    tramos = cache.tramos(ttl).get((tipo_cliente_value, producto_id if producto_id else None,
+                                    None if producto_id else subproducto_id))
+    if not tramos:
+        return None
+
+    hoy = date.today()
+    for minima, precio_kg, inicio, fin in tramos:
+        vigente = (inicio is None or inicio <= hoy) and (fin is None or fin >= hoy)
+        if vigente and cantidad >= minima:
+            return precio_kg
+
+    # Precio base (cantidad mínima 0) como respaldo, igual que la consulta original
+    for minima, precio_kg, _, _ in tramos:
+        if minima == Decimal('0.0'):
+            return precio_kg
+    return None
+
+
+def invalidar():
+    """Invalida la caché de precios de este proceso (llamar tras confirmar cambios en precios)."""
+    cache.invalidar()
@@ -11,6 +11,8 @@ from decimal import Decimal # Importar Decimal para cálculos monetarios y canti
 from datetime import date # Importar date para vigencia de precios
 from sqlalchemy.exc import IntegrityError # Para manejar errores de unicidad, FK, etc.
 from sqlalchemy import or_, and_ # Para consultas complejas
+from app.utils.db_routing import solo_lectura # Lecturas de listados hacia la réplica
+from app.productos import cache_precios # Caché de tramos de precio de la venta rápida
 
 # --- Funciones de Ayuda Internas ---
 
@@ -129,6 +131,7 @@ def get_producto_by_id(producto_id: str) -> Optional[Producto]:
     """Obtiene un producto por su ID (código)."""
     return Producto.query.get(producto_id)
 
+@solo_lectura
 def get_all_productos(page: int = 1, per_page: int = 10, include_inactive: bool = False):
     """Obtiene todos los productos con paginación."""
     query = Producto.query.order_by(Producto.nombre.asc())
@@ -136,13 +139,17 @@ def get_all_productos(page: int = 1, per_page: int = 10, include_inactive: bool
         query = query.filter_by(activo=True)
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
-def search_productos(query: str, page: int = 1, per_page: int = 10):
-    """Busca productos por código o nombre."""
+@solo_lectura
+def search_productos(query: str, page: int = 1, per_page: int = 10, include_inactive: bool = True):
+    """Busca productos por código o nombre. Con include_inactive=False omite los inactivos (toma de pedidos)."""
     search_term = f"%{query}%"
     query = Producto.query.filter(
         (Producto.id.ilike(search_term)) |
         (Producto.nombre.ilike(search_term))
-    ).order_by(Producto.nombre.asc())
+    )
+    if not include_inactive:
+        query = query.filter(Producto.activo == True)
+    query = query.order_by(Producto.nombre.asc())
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
 
@@ -271,6 +278,7 @@ def get_subproducto_by_id(subproducto_id: int) -> Optional[Subproducto]:
     """Obtiene un subproducto por su ID."""
     return Subproducto.query.get(subproducto_id)
 
+@solo_lectura
 def get_all_subproductos(page: int = 1, per_page: int = 10, include_inactive: bool = False):
     """Obtiene todos los subproductos con paginación."""
     query = Subproducto.query.order_by(Subproducto.nombre.asc())
@@ -278,13 +286,17 @@ def get_all_subproductos(page: int = 1, per_page: int = 10, include_inactive: bo
         query = query.filter_by(activo=True)
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
-def search_subproductos(query: str, page: int = 1, per_page: int = 10):
-    """Busca subproductos por código o nombre."""
+@solo_lectura
+def search_subproductos(query: str, page: int = 1, per_page: int = 10, include_inactive: bool = True):
+    """Busca subproductos por código o nombre. Con include_inactive=False omite los inactivos (toma de pedidos)."""
     search_term = f"%{query}%"
     query = Subproducto.query.filter(
         (Subproducto.codigo_subprod.ilike(search_term)) |
         (Subproducto.nombre.ilike(search_term))
-    ).order_by(Subproducto.nombre.asc())
+    )
+    if not include_inactive:
+        query = query.filter(Subproducto.activo == True)
+    query = query.order_by(Subproducto.nombre.asc())
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
 
@@ -427,6 +439,7 @@ def get_modificacion_by_id(modificacion_id: int) -> Optional[Modificacion]:
     """Obtiene una modificación por su ID."""
     return Modificacion.query.get(modificacion_id)
 
+@solo_lectura
 def get_all_modificaciones(page: int = 1, per_page: int = 10, include_inactive: bool = False):
     """Obtiene todas las modificaciones con paginación."""
     query = Modificacion.query.order_by(Modificacion.nombre.asc())
@@ -434,6 +447,7 @@ def get_all_modificaciones(page: int = 1, per_page: int = 10, include_inactive:
         query = query.filter_by(activo=True)
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
+@solo_lectura
 def search_modificaciones(query: str, page: int = 1, per_page: int = 10):
     """Busca modificaciones por código o nombre."""
     search_term = f"%{query}%"
@@ -598,6 +612,7 @@ def create_precio(
         )
         db.session.add(precio)
         db.session.commit()
+        cache_precios.invalidar()
         return precio
     except ValueError as e:
         db.session.rollback()
@@ -616,6 +631,7 @@ def get_precio_by_id(precio_id: int) -> Optional[Precio]:
     """Obtiene un registro de precio por su ID."""
     return Precio.query.get(precio_id)
 
+@solo_lectura
 def get_all_precios(page: int = 1, per_page: int = 10, include_inactive: bool = False):
     """Obtiene todos los registros de precios con paginación."""
     query = Precio.query.order_by(Precio.tipo_cliente.asc(), Precio.cantidad_minima_kg.asc())
@@ -681,6 +697,7 @@ def update_precio(
             precio.activo = activo
 
         db.session.commit()
+        cache_precios.invalidar()
         return precio
     except ValueError as e:
         db.session.rollback()
@@ -710,6 +727,7 @@ def delete_precio(precio_id: int) -> bool:
         # guardan el precio al momento de la venta y no dependen de este registro después.
         db.session.delete(precio)
         db.session.commit()
+        cache_precios.invalidar()
         return True
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,446 @@
+# Archivo: PolleriaMontiel\app\seed_scale.py
+
+"""
+Generador de datos sintéticos a gran escala (ej. un año de operación, 1M de pedidos).
+
+Complementa a seed.py (catálogo estático): simula día por día la operación de la pollería
+(clientes con teléfonos y direcciones, pedidos de mostrador y domicilio con ítems y PAs,
+pagos con sus movimientos de caja y denominaciones, y un corte por cajero por día).
+
+Para que termine en minutos y no en horas:
+    - Las filas se construyen como diccionarios y se insertan con Core (executemany), sin ORM.
+    - Los IDs se asignan en Python (max(id) + 1) para enlazar FKs sin leer de vuelta.
+    - Se inserta y se hace commit por lotes de `chunk_size` filas.
+El RNG usa una semilla fija: misma semilla + mismos parámetros = mismos datos.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from app import db
+from app.models import (
+    Usuario, Cliente, Telefono, Direccion, Producto, Precio,
+    Pedido, PedidoItem, ProductoAdicional,
+    MovimientoCaja, MovimientoDenominacion, CorteCaja, DenominacionCorteCaja, ConfiguracionSistema,
+    RolUsuario, TipoCliente, TipoTelefono, TipoDireccion, TipoVenta, FormaPago,
+    EstadoPedido, TipoMovimientoCaja, EstadoCorteCaja
+)
+from app.caja.registro_cortes import registro as registro_cortes
+from app.utils.kpis_dia import kpis as kpis_dia
+from app.utils.folios import reservar_bloque
+from app.utils.helpers import format_pedido_folio
+
+# Catálogo mínimo que se crea si la BD no tiene productos (precio público por kg)
+PRODUCTOS_BASE = [
+    ('PECH', 'Pechuga de Pollo', 'POLLO_CRUDO', Decimal('120.00')),
+    ('AL', 'Alas de Pollo', 'POLLO_CRUDO', Decimal('95.00')),
+    ('PIER', 'Pierna de Pollo', 'POLLO_CRUDO', Decimal('85.00')),
+    ('MUS', 'Muslo de Pollo', 'POLLO_CRUDO', Decimal('80.00')),
+    ('POLLO', 'Pollo Entero', 'POLLO_CRUDO', Decimal('70.00')),
+    ('HIG', 'Hígado de Pollo', 'POLLO_CRUDO', Decimal('45.00')),
+]
+
+PRODUCTOS_ADICIONALES = [
+    ('Tortillas', 'kg', 2400), ('Refresco 2L', 'pieza', 3800), ('Salsa', 'pieza', 1500),
+    ('Limones', 'kg', 3000), ('Crema', 'pieza', 2800), ('Queso fresco', 'kg', 12000),
+]
+
+NOMBRES = ['Juan', 'María', 'José', 'Guadalupe', 'Luis', 'Ana', 'Carlos', 'Rosa', 'Miguel', 'Laura',
+           'Jorge', 'Patricia', 'Pedro', 'Elena', 'Ricardo', 'Sofía', 'Fernando', 'Claudia', 'Raúl', 'Verónica']
+APELLIDOS = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+             'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Reyes', 'Jiménez', 'Torres', 'Díaz']
+COLONIAS = ['Centro', 'San Juan', 'La Joya', 'El Carmen', 'Las Flores', 'Jardines', 'Reforma', 'Lomas',
+            'Santa Cruz', 'El Mirador', 'Los Pinos', 'Valle Verde']
+
+# Distribución de tipos de cliente (la mayoría público)
+TIPOS_CLIENTE_PESOS = [
+    (TipoCliente.PUBLICO, 70), (TipoCliente.LEAL, 12), (TipoCliente.COCINA, 8),
+    (TipoCliente.MAYOREO, 5), (TipoCliente.ALIADO, 3), (TipoCliente.EMPLEADO, 2),
+]
+FORMAS_PAGO_MOSTRADOR = [
+    (FormaPago.EFECTIVO, 65), (FormaPago.TARJETA_DEBITO, 15), (FormaPago.TARJETA_CREDITO, 5),
+    (FormaPago.TRANSFERENCIA_BANCARIA, 8), (FormaPago.QR_PAGO, 5), (FormaPago.CREDITO_INTERNO, 2),
+]
+FORMAS_PAGO_DOMICILIO = [
+    (FormaPago.EFECTIVO_CONTRA_ENTREGA, 60), (FormaPago.TRANSFERENCIA_BANCARIA, 25), (FormaPago.TARJETA_DEBITO, 15),
+]
+# Estados de pedidos de días anteriores (ya terminados)
+ESTADOS_HISTORICOS = [
+    (EstadoPedido.ENTREGADO_Y_PAGADO, 90), (EstadoPedido.PAGADO, 6),
+    (EstadoPedido.CANCELADO_POR_CLIENTE, 3), (EstadoPedido.CANCELADO_POR_NEGOCIO, 1),
+]
+# Estados posibles de pedidos del último día (todavía en curso)
+ESTADOS_EN_CURSO = [
+    EstadoPedido.PENDIENTE_PREPARACION, EstadoPedido.EN_PREPARACION, EstadoPedido.LISTO_PARA_ENTREGA,
+    EstadoPedido.ASIGNADO_A_REPARTIDOR, EstadoPedido.EN_RUTA, EstadoPedido.ENTREGADO_PENDIENTE_PAGO,
+]
+ESTADOS_PAGADOS = (EstadoPedido.ENTREGADO_Y_PAGADO, EstadoPedido.PAGADO)
+
+# Denominaciones MXN en centavos, de mayor a menor (billete y moneda de $20 cuentan igual)
+DENOMINACIONES_CENTAVOS = [100000, 50000, 20000, 10000, 5000, 2000, 1000, 500, 200, 100, 50]
+SALDO_INICIAL_CENTAVOS = 100000 # $1,000.00 de fondo de caja por turno
+COSTO_ENVIO_CENTAVOS = 2000
+
+CHUNK_SIZE_DEFAULT = 5000
+
+
+def _dinero(centavos: int) -> Decimal:
+    """Convierte centavos (int) a Decimal con 2 decimales."""
+    return Decimal(centavos).scaleb(-2)
+
+
+def _desglosar(centavos: int) -> Dict[int, int]:
+    """Desglose voraz de un monto en denominaciones MXN (centavos -> cantidad)."""
+    desglose = {}
+    for valor in DENOMINACIONES_CENTAVOS:
+        cantidad, centavos = divmod(centavos, valor)
+        if cantidad:
+            desglose[valor] = cantidad
+    return desglose
+
+
+class _Lotes:
+    """
+    Acumula filas por tabla y las inserta en orden de dependencias.
+    Solo se vacía en puntos seguros (fin de cliente o de día) para que ninguna fila llegue
+    a la BD antes que la fila a la que referencia (ej. un movimiento antes de su corte).
+    """
+
+    # Orden de inserción respetando FKs
+    ORDEN = (Cliente, Telefono, Direccion, CorteCaja, DenominacionCorteCaja, Pedido, PedidoItem,
+             ProductoAdicional, MovimientoCaja, MovimientoDenominacion)
+
+    def __init__(self, conn, chunk_size: int):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.filas: Dict[type, List[dict]] = {model: [] for model in self.ORDEN}
+        self.pendientes = 0
+        self.totales: Dict[str, int] = {model.__tablename__: 0 for model in self.ORDEN}
+
+    def agregar(self, model, fila: dict):
+        self.filas[model].append(fila)
+        self.pendientes += 1
+
+    def vaciar_si_lleno(self):
+        if self.pendientes >= self.chunk_size:
+            self.vaciar()
+
+    def vaciar(self):
+        for model in self.ORDEN:
+            filas = self.filas[model]
+            if not filas:
+                continue
+            # executemany requiere las mismas columnas en todas las filas del grupo
+            grupos: Dict[tuple, List[dict]] = {}
+            for fila in filas:
+                grupos.setdefault(tuple(fila), []).append(fila)
+            for grupo in grupos.values():
+                self.conn.execute(model.__table__.insert(), grupo)
+            self.totales[model.__tablename__] += len(filas)
+            self.filas[model] = []
+        self.conn.commit()
+        self.pendientes = 0
+
+
+def _siguiente_id(conn, model) -> int:
+    return (conn.execute(db.select(db.func.max(model.id))).scalar() or 0) + 1
+
+
+def _asegurar_catalogo() -> Dict[str, int]:
+    """Crea el catálogo base si no hay productos. Retorna {producto_id: precio_publico_centavos}."""
+    if not Producto.query.first():
+        for codigo, nombre, categoria, precio in PRODUCTOS_BASE:
+            db.session.add(Producto(id=codigo, nombre=nombre, categoria=categoria))
+            db.session.add(Precio(producto_id=codigo, tipo_cliente=TipoCliente.PUBLICO, precio_kg=precio,
+                                  cantidad_minima_kg=Decimal('0.000')))
+        db.session.commit()
+
+    precios = {}
+    for producto in Producto.query.filter_by(activo=True).all():
+        precio = Precio.query.filter_by(producto_id=producto.id, tipo_cliente=TipoCliente.PUBLICO, activo=True) \
+            .order_by(Precio.cantidad_minima_kg.asc()).first()
+        precios[producto.id] = int(precio.precio_kg * 100) if precio else 10000
+    return precios
+
+
+def _asegurar_usuarios(prefijo: str, rol: RolUsuario, cantidad: int) -> List[int]:
+    """Crea (si no existen) usuarios '<prefijo>_<n>' con el rol dado. Retorna sus IDs."""
+    ids = []
+    for n in range(1, cantidad + 1):
+        username = f'{prefijo}_{n}'
+        usuario = Usuario.query.filter_by(username=username).first()
+        if not usuario:
+            usuario = Usuario(username=username, nombre_completo=f'{rol.value.title()} Sintético {n}', rol=rol)
+            usuario.set_password(username) # Solo para datos de prueba
+            db.session.add(usuario)
+            db.session.flush()
+        ids.append(usuario.id)
+    db.session.commit()
+    return ids
+
+
+def seed_scale_data(
+    pedidos: int = 10000,
+    clientes: Optional[int] = None,
+    dias: int = 365,
+    cajeros: int = 2,
+    repartidores: int = 3,
+    semilla: int = 42,
+    hasta: Optional[date] = None,
+    chunk_size: int = CHUNK_SIZE_DEFAULT,
+    progreso: Optional[Callable[[str], None]] = None
+) -> Dict[str, int]:
+    """
+    Genera `pedidos` pedidos repartidos en `dias` días que terminan en `hasta` (hoy por defecto).
+
+    Args:
+        pedidos: Total de pedidos a generar.
+        clientes: Clientes registrados (por defecto pedidos // 10, mínimo 100).
+        dias: Días de operación simulados.
+        cajeros: Cajeros (un corte de caja por cajero por día).
+        repartidores: Repartidores para pedidos a domicilio.
+        semilla: Semilla del RNG (resultados reproducibles).
+        hasta: Último día simulado; sus pedidos pueden quedar en estados activos.
+        chunk_size: Filas por lote de inserción/commit.
+        progreso: Función opcional que recibe mensajes de avance.
+
+    Returns:
+        Diccionario {nombre_tabla: filas_insertadas}.
+    """
+    rng = random.Random(semilla)
+    avisar = progreso or (lambda mensaje: None)
+    hasta = hasta or date.today()
+    dias = max(1, dias)
+    clientes = clientes if clientes is not None else max(100, pedidos // 10)
+
+    if not ConfiguracionSistema.query.get(1):
+        db.session.add(ConfiguracionSistema(id=1))
+        db.session.commit()
+    precios = _asegurar_catalogo()
+    codigos_productos = list(precios)
+    nombres_productos = {p.id: p.nombre for p in Producto.query.all()}
+    ids_cajeros = _asegurar_usuarios('scale_cajero', RolUsuario.CAJERO, max(1, cajeros))
+    ids_repartidores = _asegurar_usuarios('scale_repartidor', RolUsuario.REPARTIDOR, max(1, repartidores))
+
+    tipos_cliente, pesos_tipos = zip(*TIPOS_CLIENTE_PESOS)
+    formas_mostrador, pesos_mostrador = zip(*FORMAS_PAGO_MOSTRADOR)
+    formas_domicilio, pesos_domicilio = zip(*FORMAS_PAGO_DOMICILIO)
+    estados_hist, pesos_hist = zip(*ESTADOS_HISTORICOS)
+    desglose_saldo_inicial = {20000: 3, 10000: 3, 5000: 2} # $1,000.00
+
+    # Folios de todos los pedidos en una sola reserva (mismo contador que usa create_pedido)
+    primer_folio, _ = reservar_bloque(pedidos) if pedidos > 0 else (None, None)
+
+    with db.engine.connect() as conn:
+        lotes = _Lotes(conn, chunk_size)
+        siguiente = {model: _siguiente_id(conn, model) for model in (Cliente, Pedido, MovimientoCaja, CorteCaja)}
+        primera_direccion = _siguiente_id(conn, Direccion)
+        primer_telefono = _siguiente_id(conn, Telefono)
+
+        # --- Clientes con teléfono y dirección principal ---
+        primer_cliente = siguiente[Cliente]
+        inicio_historial = datetime.combine(hasta - timedelta(days=dias - 1), time(0, 0))
+        for n in range(clientes):
+            lotes.agregar(Cliente, dict(
+                id=primer_cliente + n, nombre=rng.choice(NOMBRES),
+                apellidos=f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}', alias=f'SC{semilla}-{n:07d}',
+                tipo_cliente=rng.choices(tipos_cliente, pesos_tipos)[0],
+                fecha_registro=inicio_historial + timedelta(minutes=rng.randrange(dias * 1440)), activo=True
+            ))
+            lotes.agregar(Telefono, dict(
+                id=primer_telefono + n, cliente_id=primer_cliente + n,
+                numero_telefono=f'55{rng.randrange(10**7, 10**8)}', tipo_telefono=TipoTelefono.CELULAR, es_principal=True
+            ))
+            lotes.agregar(Direccion, dict(
+                id=primera_direccion + n, cliente_id=primer_cliente + n,
+                calle_numero=f'Calle {rng.randint(1, 400)} #{rng.randint(1, 999)}', colonia=rng.choice(COLONIAS),
+                ciudad='Montiel', codigo_postal=f'{rng.randint(10000, 99999)}', tipo_direccion=TipoDireccion.CASA,
+                es_principal=True
+            ))
+            lotes.vaciar_si_lleno()
+        avisar(f'Clientes generados: {clientes}')
+
+        # --- Operación día por día ---
+        por_dia, sobrante = divmod(pedidos, dias)
+        siguiente_pedido = siguiente[Pedido]
+        siguiente_mov = siguiente[MovimientoCaja]
+        siguiente_corte = siguiente[CorteCaja]
+
+        for d in range(dias):
+            dia = hasta - timedelta(days=dias - 1 - d)
+            es_ultimo_dia = d == dias - 1
+            apertura = datetime.combine(dia, time(8, 0))
+            cierre = datetime.combine(dia, time(21, 0))
+
+            # Un corte por cajero; sus totales se acumulan durante el día
+            cortes = {}
+            for cajero_id in ids_cajeros:
+                cortes[cajero_id] = {'id': siguiente_corte, 'efectivo': 0, 'egresos': 0, 'tarjeta': 0, 'transfer': 0, 'otros': 0}
+                lotes.agregar(MovimientoCaja, dict(
+                    id=siguiente_mov, usuario_id=cajero_id, corte_caja_id=siguiente_corte,
+                    tipo_movimiento=TipoMovimientoCaja.INGRESO, motivo_movimiento='Saldo Inicial Caja',
+                    monto_movimiento=_dinero(SALDO_INICIAL_CENTAVOS), forma_pago_efectuado=FormaPago.SALDO_INICIAL_CAJA,
+                    notas_movimiento='Registro automático de saldo inicial al abrir caja.', fecha_movimiento=apertura
+                ))
+                for valor, cantidad in desglose_saldo_inicial.items():
+                    lotes.agregar(MovimientoDenominacion, dict(
+                        movimiento_caja_id=siguiente_mov, denominacion_valor=_dinero(valor), cantidad=cantidad
+                    ))
+                siguiente_mov += 1
+                siguiente_corte += 1
+
+            pedidos_dia = por_dia + (1 if d < sobrante else 0)
+            # Horas de venta ordenadas para que los IDs crezcan con la fecha, como en producción
+            minutos = sorted(rng.randrange(0, 12 * 60) for _ in range(pedidos_dia))
+            for minuto in minutos:
+                pid = siguiente_pedido
+                folio = primer_folio + (pid - siguiente[Pedido])
+                siguiente_pedido += 1
+                fecha = apertura + timedelta(minutes=minuto, seconds=rng.randrange(60))
+                cajero_id = rng.choice(ids_cajeros)
+                domicilio = rng.random() < 0.35
+                cliente_n = rng.randrange(clientes) if clientes and (domicilio or rng.random() < 0.25) else None
+                if cliente_n is None:
+                    domicilio = False
+
+                # Ítems de pollo
+                subtotal_pollo = 0
+                for _ in range(rng.choices((1, 2, 3, 4), (40, 30, 20, 10))[0]):
+                    codigo = rng.choice(codigos_productos)
+                    gramos = rng.randrange(250, 5001, 50)
+                    precio = precios[codigo]
+                    subtotal = (gramos * precio + 500) // 1000 # Redondeo a centavos
+                    subtotal_pollo += subtotal
+                    lotes.agregar(PedidoItem, dict(
+                        pedido_id=pid, producto_id=codigo, descripcion_item_venta=nombres_productos.get(codigo, codigo),
+                        cantidad=Decimal(gramos).scaleb(-3), unidad_medida='kg', precio_unitario_venta=_dinero(precio),
+                        subtotal_item=_dinero(subtotal)
+                    ))
+
+                # Productos adicionales (principalmente en domicilio)
+                subtotal_pas = 0
+                if rng.random() < (0.35 if domicilio else 0.1):
+                    for _ in range(rng.randint(1, 3)):
+                        nombre_pa, unidad, precio_pa = rng.choice(PRODUCTOS_ADICIONALES)
+                        subtotal_pas += precio_pa
+                        lotes.agregar(ProductoAdicional, dict(
+                            pedido_id=pid, nombre_pa=nombre_pa, cantidad_pa=Decimal('1.000'), unidad_medida_pa=unidad,
+                            costo_compra_unitario_pa=_dinero(precio_pa * 8 // 10), precio_venta_unitario_pa=_dinero(precio_pa),
+                            subtotal_pa=_dinero(precio_pa)
+                        ))
+
+                costo_envio = COSTO_ENVIO_CENTAVOS if domicilio else 0
+                total = subtotal_pollo + subtotal_pas + costo_envio
+
+                if domicilio:
+                    forma = rng.choices(formas_domicilio, pesos_domicilio)[0]
+                else:
+                    forma = rng.choices(formas_mostrador, pesos_mostrador)[0]
+                if es_ultimo_dia and rng.random() < 0.3:
+                    estado = rng.choice(ESTADOS_EN_CURSO)
+                else:
+                    estado = rng.choices(estados_hist, pesos_hist)[0]
+                    if estado == EstadoPedido.PAGADO and not domicilio:
+                        estado = EstadoPedido.ENTREGADO_Y_PAGADO
+
+                pagado = estado in ESTADOS_PAGADOS
+                efectivo = forma in (FormaPago.EFECTIVO, FormaPago.EFECTIVO_CONTRA_ENTREGA)
+                paga_con = cambio = None
+                paga_con_centavos = 0
+                if pagado and efectivo:
+                    redondeo = rng.choice((100, 5000, 10000, 50000)) # Paga exacto o con billete más grande
+                    paga_con_centavos = -(-total // redondeo) * redondeo
+                    paga_con, cambio = _dinero(paga_con_centavos), _dinero(paga_con_centavos - total)
+
+                lotes.agregar(Pedido, dict(
+                    id=pid, folio=folio, cliente_id=primer_cliente + cliente_n if cliente_n is not None else None,
+                    usuario_id=cajero_id, repartidor_id=rng.choice(ids_repartidores) if domicilio else None,
+                    direccion_entrega_id=primera_direccion + cliente_n if domicilio else None,
+                    tipo_venta=TipoVenta.DOMICILIO if domicilio else TipoVenta.MOSTRADOR, forma_pago=forma,
+                    paga_con=paga_con, cambio_entregado=cambio,
+                    subtotal_productos_pollo=_dinero(subtotal_pollo), subtotal_productos_adicionales=_dinero(subtotal_pas),
+                    descuento_aplicado=Decimal('0.00'), costo_envio=_dinero(costo_envio), total_pedido=_dinero(total),
+                    estado_pedido=estado, fecha_creacion=fecha, fecha_actualizacion=fecha + timedelta(minutes=rng.randint(5, 90)),
+                    requiere_factura=rng.random() < 0.02
+                ))
+
+                # Movimiento de caja del pago (el crédito interno no genera movimiento inmediato)
+                if not pagado or forma == FormaPago.CREDITO_INTERNO:
+                    continue
+                corte = cortes[cajero_id]
+                forma_mov = FormaPago.EFECTIVO if efectivo else forma
+                if efectivo:
+                    corte['efectivo'] += total
+                elif forma in (FormaPago.TARJETA_DEBITO, FormaPago.TARJETA_CREDITO):
+                    corte['tarjeta'] += total
+                elif forma == FormaPago.TRANSFERENCIA_BANCARIA:
+                    corte['transfer'] += total
+                else:
+                    corte['otros'] += total
+                motivo = 'Liquidación Repartidor' if forma == FormaPago.EFECTIVO_CONTRA_ENTREGA else \
+                    f"Venta Pedido {'Domicilio' if domicilio else 'Mostrador'}"
+                lotes.agregar(MovimientoCaja, dict(
+                    id=siguiente_mov, usuario_id=cajero_id, pedido_id=pid, corte_caja_id=corte['id'],
+                    tipo_movimiento=TipoMovimientoCaja.INGRESO, motivo_movimiento=f'{motivo} #{format_pedido_folio(folio)}',
+                    monto_movimiento=_dinero(total), forma_pago_efectuado=forma_mov, fecha_movimiento=fecha
+                ))
+                if efectivo:
+                    for valor, cantidad in _desglosar(paga_con_centavos).items():
+                        lotes.agregar(MovimientoDenominacion, dict(
+                            movimiento_caja_id=siguiente_mov, denominacion_valor=_dinero(valor), cantidad=cantidad
+                        ))
+                siguiente_mov += 1
+
+            # Gastos de caja ocasionales y cierre de cada corte
+            for cajero_id, corte in cortes.items():
+                if rng.random() < 0.3:
+                    gasto = rng.randrange(5000, 30001, 500)
+                    corte['egresos'] += gasto
+                    lotes.agregar(MovimientoCaja, dict(
+                        id=siguiente_mov, usuario_id=cajero_id, corte_caja_id=corte['id'],
+                        tipo_movimiento=TipoMovimientoCaja.EGRESO, motivo_movimiento='Compra de insumos',
+                        monto_movimiento=_dinero(gasto), forma_pago_efectuado=FormaPago.EFECTIVO,
+                        fecha_movimiento=cierre - timedelta(minutes=rng.randint(30, 600))
+                    ))
+                    siguiente_mov += 1
+
+                teorico = SALDO_INICIAL_CENTAVOS + corte['efectivo'] - corte['egresos']
+                diferencia = 0 if rng.random() < 0.9 else rng.choice((-1, 1)) * rng.randrange(100, 5001, 50)
+                contado = max(0, teorico + diferencia)
+                lotes.agregar(CorteCaja, dict(
+                    id=corte['id'], usuario_id_responsable=cajero_id, fecha_apertura_periodo=apertura,
+                    fecha_cierre_corte=cierre, saldo_inicial_efectivo_teorico=_dinero(SALDO_INICIAL_CENTAVOS),
+                    total_ingresos_efectivo_periodo=_dinero(corte['efectivo']),
+                    total_egresos_efectivo_periodo=_dinero(corte['egresos']),
+                    saldo_final_efectivo_teorico=_dinero(teorico), saldo_final_efectivo_contado=_dinero(contado),
+                    diferencia_efectivo=_dinero(contado - teorico),
+                    total_ingresos_tarjeta_periodo=_dinero(corte['tarjeta']),
+                    total_ingresos_transfer_periodo=_dinero(corte['transfer']),
+                    total_ingresos_otros_periodo=_dinero(corte['otros']),
+                    estado_corte=EstadoCorteCaja.CERRADO_CONCILIADO if contado == teorico else EstadoCorteCaja.CERRADO_CON_DIFERENCIA
+                ))
+                for valor, cantidad in _desglosar(contado).items():
+                    lotes.agregar(DenominacionCorteCaja, dict(
+                        corte_caja_id=corte['id'], denominacion_valor=_dinero(valor), cantidad_contada=cantidad,
+                        total_por_denominacion=_dinero(valor * cantidad)
+                    ))
+
+            lotes.vaciar_si_lleno()
+            if (d + 1) % 30 == 0 or es_ultimo_dia:
+                avisar(f'Día {d + 1}/{dias} ({dia.isoformat()}): {siguiente_pedido - siguiente[Pedido]} pedidos generados')
+
+        lotes.vaciar()
+
+        if conn.dialect.name == 'postgresql':
+            # Los IDs se asignaron explícitamente; ajustar las secuencias SERIAL
+            from app.utils.db_migration import _reiniciar_secuencias_postgres
+            for model in _Lotes.ORDEN:
+                _reiniciar_secuencias_postgres(conn, model.__table__)
+            conn.commit()
+
+    # Los cortes se insertaron sin los servicios de caja: que ningún proceso use su registro anterior
+    registro_cortes.invalidar()
+    kpis_dia.invalidar() # Solo este proceso; los demás recargan al vencer KPIS_DIA_TTL
+    return lotes.totales
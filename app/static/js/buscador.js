@@ -0,0 +1,137 @@
+// app/static/js/buscador.js
+// Autocompletado con peticiones AJAX para los formularios (clientes, productos, direcciones).
+//
+// - Espera a que el usuario deje de escribir (debounce) antes de consultar.
+// - Cancela con AbortController la petición anterior que siga en curso: la respuesta vieja
+//   nunca pisa a la nueva en redes lentas.
+// - Recuerda las respuestas por URL mientras la página esté abierta: volver a escribir lo mismo
+//   (o borrar una letra) no vuelve a consultar al servidor.
+
+(function (global) {
+    'use strict';
+
+    const MAX_RESPUESTAS = 100; // Respuestas recordadas por página (las más antiguas se descartan)
+    const respuestas = new Map(); // url -> JSON ya recibido
+
+    // GET de JSON con memoria por URL. Solo se recuerdan los datos ya recibidos, nunca la petición
+    // en curso: esa depende del AbortController de quien la lanzó y se puede cancelar.
+    function obtenerJSON(url, signal) {
+        if (respuestas.has(url)) {
+            const guardada = respuestas.get(url);
+            respuestas.delete(url); // Reinsertar: queda como la más reciente
+            respuestas.set(url, guardada);
+            return Promise.resolve(guardada);
+        }
+        return fetch(url, {
+            signal: signal,
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest' }
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        }).then(function (datos) {
+            respuestas.set(url, datos);
+            if (respuestas.size > MAX_RESPUESTAS) {
+                respuestas.delete(respuestas.keys().next().value);
+            }
+            return datos;
+        });
+    }
+
+    function esCancelacion(error) {
+        return error && error.name === 'AbortError';
+    }
+
+    // Conecta un input de texto con su lista de resultados.
+    //   opciones.input, opciones.resultados: elementos del DOM
+    //   opciones.url(texto): URL a consultar
+    //   opciones.texto(dato): texto de cada resultado
+    //   opciones.alSeleccionar(dato): al hacer clic en un resultado
+    //   opciones.minimo (3 caracteres), opciones.espera (300 ms)
+    function crearBuscador(opciones) {
+        const input = opciones.input;
+        const resultados = opciones.resultados;
+        const minimo = opciones.minimo || 3;
+        const espera = opciones.espera || 300;
+        let temporizador = null;
+        let controlador = null;
+
+        function ocultar() {
+            resultados.style.display = 'none';
+        }
+
+        function mostrar(datos) {
+            resultados.innerHTML = '';
+            if (!Array.isArray(datos) || datos.length === 0) {
+                ocultar();
+                return;
+            }
+            datos.forEach(function (dato) {
+                const div = document.createElement('div');
+                div.classList.add('search-result-item');
+                div.textContent = opciones.texto(dato);
+                div.addEventListener('click', function () {
+                    ocultar();
+                    opciones.alSeleccionar(dato);
+                });
+                resultados.appendChild(div);
+            });
+            resultados.style.display = 'block';
+        }
+
+        function buscar(texto) {
+            if (controlador) {
+                controlador.abort();
+            }
+            controlador = new AbortController();
+            obtenerJSON(opciones.url(texto), controlador.signal)
+                .then(function (datos) {
+                    if (input.value.trim() === texto) { // Ignorar respuestas de un texto que ya cambió
+                        mostrar(datos);
+                    }
+                })
+                .catch(function (error) {
+                    if (!esCancelacion(error)) {
+                        console.error('Error en la búsqueda:', error);
+                        ocultar();
+                    }
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(temporizador);
+            const texto = input.value.trim();
+            if (texto.length < minimo) {
+                if (controlador) {
+                    controlador.abort();
+                }
+                ocultar();
+                return;
+            }
+            temporizador = setTimeout(function () { buscar(texto); }, espera);
+        });
+
+        // Ocultar resultados al hacer clic fuera
+        document.addEventListener('click', function (event) {
+            if (!input.contains(event.target) && !resultados.contains(event.target)) {
+                ocultar();
+            }
+        });
+
+        return { ocultar: ocultar };
+    }
+
+    function formatoMoneda(valor) {
+        const numero = parseFloat(valor);
+        if (valor === null || isNaN(numero)) return '$0.00';
+        return '$' + numero.toFixed(2).replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+    }
+
+    global.SGPM = global.SGPM || {};
+    global.SGPM.obtenerJSON = obtenerJSON;
+    global.SGPM.esCancelacion = esCancelacion;
+    global.SGPM.crearBuscador = crearBuscador;
+    global.SGPM.formatoMoneda = formatoMoneda;
+})(window);
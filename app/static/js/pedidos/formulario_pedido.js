@@ -0,0 +1,229 @@
+// app/static/js/pedidos/formulario_pedido.js
+// Formulario de crear/editar pedido: búsqueda de cliente, direcciones de entrega, búsqueda de
+// producto con sus modificaciones, campos de pago en efectivo y, al editar, alta/baja de ítems y PAs.
+//
+// Las URLs y datos de la página vienen en atributos data-* del formulario (data-formulario-pedido),
+// así este archivo es estático y el navegador lo guarda en caché. Requiere buscador.js.
+
+document.addEventListener('DOMContentLoaded', function () {
+    'use strict';
+
+    const form = document.querySelector('[data-formulario-pedido]');
+    if (!form || !window.SGPM) return;
+    const SGPM = window.SGPM;
+    const urls = form.dataset;
+
+    const clienteSearchInput = document.getElementById('cliente_search');
+    const clienteSearchResults = document.getElementById('cliente_search_results');
+    const clienteIdInput = document.getElementById('cliente_id');
+    const clienteSelectedInfo = document.getElementById('cliente_selected_info');
+    const direccionEntregaSelect = document.getElementById('direccion_entrega_id');
+    const productoSearchInput = document.getElementById('producto_search');
+    const productoSearchResults = document.getElementById('producto_search_results');
+    const productoIdInput = document.getElementById('producto_id');
+    const subproductoIdInput = document.getElementById('subproducto_id');
+    const modificacionSelect = document.getElementById('modificacion_id');
+    const formaPagoSelect = document.getElementById('forma_pago');
+    const efectivoFields = document.getElementById('efectivo-fields');
+    const pagaConInput = document.getElementById('paga_con');
+    const cambioEntregadoDisplay = document.getElementById('cambio_entregado_display');
+    const totalPedidoDisplay = document.getElementById('total_pedido_display');
+
+    function titulo(valor) {
+        return (valor || '').replace(/_/g, ' ').toLowerCase().replace(/\b\w/g, function (letra) { return letra.toUpperCase(); });
+    }
+
+    function conId(plantilla, id) {
+        return plantilla.replace('__id__', encodeURIComponent(id));
+    }
+
+    // --- Direcciones del cliente ---
+
+    function llenarDirecciones(direcciones) {
+        const actual = parseInt(urls.direccionActual, 10); // Al editar: la dirección guardada del pedido
+        direccionEntregaSelect.innerHTML = '<option value="">Seleccionar Dirección</option>';
+        if (!direcciones || direcciones.length === 0) {
+            const option = document.createElement('option');
+            option.value = '';
+            option.textContent = 'No hay direcciones registradas';
+            option.disabled = true;
+            direccionEntregaSelect.appendChild(option);
+            return;
+        }
+        direcciones.forEach(function (direccion) {
+            const option = document.createElement('option');
+            option.value = direccion.id;
+            option.textContent = `${direccion.calle_numero}, ${direccion.colonia || ''}, ${direccion.ciudad} (${titulo(direccion.tipo)})`;
+            option.selected = isNaN(actual) ? direccion.principal : direccion.id === actual;
+            direccionEntregaSelect.appendChild(option);
+        });
+    }
+
+    function cargarDirecciones(clienteId) {
+        if (!direccionEntregaSelect || !clienteId || !urls.urlDirecciones) return;
+        SGPM.obtenerJSON(conId(urls.urlDirecciones, clienteId))
+            .then(llenarDirecciones)
+            .catch(function (error) { console.error('Error cargando direcciones:', error); });
+    }
+
+    // --- Búsqueda de cliente ---
+
+    if (clienteSearchInput && clienteSearchResults && clienteIdInput && urls.urlClientes) {
+        SGPM.crearBuscador({
+            input: clienteSearchInput,
+            resultados: clienteSearchResults,
+            url: function (texto) { return urls.urlClientes + '?q=' + encodeURIComponent(texto); },
+            texto: function (cliente) { return cliente.text; },
+            alSeleccionar: function (cliente) {
+                const nombre = [cliente.nombre, cliente.apellidos].filter(Boolean).join(' ');
+                clienteSearchInput.value = nombre + (cliente.alias ? ` (${cliente.alias})` : '');
+                clienteIdInput.value = cliente.id;
+                if (clienteSelectedInfo) {
+                    clienteSelectedInfo.innerHTML = '';
+                    const etiqueta = document.createElement('strong');
+                    etiqueta.textContent = 'Cliente Seleccionado: ';
+                    clienteSelectedInfo.append(etiqueta, `${nombre} (${titulo(cliente.tipo_cliente)})`);
+                }
+                // La búsqueda ya trae las direcciones: no hace falta otra petición
+                if (direccionEntregaSelect) {
+                    llenarDirecciones(cliente.direcciones);
+                }
+            }
+        });
+
+        // Al editar un pedido con cliente, cargar sus direcciones
+        if (clienteIdInput.value) {
+            cargarDirecciones(clienteIdInput.value);
+        }
+    }
+
+    // --- Búsqueda de producto/subproducto y sus modificaciones ---
+
+    function cargarModificaciones(tipo, id) {
+        if (!modificacionSelect || !urls.urlModificaciones) return;
+        modificacionSelect.innerHTML = '<option value="">Seleccionar Modificación</option>';
+        const url = urls.urlModificaciones.replace('__tipo__', tipo).replace('__id__', encodeURIComponent(id));
+        SGPM.obtenerJSON(url)
+            .then(function (modificaciones) {
+                modificaciones.forEach(function (modificacion) {
+                    const option = document.createElement('option');
+                    option.value = modificacion.id;
+                    option.textContent = modificacion.text;
+                    modificacionSelect.appendChild(option);
+                });
+            })
+            .catch(function (error) { console.error('Error cargando modificaciones:', error); });
+    }
+
+    if (productoSearchInput && productoSearchResults && urls.urlProductos) {
+        SGPM.crearBuscador({
+            input: productoSearchInput,
+            resultados: productoSearchResults,
+            minimo: 2, // Los códigos de producto son cortos (ej. "PECH")
+            url: function (texto) { return urls.urlProductos + '?q=' + encodeURIComponent(texto); },
+            texto: function (producto) { return producto.text; },
+            alSeleccionar: function (producto) {
+                // id viene con prefijo: 'prod_<codigo>' o 'subprod_<id>'
+                const id = producto.id.slice(producto.id.indexOf('_') + 1);
+                productoSearchInput.value = producto.text;
+                if (productoIdInput) productoIdInput.value = producto.type === 'producto' ? id : '';
+                if (subproductoIdInput) subproductoIdInput.value = producto.type === 'subproducto' ? id : '';
+                cargarModificaciones(producto.type, id);
+            }
+        });
+    }
+
+    // --- Campos de pago en efectivo y cambio (solo UI) ---
+
+    function calcularCambio() {
+        if (!pagaConInput || !totalPedidoDisplay || !cambioEntregadoDisplay) return;
+        const totalPedido = parseFloat(totalPedidoDisplay.textContent.replace('$', '').replace(/,/g, '')) || 0;
+        const pagaCon = parseFloat(pagaConInput.value) || 0;
+        cambioEntregadoDisplay.textContent = SGPM.formatoMoneda(pagaCon - totalPedido);
+    }
+
+    if (formaPagoSelect && efectivoFields) {
+        formaPagoSelect.addEventListener('change', function () {
+            if (this.value === 'EFECTIVO' || this.value === 'EFECTIVO_CONTRA_ENTREGA') {
+                efectivoFields.style.display = 'block';
+            } else {
+                efectivoFields.style.display = 'none';
+                if (pagaConInput) pagaConInput.value = '';
+                if (cambioEntregadoDisplay) cambioEntregadoDisplay.textContent = SGPM.formatoMoneda(0);
+            }
+        });
+        formaPagoSelect.dispatchEvent(new Event('change'));
+    }
+
+    if (pagaConInput) {
+        pagaConInput.addEventListener('input', calcularCambio);
+        calcularCambio();
+    }
+
+    // --- Ítems y PAs del pedido (solo al editar: las rutas POST redirigen de vuelta a la edición) ---
+
+    // Envía por POST los campos con nombre de un área (o los datos dados) con el token CSRF del formulario
+    function enviarPost(url, area) {
+        const envio = document.createElement('form');
+        envio.method = 'POST';
+        envio.action = url;
+        envio.style.display = 'none';
+        const csrf = form.querySelector('input[name="csrf_token"]');
+        if (csrf) envio.appendChild(csrf.cloneNode());
+        if (area) {
+            area.querySelectorAll('input[name], select[name], textarea[name]').forEach(function (campo) {
+                if (campo.name === 'csrf_token') return;
+                const copia = document.createElement('input');
+                copia.type = 'hidden';
+                copia.name = campo.name;
+                copia.value = campo.value;
+                envio.appendChild(copia);
+            });
+        }
+        document.body.appendChild(envio);
+        envio.submit();
+    }
+
+    const addItemBtn = document.getElementById('add-item-btn');
+    if (addItemBtn && urls.urlAgregarItem) {
+        addItemBtn.addEventListener('click', function () {
+            if (!(productoIdInput && productoIdInput.value) && !(subproductoIdInput && subproductoIdInput.value)) {
+                alert('Debe seleccionar un producto o subproducto.');
+                return;
+            }
+            enviarPost(urls.urlAgregarItem, document.getElementById('add-item-form-area'));
+        });
+    }
+
+    const addPaBtn = document.getElementById('add-pa-btn');
+    if (addPaBtn && urls.urlAgregarPa) {
+        addPaBtn.addEventListener('click', function () {
+            const nombre = document.getElementById('nombre_pa');
+            if (!nombre || !nombre.value.trim()) {
+                alert('El nombre del PA es requerido.');
+                return;
+            }
+            enviarPost(urls.urlAgregarPa, document.getElementById('add-pa-form-area'));
+        });
+    }
+
+    if (urls.urlEliminarItem) {
+        document.querySelectorAll('.delete-item-btn').forEach(function (button) {
+            button.addEventListener('click', function () {
+                if (confirm('¿Estás seguro de eliminar este ítem?')) {
+                    enviarPost(conId(urls.urlEliminarItem, this.dataset.itemId));
+                }
+            });
+        });
+    }
+
+    if (urls.urlEliminarPa) {
+        document.querySelectorAll('.delete-pa-btn').forEach(function (button) {
+            button.addEventListener('click', function () {
+                if (confirm('¿Estás seguro de eliminar este producto adicional?')) {
+                    enviarPost(conId(urls.urlEliminarPa, this.dataset.paId));
+                }
+            });
+        });
+    }
+});
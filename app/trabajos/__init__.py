@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# Define el Blueprint para la cola de trabajos en segundo plano (estado, progreso y descarga de resultados)
+trabajos = Blueprint('trabajos', __name__, template_folder='templates')
+
+from . import routes # Importa las rutas del blueprint
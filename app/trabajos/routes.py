@@ -0,0 +1,83 @@
+# Archivo: PolleriaMontiel\app\trabajos\routes.py
+
+from flask import request, abort, jsonify, send_file, url_for, current_app
+from flask_login import login_required, current_user
+from app.models import RolUsuario, EstadoTrabajo, TrabajoSegundoPlano
+from . import trabajos # Importar el Blueprint
+from .services import encolar_trabajo, get_trabajo_by_id, ruta_resultado
+from .tareas import ARCHIVAR_PEDIDOS
+from app.utils.decorators import role_required # Importar el decorador de roles
+
+
+def trabajo_a_dict(trabajo: TrabajoSegundoPlano) -> dict:
+    """Estado del trabajo para el navegador (polling de /trabajos/<id>)."""
+    datos = {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado.value,
+        'progreso': trabajo.progreso,
+        'mensaje': trabajo.mensaje,
+        'resultado': trabajo.resultado,
+        'intentos': trabajo.intentos,
+        'max_intentos': trabajo.max_intentos,
+        'fecha_creacion': trabajo.fecha_creacion.isoformat() if trabajo.fecha_creacion else None,
+        'fecha_inicio': trabajo.fecha_inicio.isoformat() if trabajo.fecha_inicio else None,
+        'fecha_fin': trabajo.fecha_fin.isoformat() if trabajo.fecha_fin else None,
+        'terminado': trabajo.estado in (EstadoTrabajo.COMPLETADO, EstadoTrabajo.ERROR),
+        'url_estado': url_for('trabajos.estado_trabajo', trabajo_id=trabajo.id),
+        'url_descarga': None,
+    }
+    if trabajo.estado == EstadoTrabajo.COMPLETADO and trabajo.archivo_resultado:
+        datos['url_descarga'] = url_for('trabajos.descargar_resultado', trabajo_id=trabajo.id)
+    return datos
+
+
+def _trabajo_visible_o_404(trabajo_id: int) -> TrabajoSegundoPlano:
+    """El trabajo, si lo solicitó el usuario actual o es administrador (404 para los demás)."""
+    trabajo = get_trabajo_by_id(trabajo_id)
+    if trabajo is None or (trabajo.usuario_id != current_user.id and not current_user.is_admin()):
+        abort(404)
+    return trabajo
+
+
+@trabajos.route('/<int:trabajo_id>')
+@login_required
+def estado_trabajo(trabajo_id):
+    """Estado y progreso de un trabajo en segundo plano (JSON)."""
+    trabajo = _trabajo_visible_o_404(trabajo_id)
+    response = jsonify({'success': True, 'trabajo': trabajo_a_dict(trabajo)})
+    response.headers['Cache-Control'] = 'no-store' # El estado cambia en cada consulta
+    return response
+
+
+@trabajos.route('/<int:trabajo_id>/descargar')
+@login_required
+def descargar_resultado(trabajo_id):
+    """Descarga el archivo generado por un trabajo completado."""
+    trabajo = _trabajo_visible_o_404(trabajo_id)
+    if trabajo.estado != EstadoTrabajo.COMPLETADO:
+        abort(404)
+    ruta = ruta_resultado(trabajo)
+    if ruta is None:
+        abort(404) # Sin archivo o ya eliminado por la retención (TRABAJOS_RETENCION_DIAS)
+    return send_file(ruta, as_attachment=True, download_name=trabajo.archivo_resultado.rsplit('/', 1)[-1])
+
+
+@trabajos.route('/archivar-pedidos', methods=['POST'])
+@login_required
+@role_required(RolUsuario.ADMINISTRADOR) # Mueve pedidos al archivo: solo Admin
+def encolar_archivar_pedidos():
+    """Encola el archivado de pedidos cerrados (mismo proceso que `flask archivar-pedidos`)."""
+    data = request.get_json(silent=True) or request.form
+    try:
+        dias = int(data.get('dias') or current_app.config.get('ARCHIVO_PEDIDOS_DIAS', 90))
+        limite = int(data['limite']) if data.get('limite') else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Parámetros inválidos: dias y limite deben ser enteros.'}), 400
+    if dias < 1:
+        return jsonify({'success': False, 'message': 'dias debe ser mayor a 0.'}), 400
+
+    trabajo = encolar_trabajo(ARCHIVAR_PEDIDOS, {'dias': dias, 'limite': limite}, usuario_id=current_user.id)
+    if trabajo is None:
+        return jsonify({'success': False, 'message': 'No se pudo encolar el archivado.'}), 500
+    return jsonify({'success': True, 'trabajo': trabajo_a_dict(trabajo)}), 202
@@ -0,0 +1,374 @@
+# Archivo: PolleriaMontiel\app\trabajos\services.py
+
+"""
+Cola de trabajos en segundo plano respaldada por la tabla trabajos_segundo_plano.
+
+Las peticiones solo encolan (encolar_trabajo) y responden 202 con el ID; `flask worker` toma los
+trabajos PENDIENTES en orden de llegada y ejecuta la tarea registrada (app/trabajos/tareas.py):
+
+    - Tomar un trabajo es atómico: SELECT ... FOR UPDATE SKIP LOCKED en PostgreSQL y, en todos los
+      motores, un UPDATE condicionado a estado=PENDIENTE; con varios workers cada trabajo corre una vez.
+    - Progreso y latido se escriben en una conexión aparte (commit propio): no confirman ni revierten
+      lo que la tarea tenga pendiente en db.session, y el navegador los ve mientras la tarea corre.
+    - Un trabajo EN_PROCESO sin latido en TRABAJOS_TIMEOUT_LATIDO segundos (worker caído) vuelve a
+      PENDIENTE, o a ERROR si agotó max_intentos.
+    - Los archivos de resultado quedan en TRABAJOS_DIR/<id>/ y se borran, junto con el registro,
+      TRABAJOS_RETENCION_DIAS después de terminar.
+"""
+
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app import db
+from app.models import TrabajoSegundoPlano, EstadoTrabajo
+from app.trabajos.tareas import TAREAS, ErrorTrabajo
+
+INTERVALO_DEFAULT = 2
+TIMEOUT_LATIDO_DEFAULT = 300
+MAX_INTENTOS_DEFAULT = 3
+RETENCION_DIAS_DEFAULT = 7
+PROGRESO_CADA_SEGUNDOS = 1.0 # Escrituras de progreso como máximo una vez por segundo
+LIMPIEZA_CADA_SEGUNDOS = 3600
+
+
+def directorio_trabajos() -> str:
+    """Directorio de los archivos de resultado (TRABAJOS_DIR o instance/trabajos)."""
+    return current_app.config.get('TRABAJOS_DIR') or os.path.join(current_app.instance_path, 'trabajos')
+
+
+def ruta_resultado(trabajo: TrabajoSegundoPlano) -> Optional[str]:
+    """Ruta absoluta del archivo de resultado del trabajo, si tiene uno y todavía existe."""
+    if not trabajo.archivo_resultado:
+        return None
+    ruta = os.path.join(directorio_trabajos(), trabajo.archivo_resultado)
+    return ruta if os.path.isfile(ruta) else None
+
+
+# --- Encolar y consultar ---
+
+def encolar_trabajo(
+    tipo: str,
+    parametros: Optional[Dict] = None,
+    usuario_id: Optional[int] = None,
+    max_intentos: Optional[int] = None
+) -> Optional[TrabajoSegundoPlano]:
+    """
+    Registra un trabajo PENDIENTE para `flask worker`.
+
+    Args:
+        tipo: Nombre de una tarea registrada en app/trabajos/tareas.py.
+        parametros: Parámetros de la tarea (serializables a JSON).
+        usuario_id: Usuario que lo solicita (el único, además de los administradores, que ve su estado).
+        max_intentos: Intentos antes de quedar en ERROR (por defecto TRABAJOS_MAX_INTENTOS).
+
+    Returns:
+        El trabajo creado, o None si el tipo no existe o falló el guardado.
+    """
+    if tipo not in TAREAS:
+        print(f"Error al encolar trabajo: tarea '{tipo}' no registrada")
+        return None
+    try:
+        trabajo = TrabajoSegundoPlano(
+            tipo=tipo,
+            parametros=parametros or {},
+            usuario_id=usuario_id,
+            estado=EstadoTrabajo.PENDIENTE,
+            progreso=0,
+            intentos=0,
+            max_intentos=max(1, max_intentos or current_app.config.get('TRABAJOS_MAX_INTENTOS', MAX_INTENTOS_DEFAULT)),
+            mensaje='En espera de un worker',
+        )
+        db.session.add(trabajo)
+        db.session.commit()
+        return trabajo
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al encolar trabajo {tipo}: {e}")
+        return None
+
+
+def get_trabajo_by_id(trabajo_id: int) -> Optional[TrabajoSegundoPlano]:
+    return db.session.get(TrabajoSegundoPlano, trabajo_id)
+
+
+# --- Worker ---
+
+def identificador_worker() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def tomar_siguiente(worker: str, tipos: Optional[Iterable[str]] = None) -> Optional[TrabajoSegundoPlano]:
+    """Marca EN_PROCESO el trabajo PENDIENTE más antiguo (de `tipos`, si se indican) y lo retorna."""
+    consulta = select(TrabajoSegundoPlano.id).where(TrabajoSegundoPlano.estado == EstadoTrabajo.PENDIENTE)
+    if tipos:
+        consulta = consulta.where(TrabajoSegundoPlano.tipo.in_(list(tipos)))
+    consulta = consulta.order_by(TrabajoSegundoPlano.fecha_creacion, TrabajoSegundoPlano.id).limit(1)
+    try:
+        # Hasta 3 candidatos: si otro worker ganó la fila (SQLite no tiene SKIP LOCKED), buscar la siguiente
+        for _ in range(3):
+            trabajo_id = db.session.execute(consulta.with_for_update(skip_locked=True)).scalar()
+            if trabajo_id is None:
+                db.session.commit()
+                return None
+            ahora = datetime.utcnow()
+            tomado = db.session.execute(
+                update(TrabajoSegundoPlano)
+                .where(TrabajoSegundoPlano.id == trabajo_id, TrabajoSegundoPlano.estado == EstadoTrabajo.PENDIENTE)
+                .values(
+                    estado=EstadoTrabajo.EN_PROCESO, worker=worker, fecha_inicio=ahora, latido=ahora,
+                    intentos=TrabajoSegundoPlano.intentos + 1, progreso=0, mensaje='En proceso'
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if tomado:
+                return db.session.get(TrabajoSegundoPlano, trabajo_id, populate_existing=True)
+        return None
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al tomar trabajo pendiente: {e}")
+        return None
+
+
+class EjecucionTrabajo:
+    """Lo que recibe una tarea: parámetros, reporte de progreso y archivo de resultado."""
+
+    def __init__(self, trabajo: TrabajoSegundoPlano, engine, directorio: str):
+        self.trabajo_id = trabajo.id
+        self.tipo = trabajo.tipo
+        self.parametros = dict(trabajo.parametros or {})
+        self.usuario_id = trabajo.usuario_id
+        self.archivo: Optional[str] = None # Ruta relativa a TRABAJOS_DIR
+        self._engine = engine
+        self._directorio = directorio
+        self._ultimo_progreso = 0.0
+
+    def _escribir(self, **valores):
+        valores['latido'] = datetime.utcnow()
+        tabla = TrabajoSegundoPlano.__table__
+        try:
+            with self._engine.begin() as conexion: # Conexión propia: no toca la transacción de la tarea
+                conexion.execute(update(tabla).where(tabla.c.id == self.trabajo_id).values(**valores))
+        except Exception as e:
+            print(f"Error al registrar avance del trabajo {self.trabajo_id}: {e}")
+
+    def progreso(self, porcentaje: Optional[int], mensaje: Optional[str] = None):
+        """Reporta avance (0-100; None conserva el porcentaje). Se escribe como máximo una vez por segundo."""
+        ahora = time.monotonic()
+        if ahora - self._ultimo_progreso < PROGRESO_CADA_SEGUNDOS:
+            return
+        self._ultimo_progreso = ahora
+        valores = {}
+        if porcentaje is not None:
+            valores['progreso'] = max(0, min(99, int(porcentaje))) # 100 solo al completar
+        if mensaje:
+            valores['mensaje'] = mensaje[:255]
+        self._escribir(**valores)
+
+    def latido(self):
+        self._escribir()
+
+    def ruta_archivo(self, nombre: str) -> str:
+        """Ruta absoluta donde la tarea escribe su archivo descargable (uno por trabajo)."""
+        carpeta = os.path.join(self._directorio, str(self.trabajo_id))
+        os.makedirs(carpeta, exist_ok=True)
+        self.archivo = f'{self.trabajo_id}/{nombre}'
+        return os.path.join(carpeta, nombre)
+
+    def descartar_archivo(self):
+        shutil.rmtree(os.path.join(self._directorio, str(self.trabajo_id)), ignore_errors=True)
+        self.archivo = None
+
+
+class _Latido(threading.Thread):
+    """Actualiza el latido del trabajo mientras la tarea corre, aunque no reporte progreso."""
+
+    def __init__(self, ejecucion: EjecucionTrabajo, intervalo: float):
+        super().__init__(name=f'latido-trabajo-{ejecucion.trabajo_id}', daemon=True)
+        self._ejecucion = ejecucion
+        self._intervalo = intervalo
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self._intervalo):
+            self._ejecucion.latido()
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _terminar(trabajo_id: int, **valores) -> Optional[TrabajoSegundoPlano]:
+    db.session.rollback() # Descartar lo que la tarea dejó sin confirmar
+    trabajo = db.session.get(TrabajoSegundoPlano, trabajo_id, populate_existing=True)
+    for campo, valor in valores.items():
+        setattr(trabajo, campo, valor)
+    db.session.commit()
+    return trabajo
+
+
+def ejecutar_trabajo(trabajo: TrabajoSegundoPlano) -> bool:
+    """
+    Ejecuta un trabajo ya tomado (EN_PROCESO) y registra su resultado.
+
+    Returns:
+        True si terminó COMPLETADO; False si falló (queda PENDIENTE para reintento o en ERROR).
+    """
+    config = current_app.config
+    directorio = directorio_trabajos()
+    ejecucion = EjecucionTrabajo(trabajo, db.engine, directorio)
+    latido = _Latido(ejecucion, config.get('TRABAJOS_TIMEOUT_LATIDO', TIMEOUT_LATIDO_DEFAULT) / 3.0)
+    funcion = TAREAS.get(trabajo.tipo)
+    reintentar = trabajo.intentos < trabajo.max_intentos
+
+    latido.start()
+    try:
+        if funcion is None:
+            raise ErrorTrabajo(f"Tarea '{trabajo.tipo}' no registrada en este worker")
+        resultado = funcion(ejecucion) or {}
+        db.session.commit()
+    except Exception as e:
+        reintentar = reintentar and not isinstance(e, ErrorTrabajo)
+        error = f'{type(e).__name__}: {e}'[:255]
+        print(f"Error en trabajo {ejecucion.trabajo_id} ({ejecucion.tipo}): {error}")
+        ejecucion.descartar_archivo()
+        try:
+            _terminar(
+                ejecucion.trabajo_id,
+                estado=EstadoTrabajo.PENDIENTE if reintentar else EstadoTrabajo.ERROR,
+                mensaje=error, archivo_resultado=None, latido=None,
+                fecha_fin=None if reintentar else datetime.utcnow()
+            )
+        except Exception as e_registro:
+            db.session.rollback()
+            print(f"Error al registrar la falla del trabajo {ejecucion.trabajo_id}: {e_registro}")
+        return False
+    finally:
+        latido.detener()
+
+    try:
+        _terminar(
+            ejecucion.trabajo_id,
+            estado=EstadoTrabajo.COMPLETADO, progreso=100, resultado=resultado,
+            mensaje=str(resultado.get('mensaje') or 'Completado')[:255],
+            archivo_resultado=ejecucion.archivo, fecha_fin=datetime.utcnow()
+        )
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al registrar el resultado del trabajo {ejecucion.trabajo_id}: {e}")
+        return False
+
+
+def recuperar_trabajos_colgados(timeout_segundos: Optional[int] = None) -> int:
+    """Devuelve a PENDIENTE (o ERROR, sin intentos restantes) los EN_PROCESO sin latido reciente."""
+    if timeout_segundos is None:
+        timeout_segundos = current_app.config.get('TRABAJOS_TIMEOUT_LATIDO', TIMEOUT_LATIDO_DEFAULT)
+    limite = datetime.utcnow() - timedelta(seconds=timeout_segundos)
+    try:
+        colgados = TrabajoSegundoPlano.query.filter(
+            TrabajoSegundoPlano.estado == EstadoTrabajo.EN_PROCESO,
+            TrabajoSegundoPlano.latido < limite
+        ).with_for_update(skip_locked=True).all()
+        for trabajo in colgados:
+            agotado = trabajo.intentos >= trabajo.max_intentos
+            trabajo.estado = EstadoTrabajo.ERROR if agotado else EstadoTrabajo.PENDIENTE
+            trabajo.mensaje = f'El worker {trabajo.worker} dejó de responder'[:255]
+            trabajo.fecha_fin = datetime.utcnow() if agotado else None
+        db.session.commit()
+        return len(colgados)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al recuperar trabajos colgados: {e}")
+        return 0
+
+
+def limpiar_trabajos_antiguos(dias: Optional[int] = None) -> int:
+    """Borra los trabajos terminados hace más de `dias` días y sus archivos de resultado."""
+    if dias is None:
+        dias = current_app.config.get('TRABAJOS_RETENCION_DIAS', RETENCION_DIAS_DEFAULT)
+    limite = datetime.utcnow() - timedelta(days=dias)
+    directorio = directorio_trabajos()
+    try:
+        antiguos = TrabajoSegundoPlano.query.filter(
+            TrabajoSegundoPlano.estado.in_([EstadoTrabajo.COMPLETADO, EstadoTrabajo.ERROR]),
+            TrabajoSegundoPlano.fecha_fin < limite
+        ).all()
+        for trabajo in antiguos:
+            shutil.rmtree(os.path.join(directorio, str(trabajo.id)), ignore_errors=True)
+            db.session.delete(trabajo)
+        db.session.commit()
+        return len(antiguos)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al limpiar trabajos antiguos: {e}")
+        return 0
+
+
+def trabajar(
+    intervalo: Optional[float] = None,
+    una_vez: bool = False,
+    tipos: Optional[Iterable[str]] = None,
+    salida: Callable[[str], None] = print
+) -> int:
+    """
+    Ciclo del worker: toma y ejecuta trabajos hasta recibir SIGTERM/SIGINT (termina el trabajo en curso).
+
+    Args:
+        intervalo: Segundos de espera cuando no hay pendientes (por defecto TRABAJOS_INTERVALO).
+        una_vez: Procesar los pendientes actuales y salir (cron, tests).
+        tipos: Solo tomar trabajos de estas tareas (ej. un worker dedicado a reportes).
+        salida: Función para reportar cada trabajo (ej. click.echo).
+
+    Returns:
+        Número de trabajos ejecutados.
+    """
+    if intervalo is None:
+        intervalo = current_app.config.get('TRABAJOS_INTERVALO', INTERVALO_DEFAULT)
+    worker = identificador_worker()
+    detener = threading.Event()
+
+    def _senal(signum, frame):
+        salida('Señal recibida: se termina el trabajo en curso y el worker se detiene.')
+        detener.set()
+        signal.signal(signum, signal.SIG_DFL) # Una segunda señal interrumpe de inmediato
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _senal)
+        signal.signal(signal.SIGINT, _senal)
+
+    ejecutados = 0
+    ultima_limpieza = None
+    while not detener.is_set():
+        recuperados = recuperar_trabajos_colgados()
+        if recuperados:
+            salida(f'{recuperados} trabajos sin latido devueltos a la cola.')
+        if ultima_limpieza is None or time.monotonic() - ultima_limpieza > LIMPIEZA_CADA_SEGUNDOS:
+            ultima_limpieza = time.monotonic()
+            borrados = limpiar_trabajos_antiguos()
+            if borrados:
+                salida(f'{borrados} trabajos antiguos eliminados.')
+
+        trabajo = tomar_siguiente(worker, tipos)
+        if trabajo is None:
+            if una_vez:
+                break
+            detener.wait(intervalo)
+            continue
+
+        salida(f'Trabajo {trabajo.id} ({trabajo.tipo}), intento {trabajo.intentos} de {trabajo.max_intentos}...')
+        inicio = time.perf_counter()
+        completado = ejecutar_trabajo(trabajo)
+        ejecutados += 1
+        salida(f"  {'completado' if completado else 'con error'} en {time.perf_counter() - inicio:.1f} s.")
+        db.session.remove() # Sesión limpia para el siguiente trabajo (sin objetos de la tarea en memoria)
+    return ejecutados
@@ -0,0 +1,225 @@
+# Archivo: PolleriaMontiel\app\trabajos\tareas.py
+
+"""
+Tareas que ejecuta `flask worker` (ver app/trabajos/services.py).
+
+Cada tarea se registra con @tarea('nombre') y recibe la EjecucionTrabajo del trabajo tomado:
+`ejecucion.parametros` (los de encolar_trabajo), `ejecucion.progreso(porcentaje, mensaje)` y
+`ejecucion.ruta_archivo(nombre)` para guardar un archivo descargable. Lo que retorna (un dict
+serializable a JSON) queda en TrabajoSegundoPlano.resultado.
+
+Una excepción reintenta el trabajo hasta max_intentos; ErrorTrabajo lo marca ERROR sin reintentar
+(parámetros inválidos, datos que no van a cambiar en el siguiente intento).
+"""
+
+import csv
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Callable, Dict, Iterator
+
+from sqlalchemy import and_, select
+
+from app import db
+from app.models import Pedido, PedidoItem, ProductoAdicional, Cliente
+from app.utils.archivo import union_historica, archivar_pedidos_cerrados
+from app.utils import exportacion
+from app.utils.db_routing import solo_lectura
+from app.utils.helpers import format_datetime, format_pedido_folio
+
+TAREAS: Dict[str, Callable] = {}
+
+REPORTE_PEDIDOS_DETALLE = 'reporte_pedidos_detalle'
+ARCHIVAR_PEDIDOS = 'archivar_pedidos'
+EXPORTACION_COLUMNAR = 'exportacion_columnar'
+
+
+class ErrorTrabajo(Exception):
+    """Falla definitiva de una tarea: el trabajo queda en ERROR sin más intentos."""
+
+
+def tarea(nombre: str):
+    """Registra la función como la tarea `nombre`."""
+    def decorator(f):
+        TAREAS[nombre] = f
+        return f
+    return decorator
+
+
+# --- Reporte detallado de pedidos (antes se generaba dentro de la petición) ---
+
+def _fecha_parametro(valor, fin_de_dia: bool = False):
+    if not valor:
+        return None
+    fecha = datetime.strptime(valor, '%Y-%m-%d')
+    return fecha.replace(hour=23, minute=59, second=59) if fin_de_dia else fecha # Incluir todo el día
+
+
+def _filas_reporte(pedidos, items_por_pedido, pas_por_pedido, clientes, progreso) -> Iterator[Dict]:
+    """Una fila por ítem de pollo y por PA de cada pedido (mismas columnas que el Excel original)."""
+    total = len(pedidos)
+    for numero, pedido in enumerate(pedidos, start=1):
+        cliente = clientes.get(pedido.cliente_id)
+        comunes = {
+            'Pedido ID': pedido.id,
+            'Folio Pedido': format_pedido_folio(pedido),
+            'Fecha Creacion': format_datetime(pedido.fecha_creacion),
+            'Estado': pedido.estado_pedido.value,
+            'Tipo Venta': pedido.tipo_venta.value,
+            'Cliente': cliente.get_nombre_completo() if cliente else 'Mostrador',
+        }
+        for item in items_por_pedido.get(pedido.id, []):
+            yield dict(comunes, **{
+                'Tipo Item': 'Pollo',
+                'Descripcion Item': item.descripcion_item_venta,
+                'Cantidad': item.cantidad,
+                'Unidad Medida': item.unidad_medida,
+                'Precio Unitario Venta': item.precio_unitario_venta,
+                'Subtotal Item': item.subtotal_item,
+                'Notas Item': None, # PedidoItem no tiene notas propias
+                'Costo Compra Unitario': item.costo_unitario_item, # Puede ser None
+                'Comision Calculada': None # No aplica a items de pollo
+            })
+        for pa in pas_por_pedido.get(pedido.id, []):
+            yield dict(comunes, **{
+                'Tipo Item': 'Adicional',
+                'Descripcion Item': pa.nombre_pa,
+                'Cantidad': pa.cantidad_pa,
+                'Unidad Medida': pa.unidad_medida_pa,
+                'Precio Unitario Venta': pa.precio_venta_unitario_pa,
+                'Subtotal Item': pa.subtotal_pa,
+                'Notas Item': pa.notas_pa,
+                'Costo Compra Unitario': pa.costo_compra_unitario_pa, # Puede ser None
+                'Comision Calculada': pa.comision_calculada_pa # Puede ser None
+            })
+        if numero % 200 == 0:
+            progreso(20 + 70 * numero // total, f'{numero} de {total} pedidos procesados')
+
+
+def _escribir_excel(ejecucion, filas) -> tuple:
+    """Excel con pandas/openpyxl; si no están instaladas, CSV (que Excel abre igual)."""
+    try:
+        import pandas as pd
+        import openpyxl # noqa: F401 (motor de pd.ExcelWriter)
+    except ImportError:
+        pd = None
+
+    if pd is not None:
+        reporte_df = pd.DataFrame(list(filas))
+        ruta = ejecucion.ruta_archivo('reporte_pedidos.xlsx')
+        with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+            reporte_df.to_excel(writer, index=False, sheet_name='Detalle Pedidos')
+        return ruta, len(reporte_df)
+
+    ruta = ejecucion.ruta_archivo('reporte_pedidos.csv')
+    total = 0
+    with open(ruta, 'w', newline='', encoding='utf-8-sig') as archivo: # BOM: Excel detecta UTF-8
+        writer = None
+        for fila in filas:
+            if writer is None:
+                writer = csv.DictWriter(archivo, fieldnames=list(fila))
+                writer.writeheader()
+            writer.writerow(fila)
+            total += 1
+    return ruta, total
+
+
+@tarea(REPORTE_PEDIDOS_DETALLE)
+@solo_lectura # Reporte: leer desde la réplica si está configurada
+def reporte_pedidos_detalle(ejecucion) -> Dict:
+    """Detalle de ítems y PAs de los pedidos (activos y archivados) entre fecha_desde y fecha_hasta."""
+    try:
+        fecha_desde = _fecha_parametro(ejecucion.parametros.get('fecha_desde'))
+        fecha_hasta = _fecha_parametro(ejecucion.parametros.get('fecha_hasta'), fin_de_dia=True)
+    except (TypeError, ValueError) as e:
+        raise ErrorTrabajo(f'Fechas inválidas: {e}')
+
+    # Pedidos del rango de fechas, activos y archivados (filas de solo lectura)
+    pedidos_rango = union_historica(
+        Pedido, lambda c: and_(c.fecha_creacion >= fecha_desde, c.fecha_creacion <= fecha_hasta)
+    ).subquery()
+    pedidos_validos = db.session.execute(select(pedidos_rango).order_by(pedidos_rango.c.fecha_creacion)).all()
+    if not pedidos_validos:
+        return {'filas': 0, 'pedidos': 0, 'mensaje': 'No se encontraron pedidos válidos para generar reporte.'}
+    ejecucion.progreso(10, f'{len(pedidos_validos)} pedidos en el rango')
+
+    # Ítems, PAs y clientes de todos los pedidos en una consulta cada uno (activos + archivo)
+    ids_rango = select(pedidos_rango.c.id)
+    items_por_pedido, pas_por_pedido = {}, {}
+    for item in db.session.execute(union_historica(PedidoItem, lambda c: c.pedido_id.in_(ids_rango))).all():
+        items_por_pedido.setdefault(item.pedido_id, []).append(item)
+    for pa in db.session.execute(union_historica(ProductoAdicional, lambda c: c.pedido_id.in_(ids_rango))).all():
+        pas_por_pedido.setdefault(pa.pedido_id, []).append(pa)
+    clientes = {
+        cliente.id: cliente
+        for cliente in Cliente.query.filter(Cliente.id.in_({p.cliente_id for p in pedidos_validos if p.cliente_id})).all()
+    }
+    ejecucion.progreso(20, 'Ítems y productos adicionales cargados')
+
+    filas = _filas_reporte(pedidos_validos, items_por_pedido, pas_por_pedido, clientes, ejecucion.progreso)
+    _, total_filas = _escribir_excel(ejecucion, filas)
+    if not total_filas:
+        ejecucion.descartar_archivo()
+        return {'filas': 0, 'pedidos': len(pedidos_validos), 'mensaje': 'No hay datos de ítems para el rango de fechas.'}
+    return {
+        'filas': total_filas, 'pedidos': len(pedidos_validos),
+        'mensaje': f'Reporte generado con {total_filas} filas.'
+    }
+
+
+# --- Archivado de pedidos cerrados (mismo proceso que `flask archivar-pedidos`) ---
+
+@tarea(ARCHIVAR_PEDIDOS)
+def archivar_pedidos(ejecucion) -> Dict:
+    parametros = ejecucion.parametros
+    totales = archivar_pedidos_cerrados(
+        dias=parametros['dias'],
+        chunk_size=parametros.get('chunk_size') or 1000,
+        limite=parametros.get('limite'),
+        progreso=lambda mensaje: ejecucion.progreso(None, mensaje.strip())
+    )
+    if totales is None:
+        # Los lotes completados ya quedaron archivados; el reintento continúa con los restantes
+        raise RuntimeError('Error durante el archivado de un lote de pedidos')
+    return {'totales': totales, 'mensaje': f"{totales[Pedido.__table__.name]} pedidos archivados."}
+
+
+# --- Exportación columnar (Parquet / Arrow IPC) para análisis fuera del sistema ---
+
+@tarea(EXPORTACION_COLUMNAR)
+def exportacion_columnar(ejecucion) -> Dict:
+    """Exporta las tablas del rango particionadas por mes y las entrega en un solo .zip."""
+    from flask import current_app
+
+    if exportacion.pa is None:
+        raise ErrorTrabajo('El paquete pyarrow no está instalado')
+    parametros = ejecucion.parametros
+    try:
+        desde = _fecha_parametro(parametros.get('desde')).date()
+        hasta = _fecha_parametro(parametros.get('hasta')).date()
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ErrorTrabajo(f'Fechas inválidas: {e}')
+    formato = parametros.get('formato') or exportacion.PARQUET
+
+    with tempfile.TemporaryDirectory(prefix=f'sgpm_exportacion_{ejecucion.trabajo_id}_') as carpeta:
+        totales = exportacion.exportar_columnar(
+            carpeta, desde, hasta, formato=formato, tablas=parametros.get('tablas'),
+            chunk_size=current_app.config.get('EXPORTACION_CHUNK_SIZE', exportacion.CHUNK_SIZE_DEFAULT),
+            compresion=current_app.config.get('EXPORTACION_COMPRESION', exportacion.COMPRESION_DEFAULT),
+            progreso=lambda mensaje: ejecucion.progreso(None, mensaje.strip())
+        )
+        if totales is None:
+            raise ErrorTrabajo(f'Error al exportar {formato}; ver el log del worker')
+        ejecucion.progreso(95, 'Empaquetando archivos')
+        ruta = ejecucion.ruta_archivo(f'exportacion_{desde.isoformat()}_{hasta.isoformat()}_{formato}.zip')
+        # Sin recomprimir: Parquet/Arrow ya van comprimidos por columna
+        with zipfile.ZipFile(ruta, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+            for raiz, carpetas, archivos in os.walk(carpeta):
+                carpetas.sort() # Tablas y meses en orden dentro del .zip
+                for nombre in sorted(archivos):
+                    completo = os.path.join(raiz, nombre)
+                    archivo_zip.write(completo, os.path.relpath(completo, carpeta))
+
+    filas = sum(t['filas'] for t in totales.values())
+    return {'totales': totales, 'formato': formato, 'mensaje': f'Exportación {formato} con {filas} filas.'}
@@ -0,0 +1,293 @@
+# Archivo: PolleriaMontiel\app\utils\analitica.py
+
+"""
+Analítica de ventas de un rango de fechas para el tablero del administrador (main.analitica).
+
+Hasta ahora solo había conteos por estado. Aquí cada conjunto de datos se lee con una sola consulta
+de Core (activos + archivados, union_historica, sin cancelados) y se pasa a columnas de NumPy; todas
+las métricas se calculan vectorizadas (np.unique + np.bincount), sin recorrer filas en Python:
+
+    - kg vendidos e importe por subproducto (o producto si el ítem no es de un subproducto).
+    - Ingresos, pedidos y ticket promedio por tipo de cliente (sin cliente = mostrador).
+    - Curva de demanda por hora (pedidos y ventas, promedio por día) y matriz día de la semana x hora.
+    - Rendimiento de repartidores: entregas, importe, días con entregas y entregas por día.
+    - Comisiones de productos adicionales (comision_calculada_pa): total y por producto.
+
+Los resultados se guardan en memoria del proceso por (BD, rango, versión): la versión es el número
+de pedidos del rango y su última fecha_actualizacion (los servicios la actualizan en cada cambio),
+así un pedido nuevo o modificado invalida solo los rangos que lo incluyen. ANALITICA_CACHE_TTL
+acota lo que no cambia la versión (ej. el tipo de un cliente).
+
+Requiere el paquete `numpy` (opcional: sin él `np` es None y analitica_ventas retorna None).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from app import db
+from app.models import Pedido, PedidoItem, ProductoAdicional, Producto, Subproducto, Cliente, Usuario
+from app.utils.archivo import union_historica
+from app.utils.db_routing import solo_lectura
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TTL_DEFAULT = 600
+CACHE_MAX_DEFAULT = 32
+SIN_CLIENTE = 'SIN_CLIENTE'
+DIAS_SEMANA = ('Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom')
+
+
+# --- Carga columnar (una consulta por conjunto de datos) ---
+
+def _rango(desde: date, hasta: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(desde, datetime.min.time()), datetime.combine(hasta, datetime.min.time()) + timedelta(days=1)
+
+
+def _pedidos_validos(desde: date, hasta: date):
+    """Pedidos no cancelados del rango, activos y archivados."""
+    from app.pedidos import estados # Import local: app.pedidos importa módulos de app.utils
+    inicio, fin = _rango(desde, hasta)
+    return union_historica(Pedido, lambda c: and_(
+        c.fecha_creacion >= inicio, c.fecha_creacion < fin, c.estado_pedido.not_in(estados.CANCELADOS)
+    )).subquery()
+
+
+def _columnas(consulta, tipos: Dict[str, Any]) -> Dict[str, 'np.ndarray']:
+    """Ejecuta la consulta y retorna {columna: arreglo} con el dtype indicado (Decimal -> float)."""
+    filas = db.session.execute(consulta).all()
+    columnas = list(zip(*filas)) if filas else [()] * len(tipos)
+    return {nombre: np.array(valores, dtype=dtype) for (nombre, dtype), valores in zip(tipos.items(), columnas)}
+
+
+def _texto(valores) -> List[str]:
+    """Enums a su valor y None a SIN_CLIENTE (etiquetas de agrupación)."""
+    return [getattr(v, 'value', v) or SIN_CLIENTE for v in valores]
+
+
+def cargar_pedidos(desde: date, hasta: date) -> Dict[str, 'np.ndarray']:
+    pedidos = _pedidos_validos(desde, hasta)
+    consulta = (
+        select(
+            pedidos.c.fecha_creacion, pedidos.c.total_pedido, Cliente.tipo_cliente,
+            func.coalesce(pedidos.c.repartidor_id, 0), func.coalesce(Usuario.nombre_completo, '')
+        )
+        .select_from(pedidos)
+        .outerjoin(Cliente, Cliente.id == pedidos.c.cliente_id)
+        .outerjoin(Usuario, Usuario.id == pedidos.c.repartidor_id)
+    )
+    datos = _columnas(consulta, {
+        'fecha': 'datetime64[us]', 'total': float, 'tipo_cliente': object, 'repartidor_id': np.int64, 'repartidor': object,
+    })
+    datos['tipo_cliente'] = np.array(_texto(datos['tipo_cliente']), dtype=object)
+    return datos
+
+
+def cargar_items(desde: date, hasta: date) -> Dict[str, 'np.ndarray']:
+    """Ítems de pollo de los pedidos del rango con el nombre de su subproducto/producto, en una consulta."""
+    pedidos = _pedidos_validos(desde, hasta)
+    items = union_historica(PedidoItem, lambda c: c.pedido_id.in_(select(pedidos.c.id))).subquery()
+    consulta = (
+        select(
+            func.coalesce(Subproducto.nombre, Producto.nombre, items.c.descripcion_item_venta),
+            func.lower(items.c.unidad_medida), items.c.cantidad, items.c.subtotal_item
+        )
+        .select_from(items)
+        .outerjoin(Subproducto, Subproducto.id == items.c.subproducto_id)
+        .outerjoin(Producto, Producto.id == items.c.producto_id)
+    )
+    return _columnas(consulta, {'producto': object, 'unidad': object, 'cantidad': float, 'subtotal': float})
+
+
+def cargar_pas(desde: date, hasta: date) -> Dict[str, 'np.ndarray']:
+    pedidos = _pedidos_validos(desde, hasta)
+    pas = union_historica(ProductoAdicional, lambda c: c.pedido_id.in_(select(pedidos.c.id))).subquery()
+    consulta = select(pas.c.nombre_pa, pas.c.subtotal_pa, func.coalesce(pas.c.comision_calculada_pa, 0)).select_from(pas)
+    return _columnas(consulta, {'nombre': object, 'subtotal': float, 'comision': float})
+
+
+# --- Métricas vectorizadas ---
+
+def _agrupar(claves: 'np.ndarray', **pesos: 'np.ndarray') -> Tuple['np.ndarray', Dict[str, 'np.ndarray']]:
+    """Etiquetas únicas y, por etiqueta, el conteo y la suma de cada arreglo de `pesos`."""
+    etiquetas, inverso = np.unique(claves, return_inverse=True)
+    sumas = {'conteo': np.bincount(inverso, minlength=len(etiquetas))}
+    for nombre, valores in pesos.items():
+        sumas[nombre] = np.bincount(inverso, weights=valores, minlength=len(etiquetas))
+    return etiquetas, sumas
+
+
+def _filas(etiquetas, sumas: Dict[str, 'np.ndarray'], orden: str, **extras) -> List[Dict[str, Any]]:
+    """Una fila por etiqueta, de mayor a menor `orden`, con valores de Python (para plantillas y JSON)."""
+    indices = np.argsort(-sumas[orden], kind='stable')
+    columnas = dict(sumas, **extras)
+    return [
+        dict({'etiqueta': str(etiquetas[i])}, **{k: round(v[i].item(), 3) for k, v in columnas.items()})
+        for i in indices
+    ]
+
+
+def kg_por_subproducto(items) -> List[Dict[str, Any]]:
+    en_kg = items['unidad'] == 'kg'
+    etiquetas, sumas = _agrupar(items['producto'][en_kg], kg=items['cantidad'][en_kg], importe=items['subtotal'][en_kg])
+    return _filas(etiquetas, sumas, 'kg')
+
+
+def ingresos_por_tipo_cliente(pedidos) -> List[Dict[str, Any]]:
+    etiquetas, sumas = _agrupar(pedidos['tipo_cliente'], ventas=pedidos['total'])
+    total = pedidos['total'].sum()
+    return _filas(
+        etiquetas, sumas, 'ventas',
+        ticket_promedio=np.divide(sumas['ventas'], sumas['conteo'], out=np.zeros(len(etiquetas)), where=sumas['conteo'] > 0),
+        porcentaje=sumas['ventas'] * 100.0 / total if total else np.zeros(len(etiquetas))
+    )
+
+
+def curva_demanda(pedidos, dias: int, desfase_horas: int = 0) -> Dict[str, Any]:
+    """Pedidos y ventas por hora (total y promedio por día) y matriz día de la semana x hora."""
+    fechas = pedidos['fecha'] + np.timedelta64(desfase_horas, 'h') # fecha_creacion en UTC -> hora local
+    dias_epoch = fechas.astype('datetime64[D]')
+    horas = ((fechas - dias_epoch) // np.timedelta64(1, 'h')).astype(np.int64)
+    dia_semana = (dias_epoch.astype(np.int64) + 3) % 7 # 1970-01-01 fue jueves; 0 = lunes
+    pedidos_hora = np.bincount(horas, minlength=24)
+    ventas_hora = np.bincount(horas, weights=pedidos['total'], minlength=24)
+    matriz = np.bincount(dia_semana * 24 + horas, minlength=7 * 24).reshape(7, 24)
+    return {
+        'horas': [
+            {'hora': h, 'pedidos': int(pedidos_hora[h]), 'ventas': round(float(ventas_hora[h]), 2),
+             'pedidos_por_dia': round(float(pedidos_hora[h]) / dias, 2)}
+            for h in range(24)
+        ],
+        'maximo_hora': int(pedidos_hora.max()) if len(horas) else 0,
+        'matriz': [{'dia': DIAS_SEMANA[d], 'pedidos': matriz[d].tolist()} for d in range(7)],
+        'maximo_matriz': int(matriz.max()) if len(horas) else 0,
+    }
+
+
+def rendimiento_repartidores(pedidos) -> List[Dict[str, Any]]:
+    con_repartidor = pedidos['repartidor_id'] > 0
+    repartidores = pedidos['repartidor_id'][con_repartidor]
+    if not len(repartidores):
+        return []
+    ids, inverso = np.unique(repartidores, return_inverse=True)
+    entregas = np.bincount(inverso, minlength=len(ids))
+    importe = np.bincount(inverso, weights=pedidos['total'][con_repartidor], minlength=len(ids))
+    # Días distintos con entregas: pares (repartidor, día) únicos
+    dias = pedidos['fecha'][con_repartidor].astype('datetime64[D]').astype(np.int64)
+    pares = np.unique(np.stack([inverso, dias]), axis=1)
+    dias_activos = np.bincount(pares[0], minlength=len(ids))
+    nombres = pedidos['repartidor'][con_repartidor]
+    primer_indice = np.unique(inverso, return_index=True)[1]
+    return _filas(
+        nombres[primer_indice], {'entregas': entregas, 'importe': importe}, 'entregas',
+        dias_activos=dias_activos, entregas_por_dia=entregas / np.maximum(dias_activos, 1)
+    )
+
+
+def comisiones_pa(pas) -> Dict[str, Any]:
+    etiquetas, sumas = _agrupar(pas['nombre'], comision=pas['comision'], ingreso=pas['subtotal'])
+    return {
+        'total_comision': round(float(pas['comision'].sum()), 2),
+        'total_ingreso': round(float(pas['subtotal'].sum()), 2),
+        'pas': int(len(pas['comision'])),
+        'pas_con_comision': int(np.count_nonzero(pas['comision'])),
+        'por_producto': _filas(etiquetas, sumas, 'comision')[:20],
+    }
+
+
+@solo_lectura # Reporte: leer desde la réplica si está configurada
+def calcular_analitica(desde: date, hasta: date, desfase_horas: int = 0) -> Dict[str, Any]:
+    """Todas las métricas del rango (sin caché)."""
+    pedidos, items, pas = cargar_pedidos(desde, hasta), cargar_items(desde, hasta), cargar_pas(desde, hasta)
+    dias = (hasta - desde).days + 1
+    total = float(pedidos['total'].sum())
+    return {
+        'desde': desde, 'hasta': hasta, 'dias': dias,
+        'resumen': {
+            'pedidos': int(len(pedidos['total'])),
+            'ventas': round(total, 2),
+            'ticket_promedio': round(total / len(pedidos['total']), 2) if len(pedidos['total']) else 0.0,
+            'kg_vendidos': round(float(items['cantidad'][items['unidad'] == 'kg'].sum()), 3),
+        },
+        'kg_por_subproducto': kg_por_subproducto(items),
+        'ingresos_por_tipo_cliente': ingresos_por_tipo_cliente(pedidos),
+        'curva_demanda': curva_demanda(pedidos, dias, desfase_horas),
+        'repartidores': rendimiento_repartidores(pedidos),
+        'comisiones_pa': comisiones_pa(pas),
+        'calculado_en': datetime.utcnow(),
+    }
+
+
+# --- Caché por (rango, versión) ---
+
+@solo_lectura
+def version_rango(desde: date, hasta: date) -> Tuple:
+    """Cambia si se crea, modifica, cancela o archiva un pedido del rango (una consulta agregada)."""
+    inicio, fin = _rango(desde, hasta)
+    pedidos = union_historica(Pedido, lambda c: and_(c.fecha_creacion >= inicio, c.fecha_creacion < fin)).subquery()
+    conteo, ultima = db.session.execute(select(func.count(), func.max(pedidos.c.fecha_actualizacion))).one()
+    return conteo, str(ultima)
+
+
+class _CacheAnalitica:
+    """LRU en memoria del proceso: (BD, desde, hasta, desfase) -> (versión, cargado_en, resultado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resultados: 'OrderedDict[Tuple, Tuple[Tuple, float, Dict]]' = OrderedDict()
+
+    def obtener(self, clave: Tuple, version: Tuple, ttl: float) -> Optional[Dict]:
+        with self._lock:
+            entrada = self._resultados.get(clave)
+            if entrada is None or entrada[0] != version or time.monotonic() - entrada[1] > ttl:
+                return None
+            self._resultados.move_to_end(clave)
+            return entrada[2]
+
+    def guardar(self, clave: Tuple, version: Tuple, resultado: Dict, maximo: int):
+        with self._lock:
+            self._resultados[clave] = (version, time.monotonic(), resultado)
+            self._resultados.move_to_end(clave)
+            while len(self._resultados) > maximo:
+                self._resultados.popitem(last=False)
+
+    def invalidar(self):
+        with self._lock:
+            self._resultados.clear()
+
+
+cache = _CacheAnalitica()
+
+
+def analitica_ventas(desde: date, hasta: date) -> Optional[Dict[str, Any]]:
+    """
+    Métricas de ventas del rango [desde, hasta], desde la caché si los pedidos del rango no cambiaron.
+
+    Returns:
+        Diccionario de métricas (ver calcular_analitica), o None si numpy no está instalado o hubo un error.
+    """
+    if np is None:
+        print("Error en analítica de ventas: el paquete numpy no está instalado (pip install numpy)")
+        return None
+    config = current_app.config
+    desfase = config.get('ANALITICA_DESFASE_HORAS', 0)
+    clave = (db.engine.url.render_as_string(hide_password=True), desde, hasta, desfase)
+    try:
+        version = version_rango(desde, hasta)
+        resultado = cache.obtener(clave, version, config.get('ANALITICA_CACHE_TTL', TTL_DEFAULT))
+        if resultado is None:
+            resultado = calcular_analitica(desde, hasta, desfase)
+            cache.guardar(clave, version, resultado, config.get('ANALITICA_CACHE_MAX', CACHE_MAX_DEFAULT))
+        return resultado
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al calcular analítica de ventas {desde} - {hasta}: {e}")
+        return None
@@ -0,0 +1,159 @@
+# Archivo: PolleriaMontiel\app\utils\archivo.py
+
+"""
+Archivo histórico de pedidos cerrados.
+
+`pedidos`, `pedido_items`, `pedido_productos_adicionales` y `movimientos_caja` crecen sin límite y
+los dashboards/búsquedas las recorren completas. Los pedidos cerrados (estados.ARCHIVABLES) sin
+cambios en los últimos N días se mueven, con sus ítems, productos adicionales, movimientos de caja
+y denominaciones, a las tablas `<tabla>_archivo` (mismas columnas, mismos IDs, sin llaves foráneas;
+ver app/models.py):
+
+    - `archivar_pedidos_cerrados` corre por lotes de pedidos (INSERT ... SELECT + DELETE), con un
+      commit por lote: si se interrumpe, lo ya movido queda archivado y lo demás sigue en la tabla activa.
+    - No se archivan pedidos con movimientos en un corte ABIERTO (los cortes abiertos solo leen la tabla activa).
+    - En cada tabla se conserva la fila con el ID más alto: SQLite (sin AUTOINCREMENT) reutilizaría
+      ese ID y chocaría con el archivo.
+    - `union_historica` arma el UNION ALL de la tabla activa y la de archivo (con el filtro aplicado
+      en ambas ramas) para los reportes y el detalle de cortes cerrados.
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, exists, func, select, union_all
+
+from app import db
+from app.models import (
+    Pedido, PedidoItem, ProductoAdicional, MovimientoCaja, MovimientoDenominacion, CorteCaja, EstadoCorteCaja,
+    pedidos_archivo, pedido_items_archivo, productos_adicionales_archivo, movimientos_caja_archivo,
+    movimiento_denominaciones_archivo
+)
+
+DIAS_DEFAULT = 90
+CHUNK_SIZE_DEFAULT = 1000
+
+# Tabla activa -> tabla de archivo
+TABLAS_ARCHIVO = {
+    Pedido.__table__.name: pedidos_archivo,
+    PedidoItem.__table__.name: pedido_items_archivo,
+    ProductoAdicional.__table__.name: productos_adicionales_archivo,
+    MovimientoCaja.__table__.name: movimientos_caja_archivo,
+    MovimientoDenominacion.__table__.name: movimiento_denominaciones_archivo,
+}
+
+
+def union_historica(modelo, filtro: Optional[Callable] = None):
+    """
+    SELECT de todas las columnas del modelo en la tabla activa UNION ALL la de archivo.
+
+    Args:
+        modelo: Pedido, PedidoItem, ProductoAdicional, MovimientoCaja o MovimientoDenominacion.
+        filtro: Función que recibe las columnas de una tabla (`tabla.c`) y retorna la condición;
+                se aplica a cada rama para que cada una use sus propios índices.
+    """
+    ramas = []
+    for tabla in (modelo.__table__, TABLAS_ARCHIVO[modelo.__table__.name]):
+        consulta = select(*tabla.columns)
+        if filtro is not None:
+            consulta = consulta.where(filtro(tabla.c))
+        ramas.append(consulta)
+    return union_all(*ramas)
+
+
+def _mover(modelo, condicion) -> int:
+    """Copia al archivo las filas del modelo que cumplen la condición y las borra de la tabla activa."""
+    tabla = modelo.__table__
+    archivo = TABLAS_ARCHIVO[tabla.name]
+    columnas = [columna.name for columna in tabla.columns]
+    copiadas = db.session.execute(
+        archivo.insert().from_select(columnas, select(*tabla.columns).where(condicion))
+    ).rowcount
+    db.session.execute(delete(tabla).where(condicion))
+    return copiadas
+
+
+def _pedidos_protegidos() -> set:
+    """IDs de pedidos dueños de la fila con el ID más alto de alguna de las tablas a archivar."""
+    protegidos = {
+        db.session.execute(select(func.max(Pedido.id))).scalar(),
+        db.session.execute(select(PedidoItem.pedido_id).order_by(PedidoItem.id.desc()).limit(1)).scalar(),
+        db.session.execute(select(ProductoAdicional.pedido_id).order_by(ProductoAdicional.id.desc()).limit(1)).scalar(),
+        db.session.execute(select(MovimientoCaja.pedido_id).order_by(MovimientoCaja.id.desc()).limit(1)).scalar(),
+        db.session.execute(
+            select(MovimientoCaja.pedido_id)
+            .join(MovimientoDenominacion, MovimientoDenominacion.movimiento_caja_id == MovimientoCaja.id)
+            .order_by(MovimientoDenominacion.id.desc()).limit(1)
+        ).scalar(),
+    }
+    protegidos.discard(None)
+    return protegidos
+
+
+def archivar_pedidos_cerrados(
+    dias: int = DIAS_DEFAULT,
+    chunk_size: int = CHUNK_SIZE_DEFAULT,
+    limite: Optional[int] = None,
+    progreso: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, int]]:
+    """
+    Mueve al archivo los pedidos cerrados sin cambios en los últimos `dias` días.
+
+    Args:
+        dias: Antigüedad mínima (por fecha_actualizacion) de los pedidos a archivar.
+        chunk_size: Pedidos por lote (un commit por lote).
+        limite: Máximo de pedidos a archivar en esta corrida (None = todos).
+        progreso: Función opcional para reportar avance (ej. click.echo).
+
+    Returns:
+        Diccionario {tabla: filas_archivadas}, o None si un lote falló (los lotes anteriores quedan archivados).
+    """
+    from app.pedidos import estados # Import local: app.pedidos importa este módulo (reportes)
+
+    fecha_limite = datetime.utcnow() - timedelta(days=dias)
+    totales = {nombre: 0 for nombre in TABLAS_ARCHIVO}
+    protegidos = _pedidos_protegidos()
+    movimiento_en_corte_abierto = exists().where(
+        MovimientoCaja.pedido_id == Pedido.id,
+        MovimientoCaja.corte_caja_id == CorteCaja.id,
+        CorteCaja.estado_corte == EstadoCorteCaja.ABIERTO
+    )
+    ultimo_id = 0
+
+    while limite is None or totales[Pedido.__table__.name] < limite:
+        tamano = chunk_size if limite is None else min(chunk_size, limite - totales[Pedido.__table__.name])
+        consulta = select(Pedido.id).where(
+            Pedido.id > ultimo_id,
+            estados.FILTRO_ARCHIVABLES,
+            Pedido.fecha_actualizacion < fecha_limite,
+            ~movimiento_en_corte_abierto
+        )
+        if protegidos:
+            consulta = consulta.where(Pedido.id.not_in(protegidos))
+        pedido_ids = db.session.execute(consulta.order_by(Pedido.id).limit(tamano)).scalars().all()
+        if not pedido_ids:
+            break
+        ultimo_id = pedido_ids[-1]
+
+        try:
+            movimiento_ids = select(MovimientoCaja.id).where(MovimientoCaja.pedido_id.in_(pedido_ids))
+            # Hijos primero: las condiciones de los hijos dependen de filas que todavía existen
+            lote = {
+                MovimientoDenominacion.__table__.name: _mover(MovimientoDenominacion, MovimientoDenominacion.movimiento_caja_id.in_(movimiento_ids)),
+                MovimientoCaja.__table__.name: _mover(MovimientoCaja, MovimientoCaja.pedido_id.in_(pedido_ids)),
+                PedidoItem.__table__.name: _mover(PedidoItem, PedidoItem.pedido_id.in_(pedido_ids)),
+                ProductoAdicional.__table__.name: _mover(ProductoAdicional, ProductoAdicional.pedido_id.in_(pedido_ids)),
+                Pedido.__table__.name: _mover(Pedido, Pedido.id.in_(pedido_ids)),
+            }
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al archivar el lote de pedidos {pedido_ids[0]}-{pedido_ids[-1]}: {e}")
+            return None
+
+        for nombre, filas in lote.items():
+            totales[nombre] += filas
+        if progreso:
+            progreso(f'  {totales[Pedido.__table__.name]} pedidos archivados (hasta el ID {ultimo_id})...')
+
+    return totales
@@ -0,0 +1,196 @@
+# Archivo: PolleriaMontiel\app\utils\assets.py
+
+"""
+Pipeline de archivos estáticos: huella en el nombre, minificado, versiones precomprimidas y caché
+de larga duración.
+
+Las terminales de mostrador usan Wi-Fi débil y Flask sirve app/static sin caché explícita (el
+navegador revalida cada archivo en cada página). `flask build-assets` genera app/static/dist/:
+
+    - Cada archivo con el hash de su contenido en el nombre (css/estilo.3f2a9c1b0e.css) y un
+      manifest.json {nombre lógico: nombre con huella}.
+    - CSS minificado (sin comentarios ni espacios sobrantes); JS minificado solo si está instalado
+      `rjsmin` (un minificador por expresiones regulares podría romper cadenas o regex del código).
+    - Variantes .gz (siempre) y .br (si está instalado `brotli`) de los archivos de texto.
+    - Imágenes mayores a ASSETS_IMAGEN_UMBRAL_BYTES reducidas a ASSETS_IMAGEN_ANCHO_MAX px y
+      reoptimizadas (requiere Pillow; sin él se copian tal cual).
+
+En ejecución (`init_app`), si existe el manifest y ASSETS_FINGERPRINT está activo,
+url_for('static', filename=...) emite la ruta con huella y /static/dist/ responde con
+`Cache-Control: public, max-age=31536000, immutable` y la variante .br/.gz que acepte el navegador.
+Un cambio en el archivo cambia su hash y, con él, la URL: no hace falta invalidar nada.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Dict, Optional
+
+from flask import Flask, current_app, request, send_from_directory
+
+DIRECTORIO_DIST = 'dist'
+NOMBRE_MANIFEST = 'manifest.json'
+MAX_AGE_INMUTABLE = 31536000 # Un año
+EXTENSIONES_TEXTO = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+EXTENSIONES_IMAGEN = {'.png', '.jpg', '.jpeg'}
+UMBRAL_IMAGEN_DEFAULT = 100 * 1024
+ANCHO_IMAGEN_DEFAULT = 512
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+# --- Construcción (flask build-assets) ---
+
+def minificar_css(texto: str) -> str:
+    """Quita comentarios y espacios sobrantes; no reescribe reglas ni valores."""
+    texto = re.sub(r'/\*.*?\*/', '', texto, flags=re.S)
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\s*([{};,])\s*', r'\1', texto) # No toca ':' (a :hover != a:hover) ni '+' (calc)
+    return texto.replace(';}', '}').strip()
+
+
+def _minificar(extension: str, contenido: bytes) -> bytes:
+    if extension == '.css':
+        return minificar_css(contenido.decode('utf-8')).encode('utf-8')
+    if extension == '.js' and rjsmin is not None:
+        return rjsmin.jsmin(contenido.decode('utf-8')).encode('utf-8')
+    return contenido
+
+
+def _optimizar_imagen(ruta: str, ancho_max: int) -> Optional[bytes]:
+    """PNG/JPEG reducido al ancho máximo y reoptimizado, o None si Pillow no está instalado."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    import io
+    with Image.open(ruta) as imagen:
+        formato = imagen.format
+        if imagen.width > ancho_max:
+            imagen = imagen.resize((ancho_max, round(imagen.height * ancho_max / imagen.width)), Image.LANCZOS)
+        salida = io.BytesIO()
+        if formato == 'JPEG':
+            imagen.save(salida, format='JPEG', quality=85, optimize=True, progressive=True)
+        else:
+            imagen.save(salida, format='PNG', optimize=True)
+    return salida.getvalue()
+
+
+def _escribir(ruta: str, contenido: bytes):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as archivo:
+        archivo.write(contenido)
+
+
+def construir_assets(app: Flask, progreso=None) -> Dict[str, str]:
+    """
+    Regenera app/static/dist a partir de app/static (ver el docstring del módulo).
+
+    Args:
+        progreso: Función opcional para reportar cada archivo (ej. click.echo).
+
+    Returns:
+        El manifest {nombre lógico: ruta con huella relativa a static/}.
+    """
+    origen = app.static_folder
+    destino = os.path.join(origen, DIRECTORIO_DIST)
+    umbral = app.config.get('ASSETS_IMAGEN_UMBRAL_BYTES', UMBRAL_IMAGEN_DEFAULT)
+    ancho_max = app.config.get('ASSETS_IMAGEN_ANCHO_MAX', ANCHO_IMAGEN_DEFAULT)
+    shutil.rmtree(destino, ignore_errors=True) # Sin archivos huérfanos de construcciones anteriores
+
+    manifest = {}
+    for carpeta, subcarpetas, archivos in os.walk(origen):
+        subcarpetas[:] = sorted(d for d in subcarpetas if os.path.join(carpeta, d) != destino)
+        for nombre_archivo in sorted(archivos):
+            ruta = os.path.join(carpeta, nombre_archivo)
+            logico = os.path.relpath(ruta, origen).replace(os.sep, '/')
+            base, extension = os.path.splitext(logico)
+            extension = extension.lower()
+            with open(ruta, 'rb') as archivo:
+                original = archivo.read()
+
+            contenido = _minificar(extension, original)
+            if extension in EXTENSIONES_IMAGEN and len(original) > umbral:
+                optimizada = _optimizar_imagen(ruta, ancho_max)
+                if optimizada is None:
+                    print(f"Advertencia: Pillow no está instalado; {logico} ({len(original)} bytes) se copia sin optimizar.")
+                elif len(optimizada) < len(original):
+                    contenido = optimizada
+
+            huella = hashlib.sha256(contenido).hexdigest()[:10]
+            con_huella = f'{DIRECTORIO_DIST}/{base}.{huella}{extension}'
+            ruta_destino = os.path.join(origen, con_huella)
+            _escribir(ruta_destino, contenido)
+            if extension in EXTENSIONES_TEXTO:
+                _escribir(ruta_destino + '.gz', gzip.compress(contenido, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _escribir(ruta_destino + '.br', brotli.compress(contenido, quality=11))
+            manifest[logico] = con_huella
+            if progreso:
+                progreso(f'  {logico} -> {con_huella} ({len(original)} -> {len(contenido)} bytes)')
+
+    _escribir(os.path.join(destino, NOMBRE_MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+# --- Ejecución ---
+
+def _cargar_manifest(app: Flask) -> Dict[str, str]:
+    ruta = os.path.join(app.static_folder, DIRECTORIO_DIST, NOMBRE_MANIFEST)
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: No se pudo leer el manifest de assets {ruta}: {e}")
+        return {}
+
+
+def servir_dist(filename: str):
+    """Archivo con huella de /static/dist/, en la variante comprimida que acepte el navegador."""
+    directorio = os.path.join(current_app.static_folder, DIRECTORIO_DIST)
+    aceptadas = request.accept_encodings
+    tipo = mimetypes.guess_type(filename)[0]
+    codificacion = None
+    for sufijo, nombre in (('.br', 'br'), ('.gz', 'gzip')):
+        if aceptadas[nombre] and os.path.isfile(os.path.join(directorio, filename + sufijo)):
+            filename, codificacion = filename + sufijo, nombre
+            break
+
+    respuesta = send_from_directory(directorio, filename, mimetype=tipo, max_age=MAX_AGE_INMUTABLE)
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    if codificacion:
+        respuesta.headers['Content-Encoding'] = codificacion
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+def init_app(app: Flask):
+    """Activa las URLs con huella si ASSETS_FINGERPRINT está activo y ya se corrió flask build-assets."""
+    if not app.config.get('ASSETS_FINGERPRINT', True) or not app.static_folder:
+        return
+    manifest = _cargar_manifest(app)
+    if not manifest:
+        return
+
+    # Regla más específica que /static/<path:filename>: Werkzeug prefiere el segmento fijo 'dist'
+    app.add_url_rule(f'{app.static_url_path}/{DIRECTORIO_DIST}/<path:filename>', endpoint='static_dist', view_func=servir_dist)
+
+    @app.url_defaults
+    def _url_con_huella(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
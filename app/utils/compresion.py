@@ -0,0 +1,141 @@
+# Archivo: PolleriaMontiel\app\utils\compresion.py
+
+"""
+Compresión gzip/brotli de las respuestas de texto (HTML de los listados, JSON de los endpoints AJAX).
+
+Los listados (pedidos, precios, detalle de corte) y las respuestas AJAX son texto muy repetitivo que
+se reduce 5-10x comprimido; en el Wi-Fi de las terminales de mostrador eso pesa más que el CPU de
+comprimir. `init_app` registra un after_request que comprime cuando:
+
+    - el navegador lo acepta (Accept-Encoding): brotli si está instalado el paquete `brotli`,
+      si no gzip (de la biblioteca estándar);
+    - el Content-Type está en COMPRESION_TIPOS y el cuerpo tiene al menos COMPRESION_MIN_BYTES
+      (debajo de ~500 bytes los encabezados de gzip cuestan más de lo que se ahorra);
+    - la respuesta no viene ya codificada (ej. /static/dist/ sirve sus .br/.gz precomprimidos),
+      no es parcial (206), no tiene cuerpo (204/304, HEAD) y no pide `Cache-Control: no-transform`.
+
+Las respuestas en streaming (generadores, send_file) no se cargan en memoria: cada fragmento se
+comprime y se vacía (flush) al salir, así el cliente sigue recibiendo los datos conforme se generan.
+"""
+
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_BYTES_DEFAULT = 500
+NIVEL_GZIP_DEFAULT = 6
+NIVEL_BROTLI_DEFAULT = 4 # Calidad 4-5: cerca de gzip -9 en tamaño con menos CPU; 11 es solo para precomprimir
+TIPOS_DEFAULT = (
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'text/xml', 'image/svg+xml',
+)
+
+
+# --- Compresores ---
+
+class _Gzip:
+    def __init__(self, nivel: int):
+        self._z = zlib.compressobj(nivel, zlib.DEFLATED, 31) # wbits 16+15: formato gzip
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._z.compress(datos)
+
+    def vaciar(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, nivel: int):
+        self._b = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._b.process(datos)
+
+    def vaciar(self) -> bytes:
+        return self._b.flush()
+
+    def terminar(self) -> bytes:
+        return self._b.finish()
+
+
+def crear_compresor(codificacion: str, nivel: Optional[int] = None):
+    """Compresor incremental para 'gzip' o 'br' (también lo usa benchmarks/compresion.py)."""
+    if codificacion == 'br':
+        return _Brotli(NIVEL_BROTLI_DEFAULT if nivel is None else nivel)
+    return _Gzip(NIVEL_GZIP_DEFAULT if nivel is None else nivel)
+
+
+def comprimir(codificacion: str, datos: bytes, nivel: Optional[int] = None) -> bytes:
+    compresor = crear_compresor(codificacion, nivel)
+    return compresor.comprimir(datos) + compresor.terminar()
+
+
+# --- Hook de respuesta ---
+
+def _codificacion_aceptada() -> Optional[str]:
+    disponibles = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(disponibles)
+
+
+def _comprimible(response: Response) -> bool:
+    if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers or response.cache_control.no_transform:
+        return False
+    tipos = current_app.config.get('COMPRESION_TIPOS', TIPOS_DEFAULT)
+    return response.mimetype in tipos
+
+
+def _en_streaming(fragmentos: Iterable[bytes], compresor) -> Iterator[bytes]:
+    for fragmento in fragmentos:
+        if isinstance(fragmento, str):
+            fragmento = fragmento.encode('utf-8')
+        datos = compresor.comprimir(fragmento) + compresor.vaciar() # Vaciar: no retener lo ya generado
+        if datos:
+            yield datos
+    yield compresor.terminar()
+
+
+def _after_request(response: Response) -> Response:
+    if not _comprimible(response):
+        return response
+    codificacion = _codificacion_aceptada()
+    response.vary.add('Accept-Encoding') # La respuesta depende del encabezado aunque vaya sin comprimir
+    if codificacion is None:
+        return response
+    nivel = current_app.config.get('COMPRESION_NIVEL_BROTLI' if codificacion == 'br' else 'COMPRESION_NIVEL_GZIP')
+
+    if response.is_streamed:
+        original = response.response
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.response = _en_streaming(original, crear_compresor(codificacion, nivel))
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        datos = response.get_data()
+        if len(datos) < current_app.config.get('COMPRESION_MIN_BYTES', MIN_BYTES_DEFAULT):
+            return response
+        response.set_data(comprimir(codificacion, datos, nivel)) # También actualiza Content-Length
+
+    response.headers['Content-Encoding'] = codificacion
+    etag, debil = response.get_etag()
+    if etag and not debil:
+        response.set_etag(etag, weak=True) # Los bytes cambiaron: el ETag ya no es idéntico byte a byte
+    return response
+
+
+def init_app(app: Flask):
+    """Registra la compresión de respuestas si COMPRESION_ACTIVA está activo."""
+    if not app.config.get('COMPRESION_ACTIVA', True):
+        return
+    app.after_request(_after_request)
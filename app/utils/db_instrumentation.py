@@ -0,0 +1,145 @@
+# Archivo: PolleriaMontiel\app\utils\db_instrumentation.py
+
+"""
+Instrumentación de SQL por petición.
+
+Cuenta las consultas, acumula el tiempo total de BD y conserva las N sentencias más lentas
+de cada petición. Al final de la petición:
+    - Agrega el encabezado `Server-Timing` (visible en las DevTools del navegador).
+    - Escribe una línea de log estructurada (JSON) en el logger 'sgpm.sql'.
+    - Registra como WARNING cada sentencia que supere SQL_SLOW_QUERY_MS.
+
+Configuración (config.py):
+    SQL_INSTRUMENTATION (True), SQL_SLOW_QUERY_MS (100), SQL_SLOWEST_N (3),
+    SQL_SERVER_TIMING (True), SQL_LOG_REQUESTS (True).
+"""
+
+import heapq
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sgpm.sql')
+
+# Longitud máxima de SQL que se guarda en logs/estadísticas
+_MAX_SQL_LEN = 500
+_listeners_registrados = False
+
+
+def _nuevas_estadisticas() -> Dict[str, Any]:
+    return {'count': 0, 'total_ms': 0.0, 'slowest': []} # slowest: heap de (ms, sql)
+
+
+def get_request_sql_stats() -> Optional[Dict[str, Any]]:
+    """Retorna las estadísticas SQL de la petición actual (o None fuera de una petición)."""
+    if not has_request_context():
+        return None
+    return g.get('_sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_sql_inicio', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('_sql_inicio')
+    if not inicios:
+        return
+    duracion_ms = (time.perf_counter() - inicios.pop()) * 1000.0
+
+    stats = get_request_sql_stats()
+    if stats is None:
+        return
+
+    stats['count'] += 1
+    stats['total_ms'] += duracion_ms
+
+    sql = ' '.join(statement.split())[:_MAX_SQL_LEN]
+    n = current_app.config.get('SQL_SLOWEST_N', 3)
+    if n > 0:
+        if len(stats['slowest']) < n:
+            heapq.heappush(stats['slowest'], (duracion_ms, sql))
+        elif duracion_ms > stats['slowest'][0][0]:
+            heapq.heapreplace(stats['slowest'], (duracion_ms, sql))
+
+    umbral = current_app.config.get('SQL_SLOW_QUERY_MS', 100)
+    if umbral is not None and duracion_ms >= umbral:
+        logger.warning(json.dumps({
+            'event': 'slow_query',
+            'endpoint': request.endpoint,
+            'ms': round(duracion_ms, 2),
+            'sql': sql,
+        }, ensure_ascii=False))
+
+
+def _handle_error(exception_context):
+    # Si la sentencia falla no se llama after_cursor_execute; descartar su marca de inicio
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_sql_inicio'):
+        conn.info['_sql_inicio'].pop()
+
+
+def _before_request():
+    g._sql_stats = _nuevas_estadisticas()
+    g._inicio_peticion = time.perf_counter()
+
+
+def _after_request(response):
+    stats = g.get('_sql_stats')
+    if stats is None:
+        return response
+
+    app_ms = (time.perf_counter() - g._inicio_peticion) * 1000.0
+    config = current_app.config
+
+    if config.get('SQL_SERVER_TIMING', True):
+        valor = f'db;dur={stats["total_ms"]:.2f};desc="{stats["count"]} queries", app;dur={app_ms:.2f}'
+        existente = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f'{existente}, {valor}' if existente else valor
+
+    if config.get('SQL_LOG_REQUESTS', True):
+        logger.info(json.dumps({
+            'event': 'request_sql',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats['count'],
+            'db_ms': round(stats['total_ms'], 2),
+            'app_ms': round(app_ms, 2),
+            'slowest': [
+                {'ms': round(ms, 2), 'sql': sql}
+                for ms, sql in sorted(stats['slowest'], reverse=True)
+            ],
+        }, ensure_ascii=False))
+
+    return response
+
+
+def init_app(app):
+    """Registra los eventos del motor y los hooks de petición si SQL_INSTRUMENTATION está activo."""
+    global _listeners_registrados
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    # Escuchar a nivel de clase Engine cubre la primaria, la réplica y motores creados después
+    if not _listeners_registrados:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _listeners_registrados = True
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    if not logger.handlers and not logging.getLogger().handlers:
+        # Sin configuración de logging externa, enviar las líneas a la salida estándar de errores
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
@@ -0,0 +1,95 @@
+# Archivo: PolleriaMontiel\app\utils\db_migration.py
+
+"""
+Copia de datos desde la base SQLite del MVP (app.db) hacia otra base (normalmente PostgreSQL).
+
+El esquema destino debe existir previamente (`flask db upgrade` con DATABASE_URL apuntando
+al servidor nuevo). Se leen y escriben las tablas con los mismos objetos Table de los modelos,
+así los Enum y Numeric se convierten por SQLAlchemy (texto de SQLite -> Enum/Decimal -> tipo nativo).
+"""
+
+from typing import Dict, Optional
+from sqlalchemy import create_engine, func, select, text, Integer
+from sqlalchemy.engine import Engine
+
+from app import db
+
+# Tamaño de lote por defecto para lectura/inserción
+CHUNK_SIZE_DEFAULT = 5000
+
+
+def _copiar_tabla(origen: Engine, destino_conn, table, chunk_size: int) -> int:
+    """Copia una tabla completa en lotes. Retorna el número de filas copiadas."""
+    total = 0
+    orden = list(table.primary_key.columns) or list(table.columns)
+    with origen.connect() as origen_conn:
+        resultado = origen_conn.execution_options(stream_results=True).execute(
+            select(table).order_by(*orden)
+        )
+        while True:
+            filas = resultado.fetchmany(chunk_size)
+            if not filas:
+                break
+            destino_conn.execute(table.insert(), [dict(fila._mapping) for fila in filas])
+            total += len(filas)
+    return total
+
+
+def _reiniciar_secuencias_postgres(destino_conn, table):
+    """Ajusta la secuencia SERIAL de la PK entera al máximo id copiado (solo PostgreSQL)."""
+    pk_cols = list(table.primary_key.columns)
+    if len(pk_cols) != 1 or not isinstance(pk_cols[0].type, Integer):
+        return
+    pk = pk_cols[0]
+    max_id = destino_conn.execute(select(func.max(pk))).scalar()
+    secuencia = destino_conn.execute(
+        text("SELECT pg_get_serial_sequence(:tabla, :columna)"),
+        {'tabla': table.name, 'columna': pk.name}
+    ).scalar()
+    if secuencia:
+        # is_called=false cuando la tabla está vacía para que el siguiente id sea 1
+        destino_conn.execute(
+            text("SELECT setval(:secuencia, :valor, :llamado)"),
+            {'secuencia': secuencia, 'valor': max_id or 1, 'llamado': max_id is not None}
+        )
+
+
+def migrar_sqlite_a_destino(
+    ruta_sqlite: str,
+    destino: Optional[Engine] = None,
+    chunk_size: int = CHUNK_SIZE_DEFAULT,
+    vaciar_destino: bool = False
+) -> Dict[str, int]:
+    """
+    Copia todas las tablas de los modelos desde un archivo SQLite al motor destino.
+
+    Args:
+        ruta_sqlite: Ruta al archivo SQLite de origen (ej. app.db).
+        destino: Engine destino; por defecto db.engine de la app actual.
+        chunk_size: Filas por lote de inserción.
+        vaciar_destino: Si es True, borra el contenido de las tablas destino antes de copiar.
+
+    Returns:
+        Diccionario {nombre_tabla: filas_copiadas}.
+    """
+    origen = create_engine(f'sqlite:///{ruta_sqlite}')
+    destino = destino or db.engine
+    tablas = db.metadata.sorted_tables # Ordenadas por dependencias de FK
+    resumen: Dict[str, int] = {}
+
+    try:
+        with destino.begin() as destino_conn:
+            if vaciar_destino:
+                for table in reversed(tablas):
+                    destino_conn.execute(table.delete())
+
+            for table in tablas:
+                resumen[table.name] = _copiar_tabla(origen, destino_conn, table, chunk_size)
+
+            if destino.dialect.name == 'postgresql':
+                for table in tablas:
+                    _reiniciar_secuencias_postgres(destino_conn, table)
+    finally:
+        origen.dispose()
+
+    return resumen
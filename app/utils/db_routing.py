@@ -0,0 +1,103 @@
+# Archivo: PolleriaMontiel\app\utils\db_routing.py
+
+"""
+Enrutamiento de lecturas hacia una réplica de la base de datos.
+
+Las funciones de solo lectura (listados, reportes, dashboards) se marcan con @solo_lectura.
+Mientras se ejecutan, las consultas que no lleven escrituras pendientes se envían al bind
+'replica' (SQLALCHEMY_BINDS['replica']). Si no hay réplica configurada todo va a la primaria.
+
+Lectura de lo propio escrito (read-your-writes): después de un commit con escrituras,
+la sesión del usuario queda "pegada" a la primaria durante REPLICA_STICKY_SECONDS, tanto en
+la misma petición como en las siguientes (ej. POST -> redirect -> GET del listado).
+"""
+
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Nombre del bind de la réplica en SQLALCHEMY_BINDS
+REPLICA_BIND_KEY = 'replica'
+# Llave en la cookie de sesión con el instante (epoch) hasta el que se fuerza la primaria
+_SESSION_KEY_PRIMARIA_HASTA = '_db_primaria_hasta'
+
+# Bandera de contexto activada por @solo_lectura (soporta anidación y hilos/greenlets)
+_lectura_en_replica: ContextVar[bool] = ContextVar('lectura_en_replica', default=False)
+
+
+def solo_lectura(f):
+    """
+    Decorador para funciones de servicio/rutas que solo leen datos.
+    Sus consultas se envían a la réplica (si existe y la sesión no está pegada a la primaria).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = _lectura_en_replica.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _lectura_en_replica.reset(token)
+    return decorated_function
+
+
+def _sesion_pegada_a_primaria() -> bool:
+    """Indica si hubo una escritura reciente en esta petición o en la sesión del usuario."""
+    if not has_request_context():
+        return False
+    if g.get('_db_escritura_en_peticion'):
+        return True
+    primaria_hasta = flask_session.get(_SESSION_KEY_PRIMARIA_HASTA)
+    return bool(primaria_hasta) and time.time() < primaria_hasta
+
+
+class RoutingSession(Session):
+    """
+    Sesión de Flask-SQLAlchemy que decide entre primaria y réplica.
+    Las escrituras (flush) y cualquier consulta fuera de @solo_lectura usan siempre la primaria.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not _lectura_en_replica.get():
+            return engine
+
+        engines = self._db.engines
+        replica = engines.get(REPLICA_BIND_KEY)
+        # Solo se redirige lo que iba a la primaria (modelos sin bind_key propio)
+        if replica is None or engine is not engines.get(None):
+            return engine
+        # Nunca leer de la réplica con cambios sin confirmar en la sesión
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return engine
+        if _sesion_pegada_a_primaria():
+            return engine
+        return replica
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _marcar_escritura(session, flush_context):
+    """Registra que la transacción actual escribió en la primaria."""
+    session.info['_hubo_escritura'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pegar_a_primaria_tras_commit(session):
+    """Tras confirmar escrituras, fuerza la primaria para las lecturas siguientes del usuario."""
+    if not session.info.pop('_hubo_escritura', False):
+        return
+    if not has_request_context():
+        return
+    g._db_escritura_en_peticion = True
+    segundos = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    if segundos:
+        flask_session[_SESSION_KEY_PRIMARIA_HASTA] = time.time() + segundos
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _limpiar_escritura(session):
+    """Un rollback descarta las escrituras pendientes de la transacción."""
+    session.info.pop('_hubo_escritura', None)
@@ -38,8 +38,10 @@ def role_required(roles: RoleList):
                 return redirect(url_for('auth.login')) # Redirigir al login si no autenticado
 
             # Verificar si el usuario tiene alguno de los roles permitidos
-            # Asumimos que current_user.rol es el valor string del Enum cargado desde la BD
-            if not hasattr(current_user, 'rol') or current_user.rol not in allowed_roles_values:
+            # current_user.rol se carga como miembro del Enum RolUsuario; comparar por su valor
+            rol_actual = getattr(current_user, 'rol', None)
+            rol_actual_value = rol_actual.value if isinstance(rol_actual, RolUsuario) else rol_actual
+            if rol_actual_value not in allowed_roles_values:
                 flash("No tienes permiso para acceder a esta página.", "danger")
                 # Redirigir al dashboard principal o mostrar un error 403
                 return redirect(url_for('main.index')) # Redirigir al dashboard principal
@@ -0,0 +1,208 @@
+# Archivo: PolleriaMontiel\app\utils\exportacion.py
+
+"""
+Exportación columnar (Parquet o Arrow IPC) de pedidos, ítems, productos adicionales y movimientos
+de caja para análisis fuera del sistema.
+
+El reporte detallado arma un dict por fila y un DataFrame por pedido antes de escribir un XLSX; para
+meses de historia eso es lento y el archivo pesa decenas de MB. Aquí:
+
+    - Cada tabla se lee con Core (sin objetos ORM) en lotes de `chunk_size` filas, en streaming
+      (stream_results), activas y archivadas (union_historica), desde la réplica si está configurada.
+    - Cada lote se convierte a un RecordBatch de Arrow con un esquema fijo derivado de las columnas
+      del modelo (Numeric -> decimal128 exacto, Enum -> string, DateTime -> timestamp[us]) y se
+      escribe de inmediato: la memoria no crece con el rango de fechas.
+    - Un archivo por tabla y mes, en carpetas estilo Hive (`pedidos/mes=2026-01/pedidos-2026-01.parquet`),
+      que pyarrow.dataset, pandas, DuckDB o Power BI leen como una sola tabla particionada.
+    - Ítems y productos adicionales se particionan por el mes de su pedido (no tienen fecha propia).
+
+Requiere el paquete `pyarrow` (opcional: sin él `pa` es None y exportar_columnar retorna None).
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import and_, select
+
+from app import db
+from app.models import Pedido, PedidoItem, ProductoAdicional, MovimientoCaja
+from app.utils.archivo import union_historica
+from app.utils.db_routing import REPLICA_BIND_KEY
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+PARQUET, ARROW = 'parquet', 'arrow'
+FORMATOS = (PARQUET, ARROW)
+EXTENSIONES = {PARQUET: '.parquet', ARROW: '.arrow'}
+CHUNK_SIZE_DEFAULT = 50000
+COMPRESION_DEFAULT = 'zstd'
+
+# Tabla -> (modelo, columna de fecha para particionar; None = por el mes de su pedido)
+TABLAS_EXPORTACION = {
+    Pedido.__table__.name: (Pedido, 'fecha_creacion'),
+    PedidoItem.__table__.name: (PedidoItem, None),
+    ProductoAdicional.__table__.name: (ProductoAdicional, None),
+    MovimientoCaja.__table__.name: (MovimientoCaja, 'fecha_movimiento'),
+}
+
+
+def _tipo_arrow(tipo):
+    """Tipo de Arrow equivalente al tipo de la columna de SQLAlchemy."""
+    if isinstance(tipo, sa.Enum):
+        return pa.string()
+    if isinstance(tipo, sa.Float):
+        return pa.float64()
+    if isinstance(tipo, sa.Numeric):
+        return pa.decimal128(tipo.precision or 18, tipo.scale or 0) # Exacto, como en la BD
+    if isinstance(tipo, sa.Integer):
+        return pa.int64()
+    if isinstance(tipo, sa.Boolean):
+        return pa.bool_()
+    if isinstance(tipo, sa.DateTime):
+        return pa.timestamp('us')
+    if isinstance(tipo, sa.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def esquema_arrow(modelo):
+    """Esquema de Arrow con las columnas del modelo, en el mismo orden que union_historica."""
+    return pa.schema([
+        pa.field(columna.name, _tipo_arrow(columna.type), nullable=columna.nullable)
+        for columna in modelo.__table__.columns
+    ])
+
+
+def _lote_arrow(filas, esquema, columnas_enum) -> 'pa.RecordBatch':
+    columnas = list(zip(*filas))
+    arreglos = []
+    for indice, campo in enumerate(esquema):
+        valores = columnas[indice]
+        if indice in columnas_enum:
+            valores = [getattr(v, 'value', v) for v in valores] # Enum -> su valor
+        arreglos.append(pa.array(valores, type=campo.type))
+    return pa.RecordBatch.from_arrays(arreglos, schema=esquema)
+
+
+class _Escritor:
+    """Archivo Parquet o Arrow IPC de una partición; se abre con el primer lote."""
+
+    def __init__(self, ruta: str, esquema, formato: str, compresion: Optional[str]):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self.ruta = ruta
+        self._parquet = formato == PARQUET
+        self._destino = None
+        if self._parquet:
+            self._escritor = pq.ParquetWriter(ruta, esquema, compression=compresion or 'none')
+        else:
+            self._destino = pa.OSFile(ruta, 'wb')
+            opciones = pa.ipc.IpcWriteOptions(compression=compresion if compresion in ('zstd', 'lz4') else None)
+            self._escritor = pa.ipc.new_file(self._destino, esquema, options=opciones)
+
+    def escribir(self, lote):
+        if self._parquet:
+            self._escritor.write_table(pa.Table.from_batches([lote])) # Un row group por lote
+        else:
+            self._escritor.write_batch(lote)
+
+    def cerrar(self) -> int:
+        self._escritor.close()
+        if self._destino is not None:
+            self._destino.close()
+        return os.path.getsize(self.ruta)
+
+
+def _meses(desde: date, hasta: date) -> Iterator[Tuple[datetime, datetime, str]]:
+    """(inicio, fin exclusivo, 'AAAA-MM') de cada mes del rango, recortados a [desde, hasta]."""
+    fin_rango = datetime.combine(hasta, datetime.min.time()) + timedelta(days=1)
+    mes = date(desde.year, desde.month, 1)
+    while mes <= hasta:
+        siguiente = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        inicio = max(datetime.combine(mes, datetime.min.time()), datetime.combine(desde, datetime.min.time()))
+        yield inicio, min(datetime.combine(siguiente, datetime.min.time()), fin_rango), mes.strftime('%Y-%m')
+        mes = siguiente
+
+
+def _consulta_mes(modelo, columna_fecha: Optional[str], inicio: datetime, fin: datetime):
+    if columna_fecha is not None:
+        return union_historica(modelo, lambda c: and_(c[columna_fecha] >= inicio, c[columna_fecha] < fin))
+    pedidos_mes = union_historica(
+        Pedido, lambda c: and_(c.fecha_creacion >= inicio, c.fecha_creacion < fin)
+    ).subquery()
+    return union_historica(modelo, lambda c: c.pedido_id.in_(select(pedidos_mes.c.id)))
+
+
+def exportar_columnar(
+    directorio: str,
+    desde: date,
+    hasta: date,
+    formato: str = PARQUET,
+    tablas: Optional[Iterable[str]] = None,
+    chunk_size: int = CHUNK_SIZE_DEFAULT,
+    compresion: Optional[str] = COMPRESION_DEFAULT,
+    progreso: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    Escribe en `directorio` un archivo por tabla y mes con las filas del rango [desde, hasta].
+
+    Args:
+        directorio: Carpeta destino (se crea; los archivos existentes de las mismas particiones se reemplazan).
+        desde, hasta: Fechas (inclusive) de creación del pedido / del movimiento.
+        formato: 'parquet' o 'arrow' (Arrow IPC, formato de archivo de Feather v2).
+        tablas: Subconjunto de TABLAS_EXPORTACION (por defecto todas).
+        chunk_size: Filas por lote leído y escrito (row group en Parquet).
+        compresion: 'zstd', 'snappy', 'lz4', 'gzip' o None (Arrow IPC solo admite zstd y lz4).
+        progreso: Función opcional para reportar avance (ej. click.echo).
+
+    Returns:
+        {tabla: {'filas', 'archivos', 'bytes'}}, o None si pyarrow no está instalado o hubo un error.
+    """
+    if pa is None:
+        print("Error al exportar: el paquete pyarrow no está instalado (pip install pyarrow)")
+        return None
+    if formato not in FORMATOS:
+        print(f"Error al exportar: formato '{formato}' no soportado (use {', '.join(FORMATOS)})")
+        return None
+    tablas = list(tablas or TABLAS_EXPORTACION)
+    desconocidas = [t for t in tablas if t not in TABLAS_EXPORTACION]
+    if desconocidas:
+        print(f"Error al exportar: tablas no soportadas: {', '.join(desconocidas)}")
+        return None
+
+    engine = db.engines.get(REPLICA_BIND_KEY) or db.engine # Lectura masiva: réplica si existe
+    totales = {tabla: {'filas': 0, 'archivos': 0, 'bytes': 0} for tabla in tablas}
+    try:
+        with engine.connect() as conexion:
+            conexion = conexion.execution_options(stream_results=True, yield_per=chunk_size)
+            for tabla in tablas:
+                modelo, columna_fecha = TABLAS_EXPORTACION[tabla]
+                esquema = esquema_arrow(modelo)
+                columnas_enum = {
+                    i for i, columna in enumerate(modelo.__table__.columns) if isinstance(columna.type, sa.Enum)
+                }
+                for inicio, fin, mes in _meses(desde, hasta):
+                    escritor = None
+                    resultado = conexion.execute(_consulta_mes(modelo, columna_fecha, inicio, fin))
+                    try:
+                        for filas in resultado.partitions():
+                            if escritor is None:
+                                ruta = os.path.join(directorio, tabla, f'mes={mes}', f'{tabla}-{mes}{EXTENSIONES[formato]}')
+                                escritor = _Escritor(ruta, esquema, formato, compresion)
+                            escritor.escribir(_lote_arrow(filas, esquema, columnas_enum))
+                            totales[tabla]['filas'] += len(filas)
+                    finally:
+                        if escritor is not None:
+                            totales[tabla]['bytes'] += escritor.cerrar()
+                            totales[tabla]['archivos'] += 1
+                    if escritor is not None and progreso:
+                        progreso(f'  {tabla} {mes}: {totales[tabla]["filas"]} filas acumuladas')
+        return totales
+    except Exception as e:
+        print(f"Error al exportar {formato} a {directorio}: {e}")
+        return None
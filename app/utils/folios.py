@@ -0,0 +1,117 @@
+# Archivo: PolleriaMontiel\app\utils\folios.py
+
+"""
+Asignación de folios de pedido por bloques.
+
+El contador global vive en `ConfiguracionSistema.ultimo_folio_pedido`, pero no se lee y escribe
+en cada pedido (eso serializaría todas las terminales sobre la misma fila). Cada proceso reserva
+un bloque de FOLIO_BLOCK_SIZE folios con un UPDATE atómico en una transacción propia y corta, y
+los reparte en memoria (protegido con un lock entre hilos):
+
+    - Sin colisiones: cada bloque se reserva una sola vez (UPDATE ... SET n = n + tamaño) y
+      `pedidos.folio` es UNIQUE como segunda garantía.
+    - Tolerante a huecos: los folios de un bloque que no se usan (reinicio del worker, pedido que
+      falla y hace rollback) se pierden; el folio es consecutivo por proceso, no global.
+    - La fila de configuración solo se bloquea durante la reserva (1 de cada N pedidos) y nunca
+      mientras se guarda el pedido.
+
+Con SQLite en memoria (un solo connection compartido, tests) la reserva se hace dentro de la
+transacción del llamador y con bloques de 1, como el esquema original.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+from app import db
+from app.models import ConfiguracionSistema, Pedido, pedidos_archivo
+
+TAMANO_BLOQUE_DEFAULT = 100
+
+
+def _folio_inicial(conn) -> int:
+    """Último folio en uso según los pedidos existentes y archivados (para crear la fila de configuración)."""
+    maximo = conn.execute(select(func.max(func.coalesce(Pedido.folio, Pedido.id)))).scalar()
+    maximo_archivo = conn.execute(
+        select(func.max(func.coalesce(pedidos_archivo.c.folio, pedidos_archivo.c.id)))
+    ).scalar()
+    return max(int(maximo or 0), int(maximo_archivo or 0))
+
+
+def _reservar(conn, tamano: int) -> Tuple[int, int]:
+    """UPDATE atómico del contador en `conn`. Retorna (primer_folio, ultimo_folio) del bloque."""
+    config = ConfiguracionSistema.__table__
+    resultado = conn.execute(
+        update(config).where(config.c.id == 1)
+        .values(ultimo_folio_pedido=config.c.ultimo_folio_pedido + tamano)
+    )
+    if resultado.rowcount == 0:
+        # Sin fila de configuración todavía: crearla partiendo del último folio usado
+        conn.execute(config.insert().values(id=1, ultimo_folio_pedido=_folio_inicial(conn) + tamano))
+    # La fila ya está bloqueada por el UPDATE/INSERT de esta transacción: la lectura es consistente
+    ultimo = conn.execute(select(config.c.ultimo_folio_pedido).where(config.c.id == 1)).scalar_one()
+    return ultimo - tamano + 1, ultimo
+
+
+def reservar_bloque(tamano: int) -> Tuple[int, int]:
+    """
+    Reserva `tamano` folios consecutivos en una transacción independiente de la sesión actual.
+    Retorna (primer_folio, ultimo_folio). Lanza la excepción de BD si la reserva falla.
+    """
+    for intento in range(3):
+        try:
+            with db.engine.begin() as conn:
+                return _reservar(conn, tamano)
+        except IntegrityError:
+            # Otro proceso creó la fila de configuración al mismo tiempo; reintentar con UPDATE
+            if intento == 2:
+                raise
+
+
+class AsignadorFolios:
+    """Reparte en memoria los folios de los bloques reservados, por base de datos y por proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloques: Dict[str, list] = {} # url del motor -> [siguiente, ultimo]
+        self._pid = os.getpid()
+
+    def siguiente(self, tamano_bloque: int) -> int:
+        engine = db.engine
+        if isinstance(engine.pool, StaticPool):
+            # Conexión única compartida: reservar dentro de la transacción del llamador
+            primero, _ = _reservar(db.session.connection(), 1)
+            return primero
+
+        clave = engine.url.render_as_string(hide_password=True)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork de gunicorn con preload): no reutilizar los bloques del padre
+                self._bloques.clear()
+                self._pid = os.getpid()
+            bloque = self._bloques.get(clave)
+            if bloque is None or bloque[0] > bloque[1]:
+                bloque = self._bloques[clave] = list(reservar_bloque(tamano_bloque))
+            folio = bloque[0]
+            bloque[0] += 1
+            return folio
+
+    def descartar(self):
+        """Olvida los bloques en memoria (sus folios restantes quedan como hueco)."""
+        with self._lock:
+            self._bloques.clear()
+
+
+asignador = AsignadorFolios()
+
+
+def siguiente_folio(tamano_bloque: Optional[int] = None) -> int:
+    """Siguiente folio de pedido para este proceso (FOLIO_BLOCK_SIZE folios por reserva)."""
+    if tamano_bloque is None:
+        tamano_bloque = current_app.config.get('FOLIO_BLOCK_SIZE', TAMANO_BLOQUE_DEFAULT)
+    return asignador.siguiente(max(1, int(tamano_bloque)))
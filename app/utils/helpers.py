@@ -1,6 +1,6 @@
 from decimal import Decimal
 from datetime import datetime, date # Importar date explícitamente
-from typing import Union, List, Tuple # Importar tipos necesarios
+from typing import Any, Union, List, Tuple # Importar tipos necesarios
 
 # Importar modelos para anotaciones de tipo y acceso a Enum
 # Ten cuidado con las importaciones circulares si models.py importa helpers.py
@@ -83,14 +83,23 @@ def format_producto_adicional_description(pa: Union['ProductoAdicional', None])
     return f"- {quantity_formatted} {pa.unidad_medida_pa} {pa.nombre_pa} (PA): {subtotal_formatted}"
 
 
-def format_pedido_folio(pedido_id: Union[int, None]) -> str:
-    """Genera un folio formateado para mostrar al usuario."""
-    if pedido_id is None:
+def format_pedido_folio(pedido_o_id: Union[Any, int, None]) -> str:
+    """
+    Genera un folio formateado para mostrar al usuario.
+    Acepta un Pedido (usa su folio asignado y, si no tiene, su ID) o directamente un número.
+    """
+    if pedido_o_id is None:
+        return "N/A"
+    if isinstance(pedido_o_id, int):
+        numero = pedido_o_id
+    else:
+        numero = pedido_o_id.folio if pedido_o_id.folio is not None else pedido_o_id.id
+    if numero is None:
         return "N/A"
     # Prefijo y padding hardcodeados para MVP
     prefix = "PM-"
     padding = 6 # ej., PM-000123
-    return f"{prefix}{pedido_id:0{padding}d}"
+    return f"{prefix}{numero:0{padding}d}"
 
 def format_role_name(role_value: Union[str, None]) -> str:
     """Formatea el valor del rol a un nombre legible."""
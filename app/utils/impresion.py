@@ -0,0 +1,230 @@
+# Archivo: PolleriaMontiel\app\utils\impresion.py
+
+"""
+Cola de impresión local para impresoras térmicas ESC/POS.
+
+Las peticiones solo encolan los bytes ya generados (app/pedidos/tickets.py) y responden; un hilo
+trabajador por proceso los envía a la impresora, con reintentos, sin bloquear al cajero si la
+impresora tarda o está apagada.
+
+Destinos (IMPRESORA_TICKETS / IMPRESORA_COMANDAS):
+    - 'tcp://192.168.1.50:9100': impresora de red (puerto RAW, normalmente 9100).
+    - '/dev/usb/lp0' o 'file:///dev/usb/lp0': archivo de dispositivo (USB/serie); también sirve
+      cualquier archivo normal, al que se agregan los trabajos.
+    - 'fake' (o 'fake:cocina'): ImpresoraFalsa en memoria, para tests y desarrollo sin impresora.
+    - vacío: sin impresora configurada (encolar retorna None).
+
+La cola y el estado de sus trabajos viven en la memoria del proceso que encoló: con varios workers
+(gunicorn) una consulta de estado que llega a otro proceso no lo encuentra y responde 404. Los IDs
+son uuid4, así que nunca coinciden con los de otro proceso, y cada trabajo recuerda qué usuario
+lo encoló para que solo él (o un administrador) consulte su estado.
+"""
+
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from flask import current_app
+
+PUERTO_RAW_DEFAULT = 9100
+TIMEOUT_DEFAULT = 5.0
+REINTENTOS_DEFAULT = 3
+TRABAJOS_RECORDADOS = 200 # Trabajos terminados que se conservan para consultar su estado
+
+EN_COLA, IMPRESO, ERROR = 'EN_COLA', 'IMPRESO', 'ERROR'
+
+
+# --- Destinos ---
+
+class ImpresoraTCP:
+    def __init__(self, host: str, puerto: int, timeout: float):
+        self.host, self.puerto, self.timeout = host, puerto, timeout
+
+    def enviar(self, datos: bytes):
+        with socket.create_connection((self.host, self.puerto), timeout=self.timeout) as conexion:
+            conexion.sendall(datos)
+
+    def __repr__(self):
+        return f'tcp://{self.host}:{self.puerto}'
+
+
+class ImpresoraArchivo:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def enviar(self, datos: bytes):
+        with open(self.ruta, 'ab') as dispositivo:
+            dispositivo.write(datos)
+            dispositivo.flush()
+
+    def __repr__(self):
+        return self.ruta
+
+
+class ImpresoraFalsa:
+    """Guarda en memoria lo que se le envía. `fallar` simula una impresora apagada."""
+
+    def __init__(self, nombre: str = 'fake'):
+        self.nombre = nombre
+        self.fallar = False
+        self._trabajos: List[bytes] = []
+        self._lock = threading.Lock()
+
+    def enviar(self, datos: bytes):
+        if self.fallar:
+            raise OSError(f'Impresora falsa {self.nombre} sin conexión')
+        with self._lock:
+            self._trabajos.append(datos)
+
+    @property
+    def trabajos(self) -> List[bytes]:
+        with self._lock:
+            return list(self._trabajos)
+
+    def limpiar(self):
+        with self._lock:
+            self._trabajos.clear()
+
+    def __repr__(self):
+        return self.nombre
+
+
+_impresoras_falsas: Dict[str, ImpresoraFalsa] = {}
+_lock_falsas = threading.Lock()
+
+
+def impresora_falsa(nombre: str = 'fake') -> ImpresoraFalsa:
+    """La ImpresoraFalsa del proceso para ese nombre (la misma que usa la cola con destino 'fake')."""
+    with _lock_falsas:
+        if nombre not in _impresoras_falsas:
+            _impresoras_falsas[nombre] = ImpresoraFalsa(nombre)
+        return _impresoras_falsas[nombre]
+
+
+def crear_destino(destino: str, timeout: float = TIMEOUT_DEFAULT):
+    """Impresora para una cadena de destino (ver el docstring del módulo), o None si está vacía."""
+    destino = (destino or '').strip()
+    if not destino:
+        return None
+    if destino == 'fake' or destino.startswith('fake:'):
+        return impresora_falsa(destino)
+    url = urlparse(destino)
+    if url.scheme == 'tcp':
+        if not url.hostname:
+            raise ValueError(f'Destino de impresora sin host: {destino}')
+        return ImpresoraTCP(url.hostname, url.port or PUERTO_RAW_DEFAULT, timeout)
+    if url.scheme == 'file':
+        return ImpresoraArchivo(url.path)
+    if url.scheme:
+        raise ValueError(f'Destino de impresora no soportado: {destino}')
+    return ImpresoraArchivo(destino)
+
+
+# --- Cola ---
+
+class TrabajoImpresion:
+    def __init__(self, trabajo_id: str, destino, datos: bytes, descripcion: str, reintentos: int = REINTENTOS_DEFAULT,
+                 usuario_id: Optional[int] = None):
+        self.id = trabajo_id
+        self.usuario_id = usuario_id # Quién lo encoló (consulta de estado)
+        self.destino = destino
+        self.datos = datos
+        self.descripcion = descripcion
+        self.reintentos = max(1, reintentos)
+        self.estado = EN_COLA
+        self.intentos = 0
+        self.error: Optional[str] = None
+
+    def como_dict(self) -> Dict:
+        return {
+            'id': self.id, 'descripcion': self.descripcion, 'destino': repr(self.destino),
+            'estado': self.estado, 'intentos': self.intentos, 'error': self.error, 'bytes': len(self.datos),
+        }
+
+
+class ColaImpresion:
+    """Cola en memoria con un hilo trabajador (se inicia con el primer trabajo del proceso)."""
+
+    def __init__(self):
+        self._cola: 'queue.Queue[TrabajoImpresion]' = queue.Queue()
+        self._trabajos: 'OrderedDict[str, TrabajoImpresion]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+    def encolar(self, datos: bytes, descripcion: str = '', destino: Optional[str] = None,
+                clave_destino: str = 'IMPRESORA_TICKETS', usuario_id: Optional[int] = None) -> Optional[TrabajoImpresion]:
+        """
+        Encola bytes ESC/POS para imprimir. El destino se toma de la configuración (clave_destino)
+        si no se indica; usuario_id es quien lo encola (ver estado_impresion).
+
+        Returns:
+            El trabajo encolado, o None si no hay impresora configurada o el destino es inválido.
+        """
+        config = current_app.config
+        if destino is None:
+            destino = config.get(clave_destino) or config.get('IMPRESORA_TICKETS')
+        try:
+            impresora = crear_destino(destino, config.get('IMPRESORA_TIMEOUT', TIMEOUT_DEFAULT))
+        except ValueError as e:
+            print(f"Error de configuración de impresora: {e}")
+            return None
+        if impresora is None:
+            return None
+
+        with self._lock:
+            trabajo = TrabajoImpresion(
+                uuid.uuid4().hex, impresora, datos, descripcion, config.get('IMPRESION_REINTENTOS', REINTENTOS_DEFAULT),
+                usuario_id=usuario_id
+            )
+            self._trabajos[trabajo.id] = trabajo
+            while len(self._trabajos) > TRABAJOS_RECORDADOS:
+                self._trabajos.popitem(last=False)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name='cola-impresion', daemon=True)
+                self._hilo.start()
+        self._cola.put(trabajo)
+        return trabajo
+
+    def estado(self, trabajo_id: str) -> Optional[TrabajoImpresion]:
+        """El trabajo, si lo encoló este proceso y todavía se recuerda (None en otro caso)."""
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que se procesen los trabajos encolados (tests/CLI). True si la cola quedó vacía."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _trabajar(self):
+        while True:
+            trabajo = self._cola.get()
+            try:
+                self._imprimir(trabajo)
+            finally:
+                self._cola.task_done()
+
+    def _imprimir(self, trabajo: TrabajoImpresion):
+        for intento in range(1, trabajo.reintentos + 1):
+            trabajo.intentos = intento
+            try:
+                trabajo.destino.enviar(trabajo.datos)
+                trabajo.estado, trabajo.error = IMPRESO, None
+                return
+            except OSError as e:
+                trabajo.error = str(e)
+                if intento < trabajo.reintentos:
+                    time.sleep(0.5 * 2 ** (intento - 1)) # 0.5 s, 1 s, 2 s...
+        trabajo.estado = ERROR
+        print(f"Error al imprimir {trabajo.descripcion or trabajo.id} en {trabajo.destino!r}: {trabajo.error}")
+
+
+cola = ColaImpresion()
@@ -0,0 +1,214 @@
+# Archivo: PolleriaMontiel\app\utils\kpis_dia.py
+
+"""
+Indicadores del día en memoria para el inicio del administrador (main.index).
+
+Calcular las ventas del día en cada carga del inicio implicaría recorrer los pedidos de hoy en cada
+visita. En su lugar cada proceso guarda un resumen que actualizan los servicios de escritura:
+
+    - Pedidos de hoy (fecha_creacion en el día UTC, como se guardan): {id: (estado, total)}; de ahí
+      salen ventas (sin cancelados), número de pedidos, ticket promedio y pedidos por estado.
+      Los servicios de pedidos llaman a `pedido_guardado` / `pedido_eliminado` tras el commit; los
+      cambios de estado en lote llegan por el evento pedido_estado_cambiado (app/pedidos/eventos.py).
+    - Efectivo en caja por corte ABIERTO: saldo inicial + ingresos - egresos en EFECTIVO (la misma
+      regla que realizar_cierre_de_caja). registrar_metricas_movimiento (tras el commit de cualquier
+      movimiento), la apertura y el cierre de caja lo mantienen al día.
+    - Se rehidrata con dos consultas (pedidos de hoy por el índice de fecha_creacion y los cortes
+      abiertos agrupados) la primera vez que se lee en el proceso, al cambiar el día y cada
+      KPIS_DIA_TTL segundos: así converge con lo que registran los demás procesos.
+    - Guardar un pedido repetido es idempotente (se reemplaza su entrada), así que un servicio que
+      emite evento y además llama a `pedido_guardado` no cuenta doble.
+"""
+
+import threading
+import time
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import case, func, select
+
+from app import db
+from app.models import (
+    Pedido, MovimientoCaja, CorteCaja, Usuario, EstadoPedido, EstadoCorteCaja, TipoMovimientoCaja, FormaPago
+)
+
+TTL_DEFAULT = 300
+CERO = Decimal('0.00')
+
+
+class _KpisBase:
+    """Resumen del día de una base de datos (llamar a sus métodos con el lock de KpisDia)."""
+
+    def __init__(self, dia: date):
+        self.dia = dia
+        self.cargado_en = time.monotonic()
+        self.pedidos: Dict[int, Tuple[EstadoPedido, Decimal]] = {}
+        self.ventas = CERO
+        self.pedidos_con_venta = 0
+        self.por_estado: Dict[EstadoPedido, int] = {}
+        self.cajas: Dict[int, Tuple[str, Decimal]] = {} # corte_id -> (nombre del responsable, efectivo)
+
+    def quitar_pedido(self, pedido_id: int):
+        anterior = self.pedidos.pop(pedido_id, None)
+        if anterior is None:
+            return
+        estado, total = anterior
+        self.por_estado[estado] -= 1
+        if not self.por_estado[estado]:
+            del self.por_estado[estado]
+        if _cuenta_como_venta(estado):
+            self.ventas -= total
+            self.pedidos_con_venta -= 1
+
+    def poner_pedido(self, pedido_id: int, estado: EstadoPedido, total: Decimal):
+        self.quitar_pedido(pedido_id)
+        self.pedidos[pedido_id] = (estado, total)
+        self.por_estado[estado] = self.por_estado.get(estado, 0) + 1
+        if _cuenta_como_venta(estado):
+            self.ventas += total
+            self.pedidos_con_venta += 1
+
+
+def _cuenta_como_venta(estado: EstadoPedido) -> bool:
+    from app.pedidos import estados # Import local: app.pedidos importa este módulo (servicios)
+    return estado not in estados.CANCELADOS
+
+
+def _hoy() -> date:
+    return datetime.utcnow().date() # fecha_creacion se guarda en UTC
+
+
+def _decimal(valor) -> Decimal:
+    return Decimal(str(valor if valor is not None else 0))
+
+
+def _efectivo_neto(movimiento: MovimientoCaja) -> Decimal:
+    """Efecto de un movimiento sobre el efectivo en caja (0 si no es en efectivo)."""
+    if movimiento.forma_pago_efectuado != FormaPago.EFECTIVO:
+        return CERO
+    monto = _decimal(movimiento.monto_movimiento)
+    return monto if movimiento.tipo_movimiento == TipoMovimientoCaja.INGRESO else -monto
+
+
+class KpisDia:
+    """Indicadores del día por base de datos (url del motor), protegidos con un lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bases: Dict[str, _KpisBase] = {}
+
+    @staticmethod
+    def _clave() -> str:
+        return db.engine.url.render_as_string(hide_password=True)
+
+    def _cargar(self, dia: date) -> _KpisBase:
+        kpis = _KpisBase(dia)
+        inicio = datetime.combine(dia, hora.min)
+        filas = db.session.execute(
+            select(Pedido.id, Pedido.estado_pedido, Pedido.total_pedido).where(Pedido.fecha_creacion >= inicio)
+        ).all()
+        for pedido_id, estado, total in filas:
+            kpis.poner_pedido(pedido_id, estado, _decimal(total))
+
+        efectivo = func.coalesce(func.sum(case(
+            (MovimientoCaja.tipo_movimiento == TipoMovimientoCaja.INGRESO, MovimientoCaja.monto_movimiento),
+            else_=-MovimientoCaja.monto_movimiento
+        )), 0)
+        cajas = db.session.execute(
+            select(CorteCaja.id, Usuario.nombre_completo, CorteCaja.saldo_inicial_efectivo_teorico, efectivo)
+            .join(Usuario, Usuario.id == CorteCaja.usuario_id_responsable)
+            .outerjoin(MovimientoCaja, (MovimientoCaja.corte_caja_id == CorteCaja.id) & (MovimientoCaja.forma_pago_efectuado == FormaPago.EFECTIVO))
+            .where(CorteCaja.estado_corte == EstadoCorteCaja.ABIERTO)
+            .group_by(CorteCaja.id, Usuario.nombre_completo, CorteCaja.saldo_inicial_efectivo_teorico)
+        ).all()
+        for corte_id, nombre, saldo_inicial, neto in cajas:
+            kpis.cajas[corte_id] = (nombre, _decimal(saldo_inicial) + _decimal(neto))
+        return kpis
+
+    def _vigente(self) -> Optional[_KpisBase]:
+        """Resumen en memoria si sigue siendo de hoy y no venció el TTL (llamar con el lock)."""
+        kpis = self._bases.get(self._clave())
+        ttl = current_app.config.get('KPIS_DIA_TTL', TTL_DEFAULT)
+        if kpis is None or kpis.dia != _hoy() or time.monotonic() - kpis.cargado_en > ttl:
+            return None
+        return kpis
+
+    def resumen(self) -> Dict[str, Any]:
+        """Indicadores del día; solo consulta la BD si el proceso no tiene un resumen vigente."""
+        with self._lock:
+            kpis = self._vigente()
+        if kpis is None:
+            kpis = self._cargar(_hoy())
+            with self._lock:
+                self._bases[self._clave()] = kpis
+
+        with self._lock:
+            saldos: Dict[str, Decimal] = {}
+            for nombre, saldo in kpis.cajas.values():
+                saldos[nombre] = saldos.get(nombre, CERO) + saldo
+            return {
+                'total_ventas_dia': kpis.ventas,
+                'num_pedidos_dia': len(kpis.pedidos),
+                'ticket_promedio_dia': (kpis.ventas / kpis.pedidos_con_venta).quantize(Decimal('0.01')) if kpis.pedidos_con_venta else CERO,
+                'pedidos_por_estado': {estado.value: kpis.por_estado[estado] for estado in EstadoPedido if estado in kpis.por_estado},
+                'saldos_cajas_abiertas': saldos,
+            }
+
+    # --- Actualizaciones de los servicios (después del commit) ---
+
+    def pedido_guardado(self, pedido: Pedido):
+        """Registra el estado y total actuales de un pedido creado o modificado."""
+        # Leer los atributos fuera del lock (tras el commit pueden requerir recargar el pedido)
+        pedido_id, fecha_creacion = pedido.id, pedido.fecha_creacion
+        estado, total = pedido.estado_pedido, _decimal(pedido.total_pedido)
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is None or fecha_creacion is None or fecha_creacion.date() != kpis.dia:
+                return # Sin resumen cargado no hay nada que actualizar; un pedido de otro día no cuenta
+            kpis.poner_pedido(pedido_id, estado, total)
+
+    def estado_cambiado(self, pedido_id: int, estado_nuevo: EstadoPedido):
+        """Cambia el estado de un pedido de hoy ya registrado (ej. cambios en lote sin cargar el pedido)."""
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is None or pedido_id not in kpis.pedidos:
+                return
+            kpis.poner_pedido(pedido_id, estado_nuevo, kpis.pedidos[pedido_id][1])
+
+    def pedido_eliminado(self, pedido_id: int):
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is not None:
+                kpis.quitar_pedido(pedido_id)
+
+    def movimiento_registrado(self, movimiento: MovimientoCaja):
+        """Suma al efectivo del corte abierto un movimiento ya confirmado."""
+        neto, corte_id = _efectivo_neto(movimiento), movimiento.corte_caja_id
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is None or not neto or corte_id not in kpis.cajas:
+                return
+            nombre, saldo = kpis.cajas[corte_id]
+            kpis.cajas[corte_id] = (nombre, saldo + neto)
+
+    def corte_abierto(self, corte_id: int, nombre_responsable: str, saldo_inicial: Decimal):
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is not None:
+                kpis.cajas[corte_id] = (nombre_responsable, _decimal(saldo_inicial))
+
+    def corte_cerrado(self, corte_id: int):
+        with self._lock:
+            kpis = self._vigente()
+            if kpis is not None:
+                kpis.cajas.pop(corte_id, None)
+
+    def invalidar(self):
+        """Descarta los resúmenes; la siguiente lectura los vuelve a cargar (ej. tras seed-scale)."""
+        with self._lock:
+            self._bases.clear()
+
+
+kpis = KpisDia()
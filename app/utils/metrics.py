@@ -0,0 +1,258 @@
+# Archivo: PolleriaMontiel\app\utils\metrics.py
+
+"""
+Métricas en proceso con salida en formato de texto de Prometheus (sin dependencias externas).
+
+Los contadores e histogramas viven en memoria de cada proceso worker y se actualizan desde
+los servicios (pedidos, pagos, caja) y desde los hooks de petición; /metrics solo los serializa.
+Los gauges de estado (cortes abiertos, pedidos activos por estado) se calculan al momento del
+scrape con una consulta agregada cada uno.
+
+Nota: con varios workers (gunicorn) cada proceso expone sus propios contadores; Prometheus
+los distingue por instancia/puerto o deben sumarse en la consulta.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import g, request
+
+# Buckets por defecto (segundos) pensados para peticiones web y tiempo de BD
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_labels(nombres: Tuple[str, ...], valores: Tuple, extra: str = '') -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre: str, descripcion: str, labels: Iterable[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _clave(self, labels: Dict[str, object]) -> Tuple:
+        return tuple(labels.get(n, '') for n in self.labels)
+
+    def _encabezado(self) -> List[str]:
+        return [f'# HELP {self.nombre} {self.descripcion}', f'# TYPE {self.nombre} {self.tipo}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metrica):
+    """Contador monotónico con labels opcionales."""
+    tipo = 'counter'
+
+    def __init__(self, nombre, descripcion, labels=()):
+        super().__init__(nombre, descripcion, labels)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, cantidad: float = 1.0, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + float(cantidad)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        lineas = self._encabezado()
+        for clave, valor in sorted(valores):
+            lineas.append(f'{self.nombre}{_formatear_labels(self.labels, clave)} {_formatear_numero(valor)}')
+        return lineas
+
+
+class Histogram(_Metrica):
+    """Histograma con buckets acumulativos, _sum y _count."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, descripcion, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(nombre, descripcion, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple, List[float]] = {} # clave -> [conteos por bucket..., suma, total]
+
+    def observe(self, valor: float, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0.0] * (len(self.buckets) + 2)
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(clave, list(serie)) for clave, serie in self._series.items()]
+        lineas = self._encabezado()
+        for clave, serie in sorted(series):
+            acumulado = 0.0
+            for i, limite in enumerate(self.buckets):
+                acumulado += serie[i]
+                le = f'le="{_formatear_numero(limite)}"'
+                lineas.append(f'{self.nombre}_bucket{_formatear_labels(self.labels, clave, le)} {_formatear_numero(acumulado)}')
+            lineas.append(f'{self.nombre}_sum{_formatear_labels(self.labels, clave)} {_formatear_numero(serie[-2])}')
+            lineas.append(f'{self.nombre}_count{_formatear_labels(self.labels, clave)} {_formatear_numero(serie[-1])}')
+        return lineas
+
+
+class CallbackGauge(_Metrica):
+    """Gauge cuyo valor se obtiene al momento del scrape mediante una función."""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, descripcion, labels=(), callback: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        super().__init__(nombre, descripcion, labels)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lineas = self._encabezado()
+        if self.callback is None:
+            return lineas
+        for clave, valor in sorted(self.callback().items()):
+            lineas.append(f'{self.nombre}{_formatear_labels(self.labels, clave)} {_formatear_numero(valor)}')
+        return lineas
+
+
+class Registry:
+    """Conjunto de métricas que se serializan juntas en /metrics."""
+
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+
+    def register(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def render(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            try:
+                lineas.extend(metrica.render())
+            except Exception as e:
+                # Un gauge con error (ej. BD caída) no debe impedir exponer el resto
+                print(f"Error al generar métrica {metrica.nombre}: {e}")
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- Latencia por petición ---
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'sgpm_http_request_duration_seconds', 'Duración de las peticiones HTTP.',
+    labels=('blueprint', 'endpoint', 'method', 'status')
+))
+REQUEST_DB_TIME = REGISTRY.register(Histogram(
+    'sgpm_http_request_db_seconds', 'Tiempo de base de datos por petición HTTP.',
+    labels=('blueprint', 'endpoint')
+))
+REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    'sgpm_http_request_db_queries', 'Número de consultas SQL por petición HTTP.',
+    labels=('blueprint', 'endpoint'), buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+))
+
+# --- Métricas de negocio ---
+PEDIDOS_CREADOS = REGISTRY.register(Counter(
+    'sgpm_pedidos_creados_total', 'Pedidos creados.', labels=('tipo_venta',)
+))
+PEDIDO_ITEMS_AGREGADOS = REGISTRY.register(Counter(
+    'sgpm_pedido_items_agregados_total', 'Ítems de pollo añadidos a pedidos.'
+))
+PAGOS = REGISTRY.register(Counter(
+    'sgpm_pagos_total', 'Pagos de pedidos procesados.', labels=('forma_pago',)
+))
+PAGOS_MONTO = REGISTRY.register(Counter(
+    'sgpm_pagos_monto_total', 'Monto cobrado en pagos de pedidos (MXN).', labels=('forma_pago',)
+))
+PEDIDOS_TRANSICIONES = REGISTRY.register(Counter(
+    'sgpm_pedidos_transiciones_total', 'Cambios de estado de pedidos.', labels=('estado_anterior', 'estado_nuevo')
+))
+MOVIMIENTOS_CAJA = REGISTRY.register(Counter(
+    'sgpm_movimientos_caja_total', 'Movimientos de caja registrados.', labels=('tipo_movimiento', 'forma_pago')
+))
+MOVIMIENTOS_CAJA_MONTO = REGISTRY.register(Counter(
+    'sgpm_movimientos_caja_monto_total', 'Monto de los movimientos de caja (MXN).', labels=('tipo_movimiento', 'forma_pago')
+))
+
+
+def _cortes_abiertos() -> Dict[Tuple, float]:
+    from app import db
+    from app.models import CorteCaja, EstadoCorteCaja
+    total = db.session.query(db.func.count(CorteCaja.id)).filter(
+        CorteCaja.estado_corte == EstadoCorteCaja.ABIERTO
+    ).scalar()
+    return {(): float(total or 0)}
+
+
+def _pedidos_activos_por_estado() -> Dict[Tuple, float]:
+    from app import db
+    from app.models import Pedido
+    from app.pedidos import estados
+    filas = db.session.query(Pedido.estado_pedido, db.func.count(Pedido.id)).filter(
+        estados.FILTRO_ACTIVOS
+    ).group_by(Pedido.estado_pedido).all()
+    resultado = {(estado.value,): 0.0 for estado in estados.ACTIVOS_ORDENADOS} # Exponer también los estados en 0
+    for estado, total in filas:
+        resultado[(estado.value,)] = float(total)
+    return resultado
+
+
+CORTES_ABIERTOS = REGISTRY.register(CallbackGauge(
+    'sgpm_cortes_caja_abiertos', 'Cortes de caja actualmente abiertos.', callback=_cortes_abiertos
+))
+PEDIDOS_ACTIVOS = REGISTRY.register(CallbackGauge(
+    'sgpm_pedidos_activos', 'Pedidos en estados activos.', labels=('estado',), callback=_pedidos_activos_por_estado
+))
+
+
+# --- Hooks de petición ---
+
+def _before_request():
+    g._metrics_inicio = time.perf_counter()
+
+
+def _after_request(response):
+    inicio = g.get('_metrics_inicio')
+    if inicio is None or request.endpoint == 'main.metrics':
+        return response
+    endpoint = request.endpoint or 'sin_endpoint' # 404 y similares
+    blueprint = request.blueprint or ''
+    REQUEST_LATENCY.observe(
+        time.perf_counter() - inicio,
+        blueprint=blueprint, endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    # Tiempo de BD recolectado por la instrumentación SQL (si está activa)
+    from app.utils.db_instrumentation import get_request_sql_stats
+    stats = get_request_sql_stats()
+    if stats is not None:
+        REQUEST_DB_TIME.observe(stats['total_ms'] / 1000.0, blueprint=blueprint, endpoint=endpoint)
+        REQUEST_DB_QUERIES.observe(stats['count'], blueprint=blueprint, endpoint=endpoint)
+    return response
+
+
+def init_app(app):
+    """Registra los hooks que alimentan los histogramas de latencia."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
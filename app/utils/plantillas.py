@@ -0,0 +1,70 @@
+# Archivo: PolleriaMontiel\app\utils\plantillas.py
+
+"""
+Caché de bytecode de Jinja y precompilación de plantillas.
+
+Jinja compila cada plantilla la primera vez que se usa en cada proceso; las pesadas
+(pedidos/crear_pedido.html, pedidos/editar_pedido.html) tardan lo suficiente para que el primer
+cajero después de un deploy o reciclado de workers lo note.
+
+    - `init_app` configura un FileSystemBytecodeCache (por defecto en instance/jinja_bytecode):
+      un proceso nuevo solo carga el código ya compilado. Jinja invalida cada entrada si la plantilla
+      cambió (compara el mtime), así que no hay que limpiar nada al desplegar.
+    - `flask precompile-templates` compila todas las plantillas y llena esa caché (ej. en el deploy).
+    - Con TEMPLATES_PRECOMPILAR_AL_INICIO, create_app además las carga en la caché en memoria del
+      proceso al arrancar, para que ninguna petición pague la compilación.
+"""
+
+import os
+import time
+from typing import Dict, List, Tuple
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+NOMBRE_DIRECTORIO_DEFAULT = 'jinja_bytecode'
+
+
+def init_app(app: Flask):
+    """Configura la caché de bytecode en el entorno de Jinja si TEMPLATE_BYTECODE_CACHE está activo."""
+    if not app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+        return
+    directorio = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, NOMBRE_DIRECTORIO_DEFAULT)
+    try:
+        os.makedirs(directorio, exist_ok=True)
+    except OSError as e:
+        # Sin directorio se sigue compilando en cada proceso, como antes
+        print(f"Advertencia: No se pudo crear el directorio de caché de plantillas {directorio}: {e}")
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
+
+
+def precompilar_plantillas(app: Flask) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Compila todas las plantillas .html de la aplicación y de los blueprints.
+
+    Quedan en la caché en memoria del proceso y, si está configurada, en la caché de bytecode.
+
+    Returns:
+        (plantillas compiladas, {plantilla: error}) — una plantilla con errores de sintaxis no
+        detiene a las demás.
+    """
+    compiladas, errores = [], {}
+    for nombre in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(nombre)
+            compiladas.append(nombre)
+        except Exception as e:
+            errores[nombre] = str(e)
+    return compiladas, errores
+
+
+def precalentar(app: Flask):
+    """Precompila al arrancar el proceso (TEMPLATES_PRECOMPILAR_AL_INICIO) y resume el resultado."""
+    inicio = time.perf_counter()
+    compiladas, errores = precompilar_plantillas(app)
+    app.logger.info(
+        'Plantillas precompiladas: %d en %.2f s (%d con errores)', len(compiladas), time.perf_counter() - inicio, len(errores)
+    )
+    for nombre, error in errores.items():
+        app.logger.warning('No se pudo compilar la plantilla %s: %s', nombre, error)
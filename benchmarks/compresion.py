@@ -0,0 +1,216 @@
+# Archivo: PolleriaMontiel\benchmarks\compresion.py
+
+"""
+Benchmark de la compresión de respuestas (app/utils/compresion.py): bytes en la red y CPU.
+
+1. Captura sin comprimir las respuestas reales de los listados (pedidos, precios, detalle de corte)
+   y de endpoints JSON, sobre un dataset sintético.
+2. Para cada respuesta, y para cortes de la más grande a tamaños fijos (1 KB ... 256 KB), mide
+   tamaño comprimido y tiempo de CPU por respuesta con gzip (niveles 1/6/9) y brotli (4/11, si
+   está instalado el paquete `brotli`).
+3. Mide la petición completa con la compresión activa contra la misma app sin compresión.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/compresion.py
+    python benchmarks/compresion.py --pedidos 5000 --repeticiones 200 --salida benchmarks/results/compresion.json
+
+Usa una BD SQLite temporal (se crea y se borra en cada corrida).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+# Permitir ejecutar el script directamente sin instalar el paquete
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+from app import create_app, db
+from config import config, TestingConfig
+from app.utils import compresion
+from benchmarks.dataset import generar_dataset
+
+TAMANOS_CORTE = (1024, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024)
+
+
+def _codecs() -> List[Tuple[str, str, int]]:
+    codecs = [('gzip-1', 'gzip', 1), ('gzip-6', 'gzip', 6), ('gzip-9', 'gzip', 9)]
+    if compresion.brotli is not None:
+        codecs += [('br-4', 'br', 4), ('br-11', 'br', 11)]
+    return codecs
+
+
+def _mediana_us(fn: Callable[[], Any], repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return statistics.median(tiempos)
+
+
+def _crear_app(url_bd: str, comprimir: bool):
+    nombre = f'benchmark_compresion_{int(comprimir)}'
+    config[nombre] = type('BenchmarkCompresionConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': url_bd,
+        'SQL_SLOW_QUERY_MS': None,
+        'COMPRESION_ACTIVA': comprimir,
+    })
+    return create_app(nombre)
+
+
+def _cliente(app):
+    client = app.test_client()
+    respuesta = client.post('/auth/login', data={'username': 'bench_admin', 'password': 'bench'})
+    if respuesta.status_code != 302 or '/auth/login' in respuesta.headers.get('Location', ''):
+        print("  Advertencia: no se pudo iniciar sesión como bench_admin; las páginas redirigirán al login.")
+    return client
+
+
+def _peticiones(app) -> Dict[str, Tuple[str, str, Dict[str, Any]]]:
+    from app.models import CorteCaja
+    hoy = datetime.utcnow().date()
+    rango_semana = {'fecha_desde': (hoy - timedelta(days=7)).isoformat(), 'fecha_hasta': hoy.isoformat()}
+    peticiones = {
+        'GET pedidos (listado)': ('get', '/pedidos/', {}),
+        'GET productos.listar_precios': ('get', '/productos/precios/', {}),
+        'GET caja.listar_cortes': ('get', '/caja/cortes', {}),
+        'GET ajax buscar productos (JSON)': ('get', '/pedidos/ajax/productos/buscar?q=po', {}),
+        'POST ajax reportes estadísticas 7d (JSON)': ('post', '/pedidos/ajax/reportes/pedidos_estadisticas', {'json': rango_semana}),
+    }
+    with app.app_context():
+        corte = CorteCaja.query.order_by(CorteCaja.id.desc()).first()
+    if corte:
+        peticiones['GET caja.ver_corte'] = ('get', f'/caja/cortes/{corte.id}', {})
+    return peticiones
+
+
+def capturar_cuerpos(app, peticiones) -> Dict[str, bytes]:
+    """Cuerpos sin comprimir de cada petición que responde 200."""
+    client = _cliente(app)
+    cuerpos = {}
+    for nombre, (metodo, url, kwargs) in peticiones.items():
+        respuesta = getattr(client, metodo)(url, **kwargs)
+        if respuesta.status_code != 200:
+            print(f"  Omitida {nombre}: HTTP {respuesta.status_code}")
+            continue
+        cuerpos[nombre] = respuesta.get_data()
+    return cuerpos
+
+
+def medir_codecs(cuerpos: Dict[str, bytes], repeticiones: int) -> Dict[str, Any]:
+    """Tamaño comprimido y CPU (mediana en µs) por cuerpo y codec."""
+    resultados = {}
+    for nombre, datos in cuerpos.items():
+        fila = {'bytes': len(datos)}
+        for etiqueta, codificacion, nivel in _codecs():
+            comprimido = compresion.comprimir(codificacion, datos, nivel)
+            fila[etiqueta] = {
+                'bytes': len(comprimido),
+                'ratio': round(len(datos) / len(comprimido), 2),
+                'cpu_us': round(_mediana_us(lambda: compresion.comprimir(codificacion, datos, nivel), repeticiones), 1),
+            }
+        resultados[nombre] = fila
+    return resultados
+
+
+def medir_peticiones(app_sin, app_con, peticiones, repeticiones: int) -> Dict[str, Any]:
+    """Mediana de la petición completa sin y con compresión (el cliente acepta gzip y br)."""
+    encabezados = {'Accept-Encoding': 'br, gzip'}
+    clientes = {'sin': _cliente(app_sin), 'con': _cliente(app_con)}
+    resultados = {}
+    for nombre, (metodo, url, kwargs) in peticiones.items():
+        fila = {}
+        for etiqueta, client in clientes.items():
+            respuesta = getattr(client, metodo)(url, headers=encabezados, **kwargs)
+            if respuesta.status_code != 200:
+                break
+            fila[f'bytes_{etiqueta}'] = len(respuesta.get_data())
+            fila[f'codificacion_{etiqueta}'] = respuesta.headers.get('Content-Encoding', 'identity')
+            fila[f'ms_{etiqueta}'] = round(_mediana_us(
+                lambda: getattr(client, metodo)(url, headers=encabezados, **kwargs), repeticiones
+            ) / 1000.0, 2)
+        else:
+            resultados[nombre] = fila
+    return resultados
+
+
+def _imprimir_codecs(titulo: str, resultados: Dict[str, Any]):
+    etiquetas = [c[0] for c in _codecs()]
+    print(f"\n{titulo}")
+    print(f"{'respuesta':<40} {'bytes':>9} " + ' '.join(f'{e:>20}' for e in etiquetas))
+    for nombre, fila in resultados.items():
+        celdas = ' '.join(f"{fila[e]['bytes']:>8}B {fila[e]['cpu_us']:>8.0f}µs" for e in etiquetas)
+        print(f"{nombre:<40} {fila['bytes']:>9} {celdas}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de compresión de respuestas del SGPM.')
+    parser.add_argument('--clientes', type=int, default=300, help='Clientes del dataset sintético.')
+    parser.add_argument('--pedidos', type=int, default=1500, help='Pedidos del dataset sintético.')
+    parser.add_argument('--dias', type=int, default=14, help='Días de historial de los pedidos.')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador de datos.')
+    parser.add_argument('--repeticiones', type=int, default=50, help='Repeticiones por medición.')
+    parser.add_argument('--salida', help='Ruta opcional del JSON de resultados.')
+    args = parser.parse_args(argv)
+
+    fd, archivo_temporal = tempfile.mkstemp(prefix='sgpm_compresion_', suffix='.db')
+    os.close(fd)
+    url = f'sqlite:///{archivo_temporal}'
+    try:
+        app_sin = _crear_app(url, comprimir=False)
+        app_con = _crear_app(url, comprimir=True)
+        with app_sin.app_context():
+            db.create_all()
+            print(f"Generando dataset ({args.pedidos} pedidos, {args.clientes} clientes)...")
+            generar_dataset(clientes=args.clientes, pedidos=args.pedidos, dias=args.dias, semilla=args.semilla)
+
+        peticiones = _peticiones(app_sin)
+        cuerpos = capturar_cuerpos(app_sin, peticiones)
+        if not cuerpos:
+            print("Ninguna petición respondió 200; nada que medir.")
+            return 1
+        mayor = max(cuerpos.values(), key=len)
+        repetido = mayor * (max(TAMANOS_CORTE) // len(mayor) + 1)
+        cortes = {f'{tamano // 1024} KB (corte de la respuesta mayor)': repetido[:tamano] for tamano in TAMANOS_CORTE}
+
+        if compresion.brotli is None:
+            print("Nota: el paquete `brotli` no está instalado; solo se mide gzip.")
+        por_respuesta = medir_codecs(cuerpos, args.repeticiones)
+        por_tamano = medir_codecs(cortes, args.repeticiones)
+        extremo_a_extremo = medir_peticiones(app_sin, app_con, peticiones, args.repeticiones)
+    finally:
+        if os.path.exists(archivo_temporal):
+            os.remove(archivo_temporal)
+
+    _imprimir_codecs('Respuestas reales (tamaño comprimido y CPU por respuesta):', por_respuesta)
+    _imprimir_codecs('Por tamaño de respuesta:', por_tamano)
+    print("\nPetición completa (test client, Accept-Encoding: br, gzip):")
+    print(f"{'respuesta':<40} {'bytes sin':>10} {'bytes con':>10} {'codif.':>8} {'ms sin':>8} {'ms con':>8}")
+    for nombre, fila in extremo_a_extremo.items():
+        print(f"{nombre:<40} {fila['bytes_sin']:>10} {fila['bytes_con']:>10} {fila['codificacion_con']:>8} "
+              f"{fila['ms_sin']:>8.2f} {fila['ms_con']:>8.2f}")
+
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({
+                'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+                'brotli': compresion.brotli is not None,
+                'por_respuesta': por_respuesta,
+                'por_tamano': por_tamano,
+                'peticion_completa': extremo_a_extremo,
+            }, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# Archivo: PolleriaMontiel\benchmarks\dataset.py
+
+"""
+Datos sintéticos para los benchmarks.
+
+Usa el mismo generador que `flask seed-scale` (app/seed_scale.py) con semilla fija, así dos
+corridas con la misma escala miden exactamente los mismos datos. Además crea los usuarios
+'bench_*' que usan los benchmarks (contraseña 'bench').
+"""
+
+from typing import Dict
+
+from app import db
+from app.models import (
+    Usuario, Cliente, Pedido, PedidoItem, ProductoAdicional, MovimientoCaja, CorteCaja, RolUsuario
+)
+from app.seed_scale import seed_scale_data
+
+# Escalas predefinidas (se pueden sobreescribir desde la línea de comandos)
+ESCALAS = {
+    'small': {'clientes': 500, 'pedidos': 2000, 'dias': 30},
+    'medium': {'clientes': 5000, 'pedidos': 20000, 'dias': 90},
+    'large': {'clientes': 20000, 'pedidos': 100000, 'dias': 365},
+}
+
+USUARIOS_BENCH = [
+    ('bench_admin', RolUsuario.ADMINISTRADOR), ('bench_cajero', RolUsuario.CAJERO),
+    ('bench_cajero_cierre', RolUsuario.CAJERO), ('bench_tablajero', RolUsuario.TABLAJERO),
+    ('bench_repartidor', RolUsuario.REPARTIDOR),
+]
+
+
+def generar_dataset(clientes: int, pedidos: int, dias: int, semilla: int = 42) -> Dict[str, int]:
+    """
+    Crea el dataset sintético en la BD actual (se espera un esquema vacío).
+
+    Returns:
+        Diccionario con el número de filas por entidad y los IDs de los usuarios 'bench_*'.
+    """
+    ids_usuarios = {}
+    for username, rol in USUARIOS_BENCH:
+        usuario = Usuario(username=username, nombre_completo=username, rol=rol)
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.flush()
+        ids_usuarios[username] = usuario.id
+    db.session.commit()
+
+    seed_scale_data(pedidos=pedidos, clientes=clientes, dias=dias, semilla=semilla)
+
+    resumen = {
+        'clientes': Cliente.query.count(),
+        'pedidos': Pedido.query.count(),
+        'pedido_items': PedidoItem.query.count(),
+        'productos_adicionales': ProductoAdicional.query.count(),
+        'movimientos_caja': MovimientoCaja.query.count(),
+        'cortes_caja': CorteCaja.query.count(),
+    }
+    resumen.update({f'usuario_{k}': v for k, v in ids_usuarios.items()})
+    return resumen
@@ -0,0 +1,168 @@
+# Archivo: PolleriaMontiel\benchmarks\exportacion.py
+
+"""
+Benchmark de la exportación de pedidos, ítems, PAs y movimientos de caja: tiempo, tamaño y memoria.
+
+Compara, sobre el mismo dataset sintético y las mismas tablas:
+    - xlsx:    objetos ORM -> un dict por fila -> DataFrame -> to_excel (el camino del reporte
+               detallado; requiere pandas y openpyxl).
+    - csv:     filas de Core en streaming -> csv.writer (biblioteca estándar).
+    - parquet / arrow: app/utils/exportacion.py (requiere pyarrow), particionado por mes.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/exportacion.py
+    python benchmarks/exportacion.py --pedidos 20000 --dias 365 --salida benchmarks/results/exportacion.json
+
+Usa una BD SQLite temporal y una carpeta temporal (se borran en cada corrida).
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+# Permitir ejecutar el script directamente sin instalar el paquete
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+from app import create_app, db
+from config import config, TestingConfig
+from app.utils import exportacion
+from benchmarks.dataset import generar_dataset
+
+
+def _tamano_directorio(ruta: str) -> int:
+    return sum(os.path.getsize(os.path.join(raiz, f)) for raiz, _, archivos in os.walk(ruta) for f in archivos)
+
+
+def exportar_xlsx(directorio: str, desde, hasta) -> Optional[int]:
+    """Camino fila por fila: objetos ORM a dicts, DataFrame y to_excel (una hoja por tabla)."""
+    try:
+        import pandas as pd
+        import openpyxl # noqa: F401
+    except ImportError:
+        return None
+    inicio, fin = datetime.combine(desde, datetime.min.time()), datetime.combine(hasta, datetime.min.time()) + timedelta(days=1)
+    os.makedirs(directorio, exist_ok=True)
+    filas_totales = 0
+    with pd.ExcelWriter(os.path.join(directorio, 'exportacion.xlsx'), engine='openpyxl') as writer:
+        for tabla, (modelo, columna_fecha) in exportacion.TABLAS_EXPORTACION.items():
+            consulta = modelo.query
+            if columna_fecha:
+                consulta = consulta.filter(getattr(modelo, columna_fecha) >= inicio, getattr(modelo, columna_fecha) < fin)
+            else:
+                consulta = consulta.join(modelo.pedido).filter(
+                    exportacion.Pedido.fecha_creacion >= inicio, exportacion.Pedido.fecha_creacion < fin
+                )
+            columnas = [c.name for c in modelo.__table__.columns]
+            filas = [{c: getattr(objeto, c) for c in columnas} for objeto in consulta.all()]
+            pd.DataFrame(filas, columns=columnas).to_excel(writer, index=False, sheet_name=tabla[:31])
+            filas_totales += len(filas)
+    return filas_totales
+
+
+def exportar_csv(directorio: str, desde, hasta) -> int:
+    """Filas de Core en streaming a un CSV por tabla y mes (misma partición que Parquet)."""
+    filas_totales = 0
+    with db.engine.connect() as conexion:
+        conexion = conexion.execution_options(stream_results=True, yield_per=exportacion.CHUNK_SIZE_DEFAULT)
+        for tabla, (modelo, columna_fecha) in exportacion.TABLAS_EXPORTACION.items():
+            for inicio, fin, mes in exportacion._meses(desde, hasta):
+                resultado = conexion.execute(exportacion._consulta_mes(modelo, columna_fecha, inicio, fin))
+                ruta = os.path.join(directorio, tabla, f'mes={mes}', f'{tabla}-{mes}.csv')
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                    writer = csv.writer(archivo)
+                    writer.writerow(resultado.keys())
+                    for filas in resultado.partitions():
+                        writer.writerows([getattr(v, 'value', v) for v in fila] for fila in filas)
+                        filas_totales += len(filas)
+    return filas_totales
+
+
+def _formato_columnar(formato: str) -> Callable:
+    def _exportar(directorio, desde, hasta):
+        totales = exportacion.exportar_columnar(directorio, desde, hasta, formato=formato)
+        return None if totales is None else sum(t['filas'] for t in totales.values())
+    return _exportar
+
+
+def medir(nombre: str, fn: Callable, directorio: str, desde, hasta) -> Optional[Dict]:
+    db.session.remove()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    filas = fn(directorio, desde, hasta)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if filas is None:
+        print(f"  Omitido {nombre}: dependencia no instalada")
+        return None
+    return {
+        'filas': filas, 'segundos': round(segundos, 3), 'bytes': _tamano_directorio(directorio),
+        'filas_por_segundo': round(filas / segundos) if segundos else None, 'memoria_pico_mb': round(pico / 2 ** 20, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de exportación XLSX / CSV / Parquet / Arrow del SGPM.')
+    parser.add_argument('--clientes', type=int, default=500, help='Clientes del dataset sintético.')
+    parser.add_argument('--pedidos', type=int, default=5000, help='Pedidos del dataset sintético.')
+    parser.add_argument('--dias', type=int, default=180, help='Días de historial de los pedidos.')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador de datos.')
+    parser.add_argument('--salida', help='Ruta opcional del JSON de resultados.')
+    args = parser.parse_args(argv)
+
+    fd, archivo_temporal = tempfile.mkstemp(prefix='sgpm_exportacion_', suffix='.db')
+    os.close(fd)
+    carpeta = tempfile.mkdtemp(prefix='sgpm_exportacion_')
+    config['benchmark_exportacion'] = type('BenchmarkExportacionConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{archivo_temporal}',
+        'SQL_SLOW_QUERY_MS': None,
+    })
+    app = create_app('benchmark_exportacion')
+    resultados = {}
+    try:
+        with app.app_context():
+            db.create_all()
+            print(f"Generando dataset ({args.pedidos} pedidos, {args.clientes} clientes, {args.dias} días)...")
+            generar_dataset(clientes=args.clientes, pedidos=args.pedidos, dias=args.dias, semilla=args.semilla)
+            hasta = datetime.utcnow().date() + timedelta(days=1)
+            desde = hasta - timedelta(days=args.dias + 1)
+            if exportacion.pa is None:
+                print("Nota: el paquete `pyarrow` no está instalado; se omiten Parquet y Arrow.")
+            for nombre, fn in (('xlsx', exportar_xlsx), ('csv', exportar_csv),
+                               ('parquet', _formato_columnar(exportacion.PARQUET)),
+                               ('arrow', _formato_columnar(exportacion.ARROW))):
+                resultado = medir(nombre, fn, os.path.join(carpeta, nombre), desde, hasta)
+                if resultado:
+                    resultados[nombre] = resultado
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        if os.path.exists(archivo_temporal):
+            os.remove(archivo_temporal)
+
+    print(f"\n{'formato':<10} {'filas':>9} {'segundos':>9} {'filas/s':>10} {'KB':>9} {'MB pico':>8}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<10} {r['filas']:>9} {r['segundos']:>9.3f} {r['filas_por_segundo'] or 0:>10} "
+              f"{r['bytes'] / 1024:>9.0f} {r['memoria_pico_mb']:>8.1f}")
+
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'fecha': datetime.utcnow().isoformat(timespec='seconds'), 'resultados': resultados},
+                      archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
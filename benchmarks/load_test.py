@@ -0,0 +1,559 @@
+# Archivo: PolleriaMontiel\benchmarks\load_test.py
+
+"""
+Prueba de carga HTTP con flujos realistas por rol.
+
+Cada usuario virtual es un hilo con su propia conexión y cookies (como un navegador) que repite
+el flujo de su rol hasta que termina la prueba:
+    - cajero:     crea un pedido de mostrador, busca productos, consulta el precio, añade 1-3
+                  ítems y cobra en efectivo.
+    - tablajero:  consulta periódicamente la cola de preparación (dashboard de pedidos).
+    - repartidor: revisa sus pedidos asignados y liquida en caja el primero pendiente.
+    - admin:      ejecuta el reporte de estadísticas y revisa la lista y el detalle de cortes.
+
+Al final reporta por endpoint (ruta con los IDs normalizados, ej. 'POST /pedidos/<id>/pagar'):
+peticiones, errores, throughput (req/s) y latencia p50/p95/p99/máx.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/load_test.py --duracion 60 --cajeros 4 --tablajeros 2 --repartidores 3 --admins 1
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --duracion 120 --cajeros 10
+
+Sin --url se crea una BD SQLite temporal con el dataset de benchmarks (--scale) y se levanta el
+servidor de desarrollo (multihilo) en un subproceso. Con --url se ataca un servidor externo
+(ej. gunicorn con N workers) que debe tener los usuarios del dataset: prepararlo con
+    python benchmarks/load_test.py --preparar-bd --database-url postgresql://...
+Contra un servidor con CSRF activo el token se toma de los formularios HTML.
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_UP
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from http.cookies import SimpleCookie
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# Permitir ejecutar el script directamente sin instalar el paquete
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+from benchmarks.run_benchmarks import DIRECTORIO_RESULTADOS, _info_git, _percentil
+
+# Términos que un cajero teclea en el buscador de productos
+BUSQUEDAS_PRODUCTO = ['Pechuga', 'Pierna', 'Ala', 'Muslo', 'Pollo', 'Hígado']
+# Número de usuarios 'scale_repartidor_N' que crea app/seed_scale.py por defecto
+REPARTIDORES_DATASET = 3
+
+_RE_CSRF = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+_RE_PEDIDO = re.compile(r'/pedidos/(\d+)(?:/|$)')
+_RE_ENLACE_PEDIDO = re.compile(r'/pedidos/(\d+)"')
+_RE_ENLACE_CORTE = re.compile(r'/caja/cortes/(\d+)"')
+_RE_IDS = re.compile(r'/\d+(?=/|$)')
+
+
+# --- Registro de resultados ---
+
+class Estadisticas:
+    """Latencias y errores por endpoint, compartidas entre los hilos de los usuarios virtuales."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, endpoint: str, ms: float, status: int, error: bool):
+        with self._lock:
+            datos = self._endpoints.setdefault(endpoint, {'latencias': [], 'errores': 0, 'status': {}})
+            datos['latencias'].append(ms)
+            datos['status'][str(status)] = datos['status'].get(str(status), 0) + 1
+            if error:
+                datos['errores'] += 1
+
+    def resumen(self, duracion_s: float) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {k: {'latencias': list(v['latencias']), 'errores': v['errores'], 'status': dict(v['status'])}
+                         for k, v in self._endpoints.items()}
+
+        def _metricas(latencias: List[float], errores: int, status: Dict[str, int]) -> Dict[str, Any]:
+            return {
+                'peticiones': len(latencias),
+                'errores': errores,
+                'rps': round(len(latencias) / duracion_s, 2) if duracion_s else 0.0,
+                'p50_ms': round(_percentil(latencias, 50), 2),
+                'p95_ms': round(_percentil(latencias, 95), 2),
+                'p99_ms': round(_percentil(latencias, 99), 2),
+                'max_ms': round(max(latencias), 2),
+                'status': status,
+            }
+
+        resultado = {nombre: _metricas(d['latencias'], d['errores'], d['status'])
+                     for nombre, d in sorted(endpoints.items())}
+        todas = [ms for d in endpoints.values() for ms in d['latencias']]
+        total = None
+        if todas:
+            status_total: Dict[str, int] = {}
+            for d in endpoints.values():
+                for codigo, n in d['status'].items():
+                    status_total[codigo] = status_total.get(codigo, 0) + n
+            total = _metricas(todas, sum(d['errores'] for d in endpoints.values()), status_total)
+        return {'endpoints': resultado, 'total': total}
+
+
+# --- Usuario virtual ---
+
+class Respuesta:
+    def __init__(self, status: int, headers: Dict[str, str], cuerpo: str):
+        self.status = status
+        self.headers = headers
+        self.cuerpo = cuerpo
+
+    @property
+    def location(self) -> str:
+        return urlsplit(self.headers.get('location', '')).path
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.cuerpo)
+        except ValueError:
+            return None
+
+
+def _flashes_de_sesion(valor_cookie: str) -> List[str]:
+    """
+    Categorías de los mensajes flash guardados en la cookie de sesión de Flask.
+    La cookie está firmada, no cifrada: el payload es JSON en base64 (comprimido con zlib si empieza con '.').
+    """
+    comprimido = valor_cookie.startswith('.')
+    payload = (valor_cookie[1:] if comprimido else valor_cookie).split('.')[0]
+    try:
+        datos = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        if comprimido:
+            datos = zlib.decompress(datos)
+        sesion = json.loads(datos)
+    except (ValueError, zlib.error):
+        return []
+    # Las tuplas (categoría, mensaje) se serializan como {" t": [categoría, mensaje]}
+    return [f[' t'][0] if isinstance(f, dict) else f[0] for f in sesion.get('_flashes', [])]
+
+
+class UsuarioVirtual:
+    """Cliente HTTP con sesión propia que registra cada petición en las estadísticas."""
+
+    def __init__(self, base_url: str, estadisticas: Estadisticas, rng: random.Random, timeout: float = 30.0):
+        partes = urlsplit(base_url)
+        clase = HTTPSConnection if partes.scheme == 'https' else HTTPConnection
+        self.conexion = clase(partes.netloc, timeout=timeout)
+        self.prefijo = partes.path.rstrip('/')
+        self.estadisticas = estadisticas
+        self.rng = rng
+        self.cookies = SimpleCookie()
+        self.csrf_token: Optional[str] = None
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def peticion(
+        self,
+        metodo: str,
+        ruta: str,
+        datos: Optional[Dict[str, Any]] = None,
+        json_datos: Optional[Dict[str, Any]] = None,
+        esperado: Tuple[int, ...] = (200,),
+        nombre: Optional[str] = None
+    ) -> Optional[Respuesta]:
+        """
+        Ejecuta la petición y la registra como '<MÉTODO> <ruta con /<id>>' (o `nombre`).
+        Cuenta como error un status fuera de `esperado`, una excepción de red o un flash 'danger'
+        (los formularios del sistema redirigen igual en éxito y en error).
+        """
+        encabezados = {'Accept': 'text/html,application/json'}
+        cuerpo = None
+        if datos is not None:
+            datos = dict(datos)
+            if self.csrf_token:
+                datos.setdefault('csrf_token', self.csrf_token)
+            cuerpo = urlencode(datos)
+            encabezados['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_datos is not None:
+            cuerpo = json.dumps(json_datos)
+            encabezados['Content-Type'] = 'application/json'
+            if self.csrf_token:
+                encabezados['X-CSRFToken'] = self.csrf_token
+        galletas = '; '.join(f'{k}={m.value}' for k, m in self.cookies.items())
+        if galletas:
+            encabezados['Cookie'] = galletas
+
+        nombre = nombre or f"{metodo} {_RE_IDS.sub('/<id>', ruta.split('?')[0])}"
+        flashes_previos = self._flashes()
+        inicio = time.perf_counter()
+        try:
+            self.conexion.request(metodo, self.prefijo + ruta, body=cuerpo, headers=encabezados)
+            raw = self.conexion.getresponse()
+            contenido = raw.read().decode('utf-8', errors='replace')
+        except (OSError, HTTPException) as e:
+            self.estadisticas.registrar(nombre, (time.perf_counter() - inicio) * 1000.0, 0, True)
+            self.conexion.close() # Reconecta en la siguiente petición
+            print(f"  [{nombre}] error de conexión: {e}")
+            return None
+        ms = (time.perf_counter() - inicio) * 1000.0
+
+        for valor in raw.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(valor)
+        respuesta = Respuesta(raw.status, {k.lower(): v for k, v in raw.getheaders()}, contenido)
+        token = _RE_CSRF.search(contenido)
+        if token:
+            self.csrf_token = token.group(1)
+
+        error = raw.status not in esperado
+        if not error:
+            # Solo cuentan los flash que agregó esta petición (los anteriores se consumen al renderizar una página)
+            flashes = self._flashes()
+            nuevos = flashes[len(flashes_previos):] if flashes[:len(flashes_previos)] == flashes_previos else flashes
+            error = 'danger' in nuevos
+        self.estadisticas.registrar(nombre, ms, raw.status, error)
+        return respuesta
+
+    def _flashes(self) -> List[str]:
+        return _flashes_de_sesion(self.cookies['session'].value) if 'session' in self.cookies else []
+
+    def seguir(self, respuesta: Optional[Respuesta]) -> Optional[Respuesta]:
+        """GET a la redirección (como el navegador); consume los flash pendientes de la sesión."""
+        if respuesta is None or respuesta.status not in (301, 302, 303) or not respuesta.location:
+            return respuesta
+        return self.peticion('GET', respuesta.location)
+
+    def login(self, username: str, password: str) -> bool:
+        self.peticion('GET', '/auth/login') # Toma cookie de sesión y token CSRF del formulario
+        respuesta = self.peticion('POST', '/auth/login', datos={'username': username, 'password': password}, esperado=(302,))
+        return respuesta is not None and respuesta.status == 302 and '/auth/login' not in respuesta.location
+
+    def pausa(self, think_time: float, detener: threading.Event):
+        """Tiempo de "pensar" del usuario: uniforme entre 0 y 2x el promedio."""
+        if think_time > 0:
+            detener.wait(self.rng.uniform(0, 2 * think_time))
+
+
+# --- Flujos por rol ---
+
+def flujo_cajero(u: UsuarioVirtual, think_time: float, detener: threading.Event):
+    """Pedido de mostrador con 1-3 ítems cobrado en efectivo."""
+    respuesta = u.peticion('POST', '/pedidos/nuevo', datos={
+        'tipo_venta': 'MOSTRADOR', 'estado_pedido': 'PENDIENTE_PREPARACION'
+    }, esperado=(302,))
+    coincidencia = _RE_PEDIDO.search(respuesta.location) if respuesta is not None else None
+    if not coincidencia:
+        return
+    pedido_id = int(coincidencia.group(1))
+
+    total = Decimal('0.00')
+    for _ in range(u.rng.randint(1, 3)):
+        u.pausa(think_time / 3, detener)
+        resultados = u.peticion('GET', '/pedidos/ajax/productos/buscar?' + urlencode({'q': u.rng.choice(BUSQUEDAS_PRODUCTO)}),
+                                nombre='GET /pedidos/ajax/productos/buscar')
+        productos = [r for r in ((resultados.json() or []) if resultados else []) if r.get('type') == 'producto']
+        if not productos:
+            continue
+        producto_id = u.rng.choice(productos)['codigo']
+        cantidad = Decimal(u.rng.choice(['0.5', '1', '1.5', '2', '3']))
+        precio = u.peticion('GET', '/pedidos/ajax/precios/aplicable?' + urlencode({
+            'item_type': 'producto', 'item_id': producto_id, 'cantidad': str(cantidad)
+        }), nombre='GET /pedidos/ajax/precios/aplicable', esperado=(200, 404))
+        datos_precio = precio.json() if precio is not None else None
+        if not datos_precio or not datos_precio.get('success'):
+            continue
+        precio_kg = Decimal(datos_precio['precio_kg'])
+        respuesta = u.peticion('POST', f'/pedidos/{pedido_id}/items/nuevo', datos={
+            'producto_id': producto_id, 'cantidad': str(cantidad), 'unidad_medida': 'kg',
+            'precio_unitario_venta': str(precio_kg)
+        }, esperado=(302,))
+        if respuesta is not None and respuesta.status == 302:
+            total += precio_kg * cantidad
+
+    if total <= 0:
+        return
+    u.pausa(think_time, detener)
+    # El cliente paga con billetes de $500 suficientes para cubrir el total
+    billetes = int((total / Decimal('500')).to_integral_value(rounding=ROUND_UP))
+    respuesta = u.peticion('POST', f'/pedidos/{pedido_id}/pagar', datos={
+        'forma_pago': 'EFECTIVO', 'monto_recibido': str(billetes * 500), 'cantidad_500_0': billetes
+    }, esperado=(302,))
+    u.seguir(respuesta) # Vista del pedido pagado
+
+
+def flujo_tablajero(u: UsuarioVirtual, think_time: float, detener: threading.Event):
+    """Consulta la cola de pedidos pendientes de preparación."""
+    u.peticion('GET', '/pedidos/dashboard')
+
+
+def flujo_repartidor(u: UsuarioVirtual, think_time: float, detener: threading.Event):
+    """Revisa sus pedidos asignados y liquida el primero en efectivo."""
+    respuesta = u.peticion('GET', '/pedidos/dashboard')
+    ids = _RE_ENLACE_PEDIDO.findall(respuesta.cuerpo) if respuesta is not None else []
+    if not ids:
+        return
+    pedido_id = int(ids[0])
+    detalle = u.peticion('GET', f'/pedidos/{pedido_id}')
+    if detalle is None or detalle.status != 200:
+        return
+    u.pausa(think_time, detener)
+    # Sin el total exacto en un campo parseable, se liquida con $1000 (el excedente queda como diferencia)
+    respuesta = u.peticion('POST', f'/pedidos/{pedido_id}/liquidar', datos={
+        'monto_recibido': '1000', 'cantidad_1000_0': 1
+    }, esperado=(302,))
+    # No se sigue la redirección: ya pagado, el pedido deja de ser visible para el repartidor;
+    # el flash de éxito se consume en el dashboard de la siguiente vuelta.
+
+
+def flujo_admin(u: UsuarioVirtual, think_time: float, detener: threading.Event):
+    """Reporte de estadísticas del último mes y revisión de cortes."""
+    hoy = datetime.utcnow().date()
+    u.peticion('POST', '/pedidos/ajax/reportes/pedidos_estadisticas', json_datos={
+        'fecha_desde': (hoy - timedelta(days=30)).isoformat(), 'fecha_hasta': hoy.isoformat()
+    })
+    u.pausa(think_time, detener)
+    respuesta = u.peticion('GET', '/caja/cortes')
+    ids = _RE_ENLACE_CORTE.findall(respuesta.cuerpo) if respuesta is not None else []
+    if ids:
+        u.pausa(think_time, detener)
+        u.peticion('GET', f'/caja/cortes/{u.rng.choice(ids)}')
+
+
+FLUJOS = {
+    'cajero': flujo_cajero,
+    'tablajero': flujo_tablajero,
+    'repartidor': flujo_repartidor,
+    'admin': flujo_admin,
+}
+
+
+def _credenciales(rol: str, indice: int) -> Tuple[str, str]:
+    """Usuario del dataset de benchmarks para el i-ésimo usuario virtual del rol."""
+    if rol == 'repartidor':
+        # Los pedidos del dataset están asignados a los repartidores de seed_scale (contraseña = usuario)
+        username = f'scale_repartidor_{indice % REPARTIDORES_DATASET + 1}'
+        return username, username
+    return f'bench_{rol}', 'bench'
+
+
+def ejecutar_carga(
+    base_url: str,
+    usuarios: Dict[str, int],
+    duracion: float,
+    think_time: float,
+    rampa: float,
+    semilla: int
+) -> Dict[str, Any]:
+    """Lanza los usuarios virtuales, espera `duracion` segundos y retorna el resumen por endpoint."""
+    estadisticas = Estadisticas()
+    detener = threading.Event()
+    fallos_login: List[str] = []
+    hilos = []
+    total_usuarios = sum(usuarios.values())
+
+    def _ejecutar(rol: str, indice: int, retraso: float):
+        if detener.wait(retraso):
+            return
+        u = UsuarioVirtual(base_url, estadisticas, random.Random(f'{semilla}-{rol}-{indice}'))
+        try:
+            username, password = _credenciales(rol, indice)
+            if not u.login(username, password):
+                fallos_login.append(username)
+                return
+            flujo = FLUJOS[rol]
+            while not detener.is_set():
+                flujo(u, think_time, detener)
+                u.pausa(think_time, detener)
+        finally:
+            u.cerrar()
+
+    n = 0
+    for rol, cantidad in usuarios.items():
+        for i in range(cantidad):
+            # Arranque escalonado para no iniciar todas las sesiones en el mismo instante
+            retraso = rampa * n / total_usuarios if total_usuarios else 0.0
+            hilo = threading.Thread(target=_ejecutar, args=(rol, i, retraso), name=f'{rol}-{i}', daemon=True)
+            hilos.append(hilo)
+            n += 1
+
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    detener.wait(duracion)
+    detener.set()
+    for hilo in hilos:
+        hilo.join(timeout=60)
+    duracion_real = time.perf_counter() - inicio
+
+    if fallos_login:
+        print(f"  Advertencia: no se pudo iniciar sesión con {sorted(set(fallos_login))}.")
+    resumen = estadisticas.resumen(duracion_real)
+    resumen['duracion_s'] = round(duracion_real, 2)
+    return resumen
+
+
+# --- Servidor local y preparación de la BD ---
+
+def _app_para(url_bd: str):
+    from app import create_app
+    from config import config, TestingConfig
+    # Mismo perfil que run_benchmarks.py: TestingConfig apuntando a la BD indicada
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': url_bd,
+        'SQL_SLOW_QUERY_MS': None,
+    })
+    return create_app('benchmark')
+
+
+def preparar_bd(url_bd: str, escala: Dict[str, int], semilla: int) -> Dict[str, int]:
+    """Crea el esquema y el dataset de benchmarks (usuarios bench_* y scale_*) en una BD vacía."""
+    from app import db
+    from benchmarks.dataset import generar_dataset
+    app = _app_para(url_bd)
+    with app.app_context():
+        db.create_all()
+        dataset = generar_dataset(semilla=semilla, **escala)
+        db.session.remove()
+    return dataset
+
+
+def servir(url_bd: str, puerto: int):
+    """Servidor de desarrollo multihilo (modo --servir, lo lanza el propio script en un subproceso)."""
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # Sin una línea por petición
+    app = _app_para(url_bd)
+    app.run(host='127.0.0.1', port=puerto, threaded=True, use_reloader=False)
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar_servidor(base_url: str, proceso: subprocess.Popen, timeout: float = 30.0):
+    partes = urlsplit(base_url)
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'El servidor terminó con código {proceso.returncode}.')
+        try:
+            conexion = HTTPConnection(partes.netloc, timeout=2)
+            conexion.request('GET', '/auth/login')
+            if conexion.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('El servidor no respondió a tiempo.')
+
+
+def imprimir_resumen(resumen: Dict[str, Any]):
+    print(f"\n{'Endpoint':<50} {'reqs':>6} {'err':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'máx':>8}")
+    filas = list(resumen['endpoints'].items())
+    if resumen['total']:
+        filas.append(('TOTAL', resumen['total']))
+    for nombre, m in filas:
+        print(f"{nombre:<50} {m['peticiones']:>6} {m['errores']:>5} {m['rps']:>7.2f} "
+              f"{m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} {m['p99_ms']:>8.1f} {m['max_ms']:>8.1f}")
+    print("(latencias en ms)")
+
+
+def main(argv=None):
+    from benchmarks.dataset import ESCALAS
+
+    parser = argparse.ArgumentParser(description='Prueba de carga HTTP del SGPM con flujos por rol.')
+    parser.add_argument('--url', help='Servidor a probar (ej. http://127.0.0.1:8000). Por defecto levanta uno local.')
+    parser.add_argument('--duracion', type=float, default=60.0, help='Segundos de carga.')
+    parser.add_argument('--cajeros', type=int, default=4, help='Usuarios virtuales con rol cajero.')
+    parser.add_argument('--tablajeros', type=int, default=2, help='Usuarios virtuales con rol tablajero.')
+    parser.add_argument('--repartidores', type=int, default=3, help='Usuarios virtuales con rol repartidor.')
+    parser.add_argument('--admins', type=int, default=1, help='Usuarios virtuales con rol administrador.')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Pausa promedio (s) entre acciones de un usuario; 0 = máxima presión.')
+    parser.add_argument('--rampa', type=float, default=5.0, help='Segundos para arrancar a todos los usuarios.')
+    parser.add_argument('--scale', choices=sorted(ESCALAS), default='small', help='Escala del dataset local.')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del dataset y de los usuarios virtuales.')
+    parser.add_argument('--database-url', help='BD a preparar/servir (desechable). Por defecto SQLite temporal.')
+    parser.add_argument('--preparar-bd', action='store_true', help='Solo crear el dataset en --database-url y salir.')
+    parser.add_argument('--servir', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--puerto', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados.')
+    args = parser.parse_args(argv)
+
+    if args.servir:
+        servir(args.database_url, args.puerto)
+        return
+    if args.preparar_bd:
+        if not args.database_url:
+            parser.error('--preparar-bd requiere --database-url.')
+        print(f"Dataset creado: {preparar_bd(args.database_url, ESCALAS[args.scale], args.semilla)}")
+        return
+
+    usuarios = {'cajero': args.cajeros, 'tablajero': args.tablajeros,
+                'repartidor': args.repartidores, 'admin': args.admins}
+    proceso = None
+    archivo_temporal = None
+    base_url = args.url
+    try:
+        if not base_url:
+            url_bd = args.database_url
+            if not url_bd:
+                fd, archivo_temporal = tempfile.mkstemp(prefix='sgpm_carga_', suffix='.db')
+                os.close(fd)
+                url_bd = f'sqlite:///{archivo_temporal}'
+            print(f"Generando dataset {args.scale} ...")
+            print(f"Dataset listo: {preparar_bd(url_bd, ESCALAS[args.scale], args.semilla)}")
+            puerto = _puerto_libre()
+            base_url = f'http://127.0.0.1:{puerto}'
+            proceso = subprocess.Popen([
+                sys.executable, os.path.abspath(__file__), '--servir',
+                '--database-url', url_bd, '--puerto', str(puerto)
+            ], cwd=RAIZ_PROYECTO)
+            _esperar_servidor(base_url, proceso)
+
+        print(f"\nCarga contra {base_url} durante {args.duracion:.0f} s: {usuarios} (think time {args.think_time} s)")
+        resumen = ejecutar_carga(base_url, usuarios, args.duracion, args.think_time, args.rampa, args.semilla)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=10)
+        if archivo_temporal and os.path.exists(archivo_temporal):
+            os.remove(archivo_temporal)
+
+    imprimir_resumen(resumen)
+
+    resultados = {
+        'meta': {
+            'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+            'git': _info_git(),
+            'url': args.url or 'local (servidor de desarrollo multihilo)',
+            'usuarios': usuarios,
+            'duracion_s': resumen.pop('duracion_s'),
+            'think_time_s': args.think_time,
+            'escala': args.scale if not args.url else None,
+        },
+        **resumen,
+    }
+    salida = args.salida
+    if not salida:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        commit = resultados['meta']['git'].get('commit') or 'sin_git'
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f"carga_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == '__main__':
+    main()
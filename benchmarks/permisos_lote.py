@@ -0,0 +1,140 @@
+# Archivo: PolleriaMontiel\benchmarks\permisos_lote.py
+
+"""
+Verificación de permisos del cambio de estado en lote (POST /pedidos/cambiar_estado_lote) y de un
+solo pedido (POST /pedidos/<id>/cambiar_estado).
+
+Con el cliente de pruebas de Flask sobre una BD SQLite temporal, comprueba que:
+    - un tablajero no puede mover pedidos fuera de los estados que ve (ASIGNADO_A_REPARTIDOR ->
+      LISTO_PARA_ENTREGA, PAGADO -> EN_PREPARACION), aunque la matriz de transiciones lo permita,
+    - un tablajero sí mueve sus pedidos en preparación,
+    - al desasignar un pedido (ASIGNADO_A_REPARTIDOR -> LISTO_PARA_ENTREGA) se limpia repartidor_id,
+    - al entregar y cobrar (EN_RUTA -> ENTREGADO_Y_PAGADO) se conserva el repartidor,
+    - en el cambio individual, un tablajero no puede cancelar (CANCELADO_POR_NEGOCIO no es destino de su rol)
+      y un repartidor no puede mover pedidos de otro repartidor, pero sí los suyos.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/permisos_lote.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Permitir ejecutar el script directamente sin instalar el paquete
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+from app import create_app, db
+from app.models import Usuario, Pedido, ConfiguracionSistema, RolUsuario, TipoVenta, EstadoPedido
+from config import config, TestingConfig
+
+CLAVE = 'permisos'
+
+
+def _usuario(username: str, rol: RolUsuario) -> Usuario:
+    usuario = Usuario(username=username, nombre_completo=username, rol=rol)
+    usuario.set_password(CLAVE)
+    db.session.add(usuario)
+    return usuario
+
+
+def _pedido(usuario: Usuario, estado: EstadoPedido, repartidor: Usuario = None) -> Pedido:
+    pedido = Pedido(usuario_id=usuario.id, tipo_venta=TipoVenta.DOMICILIO, estado_pedido=estado,
+                    repartidor_id=repartidor.id if repartidor else None)
+    db.session.add(pedido)
+    return pedido
+
+
+def _cambiar_lote(app, username: str, pedido_ids, new_estado: str) -> int:
+    with app.test_client() as cliente:
+        cliente.post('/auth/login', data={'username': username, 'password': CLAVE})
+        respuesta = cliente.post('/pedidos/cambiar_estado_lote', data={'pedido_ids': pedido_ids, 'new_estado': new_estado})
+        return respuesta.status_code
+
+
+def _cambiar_uno(app, username: str, pedido_id: int, new_estado: str) -> int:
+    with app.test_client() as cliente:
+        cliente.post('/auth/login', data={'username': username, 'password': CLAVE})
+        respuesta = cliente.post(f'/pedidos/{pedido_id}/cambiar_estado', data={'new_estado': new_estado})
+        return respuesta.status_code
+
+
+def main(argv=None):
+    fd, archivo_temporal = tempfile.mkstemp(prefix='sgpm_permisos_', suffix='.db')
+    os.close(fd)
+    config['permisos_lote'] = type('PermisosLoteConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{archivo_temporal}',
+        'SQL_SLOW_QUERY_MS': None,
+    })
+    app = create_app('permisos_lote')
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(ConfiguracionSistema(id=1))
+            admin = _usuario('permisos_admin', RolUsuario.ADMINISTRADOR)
+            _usuario('permisos_tablajero', RolUsuario.TABLAJERO)
+            repartidor = _usuario('permisos_repartidor', RolUsuario.REPARTIDOR)
+            _usuario('permisos_repartidor_2', RolUsuario.REPARTIDOR)
+            db.session.flush()
+            asignado = _pedido(admin, EstadoPedido.ASIGNADO_A_REPARTIDOR, repartidor)
+            pagado = _pedido(admin, EstadoPedido.PAGADO)
+            en_cocina = _pedido(admin, EstadoPedido.EN_PREPARACION)
+            desasignar = _pedido(admin, EstadoPedido.ASIGNADO_A_REPARTIDOR, repartidor)
+            entregado = _pedido(admin, EstadoPedido.EN_RUTA, repartidor)
+            cancelar = _pedido(admin, EstadoPedido.EN_PREPARACION)
+            ajeno = _pedido(admin, EstadoPedido.ASIGNADO_A_REPARTIDOR, repartidor)
+            propio = _pedido(admin, EstadoPedido.ASIGNADO_A_REPARTIDOR, repartidor)
+            db.session.commit()
+            ids = {nombre: p.id for nombre, p in (
+                ('asignado', asignado), ('pagado', pagado), ('en_cocina', en_cocina), ('desasignar', desasignar),
+                ('entregado', entregado), ('cancelar', cancelar), ('ajeno', ajeno),
+                ('propio', propio)
+            )}
+            db.session.remove()
+
+        _cambiar_lote(app, 'permisos_tablajero', [ids['asignado']], EstadoPedido.LISTO_PARA_ENTREGA.value)
+        _cambiar_lote(app, 'permisos_tablajero', [ids['pagado']], EstadoPedido.EN_PREPARACION.value)
+        _cambiar_lote(app, 'permisos_tablajero', [ids['en_cocina']], EstadoPedido.LISTO_PARA_ENTREGA.value)
+        _cambiar_lote(app, 'permisos_admin', [ids['desasignar']], EstadoPedido.LISTO_PARA_ENTREGA.value)
+        _cambiar_lote(app, 'permisos_admin', [ids['entregado']], EstadoPedido.ENTREGADO_Y_PAGADO.value)
+        _cambiar_uno(app, 'permisos_tablajero', ids['cancelar'], EstadoPedido.CANCELADO_POR_NEGOCIO.name)
+        _cambiar_uno(app, 'permisos_repartidor_2', ids['ajeno'], EstadoPedido.EN_RUTA.name)
+        _cambiar_uno(app, 'permisos_repartidor', ids['propio'], EstadoPedido.EN_RUTA.name)
+
+        with app.app_context():
+            pedidos = {nombre: db.session.get(Pedido, pedido_id) for nombre, pedido_id in ids.items()}
+            comprobaciones = [
+                ('tablajero no mueve un pedido asignado a repartidor',
+                 pedidos['asignado'].estado_pedido == EstadoPedido.ASIGNADO_A_REPARTIDOR
+                 and pedidos['asignado'].repartidor_id is not None),
+                ('tablajero no mueve un pedido pagado',
+                 pedidos['pagado'].estado_pedido == EstadoPedido.PAGADO),
+                ('tablajero mueve un pedido en preparación',
+                 pedidos['en_cocina'].estado_pedido == EstadoPedido.LISTO_PARA_ENTREGA),
+                ('desasignar limpia repartidor_id',
+                 pedidos['desasignar'].estado_pedido == EstadoPedido.LISTO_PARA_ENTREGA
+                 and pedidos['desasignar'].repartidor_id is None),
+                ('entregar y cobrar conserva el repartidor',
+                 pedidos['entregado'].estado_pedido == EstadoPedido.ENTREGADO_Y_PAGADO
+                 and pedidos['entregado'].repartidor_id is not None),
+                ('tablajero no cancela un pedido (cambio individual)',
+                 pedidos['cancelar'].estado_pedido == EstadoPedido.EN_PREPARACION),
+                ('repartidor no mueve el pedido de otro repartidor (cambio individual)',
+                 pedidos['ajeno'].estado_pedido == EstadoPedido.ASIGNADO_A_REPARTIDOR),
+                ('repartidor mueve su pedido (cambio individual)',
+                 pedidos['propio'].estado_pedido == EstadoPedido.EN_RUTA),
+            ]
+            db.session.remove()
+    finally:
+        if os.path.exists(archivo_temporal):
+            os.remove(archivo_temporal)
+
+    for descripcion, correcto in comprobaciones:
+        print(f"{'OK   ' if correcto else 'ERROR'} {descripcion}")
+    return 0 if all(correcto for _, correcto in comprobaciones) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Add folio to pedidos (folios asignados por bloques)
+
+Revision ID: 8f2d41c7a9b3
+Revises: 3c221bd1cc56
+Create Date: 2026-10-19 16:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d41c7a9b3'
+down_revision = '3c221bd1cc56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pedidos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('folio', sa.Integer(), nullable=True))
+        batch_op.create_unique_constraint('uq_pedidos_folio', ['folio'])
+
+    # Los pedidos existentes conservan como folio su ID (el folio que ya mostraban)
+    op.execute('UPDATE pedidos SET folio = id')
+    # El contador continúa después del último folio en uso
+    op.execute(
+        'UPDATE configuracion_sistema SET ultimo_folio_pedido = '
+        '(SELECT COALESCE(MAX(folio), 0) FROM pedidos) '
+        'WHERE ultimo_folio_pedido < (SELECT COALESCE(MAX(folio), 0) FROM pedidos)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('pedidos', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_pedidos_folio', type_='unique')
+        batch_op.drop_column('folio')
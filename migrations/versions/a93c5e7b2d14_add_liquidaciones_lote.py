@@ -0,0 +1,75 @@
+"""Add liquidaciones_lote (entrega de efectivo de una liquidación en lote) and movimientos_caja.liquidacion_lote_id
+
+Revision ID: a93c5e7b2d14
+Revises: d41f6c2e8a17
+Create Date: 2026-10-20 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93c5e7b2d14'
+down_revision = 'd41f6c2e8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('liquidaciones_lote',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('repartidor_id', sa.Integer(), nullable=True),
+    sa.Column('monto_recibido', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('fecha_liquidacion', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['repartidor_id'], ['usuarios.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('liquidaciones_lote', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_liquidaciones_lote_fecha_liquidacion'), ['fecha_liquidacion'], unique=False)
+        batch_op.create_index(batch_op.f('ix_liquidaciones_lote_repartidor_id'), ['repartidor_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_liquidaciones_lote_usuario_id'), ['usuario_id'], unique=False)
+
+    op.create_table('liquidacion_lote_denominaciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('liquidacion_lote_id', sa.Integer(), nullable=False),
+    sa.Column('denominacion_valor', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['liquidacion_lote_id'], ['liquidaciones_lote.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('liquidacion_lote_id', 'denominacion_valor', name='uq_liquidacion_lote_denominacion')
+    )
+    with op.batch_alter_table('liquidacion_lote_denominaciones', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_liquidacion_lote_denominaciones_liquidacion_lote_id'), ['liquidacion_lote_id'], unique=False)
+
+    with op.batch_alter_table('movimientos_caja', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('liquidacion_lote_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_movimientos_caja_liquidacion_lote_id'), ['liquidacion_lote_id'], unique=False)
+        batch_op.create_foreign_key('fk_movimientos_caja_liquidacion_lote_id', 'liquidaciones_lote', ['liquidacion_lote_id'], ['id'])
+
+    # La tabla de archivo conserva las mismas columnas que la activa (UNION ALL en los reportes)
+    with op.batch_alter_table('movimientos_caja_archivo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('liquidacion_lote_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('movimientos_caja_archivo', schema=None) as batch_op:
+        batch_op.drop_column('liquidacion_lote_id')
+
+    with op.batch_alter_table('movimientos_caja', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_movimientos_caja_liquidacion_lote_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_movimientos_caja_liquidacion_lote_id'))
+        batch_op.drop_column('liquidacion_lote_id')
+
+    with op.batch_alter_table('liquidacion_lote_denominaciones', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_liquidacion_lote_denominaciones_liquidacion_lote_id'))
+
+    op.drop_table('liquidacion_lote_denominaciones')
+    with op.batch_alter_table('liquidaciones_lote', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_liquidaciones_lote_usuario_id'))
+        batch_op.drop_index(batch_op.f('ix_liquidaciones_lote_repartidor_id'))
+        batch_op.drop_index(batch_op.f('ix_liquidaciones_lote_fecha_liquidacion'))
+
+    op.drop_table('liquidaciones_lote')
@@ -0,0 +1,137 @@
+"""Add archive tables for closed pedidos (flask archivar-pedidos)
+
+Revision ID: b7e3a5d19c42
+Revises: 8f2d41c7a9b3
+Create Date: 2026-10-19 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a5d19c42'
+down_revision = '8f2d41c7a9b3'
+branch_labels = None
+depends_on = None
+
+
+def _enum(*valores, name):
+    # Los tipos ENUM ya existen (los crearon las tablas activas); en PostgreSQL no se vuelven a crear
+    return sa.Enum(*valores, name=name).with_variant(postgresql.ENUM(*valores, name=name, create_type=False), 'postgresql')
+
+
+FORMAS_PAGO = (
+    'EFECTIVO', 'TARJETA_DEBITO', 'TARJETA_CREDITO', 'TRANSFERENCIA_BANCARIA', 'QR_PAGO', 'CREDITO_INTERNO',
+    'CORTESIA', 'PAGO_MULTIPLE', 'GASTO_INTERNO_CAJA', 'AJUSTE_INGRESO_CAJA', 'AJUSTE_EGRESO_CAJA',
+    'SALDO_INICIAL_CAJA', 'RETIRO_EFECTIVO_CAJA', 'EFECTIVO_CONTRA_ENTREGA'
+)
+ESTADOS_PEDIDO = (
+    'PENDIENTE_CONFIRMACION', 'PENDIENTE_PREPARACION', 'EN_PREPARACION', 'LISTO_PARA_ENTREGA',
+    'ASIGNADO_A_REPARTIDOR', 'EN_RUTA', 'ENTREGADO_PENDIENTE_PAGO', 'ENTREGADO_Y_PAGADO', 'PAGADO',
+    'PROBLEMA_EN_ENTREGA', 'REPROGRAMADO', 'CANCELADO_POR_CLIENTE', 'CANCELADO_POR_NEGOCIO'
+)
+
+
+def upgrade():
+    # Mismas columnas y orden que las tablas activas (los reportes hacen UNION ALL), sin llaves foráneas
+    op.create_table('pedidos_archivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('folio', sa.Integer(), nullable=True),
+    sa.Column('cliente_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('repartidor_id', sa.Integer(), nullable=True),
+    sa.Column('direccion_entrega_id', sa.Integer(), nullable=True),
+    sa.Column('tipo_venta', _enum('MOSTRADOR', 'DOMICILIO', name='tipoventa'), nullable=False),
+    sa.Column('forma_pago', _enum(*FORMAS_PAGO, name='formapago'), nullable=True),
+    sa.Column('paga_con', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('cambio_entregado', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('subtotal_productos_pollo', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('subtotal_productos_adicionales', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('descuento_aplicado', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('costo_envio', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_pedido', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('estado_pedido', _enum(*ESTADOS_PEDIDO, name='estadopedido'), nullable=False),
+    sa.Column('notas_pedido', sa.Text(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_actualizacion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_entrega_programada', sa.DateTime(), nullable=True),
+    sa.Column('requiere_factura', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pedidos_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pedidos_archivo_cliente_id'), ['cliente_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_pedidos_archivo_estado_pedido'), ['estado_pedido'], unique=False)
+        batch_op.create_index(batch_op.f('ix_pedidos_archivo_fecha_creacion'), ['fecha_creacion'], unique=False)
+        batch_op.create_index(batch_op.f('ix_pedidos_archivo_folio'), ['folio'], unique=False)
+
+    op.create_table('pedido_items_archivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('pedido_id', sa.Integer(), nullable=False),
+    sa.Column('producto_id', sa.String(length=10), nullable=True),
+    sa.Column('subproducto_id', sa.Integer(), nullable=True),
+    sa.Column('modificacion_id', sa.Integer(), nullable=True),
+    sa.Column('descripcion_item_venta', sa.String(length=255), nullable=False),
+    sa.Column('cantidad', sa.Numeric(precision=10, scale=3), nullable=False),
+    sa.Column('unidad_medida', sa.String(length=10), nullable=False),
+    sa.Column('precio_unitario_venta', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('subtotal_item', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('costo_unitario_item', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pedido_items_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pedido_items_archivo_pedido_id'), ['pedido_id'], unique=False)
+
+    op.create_table('pedido_productos_adicionales_archivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('pedido_id', sa.Integer(), nullable=False),
+    sa.Column('nombre_pa', sa.String(length=150), nullable=False),
+    sa.Column('cantidad_pa', sa.Numeric(precision=10, scale=3), nullable=False),
+    sa.Column('unidad_medida_pa', sa.String(length=20), nullable=False),
+    sa.Column('costo_compra_unitario_pa', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('precio_venta_unitario_pa', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('subtotal_pa', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('comision_calculada_pa', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('notas_pa', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pedido_productos_adicionales_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pedido_productos_adicionales_archivo_pedido_id'), ['pedido_id'], unique=False)
+
+    op.create_table('movimientos_caja_archivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('pedido_id', sa.Integer(), nullable=True),
+    sa.Column('corte_caja_id', sa.Integer(), nullable=True),
+    sa.Column('tipo_movimiento', _enum('INGRESO', 'EGRESO', name='tipomovimientocaja'), nullable=False),
+    sa.Column('motivo_movimiento', sa.String(length=255), nullable=False),
+    sa.Column('monto_movimiento', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('forma_pago_efectuado', _enum(*FORMAS_PAGO, name='formapago'), nullable=False),
+    sa.Column('fecha_movimiento', sa.DateTime(), nullable=False),
+    sa.Column('notas_movimiento', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('movimientos_caja_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movimientos_caja_archivo_corte_caja_id'), ['corte_caja_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movimientos_caja_archivo_fecha_movimiento'), ['fecha_movimiento'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movimientos_caja_archivo_pedido_id'), ['pedido_id'], unique=False)
+
+    op.create_table('movimiento_denominaciones_archivo',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('movimiento_caja_id', sa.Integer(), nullable=False),
+    sa.Column('denominacion_valor', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('movimiento_denominaciones_archivo', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movimiento_denominaciones_archivo_movimiento_caja_id'), ['movimiento_caja_id'], unique=False)
+
+
+def downgrade():
+    # Los pedidos archivados se pierden con las tablas: restaurarlos antes si se necesitan
+    op.drop_table('movimiento_denominaciones_archivo')
+    op.drop_table('movimientos_caja_archivo')
+    op.drop_table('pedido_productos_adicionales_archivo')
+    op.drop_table('pedido_items_archivo')
+    op.drop_table('pedidos_archivo')
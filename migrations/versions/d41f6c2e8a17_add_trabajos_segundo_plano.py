@@ -0,0 +1,54 @@
+"""Add trabajos_segundo_plano (cola de trabajos de `flask worker`)
+
+Revision ID: d41f6c2e8a17
+Revises: b7e3a5d19c42
+Create Date: 2026-10-19 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f6c2e8a17'
+down_revision = 'b7e3a5d19c42'
+branch_labels = None
+depends_on = None
+
+ESTADOS_TRABAJO = ('PENDIENTE', 'EN_PROCESO', 'COMPLETADO', 'ERROR')
+
+
+def upgrade():
+    op.create_table('trabajos_segundo_plano',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=False),
+    sa.Column('estado', sa.Enum(*ESTADOS_TRABAJO, name='estadotrabajo'), nullable=False),
+    sa.Column('progreso', sa.Integer(), nullable=False),
+    sa.Column('mensaje', sa.String(length=255), nullable=True),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('archivo_resultado', sa.String(length=255), nullable=True),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('max_intentos', sa.Integer(), nullable=False),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+    sa.Column('fecha_inicio', sa.DateTime(), nullable=True),
+    sa.Column('fecha_fin', sa.DateTime(), nullable=True),
+    sa.Column('latido', sa.DateTime(), nullable=True),
+    sa.CheckConstraint('progreso >= 0 AND progreso <= 100', name='chk_trabajo_progreso'),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trabajos_segundo_plano', schema=None) as batch_op:
+        batch_op.create_index('ix_trabajos_estado_fecha', ['estado', 'fecha_creacion'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trabajos_segundo_plano_usuario_id'), ['usuario_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos_segundo_plano', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trabajos_segundo_plano_usuario_id'))
+        batch_op.drop_index('ix_trabajos_estado_fecha')
+
+    op.drop_table('trabajos_segundo_plano')
+    sa.Enum(name='estadotrabajo').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,67 @@
+# Archivo: PolleriaMontiel\tests\test_caja_services.py
+
+"""Servicios de caja: apertura, movimientos asociados al corte abierto y cierre."""
+
+from decimal import Decimal
+
+from app import db
+from app.models import CorteCaja, MovimientoCaja, EstadoCorteCaja, TipoMovimientoCaja, FormaPago
+from app.caja.services import (
+    realizar_apertura_caja, realizar_cierre_de_caja, registrar_movimiento_caja, get_current_open_corte_caja
+)
+
+SALDO_INICIAL = {Decimal('100'): 5} # $500.00
+
+
+def test_apertura_registra_saldo_inicial(cajero):
+    corte = realizar_apertura_caja(cajero.id, SALDO_INICIAL)
+    assert corte is not None
+    corte_id = corte.id
+    db.session.expire_all()
+
+    corte = db.session.get(CorteCaja, corte_id)
+    assert corte.estado_corte == EstadoCorteCaja.ABIERTO
+    assert corte.saldo_inicial_efectivo_teorico == Decimal('500.00')
+    movimiento = MovimientoCaja.query.filter_by(corte_caja_id=corte_id).one()
+    assert movimiento.forma_pago_efectuado == FormaPago.SALDO_INICIAL_CAJA
+    assert movimiento.monto_movimiento == Decimal('500.00')
+
+
+def test_no_se_abren_dos_cortes_para_el_mismo_usuario(cajero):
+    assert realizar_apertura_caja(cajero.id, SALDO_INICIAL) is not None
+    assert realizar_apertura_caja(cajero.id, SALDO_INICIAL) is None
+    assert CorteCaja.query.count() == 1
+
+
+def test_movimiento_se_asocia_al_corte_abierto(cajero):
+    corte = realizar_apertura_caja(cajero.id, SALDO_INICIAL)
+    movimiento = registrar_movimiento_caja(
+        cajero.id, TipoMovimientoCaja.EGRESO.value, 'Compra de bolsas', Decimal('35.50'), FormaPago.EFECTIVO.value
+    )
+    assert movimiento is not None
+    assert movimiento.corte_caja_id == corte.id
+
+
+def test_cierre_conciliado_y_con_diferencia(cajero):
+    corte = realizar_apertura_caja(cajero.id, SALDO_INICIAL)
+    registrar_movimiento_caja(
+        cajero.id, TipoMovimientoCaja.INGRESO.value, 'Venta', Decimal('120.00'), FormaPago.EFECTIVO.value
+    )
+    registrar_movimiento_caja(
+        cajero.id, TipoMovimientoCaja.INGRESO.value, 'Venta con tarjeta', Decimal('80.00'), FormaPago.TARJETA_DEBITO.value
+    )
+    cerrado = realizar_cierre_de_caja(corte.id, cajero.id, {Decimal('500'): 1, Decimal('20'): 6})
+    assert cerrado is not None
+    corte_id = cerrado.id
+    db.session.expire_all()
+
+    corte = db.session.get(CorteCaja, corte_id)
+    assert corte.estado_corte == EstadoCorteCaja.CERRADO_CONCILIADO
+    assert corte.saldo_final_efectivo_teorico == Decimal('620.00')
+    assert corte.total_ingresos_tarjeta_periodo == Decimal('80.00')
+    assert get_current_open_corte_caja(cajero.id) is None
+
+    otro = realizar_apertura_caja(cajero.id, SALDO_INICIAL)
+    cerrado = realizar_cierre_de_caja(otro.id, cajero.id, {Decimal('100'): 4})
+    assert cerrado.estado_corte == EstadoCorteCaja.CERRADO_CON_DIFERENCIA
+    assert cerrado.diferencia_efectivo == Decimal('-100.00')
@@ -0,0 +1,135 @@
+# Archivo: PolleriaMontiel\tests\test_pedidos_services.py
+
+"""Servicios de pedidos: alta con líneas y pago, cambios de estado y liquidación en lote."""
+
+from decimal import Decimal
+
+from app import db
+from app.models import (
+    Pedido, MovimientoCaja, MovimientoDenominacion, LiquidacionLote, EstadoPedido, TipoVenta, FormaPago,
+    RolUsuario
+)
+from app.pedidos.services import (
+    create_pedido_with_lines, update_pedido_status, update_pedidos_status_bulk,
+    process_repartidor_liquidacion_lote, _asignar_montos_liquidacion
+)
+
+
+def _pedido_domicilio(usuario, estado, total, repartidor=None) -> Pedido:
+    pedido = Pedido(usuario_id=usuario.id, tipo_venta=TipoVenta.DOMICILIO, estado_pedido=estado,
+                    repartidor_id=repartidor.id if repartidor else None, total_pedido=Decimal(total))
+    db.session.add(pedido)
+    db.session.commit()
+    return pedido
+
+
+def test_venta_mostrador_en_efectivo(cajero, producto):
+    pedido = create_pedido_with_lines(
+        usuario_id=cajero.id,
+        tipo_venta_value=TipoVenta.MOSTRADOR.value,
+        items=[{'producto_id': producto.id, 'cantidad': Decimal('1.500'), 'precio_unitario_venta': Decimal('120.00')}],
+        pago={'forma_pago_value': FormaPago.EFECTIVO.value, 'monto_recibido': Decimal('200.00'),
+              'denominaciones_recibidas': {Decimal('200'): 1}}
+    )
+    assert pedido is not None
+    pedido_id = pedido.id
+    db.session.expire_all() # Leer lo que guardó la BD, no lo que quedó en memoria
+
+    pedido = db.session.get(Pedido, pedido_id)
+    assert pedido.estado_pedido == EstadoPedido.ENTREGADO_Y_PAGADO
+    assert pedido.total_pedido == Decimal('180.00')
+    assert pedido.cambio_entregado == Decimal('20.00')
+    movimiento = MovimientoCaja.query.filter_by(pedido_id=pedido_id).one()
+    assert movimiento.monto_movimiento == Decimal('180.00')
+    assert movimiento.forma_pago_efectuado == FormaPago.EFECTIVO
+
+
+def test_venta_efectivo_insuficiente_no_guarda_nada(cajero, producto):
+    pedido = create_pedido_with_lines(
+        usuario_id=cajero.id,
+        tipo_venta_value=TipoVenta.MOSTRADOR.value,
+        items=[{'producto_id': producto.id, 'cantidad': Decimal('1'), 'precio_unitario_venta': Decimal('120.00')}],
+        pago={'forma_pago_value': FormaPago.EFECTIVO.value, 'monto_recibido': Decimal('100.00'),
+              'denominaciones_recibidas': {Decimal('100'): 1}}
+    )
+    assert pedido is None
+    assert Pedido.query.count() == 0
+    assert MovimientoCaja.query.count() == 0
+
+
+def test_cambio_de_estado_valida_la_transicion(cajero):
+    pedido = _pedido_domicilio(cajero, EstadoPedido.PENDIENTE_CONFIRMACION, '100.00')
+    assert update_pedido_status(pedido.id, EstadoPedido.ENTREGADO_Y_PAGADO.value) is None
+    assert update_pedido_status(pedido.id, EstadoPedido.PENDIENTE_PREPARACION.value) is not None
+    db.session.expire_all()
+    assert db.session.get(Pedido, pedido.id).estado_pedido == EstadoPedido.PENDIENTE_PREPARACION
+
+
+def test_desasignar_libera_al_repartidor_y_entregar_lo_conserva(cajero, repartidor):
+    desasignar = _pedido_domicilio(cajero, EstadoPedido.ASIGNADO_A_REPARTIDOR, '100.00', repartidor)
+    entregar = _pedido_domicilio(cajero, EstadoPedido.EN_RUTA, '100.00', repartidor)
+
+    assert update_pedido_status(desasignar.id, EstadoPedido.LISTO_PARA_ENTREGA.value) is not None
+    resultado = update_pedidos_status_bulk([entregar.id], EstadoPedido.ENTREGADO_Y_PAGADO.value, usuario_id=cajero.id)
+    assert resultado['actualizados'] == [entregar.id]
+
+    db.session.expire_all()
+    assert db.session.get(Pedido, desasignar.id).repartidor_id is None
+    assert db.session.get(Pedido, entregar.id).repartidor_id == repartidor.id
+
+
+def test_cambio_en_lote_respeta_la_visibilidad_del_rol(cajero):
+    en_cocina = _pedido_domicilio(cajero, EstadoPedido.EN_PREPARACION, '100.00')
+    pagado = _pedido_domicilio(cajero, EstadoPedido.PAGADO, '100.00')
+
+    resultado = update_pedidos_status_bulk(
+        [en_cocina.id, pagado.id], EstadoPedido.LISTO_PARA_ENTREGA.value, usuario_id=cajero.id, rol=RolUsuario.TABLAJERO
+    )
+    assert resultado['actualizados'] == [en_cocina.id]
+    assert resultado['rechazados'] == [pagado.id]
+    db.session.expire_all()
+    assert db.session.get(Pedido, pagado.id).estado_pedido == EstadoPedido.PAGADO
+
+
+def test_asignar_montos_liquidacion_reparte_el_faltante_desde_el_ultimo(cajero):
+    pedidos = [Pedido(total_pedido=Decimal('100.00')), Pedido(total_pedido=Decimal('50.00'))]
+    assert _asignar_montos_liquidacion(pedidos, Decimal('120.00')) == [Decimal('100.00'), Decimal('20.00')]
+    assert _asignar_montos_liquidacion(pedidos, Decimal('170.00')) == [Decimal('100.00'), Decimal('70.00')]
+
+
+def test_liquidacion_en_lote_un_movimiento_por_pedido(cajero, repartidor):
+    pedidos = [
+        _pedido_domicilio(cajero, EstadoPedido.EN_RUTA, '250.00', repartidor),
+        _pedido_domicilio(cajero, EstadoPedido.ASIGNADO_A_REPARTIDOR, '150.50', repartidor),
+    ]
+    ids = [pedido.id for pedido in pedidos]
+
+    liquidados = process_repartidor_liquidacion_lote(
+        ids, cajero.id, Decimal('400.50'), {Decimal('200'): 2, Decimal('0.50'): 1}
+    )
+    assert liquidados is not None
+    db.session.expire_all()
+
+    assert db.session.get(Pedido, ids[0]).estado_pedido == EstadoPedido.ENTREGADO_Y_PAGADO
+    assert db.session.get(Pedido, ids[1]).estado_pedido == EstadoPedido.PAGADO
+
+    liquidacion = LiquidacionLote.query.one()
+    assert liquidacion.monto_recibido == Decimal('400.50')
+    assert liquidacion.repartidor_id == repartidor.id
+    assert {d.denominacion_valor: d.cantidad for d in liquidacion.detalle_denominaciones} == {
+        Decimal('200.00'): 2, Decimal('0.50'): 1
+    }
+
+    movimientos = {m.pedido_id: m for m in MovimientoCaja.query.filter_by(liquidacion_lote_id=liquidacion.id)}
+    assert movimientos[ids[0]].monto_movimiento == Decimal('250.00')
+    assert movimientos[ids[1]].monto_movimiento == Decimal('150.50')
+    # El conteo físico está en la liquidación, no repartido entre los movimientos
+    assert MovimientoDenominacion.query.count() == 0
+
+
+def test_liquidacion_en_lote_rechaza_conteo_que_no_cuadra(cajero, repartidor):
+    pedido = _pedido_domicilio(cajero, EstadoPedido.EN_RUTA, '250.00', repartidor)
+    assert process_repartidor_liquidacion_lote([pedido.id], cajero.id, Decimal('250.00'), {Decimal('200'): 1}) is None
+    db.session.expire_all()
+    assert db.session.get(Pedido, pedido.id).estado_pedido == EstadoPedido.EN_RUTA
+    assert LiquidacionLote.query.count() == 0